@@ -0,0 +1,840 @@
+"""
+etf_backtest_engine.py
+======================
+Vectorized backtest engine behind the ETF momentum research scripts in
+backtest results/ (etf_backtest.py = Run 1, etf_backtest_v2.py … v13).
+
+Each of those scripts walks every trading day: at every rebalance it
+rebuilds the ranking with a meta.iterrows() loop of sharpe_score() calls,
+and every day it marks the book with a per-slot prices.loc[] sum. The
+scripts only differ in a handful of rules, so here:
+
+  * build_panel() precomputes, for every date and ETF at once, the
+    trailing Sharpe of any window (cumulative sums of log returns and
+    squared log returns turn a window's mean / std into two subtractions),
+    the Clenow slope × R² (the same sums over log prices), the 63-day
+    realised vol, the 252-day high and distance from it, and the regime
+    EMAs of the Nifty 500 series;
+  * a variant is a plain dict (VARIANTS below): rebalance frequency, flush
+    or hold-and-replace, scoring terms and composite rule, regime rule,
+    exit rules and when they are checked, sizing and sector cap.
+    rank_matrix() turns its scoring into (rebalance × ETF) ranks in one pass;
+  * run_variant() keeps the holdings as a few parallel arrays (column,
+    shares, entry price, peak). Between rebalances the book only shrinks
+    (daily stops), so each segment is marked with one gather and the daily
+    TSL / 52-week-high checks become a running max and a first-hit scan.
+
+Decisions use the previous trading day's data and trade at the rebalance
+day's price, idle cash earns CASH_INTEREST_PA / 365 per trading day and
+every trade leg costs TRADE_COST_FIXED — the conventions all the scripts
+share. run_variant("v13_CURRENT") / ("v13_V2") reproduce the v13 engines'
+equity and trades; the older variants keep their scoring, regime and exit
+rules but share the v5+ rebalance mechanics (see the VARIANTS notes).
+
+A window of unchanged (stale) prices is the one place the scripts'
+arithmetic misbehaves: their `excess.std() == 0` check misses the rounding
+noise of a constant series, so such an ETF scores around ±1e16 (e.g.
+LICNETFGSC's 3M Sharpe on 2016-07-29) and every other Z-score on that date
+is flattened. Variants keep that behaviour by default (flat_sharpe =
+"legacy") so they match the scripts; flat_sharpe = "nan" gives such windows
+no Sharpe, as the live ranking does.
+
+Functions
+---------
+load_backtest_data(filepath)              — meta + forward-filled (dates × tickers) prices
+load_regime_series(prices, offline)       — ^CRSLDX via benchmark_store (MONIFTY500 fallback)
+build_panel(meta, prices, regime, sector_fn) — precomputed per-date statistics
+window_stat(panel, kind, window, daily_rf, flat) — memoised SHARPE / CLENOW / VOL (dates × ETFs)
+rebalance_days(dates, freq)               — first trading day of each ISO week ("W") / month ("M")
+variant(name, **overrides)                — VARIANTS entry with the defaults filled in
+rank_matrix(panel, var, rows)             — screen, ranks and exit flags on the decision rows
+run_variant(panel, var)                   — {"equity": DataFrame, "trades": DataFrame}
+compute_metrics(equity)                   — CAGR, max drawdown, vol, simple Sharpe
+run_all(panel, names)                     — every named variant off one panel
+
+Usage:  python etf_backtest_engine.py [variant ...] [--data FILE] [--out DIR] [--offline]
+        Runs every variant by default and prints the comparison table.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+_SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.append(str(_SCRIPT_DIR.parent / "Sharpe"))
+import benchmark_store as bs
+import etf_rank_core as erc
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+class CONFIG:
+    INPUT_FILE           = str(_SCRIPT_DIR / "backtest results" / "ETF - Backtest  - Copy.xlsx")
+
+    START_CAPITAL        = 1_000_000.0
+    CASH_INTEREST_PA     = 0.02          # idle cash, accrued r/365 per trading day
+    TRADE_COST_FIXED     = 20.0          # INR per trade leg
+
+    ANNUALIZE            = 252
+    HIGH_WINDOW          = 252
+    VOL_WINDOW           = 63
+    WINDOWS              = {**erc.WINDOWS, "1M": 21}
+
+    TREND_FAST_EMA       = 50
+    TREND_SLOW_EMA       = 100
+    REGIME_XLSX_FALLBACK = "MONIFTY500"
+
+
+TRADE_COLUMNS = ["TYPE", "REASON", "TICKER", "NAME", "ENTRY_DATE", "EXIT_DATE",
+                 "HOLDING_DAYS", "ENTRY_PRICE", "EXIT_PRICE", "SHARES", "GROSS_PNL",
+                 "COSTS", "NET_PNL", "REGIME"]
+
+
+# =========================================================
+# SCORING + VARIANTS
+# =========================================================
+# terms: {"<KIND>_<window label>": weight}; combine: how missing terms are handled
+#   fixed  — drop missing terms, no rescale (the live script)
+#   mean   — mean of the terms present
+#   strict — mean, NaN unless every term is present
+#   zero   — missing terms count as 0 (Run 1)
+# required / fallback: NaN without the required terms; fallback weights apply
+# when an optional term is missing. unscored: "bottom" ranks NaN composites
+# last among screen-pass ETFs, "unranked" leaves them out (v2-v4).
+SCORINGS = {
+    "live":      {"terms": {"SHARPE_6M": 0.5, "SHARPE_3M": 0.5}},
+    "live_1m":   {"terms": {"SHARPE_6M": 0.5, "SHARPE_3M": 0.5, "SHARPE_1M": -0.2}},
+    "clenow":    {"terms": {"CLENOW_6M": 0.5, "CLENOW_3M": 0.5}},
+    "blend":     {"terms": {"SHARPE_6M": 0.25, "SHARPE_3M": 0.25,
+                            "CLENOW_6M": 0.25, "CLENOW_3M": 0.25}},
+    "4w_avg":    {"terms": {"SHARPE_12M": 0.25, "SHARPE_9M": 0.25,
+                            "SHARPE_6M": 0.25, "SHARPE_3M": 0.25}, "combine": "mean"},
+    "4w_strict": {"terms": {"SHARPE_12M": 0.25, "SHARPE_9M": 0.25,
+                            "SHARPE_6M": 0.25, "SHARPE_3M": 0.25}, "combine": "strict"},
+    "3w_avg":    {"terms": {"SHARPE_12M": 1 / 3, "SHARPE_6M": 1 / 3, "SHARPE_3M": 1 / 3},
+                  "combine": "mean"},
+    "3w_strict": {"terms": {"SHARPE_12M": 1 / 3, "SHARPE_6M": 1 / 3, "SHARPE_3M": 1 / 3},
+                  "combine": "strict"},
+    "run1":      {"terms": {"SHARPE_6M": 0.5, "SHARPE_3M": 0.5}, "zscore": False,
+                  "combine": "zero", "min_history": 63},
+    "accel":     {"terms": {"SHARPE_1M": 0.4, "SHARPE_3M": 0.4, "SHARPE_6M": -0.2},
+                  "zscore": False, "required": ("SHARPE_1M", "SHARPE_3M"),
+                  "min_history": 22, "unscored": "unranked"},
+    "accel_rescaled": {"terms": {"SHARPE_1M": 0.4, "SHARPE_3M": 0.4, "SHARPE_6M": -0.2},
+                  "zscore": False, "required": ("SHARPE_1M", "SHARPE_3M"),
+                  "fallback": {"SHARPE_1M": 0.5, "SHARPE_3M": 0.5},
+                  "min_history": 22, "unscored": "unranked"},
+    "positive":  {"terms": {"SHARPE_1M": 0.4, "SHARPE_3M": 0.4, "SHARPE_6M": 0.2},
+                  "zscore": False, "required": ("SHARPE_1M", "SHARPE_3M"),
+                  "fallback": {"SHARPE_1M": 0.5, "SHARPE_3M": 0.5},
+                  "min_history": 22, "unscored": "unranked"},
+    # v8: both composites ranked separately, top_k on each, ordered by mean rank
+    "intersection": {"intersection": ("live", "clenow"), "top_k": 20},
+}
+_SCORING_DEFAULTS = {
+    "zscore":      True,
+    "combine":     "fixed",
+    "required":    (),
+    "fallback":    None,
+    "min_history": 0,
+    "unscored":    "bottom",
+}
+
+_VARIANT_DEFAULTS = {
+    "rebalance":        "W",          # W: first trading day of the ISO week, M: of the month
+    "mode":             "hold",       # hold (hold-and-replace) | flush (sell all, rebuy)
+    "scoring":          "live",
+    "regime":           "tiered",     # tiered | tiered_price | ema_hold | None (always BULL)
+    "top_n":            5,
+    "top_n_partial":    3,
+    "sector_cap":       1,
+    "sizing":           "EQUAL",      # EQUAL | INVVOL (63d vol across each batch of buys)
+    "max_drawdown":     0.25,         # screen: within 25% of the 52-week high
+    "dd_exit":          0.25,         # hold: exit > 25% off the 52-week high
+    "rank_exit":        20,           # hold: exit when ranked worse than this (None: off)
+    "tsl":              0.05,         # trailing stop from the position peak (None: off)
+    "tsl_check":        "rebalance",  # rebalance (peak refreshed weekly) | daily
+    "daily_dd_exit":    None,         # 52-week-high exit checked every non-rebalance day
+    "slot_cut":         "order",      # order: cut the latest holds | rank: keep the best ranked
+    "size_after_exits": False,        # slot = equity after (True) / before the exits / N
+    "daily_rf":         0.07 / 252,
+    "flat_sharpe":      "legacy",     # stale windows: legacy (the scripts' ±1e16) | nan
+}
+
+# One entry per configuration the scripts ran. Exact duplicates are folded:
+# v5 "old", v6/v7/v8 "current" and v9 CURRENT are v13_CURRENT; v10
+# WEEKLY_EQUAL is v9_NEW_3W_STRICT; v12 MONTHLY_INVVOL_NOCAP is v13_V2.
+_MONTHLY = {"rebalance": "M", "mode": "flush", "scoring": "3w_strict", "rank_exit": None,
+            "tsl": None}
+VARIANTS = {
+    # Run 1 / v2-v4 keep their raw composites, regimes and daily TSL
+    "RUN1":               {"rebalance": "M", "mode": "flush", "scoring": "run1",
+                           "rank_exit": None, "tsl": 0.10, "tsl_check": "daily"},
+    "v2":                 {"scoring": "accel", "regime": "ema_hold", "tsl_check": "daily",
+                           "size_after_exits": True, "daily_rf": 0.06 / 252},
+    "v3":                 {"scoring": "positive", "tsl": 0.10, "tsl_check": "daily",
+                           "slot_cut": "rank", "size_after_exits": True,
+                           "daily_rf": 0.06 / 252},
+    "v4":                 {"mode": "flush", "scoring": "accel_rescaled", "rank_exit": None,
+                           "tsl": 0.10, "tsl_check": "daily", "daily_rf": 0.06 / 252},
+    "v5_NEW":             {"regime": "tiered_price"},
+    "v6_NEW_1M":          {"scoring": "live_1m"},
+    "v7_CLENOW_ONLY":     {"scoring": "clenow"},
+    "v7_BLEND":           {"scoring": "blend"},
+    "v8_INTERSECTION":    {"scoring": "intersection"},
+    "v9_NEW_4W_AVG":      {"scoring": "4w_avg"},
+    "v9_NEW_4W_STRICT":   {"scoring": "4w_strict"},
+    "v9_NEW_3W_AVG":      {"scoring": "3w_avg"},
+    "v9_NEW_3W_STRICT":   {"scoring": "3w_strict"},
+    "v10_WEEKLY_INVVOL":  {"scoring": "3w_strict", "sizing": "INVVOL"},
+    "v10_MONTHLY_EQUAL":  {**_MONTHLY},
+    "v10_MONTHLY_INVVOL": {**_MONTHLY, "sizing": "INVVOL"},
+    "v11_MONTHLY_EQUAL_DDEXIT":  {**_MONTHLY, "daily_dd_exit": 0.25},
+    "v11_MONTHLY_INVVOL_DDEXIT": {**_MONTHLY, "sizing": "INVVOL", "daily_dd_exit": 0.25},
+    "v12_MONTHLY_EQUAL_NOCAP":   {**_MONTHLY, "sector_cap": 5},
+    "v13_CURRENT":        {},
+    "v13_V2":             {**_MONTHLY, "sizing": "INVVOL", "sector_cap": 5},
+}
+
+
+def _scoring(spec) -> dict:
+    spec = SCORINGS[spec] if isinstance(spec, str) else spec
+    return spec if "intersection" in spec else {**_SCORING_DEFAULTS, **spec}
+
+
+def variant(name: str | None = None, **overrides) -> dict:
+    """VARIANTS[name] (or just the defaults) with `overrides` applied and the scoring resolved."""
+    base = VARIANTS[name] if name else {}
+    var  = {**_VARIANT_DEFAULTS, **base, "name": name or "custom", **overrides}
+    var["scoring"] = _scoring(var["scoring"])
+    return var
+
+
+# =========================================================
+# 1. DATA
+# =========================================================
+def load_backtest_data(filepath: str):
+    """Sheet DATA of the backtest workbook: (meta, prices) with zeros as NaN, forward-filled."""
+    print(f"Loading data from {filepath} ...")
+    raw = pd.read_excel(filepath, sheet_name="DATA", header=None)
+    header = raw.iloc[0]
+    date_cols = [c for c in range(2, raw.shape[1])
+                 if pd.notna(header.iloc[c]) and isinstance(header.iloc[c], (datetime, pd.Timestamp))]
+    dates = pd.to_datetime([header.iloc[c] for c in date_cols])
+
+    meta = pd.DataFrame({
+        "ETF_NAME": raw.iloc[1:, 0].fillna("").astype(str).str.strip(),
+        "TICKER":   raw.iloc[1:, 1].astype(str).str.strip(),
+    }).reset_index(drop=True)
+
+    price_df = raw.iloc[1:, date_cols].apply(pd.to_numeric, errors="coerce").replace(0, np.nan)
+    price_df.columns = dates
+    price_df.index = meta["TICKER"]
+    prices = price_df.T.sort_index().ffill()
+    print(f"  {len(meta)} ETFs | {len(dates)} date columns "
+          f"({prices.index[0].date()} -> {prices.index[-1].date()})")
+    return meta, prices
+
+
+def load_regime_series(prices: pd.DataFrame, offline: bool = False) -> pd.Series | None:
+    """
+    Nifty 500 closes aligned (ffill) to the price calendar: ^CRSLDX from the
+    shared benchmark store, else the MONIFTY500 column of the workbook.
+    """
+    dates = prices.index
+    if not offline:
+        try:
+            close = bs.get_frame(bs.NIFTY500, dates[0].date())["Close"].dropna()
+            if len(close):
+                print(f"  Regime source: {bs.NIFTY500} ({close.index[0].date()} -> "
+                      f"{close.index[-1].date()})")
+                return close.reindex(dates, method="ffill")
+        except Exception as e:
+            print(f"  [warn] {bs.NIFTY500} unavailable ({e})")
+    col = CONFIG.REGIME_XLSX_FALLBACK
+    if col in prices.columns:
+        print(f"  Regime source: {col} column")
+        return prices[col].dropna().reindex(dates, method="ffill")
+    print("  [warn] No regime series; every rebalance is BULL")
+    return None
+
+
+# =========================================================
+# 2. PANEL
+# =========================================================
+def _cum(x: np.ndarray) -> np.ndarray:
+    """Column cumsums with a leading zero row: cum[k] = x[:k].sum(axis=0)."""
+    out = np.zeros((x.shape[0] + 1, x.shape[1]))
+    np.cumsum(x, axis=0, out=out[1:])
+    return out
+
+
+def _trailing(cum: np.ndarray, w: int) -> np.ndarray:
+    """Sum of the last w rows ending at each row (NaN for the first w-1 rows)."""
+    out = np.full((cum.shape[0] - 1, cum.shape[1]), np.nan)
+    out[w - 1:] = cum[w:] - cum[:-w]
+    return out
+
+
+def build_panel(meta: pd.DataFrame, prices: pd.DataFrame, regime: pd.Series | None = None,
+                sector_fn=None) -> dict:
+    """
+    Per-date statistics for every ETF in the forward-filled price frame.
+    Valid prices are contiguous after listing, so "the last N valid prices
+    as of row t" is rows t-N+1 … t and every window is a cumsum difference.
+    """
+    values = prices.to_numpy(dtype=float)
+    valid  = ~np.isnan(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logp = np.log(values)
+    ret  = np.diff(logp, axis=0, prepend=np.nan)
+    r    = np.nan_to_num(ret)
+    # log prices relative to each ETF's first valid price keep the sums small
+    first = np.take_along_axis(logp, valid.argmax(axis=0)[None, :], axis=0)
+    y    = np.nan_to_num(logp - first)
+    rows = np.arange(len(values), dtype=float)[:, None]
+    high = prices.rolling(CONFIG.HIGH_WINDOW, min_periods=1).max().to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        has = valid & (high > 0)
+        pct = np.where(has, (high - values) / high, np.nan)
+
+    names = dict(zip(meta["TICKER"], meta["ETF_NAME"]))
+    sector_fn = sector_fn or (lambda name, ticker: "OTHER")
+    if regime is not None:
+        regime = regime.reindex(prices.index)
+        fast = regime.ewm(span=CONFIG.TREND_FAST_EMA, adjust=False).mean().to_numpy()
+        slow = regime.ewm(span=CONFIG.TREND_SLOW_EMA, adjust=False).mean().to_numpy()
+        regime = regime.to_numpy(dtype=float)
+    else:
+        fast = slow = None
+
+    return {
+        "dates":         prices.index,
+        "tickers":       list(prices.columns),
+        "names":         [names.get(t, "") for t in prices.columns],
+        "sectors":       np.array([sector_fn(names.get(t, ""), t) for t in prices.columns]),
+        "PRICE":         values,
+        "COUNT":         np.cumsum(valid, axis=0),
+        "HIGH":          high,
+        "PCT_FROM_HIGH": pct,
+        "REGIME":        regime,
+        "EMA_FAST":      fast,
+        "EMA_SLOW":      slow,
+        "_cum_r":        _cum(r),
+        "_cum_r2":       _cum(r * r),
+        "_cum_nz":       _cum((r != 0).astype(float)),
+        "_cum_y":        _cum(y),
+        "_cum_ty":       _cum(rows * y),
+        "_cum_y2":       _cum(y * y),
+        "_memo":         {},
+    }
+
+
+def _moments(panel: dict, w: int):
+    """Mean and sample std of the last w log returns, plus where they are defined."""
+    key = ("MOMENTS", w)
+    if key not in panel["_memo"]:
+        s1 = _trailing(panel["_cum_r"], w)
+        s2 = _trailing(panel["_cum_r2"], w)
+        nz = _trailing(panel["_cum_nz"], w)
+        with np.errstate(invalid="ignore"):
+            sd = np.sqrt(np.clip((s2 - s1 * s1 / w) / (w - 1), 0.0, None))
+            ok = (panel["COUNT"] >= w + 1) & (nz > 0) & (sd > 0)
+        panel["_memo"][key] = (s1 / w, sd, ok)
+    return panel["_memo"][key]
+
+
+def _clenow(panel: dict, w: int) -> np.ndarray:
+    """clenow_score(): annualised log-price slope × R² over the last min(count, w) prices."""
+    count = panel["COUNT"]
+    T     = count.shape[0]
+    n     = np.minimum(count, w).astype(float)
+    end   = np.arange(1, T + 1)[:, None].repeat(count.shape[1], axis=1)
+    start = (end - n).astype(int)
+
+    def window(cum, lo):
+        return np.take_along_axis(cum, end, axis=0) - np.take_along_axis(cum, lo, axis=0)
+
+    sy  = window(panel["_cum_y"], start)
+    sty = window(panel["_cum_ty"], start)
+    sy2 = window(panel["_cum_y2"], start)
+    nz  = window(panel["_cum_nz"], np.minimum(start + 1, end))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sxy   = sty - start * sy - (n - 1) / 2 * sy
+        sxx   = n * (n * n - 1) / 12
+        syy   = sy2 - sy * sy / n
+        score = sxy / sxx * CONFIG.ANNUALIZE * (sxy * sxy / (sxx * syy))
+        ok    = (count >= w * erc.CLENOW_MIN_COVERAGE) & (n >= 2) & (nz > 0) & (syy > 0)
+    return np.where(ok, score, np.nan)
+
+
+def _legacy_flat_sharpe(window: int, daily_rf: float) -> float:
+    """The scripts' sharpe_score() on `window` zero log returns (rounding noise, not NaN)."""
+    excess = pd.Series(np.zeros(window)) - daily_rf
+    if excess.std() == 0:
+        return np.nan
+    return (excess.mean() / excess.std()) * np.sqrt(CONFIG.ANNUALIZE)
+
+
+def window_stat(panel: dict, kind: str, window: int, daily_rf: float = 0.0,
+                flat: str = "nan") -> np.ndarray:
+    """
+    SHARPE / CLENOW / VOL for every date and ETF, computed once per panel.
+    flat="legacy" gives a SHARPE window of unchanged prices the scripts'
+    value instead of NaN.
+    """
+    key = (kind, window, daily_rf if kind == "SHARPE" else None, flat if kind == "SHARPE" else None)
+    if key not in panel["_memo"]:
+        if kind == "SHARPE":
+            mean, sd, ok = _moments(panel, window)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out = np.where(ok, (mean - daily_rf) / sd * np.sqrt(CONFIG.ANNUALIZE), np.nan)
+            if flat == "legacy":
+                stale = (panel["COUNT"] >= window + 1) & (_trailing(panel["_cum_nz"], window) == 0)
+                out[stale] = _legacy_flat_sharpe(window, daily_rf)
+        elif kind == "VOL":
+            _, sd, ok = _moments(panel, window)
+            out = np.where(ok, sd * np.sqrt(CONFIG.ANNUALIZE), np.nan)
+        elif kind == "CLENOW":
+            out = _clenow(panel, window)
+        else:
+            raise ValueError(f"window_stat: unknown statistic {kind!r}")
+        panel["_memo"][key] = out
+    return panel["_memo"][key]
+
+
+def rebalance_days(dates: pd.DatetimeIndex, freq: str) -> np.ndarray:
+    """Row indices of the first trading day of each ISO week ("W") or month ("M")."""
+    if freq == "W":
+        iso = dates.isocalendar()
+        key = iso["year"].to_numpy() * 100 + iso["week"].to_numpy()
+    elif freq == "M":
+        key = dates.year.to_numpy() * 100 + dates.month.to_numpy()
+    else:
+        raise ValueError(f"rebalance_days: unknown frequency {freq!r}")
+    return np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+
+
+# =========================================================
+# 3. RANKING
+# =========================================================
+def _zscore_rows(values: np.ndarray, pool: np.ndarray, exact=None) -> np.ndarray:
+    """
+    Row-wise erc._zscore over the pooled ETFs; a degenerate row scores 0.0
+    for the whole pool. Rows flagged in `exact` take their mean / std with
+    the scripts' pandas reductions over the pool alone: next to a ±1e16
+    stale Sharpe the other Z-scores differ only in their last bits, and the
+    ties (and so the ranks) depend on that exact rounding.
+    """
+    x = np.where(pool, values, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        n   = (~np.isnan(x)).sum(axis=1, keepdims=True)
+        mu  = np.nansum(x, axis=1, keepdims=True) / n
+        sd  = np.sqrt(np.nansum((x - mu) ** 2, axis=1, keepdims=True) / (n - 1))
+        z   = (x - mu) / sd
+    z = np.where(sd > 0, z, 0.0)
+    z = np.where(pool, z, np.nan)
+    for i in np.flatnonzero(exact) if exact is not None else ():
+        s   = pd.Series(values[i, pool[i]])
+        sig = s.std()
+        z[i, pool[i]] = 0.0 if sig == 0 or np.isnan(sig) else (s - s.mean()) / sig
+    return z
+
+
+def _combine_rows(terms: dict, spec: dict) -> np.ndarray:
+    """Composite of aligned term matrices under the scoring's missing-data rule."""
+    labels  = list(spec["terms"])
+    present = {l: ~np.isnan(terms[l]) for l in labels}
+    n       = sum(present[l].astype(int) for l in labels)
+    out     = 0.0
+    for l in labels:
+        out = out + spec["terms"][l] * np.where(present[l], terms[l], 0.0)
+    if spec["combine"] in ("mean", "strict"):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out = sum(np.where(present[l], terms[l], 0.0) for l in labels) / n
+    if spec["combine"] == "strict":
+        out = np.where(n == len(labels), out, np.nan)
+    elif spec["combine"] != "zero":
+        out = np.where(n > 0, out, np.nan)
+
+    if spec["required"]:
+        req = np.logical_and.reduce([present[l] for l in spec["required"]])
+        if spec["fallback"]:
+            opt = np.logical_and.reduce([present[l] for l in labels if l not in spec["required"]])
+            fb  = 0.0
+            for l, w in spec["fallback"].items():
+                fb = fb + w * np.where(present[l], terms[l], 0.0)
+            out = np.where(opt, out, fb)
+        out = np.where(req, out, np.nan)
+    return out
+
+
+def _score(panel: dict, spec: dict, rows: np.ndarray, var: dict,
+           passed: np.ndarray) -> np.ndarray:
+    terms = {}
+    for label in spec["terms"]:
+        kind, win = label.split("_")
+        w    = CONFIG.WINDOWS[win]
+        vals = window_stat(panel, kind, w, var["daily_rf"], var["flat_sharpe"])[rows]
+        if not spec["zscore"]:
+            terms[label] = vals
+            continue
+        exact = None
+        if kind == "SHARPE" and var["flat_sharpe"] == "legacy":
+            fresh = window_stat(panel, kind, w, var["daily_rf"], "nan")[rows]
+            exact = (passed & ~np.isnan(vals) & np.isnan(fresh)).any(axis=1)
+        terms[label] = _zscore_rows(vals, passed, exact)
+    return _combine_rows(terms, spec)
+
+
+def _rank_rows(score: np.ndarray, passed: np.ndarray, unscored: str) -> np.ndarray:
+    """RANK_INVESTABLE per row: average ranks among screen-pass ETFs, truncated as .astype(int)."""
+    s = np.where(passed, score, np.nan)
+    if unscored == "bottom":
+        s = np.where(passed & np.isnan(score), -np.inf, s)
+    rank = pd.DataFrame(s).rank(axis=1, ascending=False, method="average").to_numpy()
+    return np.floor(rank)
+
+
+def rank_matrix(panel: dict, var: dict, rows: np.ndarray) -> dict:
+    """
+    On the decision rows: PASS (screen), PCT (distance from the 52-week
+    high), RANK, ORDER (buy priority, NaN = not buyable) and RANK_EXIT.
+    """
+    spec = var["scoring"]
+    pct  = panel["PCT_FROM_HIGH"][rows]
+    base = spec if "intersection" not in spec else _scoring(spec["intersection"][0])
+    universe = panel["COUNT"][rows] >= base["min_history"]
+    passed   = universe & (np.isnan(pct) | (pct <= var["max_drawdown"]))
+
+    if "intersection" in spec:
+        ranks = [_rank_rows(_score(panel, s, rows, var, passed), passed, s["unscored"])
+                 for s in map(_scoring, spec["intersection"])]
+        inside = passed & np.logical_and.reduce([r <= spec["top_k"] for r in ranks])
+        order  = np.where(inside, sum(ranks) / len(ranks), np.nan)
+        return {"PASS": passed, "PCT": pct, "RANK": ranks[0], "ORDER": order,
+                "RANK_EXIT": ~inside}
+
+    rank = _rank_rows(_score(panel, spec, rows, var, passed), passed,
+                      spec["unscored"])
+    if var["rank_exit"] is None:
+        rank_exit = np.zeros_like(passed)
+    else:
+        with np.errstate(invalid="ignore"):
+            rank_exit = (rank > var["rank_exit"]) | (
+                np.isnan(rank) & (spec["unscored"] == "unranked"))
+    return {"PASS": passed, "PCT": pct, "RANK": rank, "ORDER": rank, "RANK_EXIT": rank_exit}
+
+
+# =========================================================
+# 4. SIMULATION
+# =========================================================
+def _regime(panel: dict, var: dict, row: int, prev: str) -> tuple:
+    """(label, active slots, new buys allowed) from the regime series as of `row`."""
+    rule, n = var["regime"], var["top_n"]
+    if rule is None or panel["REGIME"] is None:
+        return ("BUY" if rule == "ema_hold" else "BULL"), n, True
+    price, fast, slow = panel["REGIME"][row], panel["EMA_FAST"][row], panel["EMA_SLOW"][row]
+    if rule == "ema_hold":
+        # BUY above EMA50; HOLD keeps the book but makes no new entries
+        label = prev if np.isnan(price) or np.isnan(fast) else ("BUY" if price > fast else "HOLD")
+        return label, n, label == "BUY"
+    if np.isnan(price) or np.isnan(fast) or np.isnan(slow):
+        return "BULL", n, True
+    bull = price > fast if rule == "tiered_price" else (fast > slow and price > fast)
+    if bull:
+        return "BULL", n, True
+    if price > slow:
+        return "PARTIAL", var["top_n_partial"], True
+    return "BEAR", 0, True
+
+
+def _book(idx=(), shares=(), entry_px=(), entry_day=(), peak=()) -> dict:
+    return {"idx": np.asarray(idx, dtype=int), "shares": np.asarray(shares, dtype=float),
+            "entry_px": np.asarray(entry_px, dtype=float),
+            "entry_day": np.asarray(entry_day, dtype=int), "peak": np.asarray(peak, dtype=float)}
+
+
+def _take(book: dict, mask: np.ndarray) -> dict:
+    return {k: v[mask] for k, v in book.items()}
+
+
+def _sell(ctx: dict, book: dict, k: int, price: float, day: int, reason: str,
+          label: str) -> float:
+    """Log the sale of holding k; returns the cash it releases."""
+    shares, entry = book["shares"][k], book["entry_px"][k]
+    cost  = CONFIG.TRADE_COST_FIXED
+    gross = shares * price - shares * entry
+    d, e  = ctx["dates"][day], ctx["dates"][book["entry_day"][k]]
+    ctx["trades"].append(["SELL", reason, ctx["tickers"][book["idx"][k]],
+                          ctx["names"][book["idx"][k]], e, d, (d - e).days, round(entry, 4),
+                          round(price, 4), round(shares, 4), round(gross, 2), cost,
+                          round(gross - cost, 2), label])
+    return shares * price - cost
+
+
+def _exit_reasons(var: dict, rk: dict, j: int, book: dict, cur: np.ndarray) -> list:
+    """should_exit() for every holding at once: a reason string, "" to keep."""
+    pct   = rk["PCT"][j, book["idx"]]
+    rank  = rk["RANK"][j, book["idx"]]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        dd    = pct > var["dd_exit"]
+        rx    = rk["RANK_EXIT"][j, book["idx"]]
+        drop  = (book["peak"] - cur) / book["peak"]
+        tsl   = (var["tsl"] is not None) & (var["tsl_check"] == "rebalance") & \
+                (book["peak"] > 0) & (cur > 0) & (drop >= (var["tsl"] or 0))
+    out = []
+    for k in range(len(book["idx"])):
+        parts = []
+        if dd[k]:
+            parts.append(f"52wk high DD {pct[k] * 100:.1f}%")
+        if rx[k]:
+            parts.append(f"Rank {rank[k]:.0f}" if not np.isnan(rank[k]) else "Unranked")
+        if tsl[k]:
+            parts.append(f"TSL {drop[k] * 100:.1f}%")
+        out.append(" | ".join(parts))
+    return out
+
+
+def _rebalance_hold(ctx, var, rk, j, d, book, cash, label, active):
+    """Exit checks and regime cuts on the held book; returns (kept book, cash)."""
+    px  = ctx["P"][d, book["idx"]]
+    cur = np.where(np.isnan(px), 0.0, px)
+    reasons = _exit_reasons(var, rk, j, book, cur)
+    exits   = np.array([bool(r) for r in reasons], dtype=bool)
+    if var["slot_cut"] == "order":
+        # the scripts walk the book in order and cut once `active` holds are kept
+        kept_before = np.cumsum(~exits) - (~exits)
+        cut  = kept_before >= active
+        keep = ~exits & ~cut
+        for k in np.flatnonzero(cut):
+            reasons[k] = "REGIME_SLOT_CUT"
+    else:
+        ranks = np.nan_to_num(rk["RANK"][j, book["idx"]], nan=9999)
+        order = [k for k in np.argsort(ranks, kind="stable") if not exits[k]]
+        keep  = np.zeros(len(exits), dtype=bool)
+        keep[order[:active]] = True
+        for k in order[active:]:
+            reasons[k] = "BEAR_REGIME_EXIT" if active == 0 else f"PARTIAL_TRIM (rank={ranks[k]:.0f})"
+    for k in np.flatnonzero(~keep):
+        price = cur[k] if cur[k] > 0 else book["entry_px"][k]
+        cash += _sell(ctx, book, k, price, d, reasons[k], label)
+    kept = _take(book, keep)
+    if var["tsl"] is not None and var["tsl_check"] == "rebalance":
+        kept["peak"] = np.maximum(kept["peak"], cur[keep])
+    return kept, cash
+
+
+def _buy(ctx, var, rk, j, d, book, cash, slot, open_slots, label):
+    """Fill up to `open_slots` from the ranking (sector cap, tradable price); returns (book, cash)."""
+    order, px = rk["ORDER"][j], ctx["P"][d]
+    cands = np.flatnonzero(rk["PASS"][j] & (np.nan_to_num(order, nan=0.0) > 0))
+    cands = cands[np.argsort(order[cands], kind="quicksort")]
+    held  = set(book["idx"].tolist())
+    secs  = ctx["sectors"]
+    count = {}
+    for s in secs[book["idx"]]:
+        count[s] = count.get(s, 0) + 1
+    picks = []
+    for c in cands:
+        if len(picks) >= open_slots:
+            break
+        if c in held or count.get(secs[c], 0) >= var["sector_cap"] or not px[c] > 0:
+            continue
+        picks.append(c)
+        held.add(c)
+        count[secs[c]] = count.get(secs[c], 0) + 1
+    if not picks:
+        return book, cash
+
+    sizes = np.full(len(picks), slot)
+    if var["sizing"] == "INVVOL":
+        vol = window_stat(ctx["panel"], "VOL", CONFIG.VOL_WINDOW)[ctx["dec"][j], picks]
+        if np.all(vol > 0):
+            sizes = (1.0 / vol) / (1.0 / vol).sum() * slot * len(picks)
+    cost = CONFIG.TRADE_COST_FIXED
+    date = ctx["dates"][d]
+    for c, size in zip(picks, sizes):
+        cash -= size + cost
+        r = rk["RANK"][j, c] if not np.isnan(rk["RANK"][j, c]) else order[c]
+        ctx["trades"].append(["BUY", f"NEW BUY (rank={r:g})", ctx["tickers"][c], ctx["names"][c],
+                              date, None, None, round(px[c], 4), None,
+                              round(size / px[c], 4), None, cost, None, label])
+    p = px[picks]
+    new = _book(picks, sizes / p, p, [d] * len(picks), p)
+    return {k: np.concatenate([book[k], new[k]]) for k in book}, cash
+
+
+def _segment(ctx, var, book, d, end, cash, label):
+    """
+    Mark days d … end-1 (day d's interest and trades already applied) with
+    the daily stops; returns (surviving book, cash at end-1).
+    """
+    P, g, K = ctx["P"], ctx["growth"], end - d
+    seg     = P[d:end][:, book["idx"]]
+    exit_at = np.full(len(book["idx"]), K)
+    reason  = [""] * len(book["idx"])
+    if len(book["idx"]) and var["tsl"] is not None and var["tsl_check"] == "daily":
+        run = np.fmax.accumulate(np.vstack([book["peak"], seg]), axis=0)[1:]
+        with np.errstate(invalid="ignore"):
+            hit = (run - seg) / run >= var["tsl"]
+        first = np.where(hit.any(axis=0), hit.argmax(axis=0), K)
+        for k in np.flatnonzero(first < exit_at):
+            exit_at[k] = first[k]
+            drop = (run[first[k], k] - seg[first[k], k]) / run[first[k], k]
+            reason[k] = f"TSL_HIT ({drop * 100:.1f}%)"
+        book = {**book, "peak": np.where(np.isnan(run[-1]), book["peak"], run[-1])}
+    if len(book["idx"]) and var["daily_dd_exit"] is not None:
+        high = ctx["panel"]["HIGH"][d:end][:, book["idx"]]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            pct = (high - seg) / high
+            hit = (high > 0) & (pct > var["daily_dd_exit"])
+        hit[0] = False                        # checked on the days between rebalances
+        first = np.where(hit.any(axis=0), hit.argmax(axis=0), K)
+        for k in np.flatnonzero(first < exit_at):
+            exit_at[k] = first[k]
+            reason[k] = f"52wk high DD {pct[first[k], k] * 100:.1f}% (intra-month)"
+
+    adds = np.zeros(K)
+    adds[0] = cash
+    for k in np.flatnonzero(exit_at < K):
+        adds[exit_at[k]] += _sell(ctx, book, k, seg[exit_at[k], k], d + exit_at[k], reason[k], label)
+    alive = np.arange(K)[:, None] < exit_at[None, :]
+    value = (np.where(alive, np.nan_to_num(seg), 0.0) * book["shares"]).sum(axis=1)
+    grow  = g ** np.arange(K)
+    cash_path = grow * np.cumsum(adds / grow)
+    ctx["equity"][d:end] = cash_path + value
+    ctx["n_hold"][d:end] = alive.sum(axis=1)
+    ctx["regime"][d:end] = label
+    return _take(book, exit_at == K), cash_path[-1]
+
+
+def run_variant(panel: dict, var: dict | str) -> dict:
+    """
+    Simulate one variant over the whole panel. Returns {"equity": DataFrame
+    (equity, regime, n_holdings per date), "trades": trade log, "variant": var}.
+    """
+    var   = variant(var) if isinstance(var, str) else var
+    dates = panel["dates"]
+    T     = len(dates)
+    reb   = rebalance_days(dates, var["rebalance"])
+    dec   = np.maximum(reb - 1, 0)             # decide on the previous day's data
+    rk    = rank_matrix(panel, var, dec)
+    ctx   = {"panel": panel, "P": panel["PRICE"], "dates": dates, "dec": dec,
+             "tickers": panel["tickers"], "names": panel["names"], "sectors": panel["sectors"],
+             "growth": 1.0 + CONFIG.CASH_INTEREST_PA / 365.0, "trades": [],
+             "equity": np.empty(T), "n_hold": np.zeros(T, dtype=int),
+             "regime": np.empty(T, dtype=object)}
+
+    cash, book, label = CONFIG.START_CAPITAL, _book(), "BULL"
+    if reb[0] > 0:                             # idle cash before the first rebalance
+        cash = _segment(ctx, var, book, 0, reb[0], cash * ctx["growth"], label)[1]
+    for j, d in enumerate(reb):
+        end   = reb[j + 1] if j + 1 < len(reb) else T
+        cash *= ctx["growth"]
+        label, active, can_buy = _regime(panel, var, dec[j], label)
+        px    = ctx["P"][d, book["idx"]]
+
+        if var["mode"] == "flush":
+            reason = "WEEKLY_FLUSH" if var["rebalance"] == "W" else "MONTHLY_FLUSH"
+            for k in range(len(book["idx"])):
+                price = px[k] if not np.isnan(px[k]) else book["entry_px"][k]
+                cash += _sell(ctx, book, k, price, d, reason, label)
+            book, base = _book(), cash
+        else:
+            base = cash + np.nansum(book["shares"] * px)
+            book, cash = _rebalance_hold(ctx, var, rk, j, d, book, cash, label, active)
+            if var["size_after_exits"]:
+                base = cash + np.nansum(book["shares"] * ctx["P"][d, book["idx"]])
+
+        open_slots = active - len(book["idx"]) if can_buy else 0
+        if open_slots > 0:
+            book, cash = _buy(ctx, var, rk, j, d, book, cash, base / var["top_n"],
+                              open_slots, label)
+        book, cash = _segment(ctx, var, book, d, end, cash, label)
+
+    equity = pd.DataFrame({"equity": ctx["equity"], "regime": ctx["regime"],
+                           "n_holdings": ctx["n_hold"]}, index=pd.Index(dates, name="date"))
+    return {"equity": equity, "trades": pd.DataFrame(ctx["trades"], columns=TRADE_COLUMNS),
+            "variant": var}
+
+
+# =========================================================
+# 5. RESULTS
+# =========================================================
+def compute_metrics(eq: pd.DataFrame) -> dict:
+    """CAGR, max drawdown, annualised vol and CAGR / vol, as every script reported them."""
+    years  = (eq.index[-1] - eq.index[0]).days / 365.25
+    equity = eq["equity"]
+    cagr   = (equity.iloc[-1] / CONFIG.START_CAPITAL) ** (1 / years) - 1
+    max_dd = (equity / equity.cummax() - 1).min()
+    vol    = equity.pct_change().dropna().std() * np.sqrt(252)
+    return {"years": years, "final": equity.iloc[-1], "cagr": cagr, "max_dd": max_dd,
+            "vol": vol, "sharpe": cagr / vol if vol > 0 else 0.0}
+
+
+def run_all(panel: dict, names: list | None = None) -> dict:
+    """{name: run_variant result} for the named variants (all by default), one shared panel."""
+    return {name: run_variant(panel, variant(name)) for name in (names or list(VARIANTS))}
+
+
+def _print_summary(results: dict, seconds: dict) -> None:
+    print(f"\n  {'Variant':<28}{'CAGR':>8}{'MaxDD':>9}{'Vol':>8}{'Sharpe':>8}"
+          f"{'Buys':>7}{'Win%':>7}{'Secs':>7}")
+    for name, res in results.items():
+        m      = compute_metrics(res["equity"])
+        trades = res["trades"]
+        sells  = trades[trades["TYPE"] == "SELL"]
+        win    = (sells["NET_PNL"] > 0).mean() if len(sells) else np.nan
+        print(f"  {name:<28}{m['cagr']:>8.2%}{m['max_dd']:>9.2%}{m['vol']:>8.2%}"
+              f"{m['sharpe']:>8.2f}{(trades['TYPE'] == 'BUY').sum():>7}{win:>7.1%}"
+              f"{seconds[name]:>7.2f}")
+
+
+# =========================================================
+# CLI
+# =========================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run ETF momentum backtest variants off one panel")
+    parser.add_argument("variants", nargs="*", default=list(VARIANTS),
+                        help="variants to run (default: all)")
+    parser.add_argument("--data", default=CONFIG.INPUT_FILE)
+    parser.add_argument("--out", default=None,
+                        help="folder for <variant>_backtest_equity.csv / _trade_log.csv")
+    parser.add_argument("--offline", action="store_true",
+                        help=f"regime from the {CONFIG.REGIME_XLSX_FALLBACK} column, no fetch")
+    args = parser.parse_args()
+    unknown = [v for v in args.variants if v not in VARIANTS]
+    if unknown:
+        sys.exit(f"Unknown variant(s): {', '.join(unknown)}")
+
+    import etf_momentum_ranking as emr
+    meta, prices = load_backtest_data(args.data)
+    regime = load_regime_series(prices, offline=args.offline)
+
+    t0 = time.perf_counter()
+    panel = build_panel(meta, prices, regime, emr.classify_sector)
+    results, seconds = {}, {}
+    for name in args.variants:
+        t1 = time.perf_counter()
+        results[name] = run_variant(panel, variant(name))
+        seconds[name] = time.perf_counter() - t1
+    print(f"\n{len(results)} variant(s) in {time.perf_counter() - t0:.2f}s "
+          f"({prices.index[0].date()} -> {prices.index[-1].date()})")
+    _print_summary(results, seconds)
+
+    if args.out:
+        out = Path(args.out)
+        out.mkdir(parents=True, exist_ok=True)
+        for name, res in results.items():
+            res["equity"].to_csv(out / f"{name}_backtest_equity.csv")
+            res["trades"].to_csv(out / f"{name}_backtest_trade_log.csv", index=False)
+        print(f"\nEquity curves and trade logs -> {out}")
@@ -22,14 +22,19 @@ import shutil
 import uuid
 import datetime
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
-import yfinance as yf
 
 # ── Ensure the script directory is importable ──────────────
 SCRIPT_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(SCRIPT_DIR))
 
 import etf_momentum_ranking as emr
+import peak_store as pk
+
+# The shared position book / quote service live with the Sharpe modules;
+# appended (not inserted) so this folder's own momentum_lib keeps precedence
+sys.path.append(str(SCRIPT_DIR.parent / "Sharpe"))
+import position_book as pb
+import live_quotes as lq
 
 # =========================================================
 # PAGE CONFIG
@@ -174,6 +179,7 @@ def compute_rankings(_meta, _prices):
 # =========================================================
 ETF_TRADELOG_FILE    = SCRIPT_DIR / "ETF_tradelog.json"
 ETF_POSITIONS_LEDGER = SCRIPT_DIR / "ETF_positions_ledger.json"
+ETF_PEAK_STORE       = SCRIPT_DIR / pk.PEAK_STORE_FILE
 
 
 def safe_write_json(path, data):
@@ -225,110 +231,10 @@ def save_tradelog(tradelog: list):
         st.error(f"Error saving tradelog: {e}")
 
 
-def validate_tradelog_integrity(transactions: list):
-    """Replay all transactions chronologically; check no ticker ever goes negative.
-    Returns (is_valid: bool, error_message: str)."""
-    try:
-        sorted_txs = sorted(transactions,
-                            key=lambda x: (x.get("date", ""), x.get("timestamp", "")))
-    except Exception:
-        sorted_txs = transactions
-    holdings = {}
-    for tx in sorted_txs:
-        ticker  = tx["ticker"]
-        action  = tx["action"].upper()
-        qty     = float(tx["quantity"])
-        current = holdings.get(ticker, 0.0)
-        if action == "BUY":
-            holdings[ticker] = current + qty
-        elif action == "SELL":
-            if qty > current + 1e-9:
-                return False, (f"{ticker}: SELL {qty:.0f} exceeds holding "
-                               f"{current:.0f} on {tx.get('date', '?')}")
-            holdings[ticker] = current - qty
-    return True, ""
-
-
-def calculate_holdings_and_pnl(transactions: list, latest_prices: dict | None = None) -> dict:
-    """FIFO avg-cost P&L engine — exact port from sharpe_dashboard.py."""
-    try:
-        sorted_txs = sorted(transactions,
-                            key=lambda x: (x.get("date", ""), x.get("timestamp", "")))
-    except Exception:
-        sorted_txs = transactions
-
-    holdings: dict = {}
-    realized_pnl = 0.0
-    realized_pnl_by_ticker: dict = {}
-
-    for tx in sorted_txs:
-        ticker   = tx["ticker"]
-        action   = tx["action"].upper()
-        qty      = float(tx["quantity"])
-        price    = float(tx["price"])
-        tx_date  = tx.get("date", "")
-        if isinstance(tx_date, str):
-            try:
-                tx_date = datetime.date.fromisoformat(tx_date)
-            except Exception:
-                tx_date = datetime.date.today()
-
-        if ticker not in holdings:
-            holdings[ticker] = {"qty": 0.0, "avg_price": 0.0,
-                                "first_buy_date": None, "total_cost": 0.0}
-        h      = holdings[ticker]
-        t_pnl  = realized_pnl_by_ticker.get(ticker, 0.0)
-
-        if action == "BUY":
-            if h["qty"] == 0:
-                h["first_buy_date"] = tx_date
-            h["total_cost"] += qty * price
-            h["qty"]        += qty
-            h["avg_price"]   = h["total_cost"] / h["qty"]
-        elif action == "SELL":
-            if h["qty"] > 0:
-                sell_qty = min(qty, h["qty"])
-                pnl      = sell_qty * (price - h["avg_price"])
-                realized_pnl += pnl
-                t_pnl        += pnl
-                h["qty"]     -= sell_qty
-                h["total_cost"] = h["qty"] * h["avg_price"]
-                if h["qty"] == 0:
-                    h["avg_price"]    = 0.0
-                    h["first_buy_date"] = None
-        realized_pnl_by_ticker[ticker] = t_pnl
-
-    active_holdings = {t: h for t, h in holdings.items() if h["qty"] > 0}
-    unrealized_pnl  = 0.0
-    holdings_metrics = []
-
-    for ticker, h in active_holdings.items():
-        curr_price = h["avg_price"]
-        if latest_prices and ticker in latest_prices:
-            curr_price = latest_prices[ticker]
-        market_val  = h["qty"] * curr_price
-        u_pnl       = market_val - h["total_cost"]
-        unrealized_pnl += u_pnl
-        u_pnl_pct   = (u_pnl / h["total_cost"] * 100) if h["total_cost"] > 0 else 0.0
-        holdings_metrics.append({
-            "Ticker":            ticker,
-            "Qty":               h["qty"],
-            "Avg Price":         h["avg_price"],
-            "Current Price":     curr_price,
-            "Cost Value":        h["total_cost"],
-            "Market Value":      market_val,
-            "Unrealized PnL":    u_pnl,
-            "Unrealized PnL %":  u_pnl_pct,
-            "First Buy Date":    h["first_buy_date"],
-        })
-
-    return {
-        "active_holdings":       active_holdings,
-        "holdings_metrics":      holdings_metrics,
-        "realized_pnl":          realized_pnl,
-        "realized_pnl_by_ticker": realized_pnl_by_ticker,
-        "unrealized_pnl":        unrealized_pnl,
-    }
+def load_position_book(tradelog: list) -> dict:
+    """Position book for ETF_tradelog.json (Sharpe/position_book.py): appends
+    are applied incrementally, edits / deletes trigger one full replay."""
+    return pb.open_book(ETF_TRADELOG_FILE, tradelog)
 
 
 def sync_to_positions_ledger(active_holdings: dict):
@@ -472,9 +378,16 @@ if "etf_live_prices" in st.session_state:
 
 # ── Load tradelog + compute holdings on every page load ──
 tradelog = load_tradelog()
-tl_result = calculate_holdings_and_pnl(tradelog, latest_etf_prices)
+position_book = load_position_book(tradelog)
+tl_result = pb.holdings_and_pnl(position_book, latest_etf_prices)
 active_holdings   = tl_result["active_holdings"]
-holdings_metrics  = emr.evaluate_holdings_exit_rules(tl_result["holdings_metrics"], ranking, prices)
+# Running peaks persist across reruns; only bars after each holding's last one are read
+peak_store        = pk.load(ETF_PEAK_STORE)
+holdings_metrics  = emr.evaluate_holdings_exit_rules(tl_result["holdings_metrics"], ranking, prices,
+                                                     peak_store)
+pk.save(ETF_PEAK_STORE, peak_store,             # closed positions are dropped
+        keep=[pk.position_key(h["Ticker"], h.get("First Buy Date"))
+              for h in tl_result["holdings_metrics"]])
 realized_pnl      = tl_result["realized_pnl"]
 unrealized_pnl    = tl_result["unrealized_pnl"]
 
@@ -896,17 +809,8 @@ with tab_tradelog:
         if st.button("🔄 Refresh Live Market Prices", use_container_width=True, key="tl_refresh_btn"):
             if holdings_metrics:
                 with st.spinner("Fetching latest NAVs from Yahoo Finance (.NS)..."):
-                    def _fetch_etf_price(tkr):
-                        try:
-                            return tkr, yf.Ticker(f"{tkr}.NS").fast_info.last_price
-                        except Exception:
-                            return tkr, None
-                    live = {}
-                    with ThreadPoolExecutor(max_workers=20) as exe:
-                        for tkr, px in exe.map(_fetch_etf_price,
-                                               [h["Ticker"] for h in holdings_metrics]):
-                            if px:
-                                live[tkr] = px
+                    live = lq.get_quotes([h["Ticker"] for h in holdings_metrics],
+                                         exchanges=("NS",))
                 if live:
                     st.session_state.etf_live_prices = live
                     st.rerun()
@@ -937,7 +841,7 @@ with tab_tradelog:
             st.success("✅ All active holdings within exit thresholds (52wk-high DD, rank, TSL).")
 
         holdings_df = pd.DataFrame(holdings_metrics)
-        cols_order  = ["Ticker", "Qty", "Avg Price", "Current Price",
+        cols_order  = ["Ticker", "Qty", "Avg Price", "Current Price", "Peak Price",
                        "Cost Value", "Market Value",
                        "Unrealized PnL", "Unrealized PnL %", "First Buy Date",
                        "Exit Reason"]
@@ -956,6 +860,7 @@ with tab_tradelog:
                 {"Qty":             "{:,.0f}",
                  "Avg Price":       "Rs {:,.2f}",
                  "Current Price":   "Rs {:,.2f}",
+                 "Peak Price":      "Rs {:,.2f}",
                  "Cost Value":      "Rs {:,.2f}",
                  "Market Value":    "Rs {:,.2f}",
                  "Unrealized PnL":  "Rs {:,.2f}",
@@ -1064,13 +969,14 @@ with tab_tradelog:
                         "price":     float(trade_price),
                     }
                     updated_tradelog = tradelog + [new_trade]
-                    is_valid, err_msg = validate_tradelog_integrity(updated_tradelog)
+                    is_valid, err_msg = pb.validate_append(position_book, tradelog, new_trade)
 
                     if not is_valid:
                         st.error(f"Trade rejected — inconsistent state: {err_msg}")
                     else:
                         save_tradelog(updated_tradelog)
-                        new_calc = calculate_holdings_and_pnl(updated_tradelog, latest_etf_prices)
+                        new_calc = pb.holdings_and_pnl(load_position_book(updated_tradelog),
+                                                       latest_etf_prices)
                         sync_to_positions_ledger(new_calc["active_holdings"])
                         st.session_state._tl_pending_reset = True
                         st.success(
@@ -1171,7 +1077,7 @@ with tab_tradelog:
                                 "quantity": int(edit_qty),
                                 "price":    float(edit_price),
                             })
-                            is_valid, err_msg = validate_tradelog_integrity(candidate)
+                            is_valid, err_msg = pb.validate_transactions(candidate)
                             if not is_valid:
                                 st.error(
                                     f"Edit rejected — inconsistent holdings: {err_msg}. "
@@ -1179,7 +1085,8 @@ with tab_tradelog:
                                 )
                             else:
                                 save_tradelog(candidate)
-                                new_calc = calculate_holdings_and_pnl(candidate, latest_etf_prices)
+                                new_calc = pb.holdings_and_pnl(load_position_book(candidate),
+                                                               latest_etf_prices)
                                 sync_to_positions_ledger(new_calc["active_holdings"])
                                 st.success("Transaction updated and positions ledger synced.")
                                 st.rerun()
@@ -1207,7 +1114,7 @@ with tab_tradelog:
                     if "(ID: " in choice
                 ]
                 candidate = [tx for tx in tradelog if tx["id"] not in ids_to_delete]
-                is_valid, err_msg = validate_tradelog_integrity(candidate)
+                is_valid, err_msg = pb.validate_transactions(candidate)
                 if not is_valid:
                     st.error(
                         f"Deletion rejected — would cause inconsistent holdings: {err_msg}. "
@@ -1215,7 +1122,8 @@ with tab_tradelog:
                     )
                 else:
                     save_tradelog(candidate)
-                    new_calc = calculate_holdings_and_pnl(candidate, latest_etf_prices)
+                    new_calc = pb.holdings_and_pnl(load_position_book(candidate),
+                                                   latest_etf_prices)
                     sync_to_positions_ledger(new_calc["active_holdings"])
                     st.success(
                         f"Deleted {len(ids_to_delete)} transaction(s) and synced positions ledger."
@@ -36,7 +36,6 @@ import datetime
 import sys
 import os
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 
@@ -45,6 +44,12 @@ sys.path.insert(0, str(SCRIPT_DIR))
 
 import etf_momentum_ranking_v2 as emr
 
+# The shared position book / quote service live with the Sharpe modules;
+# appended (not inserted) so this folder's own momentum_lib keeps precedence
+sys.path.append(str(SCRIPT_DIR.parent / "Sharpe"))
+import position_book as pb
+import live_quotes as lq
+
 try:
     import yfinance as yf
     _YF_AVAILABLE = True
@@ -101,107 +106,9 @@ def save_tradelog(tradelog: list):
     safe_write_json(ETF_TRADELOG_FILE, tradelog)
 
 
-def validate_tradelog_integrity(transactions: list):
-    """Replay all transactions chronologically; check no ticker ever goes negative."""
-    try:
-        sorted_txs = sorted(transactions, key=lambda x: (x.get("date", ""), x.get("timestamp", "")))
-    except Exception:
-        sorted_txs = transactions
-    holdings = {}
-    for tx in sorted_txs:
-        ticker  = tx["ticker"]
-        action  = tx["action"].upper()
-        qty     = float(tx["quantity"])
-        current = holdings.get(ticker, 0.0)
-        if action == "BUY":
-            holdings[ticker] = current + qty
-        elif action == "SELL":
-            if qty > current + 1e-9:
-                return False, (f"{ticker}: SELL {qty:.0f} exceeds holding "
-                               f"{current:.0f} on {tx.get('date', '?')}")
-            holdings[ticker] = current - qty
-    return True, ""
-
-
-def calculate_holdings_and_pnl(transactions: list, latest_prices: dict | None = None) -> dict:
-    """FIFO avg-cost P&L engine -- ported verbatim from etf_dashboard.py."""
-    try:
-        sorted_txs = sorted(transactions, key=lambda x: (x.get("date", ""), x.get("timestamp", "")))
-    except Exception:
-        sorted_txs = transactions
-
-    holdings: dict = {}
-    realized_pnl = 0.0
-    realized_pnl_by_ticker: dict = {}
-
-    for tx in sorted_txs:
-        ticker   = tx["ticker"]
-        action   = tx["action"].upper()
-        qty      = float(tx["quantity"])
-        price    = float(tx["price"])
-        tx_date  = tx.get("date", "")
-        if isinstance(tx_date, str):
-            try:
-                tx_date = datetime.date.fromisoformat(tx_date)
-            except Exception:
-                tx_date = datetime.date.today()
-
-        if ticker not in holdings:
-            holdings[ticker] = {"qty": 0.0, "avg_price": 0.0,
-                                "first_buy_date": None, "total_cost": 0.0}
-        h      = holdings[ticker]
-        t_pnl  = realized_pnl_by_ticker.get(ticker, 0.0)
-
-        if action == "BUY":
-            if h["qty"] == 0:
-                h["first_buy_date"] = tx_date
-            h["total_cost"] += qty * price
-            h["qty"]        += qty
-            h["avg_price"]   = h["total_cost"] / h["qty"]
-        elif action == "SELL":
-            if h["qty"] > 0:
-                sell_qty = min(qty, h["qty"])
-                pnl      = sell_qty * (price - h["avg_price"])
-                realized_pnl += pnl
-                t_pnl        += pnl
-                h["qty"]     -= sell_qty
-                h["total_cost"] = h["qty"] * h["avg_price"]
-                if h["qty"] == 0:
-                    h["avg_price"]      = 0.0
-                    h["first_buy_date"] = None
-        realized_pnl_by_ticker[ticker] = t_pnl
-
-    active_holdings = {t: h for t, h in holdings.items() if h["qty"] > 0}
-    unrealized_pnl  = 0.0
-    holdings_metrics = []
-
-    for ticker, h in active_holdings.items():
-        curr_price = h["avg_price"]
-        if latest_prices and ticker in latest_prices:
-            curr_price = latest_prices[ticker]
-        market_val  = h["qty"] * curr_price
-        u_pnl       = market_val - h["total_cost"]
-        unrealized_pnl += u_pnl
-        u_pnl_pct   = (u_pnl / h["total_cost"] * 100) if h["total_cost"] > 0 else 0.0
-        holdings_metrics.append({
-            "Ticker":            ticker,
-            "Qty":               h["qty"],
-            "Avg Price":         h["avg_price"],
-            "Current Price":     curr_price,
-            "Cost Value":        h["total_cost"],
-            "Market Value":      market_val,
-            "Unrealized PnL":    u_pnl,
-            "Unrealized PnL %":  u_pnl_pct,
-            "First Buy Date":    h["first_buy_date"],
-        })
-
-    return {
-        "active_holdings":        active_holdings,
-        "holdings_metrics":       holdings_metrics,
-        "realized_pnl":           realized_pnl,
-        "realized_pnl_by_ticker": realized_pnl_by_ticker,
-        "unrealized_pnl":         unrealized_pnl,
-    }
+def load_position_book(tradelog: list) -> dict:
+    """Position book for ETF_tradelog_v2.json (Sharpe/position_book.py)."""
+    return pb.open_book(ETF_TRADELOG_FILE, tradelog)
 
 
 def sync_to_positions_ledger(active_holdings: dict):
@@ -827,7 +734,7 @@ class ETFMomentumV2App:
             "ticker": ticker, "action": action, "quantity": qty, "price": price,
         }
         updated = self.tradelog + [new_trade]
-        ok, err = validate_tradelog_integrity(updated)
+        ok, err = pb.validate_append(load_position_book(self.tradelog), self.tradelog, new_trade)
         if not ok:
             messagebox.showerror("Rejected — inconsistent state", err)
             return
@@ -859,7 +766,7 @@ class ETFMomentumV2App:
             "ticker": ticker, "action": action,
             "date": trade_date.isoformat(), "quantity": qty, "price": price,
         })
-        ok, err = validate_tradelog_integrity(candidate)
+        ok, err = pb.validate_transactions(candidate)
         if not ok:
             messagebox.showerror("Rejected — inconsistent holdings", err)
             return
@@ -876,7 +783,7 @@ class ETFMomentumV2App:
         if not messagebox.askyesno("Confirm delete", "Permanently delete the selected transaction?"):
             return
         candidate = [tx for tx in self.tradelog if tx["id"] != self._editing_tx_id]
-        ok, err = validate_tradelog_integrity(candidate)
+        ok, err = pb.validate_transactions(candidate)
         if not ok:
             messagebox.showerror("Rejected", f"Would cause inconsistent holdings: {err}")
             return
@@ -889,7 +796,7 @@ class ETFMomentumV2App:
     def _recompute_tradelog_state(self):
         latest_prices = {t: get_etf_latest_price(t, self.prices) for t in self.etf_tickers}
         latest_prices.update(self.live_price_overrides)
-        result = calculate_holdings_and_pnl(self.tradelog, latest_prices)
+        result = pb.holdings_and_pnl(load_position_book(self.tradelog), latest_prices)
         self.active_holdings = result["active_holdings"]
         self.realized_pnl = result["realized_pnl"]
         self.unrealized_pnl = result["unrealized_pnl"]
@@ -904,7 +811,7 @@ class ETFMomentumV2App:
         if not self.holdings_metrics:
             messagebox.showinfo("Nothing to refresh", "No active holdings.")
             return
-        if not _YF_AVAILABLE:
+        if not _YF_AVAILABLE and not os.environ.get(lq.STUB_ENV):
             messagebox.showwarning("yfinance unavailable", "yfinance is not installed.")
             return
         self.status_var.set("Fetching live NAVs from Yahoo Finance ...")
@@ -913,18 +820,7 @@ class ETFMomentumV2App:
 
     def _worker_refresh_prices(self):
         tickers = [h["Ticker"] for h in self.holdings_metrics]
-
-        def _fetch(tkr):
-            try:
-                return tkr, yf.Ticker(f"{tkr}.NS").fast_info.last_price
-            except Exception:
-                return tkr, None
-
-        live = {}
-        with ThreadPoolExecutor(max_workers=20) as exe:
-            for tkr, px in exe.map(_fetch, tickers):
-                if px:
-                    live[tkr] = px
+        live    = lq.get_quotes(tickers, exchanges=("NS",))
         self.msg_queue.put(("live_prices", live))
 
     def _refresh_tradelog_tab(self):
@@ -8,7 +8,7 @@ Differences from etf_momentum_ranking.py:
   - ETF metadata: AMFI ETF Codes.csv
   - ETF ID      : AMFI Scheme Code (numeric string, e.g. "153744")
   - ETF Name    : AMFI Scheme Name (e.g. "Groww BSE Power ETF")
-  - Regime      : Nifty 500 index (^CRSLDX) fetched via yfinance — not ETF NAV
+  - Regime      : Nifty 500 index (^CRSLDX) from ../Sharpe/benchmark_store.py — not ETF NAV
   - TSL NAV     : Fetched from mfapi.in by AMFI code — no .NS suffix needed
 
 Scoring pipeline (unchanged):
@@ -36,6 +36,11 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 
+import etf_rank_core as erc
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Sharpe"))
+import benchmark_store as bs
+
 
 # =========================================================
 # CONFIG  <- edit these freely
@@ -71,7 +76,6 @@ class CONFIG:
     REGIME_YF_TICKER   = "^CRSLDX"    # Nifty 500 index
     TREND_FAST_EMA     = 50
     TREND_SLOW_EMA     = 100
-    REGIME_HISTORY_DAYS = 150         # days of index history to fetch for EMA
 
     # Sector cap — max ETFs per sector in allocation
     SECTOR_CAP = 1
@@ -236,18 +240,17 @@ def r2_score(series: pd.Series, window: int) -> float:
 
 
 # =========================================================
-# 3. REGIME FILTER — Nifty 500 index via yfinance
+# 3. REGIME FILTER — Nifty 500 index from the shared benchmark store
 # =========================================================
 def regime_status() -> dict:
     """
-    Fetch Nifty 500 index history from yfinance (^CRSLDX) and compute
-    tiered regime state:
+    Nifty 500 index (^CRSLDX) close and EMAs from the shared benchmark store
+    (../Sharpe/benchmark_store.py, fetched incrementally via yfinance) and
+    the tiered regime state:
       BULL    - EMA50 > EMA100 AND Price > EMA50  -> TOP_N slots
       PARTIAL - Price > EMA100 (not BULL)         -> TOP_N_PARTIAL slots
       BEAR    - Price <= EMA100                   -> 0 slots, full cash
     """
-    import yfinance as yf
-
     ticker_label = CONFIG.REGIME_YF_TICKER
     nifty_price  = np.nan
     ema_50       = np.nan
@@ -256,25 +259,15 @@ def regime_status() -> dict:
     active_slots = CONFIG.TOP_N
 
     try:
-        data = yf.download(
-            ticker_label,
-            period=f"{CONFIG.REGIME_HISTORY_DAYS + 30}d",
-            auto_adjust=True,
-            progress=False,
-            timeout=15,
-        )
-        if data.empty:
-            raise ValueError("Empty response from yfinance")
-
-        close = data["Close"]
-        if isinstance(close, pd.DataFrame):
-            close = close.iloc[:, 0]
-        close = close.dropna().sort_index()
-
-        if len(close) >= CONFIG.TREND_SLOW_EMA:
-            nifty_price = float(close.iloc[-1])
-            ema_50      = float(close.ewm(span=CONFIG.TREND_FAST_EMA, adjust=False).mean().iloc[-1])
-            ema_100     = float(close.ewm(span=CONFIG.TREND_SLOW_EMA, adjust=False).mean().iloc[-1])
+        frame = bs.get_frame(ticker_label)
+        if frame.empty:
+            raise ValueError("no index history in the benchmark store")
+
+        inputs = bs.regime_inputs(frame, CONFIG.TREND_FAST_EMA, CONFIG.TREND_SLOW_EMA)
+        if pd.notna(inputs["ema_slow"]):
+            nifty_price = inputs["price"]
+            ema_50      = inputs["ema_fast"]
+            ema_100     = inputs["ema_slow"]
 
             if ema_50 > ema_100 and nifty_price > ema_50:
                 label        = "BULL"
@@ -286,10 +279,10 @@ def regime_status() -> dict:
                 label        = "BEAR"
                 active_slots = 0
         else:
-            print(f"  [warn] Insufficient index history ({len(close)} pts); defaulting to BULL")
+            print(f"  [warn] Insufficient index history ({len(frame)} pts); defaulting to BULL")
 
     except Exception as e:
-        print(f"  [warn] Could not fetch regime data from yfinance: {e}")
+        print(f"  [warn] Could not load regime data: {e}")
         print("         Defaulting to BULL regime.")
 
     return {
@@ -305,130 +298,22 @@ def regime_status() -> dict:
 # =========================================================
 # 4. SCORING + RANKING (identical logic to original)
 # =========================================================
-def build_ranking(meta: pd.DataFrame, prices: pd.DataFrame) -> pd.DataFrame:
-    """
-    Compute Sharpe scores, R2 scores, 52-week high screen and investable
-    ranks for all ETFs. Identifier = AMFI code (stored in TICKER column).
-    """
-    records = []
-
-    # EOM date for MTD return calculation
-    last_date    = prices.index[-1]
-    prev_indices = prices.index[
-        (prices.index.month != last_date.month) |
-        (prices.index.year  != last_date.year)
-    ]
-    if len(prev_indices) > 0:
-        eom_date   = prev_indices[-1]
-        eom_series = prices.loc[eom_date]
-        print(f"         Comp date: {eom_date.date()} (prev month eom)")
-    else:
-        eom_series = pd.Series(dtype=float)
-
-    for _, row in meta.iterrows():
-        code     = row["TICKER"]    # AMFI scheme code string
-        etf_name = row["ETF_NAME"]
-
-        if code not in prices.columns:
-            continue
-
-        s     = prices[code]
-        close = float(s.iloc[-1]) if len(s) > 0 else np.nan
-
-        # 52-week high from trailing 252 trading days
-        high_52w = float(s.tail(252).max()) if len(s) > 0 else np.nan
+def ranking_profile() -> dict:
+    """Raw weighted Sharpe 6M/3M (no Z-scores) plus R2 / SR2 display columns."""
+    return erc.profile(
+        "amfi",
+        windows      = {"6M": CONFIG.WINDOW_6M, "3M": CONFIG.WINDOW_3M},
+        sharpe       = {"6M": CONFIG.SHARPE_W6M, "3M": CONFIG.SHARPE_W3M},
+        r2           = {"6M": CONFIG.R2_W6M, "3M": CONFIG.R2_W3M},
+        max_drawdown = CONFIG.MAX_DRAWDOWN_FROM_HIGH,
+        daily_rf     = CONFIG.DAILY_RF,
+        annualize    = CONFIG.ANNUALIZE,
+    )
 
-        # Sharpe scores
-        sh6 = sharpe_score(s, CONFIG.WINDOW_6M)
-        sh3 = sharpe_score(s, CONFIG.WINDOW_3M)
 
-        # R2 scores
-        r6 = r2_score(s, CONFIG.WINDOW_6M)
-        r3 = r2_score(s, CONFIG.WINDOW_3M)
-
-        # Weighted Sharpe — fallback gracefully for newly-listed ETFs
-        if not np.isnan(sh6) and not np.isnan(sh3):
-            wtd_sharpe = CONFIG.SHARPE_W6M * sh6 + CONFIG.SHARPE_W3M * sh3
-        elif not np.isnan(sh6):
-            wtd_sharpe = sh6
-        elif not np.isnan(sh3):
-            wtd_sharpe = sh3
-        else:
-            wtd_sharpe = np.nan
-
-        # Sharpe * R2 composite (display metric only)
-        _sh6 = 0.0 if np.isnan(sh6) else sh6
-        _sh3 = 0.0 if np.isnan(sh3) else sh3
-        _r6  = 0.0 if (r6 is None or np.isnan(r6)) else r6
-        _r3  = 0.0 if (r3 is None or np.isnan(r3)) else r3
-        sr2_6m    = _sh6 * _r6
-        sr2_3m    = _sh3 * _r3
-        sr2_blend = (sr2_6m + sr2_3m) / 2
-
-        # 100-day EMA
-        clean_s = s.dropna()
-        ema_100 = (float(clean_s.ewm(span=100, adjust=False).mean().iloc[-1])
-                   if len(clean_s) >= 100 else np.nan)
-
-        # MTD return vs EOM
-        eom_price = eom_series.get(code, np.nan)
-        if pd.notna(close) and pd.notna(eom_price) and eom_price > 0:
-            eom_ret = (close / eom_price - 1) * 100
-        else:
-            eom_ret = np.nan
-
-        # 52-week high screen
-        if pd.notna(close) and pd.notna(high_52w) and high_52w > 0:
-            pct_from_high = (high_52w - close) / high_52w
-            high_pass     = pct_from_high <= CONFIG.MAX_DRAWDOWN_FROM_HIGH
-        else:
-            pct_from_high = np.nan
-            high_pass     = True    # insufficient history -> don't penalise
-
-        records.append({
-            "TICKER"       : code,
-            "ETF_NAME"     : etf_name,
-            "SECTOR"       : classify_sector(etf_name),
-            "CLOSE"        : close,
-            "52WK_HIGH"    : high_52w,
-            "PCT_FROM_HIGH": pct_from_high * 100 if not np.isnan(pct_from_high) else np.nan,
-            "EMA_100"      : ema_100,
-            "EOM_PCT"      : eom_ret,
-            "SHARPE_6M"    : sh6,
-            "SHARPE_3M"    : sh3,
-            "WTD_SHARPE"   : wtd_sharpe,
-            "R2_6M"        : r6,
-            "R2_3M"        : r3,
-            "SR2_6M"       : sr2_6m,
-            "SR2_3M"       : sr2_3m,
-            "SR2_BLEND"    : sr2_blend,
-            "SCREEN_PASS"  : high_pass,
-        })
-
-    df = pd.DataFrame(records)
-
-    # Universe rank (all ETFs, Weighted Sharpe)
-    df["RANK_UNIVERSE"] = df["WTD_SHARPE"].rank(ascending=False, na_option="bottom").astype(int)
-    df["RANK_SHARPE"]   = df["RANK_UNIVERSE"]
-
-    # SR2 rank (display)
-    df["RANK_SR2"] = df["SR2_BLEND"].rank(ascending=False, na_option="bottom").astype(int)
-
-    # Investable rank (screen-pass ETFs only)
-    inv = df[df["SCREEN_PASS"]].copy()
-    if len(inv) > 0:
-        inv["RANK_INVESTABLE"] = inv["WTD_SHARPE"].rank(ascending=False, na_option="bottom").astype(int)
-        df = df.merge(inv[["TICKER", "RANK_INVESTABLE"]], on="TICKER", how="left")
-    else:
-        df["RANK_INVESTABLE"] = np.nan
-
-    df["RANK_INVESTABLE"] = df["RANK_INVESTABLE"].fillna(0).astype(int)
-
-    # Sort: screen-pass ETFs first, then by universe rank
-    df["_sort"] = df["RANK_INVESTABLE"].replace(0, 9999)
-    df = df.sort_values(["_sort", "RANK_UNIVERSE"]).drop(columns="_sort").reset_index(drop=True)
-
-    return df
+def build_ranking(meta: pd.DataFrame, prices: pd.DataFrame) -> pd.DataFrame:
+    """Screen, score and rank every ETF; scoring runs in etf_rank_core."""
+    return erc.build_ranking(meta, prices, ranking_profile(), lambda name, ticker: classify_sector(name))
 
 
 # =========================================================
@@ -55,6 +55,11 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 
+import etf_rank_core as erc
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Sharpe"))
+import benchmark_store as bs
+
 try:
     import yfinance as yf
     _YF_AVAILABLE = True
@@ -439,75 +444,36 @@ def clenow_score(series: pd.Series, window: int, trading_days: int | None = None
 # =========================================================
 # 3. REGIME FILTER
 # =========================================================
-NIFTY500_CACHE_FILE = "nifty500_cache.csv"
-NIFTY500_CACHE_MAX_AGE_DAYS = 3   # tolerate weekends/holidays before refetching
+NIFTY500_HISTORY_DAYS = 600       # calendar days of the index handed to the regime filter
 
 
-def fetch_nifty500_index(n_days: int = 600, script_dir: Path | None = None) -> pd.Series | None:
-    """
-    Fetch the live Nifty 500 INDEX (CONFIG.REGIME_INDEX_TICKER, e.g. ^CRSLDX)
-    via yfinance, with a local daily CSV cache to avoid hitting the network
-    on every run.
-
-    Cache behaviour:
-      - If nifty500_cache.csv exists and was last written today (or within
-        NIFTY500_CACHE_MAX_AGE_DAYS calendar days, to tolerate weekends/
-        holidays), load and return it directly — no network call.
-      - Otherwise (missing, stale, or unreadable), fetch fresh via yfinance,
-        overwrite the cache, and return the new series.
-
-    Returns None if yfinance isn't installed, the fetch fails, or no cache
-    is usable — callers should fall back to the ETF.xlsx-based regime
-    tickers in that case.
+def fetch_nifty500_index(n_days: int = NIFTY500_HISTORY_DAYS) -> pd.DataFrame | None:
     """
-    cache_path = (script_dir or _SCRIPT_DIR) / NIFTY500_CACHE_FILE
+    Nifty 500 INDEX (CONFIG.REGIME_INDEX_TICKER, e.g. ^CRSLDX) from the shared
+    benchmark store (../Sharpe/benchmark_store.py): the last `n_days`
+    calendar days of Close plus the store's precomputed EMA_50 / EMA_100 /
+    EMA_200 columns.
 
-    # --- Try the cache first ---
-    if cache_path.exists():
-        try:
-            mtime_date = datetime.fromtimestamp(cache_path.stat().st_mtime).date()
-            age_days = (datetime.today().date() - mtime_date).days
-            if age_days <= NIFTY500_CACHE_MAX_AGE_DAYS:
-                cached = pd.read_csv(cache_path, index_col=0, parse_dates=True)["Close"]
-                cached = cached.dropna()
-                if len(cached) > 0:
-                    print(f"  [regime] Using cached Nifty500 index ({cache_path.name}, "
-                          f"{age_days}d old, {len(cached)} rows)")
-                    return cached
-        except Exception as e:
-            print(f"  [warn] Nifty500 cache unreadable ({e}); will refetch")
-
-    # --- Cache missing/stale/unreadable: fetch live ---
-    if not _YF_AVAILABLE:
-        print("  [warn] yfinance not installed; cannot fetch live Nifty500 index")
-        return None
+    The store tracks the last date it holds and fetches only the days after
+    it, so a run after a weekend costs one small request and a second run
+    the same day none.
 
+    Returns None if the store has no data and the fetch fails — callers
+    should fall back to the ETF.xlsx-based regime tickers in that case.
+    """
     try:
-        end = datetime.today()
-        start = end - timedelta(days=n_days)
-        data = yf.download(CONFIG.REGIME_INDEX_TICKER,
-                            start=start.strftime("%Y-%m-%d"),
-                            end=end.strftime("%Y-%m-%d"),
-                            progress=False, auto_adjust=True)
-        if data is None or data.empty:
-            print(f"  [warn] Live fetch for {CONFIG.REGIME_INDEX_TICKER} returned no data")
-            return None
-
-        close = data["Close"]
-        if isinstance(close, pd.DataFrame):   # yfinance can return a 1-col DataFrame
-            close = close.iloc[:, 0]
-        close = close.dropna()
-        if close.empty:
-            print(f"  [warn] Live fetch for {CONFIG.REGIME_INDEX_TICKER} had no valid closes")
-            return None
-
-        close.to_frame(name="Close").to_csv(cache_path)
-        print(f"  [regime] Fetched live Nifty500 index ({CONFIG.REGIME_INDEX_TICKER}, "
-              f"{len(close)} rows) -> cached to {cache_path.name}")
-        return close
+        frame = bs.get_frame(CONFIG.REGIME_INDEX_TICKER)
     except Exception as e:
-        print(f"  [warn] Live Nifty500 index fetch failed: {e}")
+        print(f"  [warn] Nifty500 benchmark store unavailable: {e}")
         return None
+    if frame is None or frame.empty:
+        print(f"  [warn] No {CONFIG.REGIME_INDEX_TICKER} history in the benchmark store")
+        return None
+    cutoff = pd.Timestamp(datetime.today().date() - timedelta(days=n_days))
+    frame  = frame[frame.index >= cutoff]
+    print(f"  [regime] Nifty500 index from benchmark store "
+          f"({len(frame)} rows, last {frame.index[-1].date()})")
+    return frame
 
 
 def regime_status(prices: pd.DataFrame, script_dir: Path | None = None) -> dict:
@@ -518,22 +484,25 @@ def regime_status(prices: pd.DataFrame, script_dir: Path | None = None) -> dict:
       BEAR    - both layers fail  -> full cash
 
     Trend source priority:
-      1. Live Nifty 500 INDEX via yfinance (CONFIG.REGIME_INDEX_TICKER, e.g. ^CRSLDX)
+      1. Live Nifty 500 INDEX from the benchmark store (CONFIG.REGIME_INDEX_TICKER)
       2. CONFIG.REGIME_TICKER (MONIFTY500) from ETF.xlsx
       3. CONFIG.REGIME_FALLBACKS, in order, from ETF.xlsx
       4. Default to BULL if nothing is available at all
+
+    script_dir is accepted for callers of the old per-folder cache; the
+    store lives in ../Sharpe/benchmark_series.
     """
-    trend_series = None
+    trend_frame  = None
     trend_ticker = None
 
     # --- Priority 1: live Nifty 500 index ---
-    live_series = fetch_nifty500_index(script_dir=script_dir)
-    if live_series is not None and len(live_series) > 0:
-        trend_series = live_series
+    live_frame = fetch_nifty500_index()
+    if live_frame is not None and len(live_frame) > 0:
+        trend_frame  = live_frame
         trend_ticker = "NIFTY500"
 
     # --- Priority 2/3: ETF.xlsx-based tickers (MONIFTY500, then fallbacks) ---
-    if trend_series is None:
+    if trend_frame is None:
         xlsx_ticker = next(
             (t for t in [CONFIG.REGIME_TICKER] + CONFIG.REGIME_FALLBACKS
              if t in prices.columns), None
@@ -541,11 +510,11 @@ def regime_status(prices: pd.DataFrame, script_dir: Path | None = None) -> dict:
         if xlsx_ticker is not None:
             s = prices[xlsx_ticker].dropna()
             if len(s) > 0:
-                trend_series = s
+                trend_frame  = s.rename("Close").to_frame()
                 trend_ticker = xlsx_ticker
 
     # --- Priority 4: nothing available at all -> default BULL ---
-    if trend_series is None:
+    if trend_frame is None:
         print("  [warn] No Nifty 500 source available (live or ETF.xlsx); "
               "trend layer defaulting to BULL")
         return {
@@ -559,11 +528,12 @@ def regime_status(prices: pd.DataFrame, script_dir: Path | None = None) -> dict:
             "trend_ticker": "N/A",
         }
 
-    s = trend_series
-    if len(s) >= CONFIG.TREND_EMA_WINDOW:
-        nifty_price = float(s.iloc[-1])
-        nifty_ema_50  = float(s.ewm(span=CONFIG.TREND_FAST_EMA_WINDOW, adjust=False).mean().iloc[-1])
-        nifty_ema_100 = float(s.ewm(span=CONFIG.TREND_EMA_WINDOW, adjust=False).mean().iloc[-1])
+    # Stored EMA columns for the store's index, computed for an ETF.xlsx series
+    inputs = bs.regime_inputs(trend_frame, CONFIG.TREND_FAST_EMA_WINDOW, CONFIG.TREND_EMA_WINDOW)
+    nifty_price = inputs["price"]
+    if pd.notna(inputs["ema_slow"]):
+        nifty_ema_50  = inputs["ema_fast"]
+        nifty_ema_100 = inputs["ema_slow"]
 
         # Regime (Run 1 - best performing config):
         #   BULL    : EMA50 > EMA100  AND  Price > EMA50  -> TOP_N slots
@@ -582,7 +552,6 @@ def regime_status(prices: pd.DataFrame, script_dir: Path | None = None) -> dict:
         trend_ok = active_slots > 0
     else:
         trend_ok    = True
-        nifty_price = float(s.iloc[-1]) if len(s) else np.nan
         nifty_ema_50 = np.nan
         nifty_ema_100 = np.nan
         label = "BULL"
@@ -605,163 +574,23 @@ def regime_status(prices: pd.DataFrame, script_dir: Path | None = None) -> dict:
 #    Abs momentum screen applied FIRST to determine investable universe,
 #    then composite ranking done on that screened subset.
 # =========================================================
-def build_ranking(meta: pd.DataFrame, prices: pd.DataFrame) -> pd.DataFrame:
-    records = []
-
-    # Get EOM date for calculation (last day of previous month with data)
-    last_date = prices.index[-1]
-    prev_indices = prices.index[(prices.index.month != last_date.month) | (prices.index.year != last_date.year)]
-    if len(prev_indices) > 0:
-        eom_date = prev_indices[-1]
-        eom_series = prices.loc[eom_date]
-        print(f"         Comp date: {eom_date.date()} (prev month eom)")
-    else:
-        eom_series = pd.Series(dtype=float)
-
-    for _, row in meta.iterrows():
-        ticker = row["TICKER"]
-        if ticker not in prices.columns:
-            continue
-        s = prices[ticker]
-        close = float(s.iloc[-1]) if len(s) > 0 else np.nan
-        # Calculate 52-week high from 1 year of historical data (252 trailing trading days)
-        high_52w = float(s.tail(252).max()) if len(s) > 0 else np.nan
-
-        sh6 = sharpe_score(s, CONFIG.WINDOW_6M)
-        sh3 = sharpe_score(s, CONFIG.WINDOW_3M)
-        cl6 = clenow_score(s, CONFIG.WINDOW_6M)
-        cl3 = clenow_score(s, CONFIG.WINDOW_3M)
-        # Raw Sharpe/Clenow values stored; composites computed post-loop via Z-scores
-
-        # --- EMA calculation (100 day) ---
-        clean_s = s.dropna()
-        ema_100 = float(clean_s.ewm(span=100, adjust=False).mean().iloc[-1]) if len(clean_s) >= 100 else np.nan
-
-        # --- Return from EOM ---
-        eom_price = eom_series.get(ticker, np.nan)
-        if pd.notna(close) and pd.notna(eom_price) and eom_price > 0:
-            eom_ret = (close / eom_price - 1) * 100
-        else:
-            eom_ret = np.nan
-
-        # --- Screen: 52-week high proximity filter (calculated from history) ---
-        if pd.notna(close) and pd.notna(high_52w) and high_52w > 0:
-            pct_from_high = (high_52w - close) / high_52w
-            high_pass     = pct_from_high <= CONFIG.MAX_DRAWDOWN_FROM_HIGH
-        else:
-            pct_from_high = np.nan
-            high_pass     = True   # no data -> don't penalise
-
-        # --- Screen: above 100 EMA filter (calculated for reference only) ---
-        ema_100 = float(clean_s.ewm(span=100, adjust=False).mean().iloc[-1]) if len(clean_s) >= 100 else np.nan
-
-        screen_pass = high_pass
-
-        records.append({
-            "TICKER"        : ticker,
-            "ETF_NAME"      : row["ETF_NAME"],
-            "SECTOR"        : classify_sector(row["ETF_NAME"], ticker),
-            "CLOSE"         : close,
-            "52WK_HIGH"     : high_52w,
-            "PCT_FROM_HIGH" : pct_from_high * 100 if not np.isnan(pct_from_high) else np.nan,
-            "EMA_100"       : ema_100,
-            "EOM_PCT"       : eom_ret,
-            "SHARPE_6M"     : sh6,
-            "SHARPE_3M"     : sh3,
-            "CLENOW_6M"     : cl6,
-            "CLENOW_3M"     : cl3,
-            "SCREEN_PASS"   : screen_pass,
-        })
-
-    df = pd.DataFrame(records)
-
-    # =================================================================
-    # CROSS-SECTIONAL Z-SCORING OF SHARPE RATIOS
-    # Z-score = (value - mean) / std, computed across ETFs with valid
-    # (non-NaN) values only.  NaN ETFs are excluded from mean/std
-    # calculation and remain NaN after Z-scoring.
-    # =================================================================
-    def _zscore(series: pd.Series) -> pd.Series:
-        """Cross-sectional Z-score; NaN values stay NaN."""
-        mu  = series.mean()   # pandas .mean() skips NaN by default
-        sig = series.std()    # pandas .std() skips NaN by default
-        if sig == 0 or np.isnan(sig):
-            return pd.Series(0.0, index=series.index)
-        return (series - mu) / sig
-
-    def _blend_composite(df: pd.DataFrame, col6: str, col3: str, w6: float, w3: float,
-                         mask: pd.Series | None = None) -> pd.Series:
-        """Z-score two windows (over `mask` if given, else the whole df) and
-        blend w6/w3, dropping (not rescaling) whichever term is NaN for a
-        given row -- same convention throughout this script."""
-        z6 = pd.Series(np.nan, index=df.index)
-        z3 = pd.Series(np.nan, index=df.index)
-        if mask is None:
-            z6 = _zscore(df[col6]); z3 = _zscore(df[col3])
-        elif mask.sum() > 0:
-            z6.loc[mask] = _zscore(df.loc[mask, col6])
-            z3.loc[mask] = _zscore(df.loc[mask, col3])
-        both  = z6.notna() & z3.notna()
-        only6 = z6.notna() & z3.isna()
-        only3 = z6.isna()  & z3.notna()
-        out = pd.Series(np.nan, index=df.index)
-        out.loc[both]  = w6 * z6[both] + w3 * z3[both]
-        out.loc[only6] = w6 * z6[only6]
-        out.loc[only3] = w3 * z3[only3]
-        return out
-
-    # ── Investable composites (reference pool = screen-pass ETFs) ──
-    inv_mask = df["SCREEN_PASS"]
-    df["SHARPE_COMPOSITE_INV"] = _blend_composite(
-        df, "SHARPE_6M", "SHARPE_3M", CONFIG.SHARPE_W6M, CONFIG.SHARPE_W3M, mask=inv_mask)
-    df["CLENOW_COMPOSITE_INV"] = _blend_composite(
-        df, "CLENOW_6M", "CLENOW_3M", CONFIG.CLENOW_W6M, CONFIG.CLENOW_W3M, mask=inv_mask)
-
-    # Final blended score used for ranking: 0.5*SharpeComposite + 0.5*ClenowComposite
-    # (again dropping whichever composite is NaN for a given ETF, not rescaling)
-    sc, cc = df["SHARPE_COMPOSITE_INV"], df["CLENOW_COMPOSITE_INV"]
-    both_bi  = sc.notna() & cc.notna()
-    onlySi   = sc.notna() & cc.isna()
-    onlyCi   = sc.isna()  & cc.notna()
-    df["_WTD_INV"] = np.nan
-    df.loc[both_bi, "_WTD_INV"] = CONFIG.BLEND_W_SHARPE * sc[both_bi] + CONFIG.BLEND_W_CLENOW * cc[both_bi]
-    df.loc[onlySi,  "_WTD_INV"] = CONFIG.BLEND_W_SHARPE * sc[onlySi]
-    df.loc[onlyCi,  "_WTD_INV"] = CONFIG.BLEND_W_CLENOW * cc[onlyCi]
-
-    # ── Universe composites (reference pool = ALL ETFs; used for display/
-    #    fallback sort of ETFs that failed the screen) ──
-    df["WTD_SHARPE"] = _blend_composite(df, "SHARPE_6M", "SHARPE_3M", CONFIG.SHARPE_W6M, CONFIG.SHARPE_W3M)
-    df["WTD_CLENOW"] = _blend_composite(df, "CLENOW_6M", "CLENOW_3M", CONFIG.CLENOW_W6M, CONFIG.CLENOW_W3M)
-    su, cu = df["WTD_SHARPE"], df["WTD_CLENOW"]
-    both_bu = su.notna() & cu.notna()
-    onlySu  = su.notna() & cu.isna()
-    onlyCu  = su.isna()  & cu.notna()
-    df["WTD_BLEND"] = np.nan
-    df.loc[both_bu, "WTD_BLEND"] = CONFIG.BLEND_W_SHARPE * su[both_bu] + CONFIG.BLEND_W_CLENOW * cu[both_bu]
-    df.loc[onlySu,  "WTD_BLEND"] = CONFIG.BLEND_W_SHARPE * su[onlySu]
-    df.loc[onlyCu,  "WTD_BLEND"] = CONFIG.BLEND_W_CLENOW * cu[onlyCu]
-
-    # ── Rankings ─────────────────────────────────────────────────
-    # Investable rank — blended Sharpe+Clenow composite among screen-pass
-    # ETFs only. ETFs that fail the 52-week-high screen get
-    # RANK_INVESTABLE = NaN (blank on display), not 0 — they were never
-    # ranked at all, since they're not part of the investable population.
-    inv = df[df["SCREEN_PASS"]].copy()
-    if len(inv) > 0:
-        inv["RANK_INVESTABLE"] = inv["_WTD_INV"].rank(ascending=False, na_option="bottom").astype(int)
-        df = df.merge(inv[["TICKER", "RANK_INVESTABLE"]], on="TICKER", how="left")
-    else:
-        df["RANK_INVESTABLE"] = np.nan
-
-    # Drop intermediate composite working columns
-    df = df.drop(columns=["SHARPE_COMPOSITE_INV", "CLENOW_COMPOSITE_INV", "_WTD_INV"], errors="ignore")
+def ranking_profile() -> dict:
+    """Sharpe + Clenow Z-score composites, blended BLEND_W_SHARPE / BLEND_W_CLENOW."""
+    return erc.profile(
+        "blend",
+        windows      = {"6M": CONFIG.WINDOW_6M, "3M": CONFIG.WINDOW_3M},
+        sharpe       = {"6M": CONFIG.SHARPE_W6M, "3M": CONFIG.SHARPE_W3M},
+        clenow       = {"6M": CONFIG.CLENOW_W6M, "3M": CONFIG.CLENOW_W3M},
+        blend        = {"SHARPE": CONFIG.BLEND_W_SHARPE, "CLENOW": CONFIG.BLEND_W_CLENOW},
+        max_drawdown = CONFIG.MAX_DRAWDOWN_FROM_HIGH,
+        daily_rf     = CONFIG.DAILY_RF,
+        annualize    = CONFIG.ANNUALIZE,
+    )
 
-    # Sort by investable rank first (passing ETFs at top, best rank first),
-    # then by raw Blended score for the remaining (non-investable) ETFs
-    df["_sort"] = df["RANK_INVESTABLE"].fillna(9999)
-    df = df.sort_values(["_sort", "WTD_BLEND"], ascending=[True, False]).drop(columns="_sort").reset_index(drop=True)
 
-    return df
+def build_ranking(meta: pd.DataFrame, prices: pd.DataFrame) -> pd.DataFrame:
+    """Screen, score and rank every ETF; scoring runs in etf_rank_core."""
+    return erc.build_ranking(meta, prices, ranking_profile(), classify_sector)
 
 
 # =========================================================
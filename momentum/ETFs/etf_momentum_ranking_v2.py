@@ -71,6 +71,11 @@ from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
 
+import etf_rank_core as erc
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Sharpe"))
+import benchmark_store as bs
+
 try:
     import yfinance as yf
     _YF_AVAILABLE = True
@@ -457,75 +462,36 @@ def compute_sizing_weights(tickers: list, prices: pd.DataFrame) -> dict:
 # =========================================================
 # 3. REGIME FILTER
 # =========================================================
-NIFTY500_CACHE_FILE = "nifty500_cache.csv"
-NIFTY500_CACHE_MAX_AGE_DAYS = 3   # tolerate weekends/holidays before refetching
+NIFTY500_HISTORY_DAYS = 600       # calendar days of the index handed to the regime filter
 
 
-def fetch_nifty500_index(n_days: int = 600, script_dir: Path | None = None) -> pd.Series | None:
-    """
-    Fetch the live Nifty 500 INDEX (CONFIG.REGIME_INDEX_TICKER, e.g. ^CRSLDX)
-    via yfinance, with a local daily CSV cache to avoid hitting the network
-    on every run.
-
-    Cache behaviour:
-      - If nifty500_cache.csv exists and was last written today (or within
-        NIFTY500_CACHE_MAX_AGE_DAYS calendar days, to tolerate weekends/
-        holidays), load and return it directly — no network call.
-      - Otherwise (missing, stale, or unreadable), fetch fresh via yfinance,
-        overwrite the cache, and return the new series.
-
-    Returns None if yfinance isn't installed, the fetch fails, or no cache
-    is usable — callers should fall back to the ETF.xlsx-based regime
-    tickers in that case.
+def fetch_nifty500_index(n_days: int = NIFTY500_HISTORY_DAYS) -> pd.DataFrame | None:
     """
-    cache_path = (script_dir or _SCRIPT_DIR) / NIFTY500_CACHE_FILE
+    Nifty 500 INDEX (CONFIG.REGIME_INDEX_TICKER, e.g. ^CRSLDX) from the shared
+    benchmark store (../Sharpe/benchmark_store.py): the last `n_days`
+    calendar days of Close plus the store's precomputed EMA_50 / EMA_100 /
+    EMA_200 columns.
 
-    # --- Try the cache first ---
-    if cache_path.exists():
-        try:
-            mtime_date = datetime.fromtimestamp(cache_path.stat().st_mtime).date()
-            age_days = (datetime.today().date() - mtime_date).days
-            if age_days <= NIFTY500_CACHE_MAX_AGE_DAYS:
-                cached = pd.read_csv(cache_path, index_col=0, parse_dates=True)["Close"]
-                cached = cached.dropna()
-                if len(cached) > 0:
-                    print(f"  [regime] Using cached Nifty500 index ({cache_path.name}, "
-                          f"{age_days}d old, {len(cached)} rows)")
-                    return cached
-        except Exception as e:
-            print(f"  [warn] Nifty500 cache unreadable ({e}); will refetch")
-
-    # --- Cache missing/stale/unreadable: fetch live ---
-    if not _YF_AVAILABLE:
-        print("  [warn] yfinance not installed; cannot fetch live Nifty500 index")
-        return None
+    The store tracks the last date it holds and fetches only the days after
+    it, so a run after a weekend costs one small request and a second run
+    the same day none.
 
+    Returns None if the store has no data and the fetch fails — callers
+    should fall back to the ETF.xlsx-based regime tickers in that case.
+    """
     try:
-        end = datetime.today()
-        start = end - timedelta(days=n_days)
-        data = yf.download(CONFIG.REGIME_INDEX_TICKER,
-                            start=start.strftime("%Y-%m-%d"),
-                            end=end.strftime("%Y-%m-%d"),
-                            progress=False, auto_adjust=True)
-        if data is None or data.empty:
-            print(f"  [warn] Live fetch for {CONFIG.REGIME_INDEX_TICKER} returned no data")
-            return None
-
-        close = data["Close"]
-        if isinstance(close, pd.DataFrame):   # yfinance can return a 1-col DataFrame
-            close = close.iloc[:, 0]
-        close = close.dropna()
-        if close.empty:
-            print(f"  [warn] Live fetch for {CONFIG.REGIME_INDEX_TICKER} had no valid closes")
-            return None
-
-        close.to_frame(name="Close").to_csv(cache_path)
-        print(f"  [regime] Fetched live Nifty500 index ({CONFIG.REGIME_INDEX_TICKER}, "
-              f"{len(close)} rows) -> cached to {cache_path.name}")
-        return close
+        frame = bs.get_frame(CONFIG.REGIME_INDEX_TICKER)
     except Exception as e:
-        print(f"  [warn] Live Nifty500 index fetch failed: {e}")
+        print(f"  [warn] Nifty500 benchmark store unavailable: {e}")
         return None
+    if frame is None or frame.empty:
+        print(f"  [warn] No {CONFIG.REGIME_INDEX_TICKER} history in the benchmark store")
+        return None
+    cutoff = pd.Timestamp(datetime.today().date() - timedelta(days=n_days))
+    frame  = frame[frame.index >= cutoff]
+    print(f"  [regime] Nifty500 index from benchmark store "
+          f"({len(frame)} rows, last {frame.index[-1].date()})")
+    return frame
 
 
 def regime_status(prices: pd.DataFrame, script_dir: Path | None = None) -> dict:
@@ -536,22 +502,25 @@ def regime_status(prices: pd.DataFrame, script_dir: Path | None = None) -> dict:
       BEAR    - both layers fail  -> full cash
 
     Trend source priority:
-      1. Live Nifty 500 INDEX via yfinance (CONFIG.REGIME_INDEX_TICKER, e.g. ^CRSLDX)
+      1. Live Nifty 500 INDEX from the benchmark store (CONFIG.REGIME_INDEX_TICKER)
       2. CONFIG.REGIME_TICKER (MONIFTY500) from ETF.xlsx
       3. CONFIG.REGIME_FALLBACKS, in order, from ETF.xlsx
       4. Default to BULL if nothing is available at all
+
+    script_dir is accepted for callers of the old per-folder cache; the
+    store lives in ../Sharpe/benchmark_series.
     """
-    trend_series = None
+    trend_frame  = None
     trend_ticker = None
 
     # --- Priority 1: live Nifty 500 index ---
-    live_series = fetch_nifty500_index(script_dir=script_dir)
-    if live_series is not None and len(live_series) > 0:
-        trend_series = live_series
+    live_frame = fetch_nifty500_index()
+    if live_frame is not None and len(live_frame) > 0:
+        trend_frame  = live_frame
         trend_ticker = "NIFTY500"
 
     # --- Priority 2/3: ETF.xlsx-based tickers (MONIFTY500, then fallbacks) ---
-    if trend_series is None:
+    if trend_frame is None:
         xlsx_ticker = next(
             (t for t in [CONFIG.REGIME_TICKER] + CONFIG.REGIME_FALLBACKS
              if t in prices.columns), None
@@ -559,11 +528,11 @@ def regime_status(prices: pd.DataFrame, script_dir: Path | None = None) -> dict:
         if xlsx_ticker is not None:
             s = prices[xlsx_ticker].dropna()
             if len(s) > 0:
-                trend_series = s
+                trend_frame  = s.rename("Close").to_frame()
                 trend_ticker = xlsx_ticker
 
     # --- Priority 4: nothing available at all -> default BULL ---
-    if trend_series is None:
+    if trend_frame is None:
         print("  [warn] No Nifty 500 source available (live or ETF.xlsx); "
               "trend layer defaulting to BULL")
         return {
@@ -577,11 +546,12 @@ def regime_status(prices: pd.DataFrame, script_dir: Path | None = None) -> dict:
             "trend_ticker": "N/A",
         }
 
-    s = trend_series
-    if len(s) >= CONFIG.TREND_EMA_WINDOW:
-        nifty_price = float(s.iloc[-1])
-        nifty_ema_50  = float(s.ewm(span=CONFIG.TREND_FAST_EMA_WINDOW, adjust=False).mean().iloc[-1])
-        nifty_ema_100 = float(s.ewm(span=CONFIG.TREND_EMA_WINDOW, adjust=False).mean().iloc[-1])
+    # Stored EMA columns for the store's index, computed for an ETF.xlsx series
+    inputs = bs.regime_inputs(trend_frame, CONFIG.TREND_FAST_EMA_WINDOW, CONFIG.TREND_EMA_WINDOW)
+    nifty_price = inputs["price"]
+    if pd.notna(inputs["ema_slow"]):
+        nifty_ema_50  = inputs["ema_fast"]
+        nifty_ema_100 = inputs["ema_slow"]
 
         # Regime (Run 1 - best performing config):
         #   BULL    : EMA50 > EMA100  AND  Price > EMA50  -> TOP_N slots
@@ -600,7 +570,6 @@ def regime_status(prices: pd.DataFrame, script_dir: Path | None = None) -> dict:
         trend_ok = active_slots > 0
     else:
         trend_ok    = True
-        nifty_price = float(s.iloc[-1]) if len(s) else np.nan
         nifty_ema_50 = np.nan
         nifty_ema_100 = np.nan
         label = "BULL"
@@ -623,134 +592,21 @@ def regime_status(prices: pd.DataFrame, script_dir: Path | None = None) -> dict:
 #    Abs momentum screen applied FIRST to determine investable universe,
 #    then composite ranking done on that screened subset.
 # =========================================================
-def build_ranking(meta: pd.DataFrame, prices: pd.DataFrame) -> pd.DataFrame:
-    records = []
-
-    # Get EOM date for calculation (last day of previous month with data)
-    last_date = prices.index[-1]
-    prev_indices = prices.index[(prices.index.month != last_date.month) | (prices.index.year != last_date.year)]
-    if len(prev_indices) > 0:
-        eom_date = prev_indices[-1]
-        eom_series = prices.loc[eom_date]
-        print(f"         Comp date: {eom_date.date()} (prev month eom)")
-    else:
-        eom_series = pd.Series(dtype=float)
+def ranking_profile() -> dict:
+    """12M/6M/3M strict Z-scored Sharpe (same scoring as 3W-STRICT) as an etf_rank_core profile."""
+    return erc.profile(
+        "3wstrict",
+        name         = "v2",
+        windows      = {"12M": CONFIG.WINDOW_12M, "6M": CONFIG.WINDOW_6M, "3M": CONFIG.WINDOW_3M},
+        max_drawdown = CONFIG.MAX_DRAWDOWN_FROM_HIGH,
+        daily_rf     = CONFIG.DAILY_RF,
+        annualize    = CONFIG.ANNUALIZE,
+    )
 
-    for _, row in meta.iterrows():
-        ticker = row["TICKER"]
-        if ticker not in prices.columns:
-            continue
-        s = prices[ticker]
-        close = float(s.iloc[-1]) if len(s) > 0 else np.nan
-        # Calculate 52-week high from 1 year of historical data (252 trailing trading days)
-        high_52w = float(s.tail(252).max()) if len(s) > 0 else np.nan
-
-        sh12 = sharpe_score(s, CONFIG.WINDOW_12M)
-        sh6  = sharpe_score(s, CONFIG.WINDOW_6M)
-        sh3  = sharpe_score(s, CONFIG.WINDOW_3M)
-        # Raw Sharpe values stored; WTD_SHARPE computed post-loop via Z-scores
-
-        # --- EMA calculation (100 day) ---
-        clean_s = s.dropna()
-        ema_100 = float(clean_s.ewm(span=100, adjust=False).mean().iloc[-1]) if len(clean_s) >= 100 else np.nan
-
-        # --- Return from EOM ---
-        eom_price = eom_series.get(ticker, np.nan)
-        if pd.notna(close) and pd.notna(eom_price) and eom_price > 0:
-            eom_ret = (close / eom_price - 1) * 100
-        else:
-            eom_ret = np.nan
-
-        # --- Screen: 52-week high proximity filter (calculated from history) ---
-        if pd.notna(close) and pd.notna(high_52w) and high_52w > 0:
-            pct_from_high = (high_52w - close) / high_52w
-            high_pass     = pct_from_high <= CONFIG.MAX_DRAWDOWN_FROM_HIGH
-        else:
-            pct_from_high = np.nan
-            high_pass     = True   # no data -> don't penalise
-
-        # --- Screen: above 100 EMA filter (calculated for reference only) ---
-        ema_100 = float(clean_s.ewm(span=100, adjust=False).mean().iloc[-1]) if len(clean_s) >= 100 else np.nan
-
-        screen_pass = high_pass
-
-        records.append({
-            "TICKER"        : ticker,
-            "ETF_NAME"      : row["ETF_NAME"],
-            "SECTOR"        : classify_sector(row["ETF_NAME"], ticker),
-            "CLOSE"         : close,
-            "52WK_HIGH"     : high_52w,
-            "PCT_FROM_HIGH" : pct_from_high * 100 if not np.isnan(pct_from_high) else np.nan,
-            "EMA_100"       : ema_100,
-            "EOM_PCT"       : eom_ret,
-            "SHARPE_12M"    : sh12,
-            "SHARPE_6M"     : sh6,
-            "SHARPE_3M"     : sh3,
-            "SCREEN_PASS"   : screen_pass,
-        })
 
-    df = pd.DataFrame(records)
-
-    # =================================================================
-    # CROSS-SECTIONAL Z-SCORING OF SHARPE RATIOS
-    # Z-score = (value - mean) / std, computed across ETFs with valid
-    # (non-NaN) values only.  NaN ETFs are excluded from mean/std
-    # calculation and remain NaN after Z-scoring.
-    # =================================================================
-    def _zscore(series: pd.Series) -> pd.Series:
-        """Cross-sectional Z-score; NaN values stay NaN."""
-        mu  = series.mean()   # pandas .mean() skips NaN by default
-        sig = series.std()    # pandas .std() skips NaN by default
-        if sig == 0 or np.isnan(sig):
-            return pd.Series(0.0, index=series.index)
-        return (series - mu) / sig
-
-    # ── Investable Z-scores (reference pool = screen-pass ETFs) ──
-    # 3W-STRICT: equal-weight mean of Z(12M)/Z(6M)/Z(3M), ONLY if all three
-    # are valid for that ETF. No partial-data fallback (unlike the live
-    # script's 6M/3M blend) -- an ETF without a full 12M history gets no
-    # composite score and falls to the bottom of RANK_INVESTABLE.
-    inv_mask = df["SCREEN_PASS"]
-    df["_Z12_INV"] = np.nan
-    df["_Z6_INV"]  = np.nan
-    df["_Z3_INV"]  = np.nan
-    if inv_mask.sum() > 0:
-        df.loc[inv_mask, "_Z12_INV"] = _zscore(df.loc[inv_mask, "SHARPE_12M"])
-        df.loc[inv_mask, "_Z6_INV"]  = _zscore(df.loc[inv_mask, "SHARPE_6M"])
-        df.loc[inv_mask, "_Z3_INV"]  = _zscore(df.loc[inv_mask, "SHARPE_3M"])
-
-    z12i, z6i, z3i = df["_Z12_INV"], df["_Z6_INV"], df["_Z3_INV"]
-    valid_all_i = z12i.notna() & z6i.notna() & z3i.notna()
-    df["_WTD_INV"] = np.nan
-    df.loc[valid_all_i, "_WTD_INV"] = (z12i[valid_all_i] + z6i[valid_all_i] + z3i[valid_all_i]) / 3.0
-
-    # ── Universe Z-scores (reference pool = ALL ETFs with valid Sharpe) ──
-    z12u = _zscore(df["SHARPE_12M"]); z6u = _zscore(df["SHARPE_6M"]); z3u = _zscore(df["SHARPE_3M"])
-    valid_all_u = z12u.notna() & z6u.notna() & z3u.notna()
-    df["WTD_SHARPE"] = np.nan
-    df.loc[valid_all_u, "WTD_SHARPE"] = (z12u[valid_all_u] + z6u[valid_all_u] + z3u[valid_all_u]) / 3.0
-
-    # ── Rankings ─────────────────────────────────────────────────
-    # Investable rank — Z-scored composite among screen-pass ETFs only.
-    # ETFs that fail the 52-week-high screen get RANK_INVESTABLE = NaN
-    # (blank on display), not 0 — they were never ranked at all, since
-    # they're not part of the investable population being ranked.
-    inv = df[df["SCREEN_PASS"]].copy()
-    if len(inv) > 0:
-        inv["RANK_INVESTABLE"] = inv["_WTD_INV"].rank(ascending=False, na_option="bottom").astype(int)
-        df = df.merge(inv[["TICKER", "RANK_INVESTABLE"]], on="TICKER", how="left")
-    else:
-        df["RANK_INVESTABLE"] = np.nan
-
-    # Drop intermediate Z-score working columns
-    df = df.drop(columns=["_Z12_INV", "_Z6_INV", "_Z3_INV", "_WTD_INV"], errors="ignore")
-
-    # Sort by investable rank first (passing ETFs at top, best rank first),
-    # then by raw Weighted Sharpe for the remaining (non-investable) ETFs
-    df["_sort"] = df["RANK_INVESTABLE"].fillna(9999)
-    df = df.sort_values(["_sort", "WTD_SHARPE"], ascending=[True, False]).drop(columns="_sort").reset_index(drop=True)
-
-    return df
+def build_ranking(meta: pd.DataFrame, prices: pd.DataFrame) -> pd.DataFrame:
+    """Screen, score and rank every ETF; scoring runs in etf_rank_core."""
+    return erc.build_ranking(meta, prices, ranking_profile(), classify_sector)
 
 
 # =========================================================
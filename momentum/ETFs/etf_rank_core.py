@@ -0,0 +1,444 @@
+"""
+etf_rank_core.py
+================
+Shared ETF scoring engine behind the etf_momentum_ranking* scripts.
+
+Each script used to carry its own build_ranking(): a meta.iterrows() loop
+calling sharpe_score() / clenow_score() / r2_score() per ETF per window,
+then a script-specific composite. The variants only differ in that
+composite, so here:
+
+  * panel_stats() takes the (dates × tickers) price frame the loaders
+    return and computes, for every ETF at once, the close, trailing
+    52-week high, EMA100 and return since the previous month end. Window
+    statistics (Sharpe, Clenow, R²) are computed on demand in one
+    vectorized pass and memoised on the stats dict, so several profiles
+    scored off one panel share them.
+  * A profile is a plain dict naming the windows, weights and composite
+    rules of one variant (PROFILES below). build_ranking(meta, prices,
+    profile) returns exactly the frame that variant's own build_ranking
+    used to.
+
+Each ETF's valid prices are packed to the bottom of the matrix first, so
+"the last N valid prices" is a row slice for every column, with the same
+coverage rules as the per-series functions (dropna, then tail).
+
+Profiles
+--------
+live      — 0.5·Z(Sharpe 6M) + 0.5·Z(Sharpe 3M)          etf_momentum_ranking.py
+3wstrict  — mean Z(Sharpe 12M/6M/3M), all three required  _3wstrict.py, _v2.py
+4wstrict  — mean Z(Sharpe 12M/9M/6M/3M), all four required (research)
+blend     — 0.5·Sharpe composite + 0.5·Clenow composite   _blend.py
+amfi      — raw weighted Sharpe 6M/3M, R² display columns _amfi.py (AMFI NAV panel)
+
+Functions
+---------
+panel_stats(prices, annualize, high_window, ema_span)  — shared per-ETF statistics
+window_stat(stats, kind, window, ...)                   — memoised SHARPE / CLENOW / R2 per ETF
+profile(base, **overrides)                              — copy of a PROFILES entry
+build_ranking(meta, prices, prof, sector_fn, stats)     — one variant's ranking frame
+rank_all(meta, prices, profiles, sector_fn)             — every profile off one panel
+
+Usage:  python etf_rank_core.py [profile ...] [--out etf_rankings_profiles.xlsx]
+        Loads ETF.xlsx once and writes one sheet per profile (amfi reads
+        AMFI_NAV_History.xlsx when it is present).
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+_SCRIPT_DIR  = Path(__file__).resolve().parent
+ANNUALIZE    = 252
+DAILY_RF     = 0.07 / 252
+HIGH_WINDOW  = 252
+EMA_SPAN     = 100
+CLENOW_MIN_COVERAGE = 0.90
+WINDOWS      = {"12M": 252, "9M": 189, "6M": 126, "3M": 63}
+
+PROFILES = {
+    "live": {
+        "sharpe":  {"6M": 0.5, "3M": 0.5},
+        "strict":  False,
+        "partial_universe": "raw",     # universe score: lone Z unweighted
+    },
+    "3wstrict": {
+        "sharpe":  {"12M": 1 / 3, "6M": 1 / 3, "3M": 1 / 3},
+        "strict":  True,
+    },
+    "4wstrict": {
+        "sharpe":  {"12M": 0.25, "9M": 0.25, "6M": 0.25, "3M": 0.25},
+        "strict":  True,
+    },
+    "blend": {
+        "sharpe":  {"6M": 0.5, "3M": 0.5},
+        "clenow":  {"6M": 0.5, "3M": 0.5},
+        "blend":   {"SHARPE": 0.5, "CLENOW": 0.5},
+        "strict":  False,
+        "partial_universe": "weighted",
+    },
+    "amfi": {
+        "sharpe":  {"6M": 0.5, "3M": 0.5},
+        "r2":      {"6M": 0.5, "3M": 0.5},
+        "zscore":  False,              # ranks the raw weighted Sharpe
+        "strict":  False,
+        "partial_universe": "raw",
+    },
+}
+_PROFILE_DEFAULTS = {
+    "windows":          WINDOWS,
+    "clenow":           None,
+    "r2":               None,
+    "blend":            None,
+    "zscore":           True,
+    "partial_universe": "weighted",
+    "max_drawdown":     0.25,
+    "daily_rf":         DAILY_RF,
+    "annualize":        ANNUALIZE,
+}
+
+
+def profile(base: str, **overrides) -> dict:
+    """PROFILES[base] with the defaults filled in and `overrides` (incl. a new name) applied."""
+    return {**_PROFILE_DEFAULTS, **PROFILES[base], "name": base, **overrides}
+
+
+# =========================================================
+# 1. PANEL STATISTICS
+# =========================================================
+def _bottom_pack_valid(values: np.ndarray) -> np.ndarray:
+    """Move each column's non-NaN entries to the bottom, preserving order."""
+    order = np.argsort(~np.isnan(values), axis=0, kind="stable")
+    return np.take_along_axis(values, order, axis=0)
+
+
+def panel_stats(prices: pd.DataFrame, annualize: int = ANNUALIZE,
+                high_window: int = HIGH_WINDOW, ema_span: int = EMA_SPAN) -> dict:
+    """
+    Per-ETF statistics shared by every profile, from the forward-filled
+    (dates × tickers) price frame. EOM_DATE is the last date of the
+    previous calendar month (None if the panel covers one month only).
+    """
+    values = prices.to_numpy(dtype=float)
+    packed = _bottom_pack_valid(values)
+    count  = (~np.isnan(values)).sum(axis=0)
+
+    close  = values[-1] if len(values) else np.full(values.shape[1], np.nan)
+    high   = prices.tail(high_window).max().to_numpy(dtype=float)
+    ema    = pd.DataFrame(packed).ewm(span=ema_span, adjust=False).mean().to_numpy()[-1] \
+             if len(values) else np.full(values.shape[1], np.nan)
+    ema    = np.where(count >= ema_span, ema, np.nan)
+
+    last     = prices.index[-1]
+    prev     = prices.index[(prices.index.month != last.month) | (prices.index.year != last.year)]
+    eom_date = prev[-1] if len(prev) else None
+    eom_px   = prices.loc[eom_date].to_numpy(dtype=float) if eom_date is not None \
+               else np.full(values.shape[1], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        eom_pct = np.where(~np.isnan(close) & (eom_px > 0), (close / eom_px - 1) * 100, np.nan)
+
+    return {
+        "tickers":   list(prices.columns),
+        "packed":    packed,
+        "count":     count,
+        "annualize": annualize,
+        "CLOSE":     close,
+        "52WK_HIGH": high,
+        "EMA_100":   ema,
+        "EOM_PCT":   eom_pct,
+        "EOM_DATE":  eom_date,
+        "_memo":     {},
+    }
+
+
+def _sharpe(stats: dict, window: int, daily_rf: float, annualize: int) -> np.ndarray:
+    """sharpe_score(): annualised Sharpe of the last `window` log returns; needs window+1 prices."""
+    tail = stats["packed"][-(window + 1):]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        excess = np.log(tail[1:] / tail[:-1]) - daily_rf
+        mean   = excess.mean(axis=0)
+        sd     = np.sqrt(((excess - mean) ** 2).sum(axis=0) / (window - 1))
+        out    = mean / sd * np.sqrt(annualize)
+    ok = (stats["count"] >= window + 1) & (len(stats["packed"]) >= window + 1) & (sd != 0)
+    return np.where(ok, out, np.nan)
+
+
+def _regression(stats: dict, window: int):
+    """Masked log-price OLS on each ETF's last min(count, window) prices: (n, sxx, syy, sxy)."""
+    tail  = stats["packed"][-window:]
+    valid = ~np.isnan(tail) & (tail > 0)
+    n     = valid.sum(axis=0)
+    x     = np.arange(len(tail), dtype=float)[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        y  = np.where(valid, np.log(np.where(valid, tail, 1.0)), 0.0)
+        xw = np.where(valid, x, 0.0)
+        mx = xw.sum(axis=0) / n
+        my = y.sum(axis=0) / n
+        dx = np.where(valid, x - mx, 0.0)
+        dy = np.where(valid, y - my, 0.0)
+    return n, (dx * dx).sum(axis=0), (dy * dy).sum(axis=0), (dx * dy).sum(axis=0), valid
+
+
+def _clenow(stats: dict, window: int, annualize: int) -> np.ndarray:
+    """clenow_score(): annualised log-price slope × R² over the last min(count, window) prices."""
+    count = stats["count"]
+    n, sxx, syy, sxy, valid = _regression(stats, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = sxy / sxx
+        r2    = sxy * sxy / (sxx * syy)
+    # any non-positive price in the window voids the score, as in clenow_score()
+    used = np.minimum(count, window)
+    ok   = (count >= window * CLENOW_MIN_COVERAGE) & (n == used) & (sxx > 0) & (syy > 0)
+    return np.where(ok, slope * annualize * r2, np.nan)
+
+
+def _r2(stats: dict, window: int) -> np.ndarray:
+    """r2_score(): R² of a log-price regression over the last `window` prices (0 when flat)."""
+    n, sxx, syy, sxy, _ = _regression(stats, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = np.where(syy > 0, sxy * sxy / (sxx * syy), 0.0)
+    return np.where((stats["count"] >= window) & (n == window), r2, np.nan)
+
+
+def window_stat(stats: dict, kind: str, window: int,
+                daily_rf: float = DAILY_RF, annualize: int | None = None) -> np.ndarray:
+    """SHARPE / CLENOW / R2 for every ETF over `window`, computed once per stats dict."""
+    annualize = stats["annualize"] if annualize is None else annualize
+    key = (kind, window, daily_rf, annualize)
+    if key not in stats["_memo"]:
+        if kind == "SHARPE":
+            stats["_memo"][key] = _sharpe(stats, window, daily_rf, annualize)
+        elif kind == "CLENOW":
+            stats["_memo"][key] = _clenow(stats, window, annualize)
+        elif kind == "R2":
+            stats["_memo"][key] = _r2(stats, window)
+        else:
+            raise ValueError(f"window_stat: unknown statistic {kind!r}")
+    return stats["_memo"][key]
+
+
+# =========================================================
+# 2. COMPOSITES
+# =========================================================
+def _zscore(series: pd.Series) -> pd.Series:
+    """Cross-sectional Z-score; NaN values stay NaN."""
+    mu  = series.mean()
+    sig = series.std()
+    if sig == 0 or np.isnan(sig):
+        return pd.Series(0.0, index=series.index)
+    return (series - mu) / sig
+
+
+def _pooled_z(df: pd.DataFrame, col: str, mask: pd.Series | None) -> pd.Series:
+    """Z-score `col` over the rows in `mask` (all rows if None); NaN elsewhere."""
+    if mask is None:
+        return _zscore(df[col])
+    z = pd.Series(np.nan, index=df.index)
+    if mask.sum() > 0:
+        z.loc[mask] = _zscore(df.loc[mask, col])
+    return z
+
+
+def _combine(terms: list, weights: list, strict: bool, partial: str) -> pd.Series:
+    """
+    Weighted sum of aligned Series. strict: NaN unless every term is valid.
+    Otherwise NaN terms are dropped, not rescaled; partial="raw" uses a lone
+    valid term unweighted (the live script's universe score).
+    """
+    frame = pd.concat(terms, axis=1)
+    w     = np.asarray(weights, dtype=float)
+    n     = frame.notna().sum(axis=1)
+    if strict and np.all(w == w[0]):
+        # equal weights: the plain mean the strict scripts computed
+        return (frame.sum(axis=1) / len(terms) * (w[0] * len(terms))).where(n == len(terms))
+    out   = (frame.fillna(0.0) * w).sum(axis=1)
+    if partial == "raw":
+        out = out.where(n != 1, frame.sum(axis=1, min_count=1))
+    return out.where(n == len(terms)) if strict else out.where(n > 0)
+
+
+def _composite(df: pd.DataFrame, kind: str, weights: dict, mask, prof: dict,
+               partial: str) -> pd.Series:
+    terms = [_pooled_z(df, f"{kind}_{label}", mask) for label in weights]
+    return _combine(terms, list(weights.values()), prof["strict"], partial)
+
+
+# =========================================================
+# 3. RANKING
+# =========================================================
+def _base_frame(meta: pd.DataFrame, stats: dict, prof: dict, sector_fn) -> pd.DataFrame:
+    """One row per meta ETF present in the panel, in meta order (loop order before)."""
+    pos  = {t: i for i, t in enumerate(stats["tickers"])}
+    rows = meta[meta["TICKER"].isin(pos)]
+    idx  = np.array([pos[t] for t in rows["TICKER"]], dtype=int)
+
+    close, high = stats["CLOSE"][idx], stats["52WK_HIGH"][idx]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        has  = ~np.isnan(close) & ~np.isnan(high) & (high > 0)
+        pct  = np.where(has, (high - close) / high, np.nan)
+    cols = {
+        "TICKER":        rows["TICKER"].to_numpy(),
+        "ETF_NAME":      rows["ETF_NAME"].to_numpy(),
+        "SECTOR":        [sector_fn(n, t) for n, t in zip(rows["ETF_NAME"], rows["TICKER"])],
+        "CLOSE":         close,
+        "52WK_HIGH":     high,
+        "PCT_FROM_HIGH": pct * 100,
+        "EMA_100":       stats["EMA_100"][idx],
+        "EOM_PCT":       stats["EOM_PCT"][idx],
+    }
+    for label in prof["sharpe"]:
+        cols[f"SHARPE_{label}"] = window_stat(stats, "SHARPE", prof["windows"][label],
+                                              prof["daily_rf"], prof["annualize"])[idx]
+    for label in prof["clenow"] or {}:
+        cols[f"CLENOW_{label}"] = window_stat(stats, "CLENOW", prof["windows"][label],
+                                              annualize=prof["annualize"])[idx]
+    df = pd.DataFrame(cols)
+    df["SCREEN_PASS"] = ~has | (pct <= prof["max_drawdown"])
+    return df
+
+
+def _rank_investable(df: pd.DataFrame, score: str) -> pd.DataFrame:
+    """RANK_INVESTABLE among screen-pass ETFs (NaN for the rest), merged as before."""
+    inv = df[df["SCREEN_PASS"]].copy()
+    if len(inv) > 0:
+        inv["RANK_INVESTABLE"] = inv[score].rank(ascending=False, na_option="bottom").astype(int)
+        return df.merge(inv[["TICKER", "RANK_INVESTABLE"]], on="TICKER", how="left")
+    df["RANK_INVESTABLE"] = np.nan
+    return df
+
+
+def _rank_zscore(df: pd.DataFrame, prof: dict) -> pd.DataFrame:
+    """live / 3wstrict / 4wstrict / blend: Z-scored composites, investable and universe pools."""
+    mask, partial = df["SCREEN_PASS"], prof["partial_universe"]
+    inv_score     = _composite(df, "SHARPE", prof["sharpe"], mask, prof, "weighted")
+    df["WTD_SHARPE"] = _composite(df, "SHARPE", prof["sharpe"], None, prof, partial)
+    sort_col = "WTD_SHARPE"
+
+    if prof["blend"]:
+        bw = prof["blend"]
+        inv_clenow = _composite(df, "CLENOW", prof["clenow"], mask, prof, "weighted")
+        inv_score  = _combine([inv_score, inv_clenow], [bw["SHARPE"], bw["CLENOW"]],
+                              False, "weighted")
+        df["WTD_CLENOW"] = _composite(df, "CLENOW", prof["clenow"], None, prof, partial)
+        df["WTD_BLEND"]  = _combine([df["WTD_SHARPE"], df["WTD_CLENOW"]],
+                                    [bw["SHARPE"], bw["CLENOW"]], False, "weighted")
+        sort_col = "WTD_BLEND"
+
+    df["_WTD_INV"] = inv_score
+    df = _rank_investable(df, "_WTD_INV").drop(columns="_WTD_INV")
+    df["_sort"] = df["RANK_INVESTABLE"].fillna(9999)
+    return (df.sort_values(["_sort", sort_col], ascending=[True, False])
+              .drop(columns="_sort").reset_index(drop=True))
+
+
+def _rank_raw(df: pd.DataFrame, prof: dict, stats: dict) -> pd.DataFrame:
+    """amfi: raw weighted Sharpe (lone window unweighted) plus Sharpe × R² display columns."""
+    screen = df.pop("SCREEN_PASS")
+    labels = list(prof["sharpe"])
+    df["WTD_SHARPE"] = _combine([df[f"SHARPE_{l}"] for l in labels],
+                                list(prof["sharpe"].values()), False, prof["partial_universe"])
+    idx = np.array([stats["tickers"].index(t) for t in df["TICKER"]], dtype=int)
+    for label in prof["r2"]:
+        df[f"R2_{label}"] = window_stat(stats, "R2", prof["windows"][label])[idx]
+    for label in prof["r2"]:
+        df[f"SR2_{label}"] = df[f"SHARPE_{label}"].fillna(0.0) * df[f"R2_{label}"].fillna(0.0)
+    df["SR2_BLEND"]   = sum(df[f"SR2_{l}"] for l in prof["r2"]) / len(prof["r2"])
+    df["SCREEN_PASS"] = screen
+
+    df["RANK_UNIVERSE"] = df["WTD_SHARPE"].rank(ascending=False, na_option="bottom").astype(int)
+    df["RANK_SHARPE"]   = df["RANK_UNIVERSE"]
+    df["RANK_SR2"]      = df["SR2_BLEND"].rank(ascending=False, na_option="bottom").astype(int)
+    df = _rank_investable(df, "WTD_SHARPE")
+    df["RANK_INVESTABLE"] = df["RANK_INVESTABLE"].fillna(0).astype(int)
+    df["_sort"] = df["RANK_INVESTABLE"].replace(0, 9999)
+    return df.sort_values(["_sort", "RANK_UNIVERSE"]).drop(columns="_sort").reset_index(drop=True)
+
+
+def build_ranking(meta: pd.DataFrame, prices: pd.DataFrame, prof: dict,
+                  sector_fn=None, stats: dict | None = None) -> pd.DataFrame:
+    """
+    Ranking frame for one profile: screen (52-week-high proximity), window
+    scores, composite, RANK_INVESTABLE, sorted investable-first. Pass
+    `stats` (panel_stats of the same prices) to share work across profiles.
+    """
+    if stats is None:
+        stats = panel_stats(prices, prof["annualize"])
+    if stats["EOM_DATE"] is not None:
+        print(f"         Comp date: {stats['EOM_DATE'].date()} (prev month eom)")
+    sector_fn = sector_fn or (lambda name, ticker: "OTHER")
+    df = _base_frame(meta, stats, prof, sector_fn)
+    return _rank_zscore(df, prof) if prof["zscore"] else _rank_raw(df, prof, stats)
+
+
+def rank_all(meta: pd.DataFrame, prices: pd.DataFrame, profiles: list,
+             sector_fn=None) -> dict:
+    """{profile name: ranking} for profiles scored off one price panel."""
+    stats = panel_stats(prices)
+    return {p["name"]: build_ranking(meta, prices, p, sector_fn, stats) for p in profiles}
+
+
+# =========================================================
+# CLI
+# =========================================================
+# Variant scripts whose CONFIG (and strategy_config*.json) each profile follows
+VARIANT_MODULES = {
+    "live":     "etf_momentum_ranking",
+    "3wstrict": "etf_momentum_ranking_3wstrict",
+    "blend":    "etf_momentum_ranking_blend",
+    "amfi":     "etf_momentum_ranking_amfi",
+}
+
+
+def _variant_profile(name: str) -> dict:
+    import importlib
+    module = VARIANT_MODULES.get(name)
+    if module is None:
+        return profile(name)
+    return importlib.import_module(module).ranking_profile()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank ETFs under every scoring profile")
+    parser.add_argument("profiles", nargs="*", default=list(PROFILES),
+                        help=f"profiles to run (default: all of {', '.join(PROFILES)})")
+    parser.add_argument("--out", default=str(_SCRIPT_DIR / "etf_rankings_profiles.xlsx"))
+    args = parser.parse_args()
+    unknown = [p for p in args.profiles if p not in PROFILES]
+    if unknown:
+        sys.exit(f"Unknown profile(s): {', '.join(unknown)}")
+
+    import etf_momentum_ranking as emr
+    t0      = time.perf_counter()
+    results = {}
+    etf_profiles = [_variant_profile(p) for p in args.profiles if p != "amfi"]
+    if etf_profiles:
+        meta, prices = emr.load_etf_data(str(_SCRIPT_DIR / emr.CONFIG.INPUT_FILE))
+        results.update(rank_all(meta, prices, etf_profiles, emr.classify_sector))
+    if "amfi" in args.profiles:
+        import etf_momentum_ranking_amfi as amfi
+        nav_file = _SCRIPT_DIR / amfi.CONFIG.AMFI_NAV_FILE
+        if nav_file.exists():
+            meta, prices = amfi.load_etf_data_amfi(str(nav_file),
+                                                   str(_SCRIPT_DIR / amfi.CONFIG.AMFI_CODES_FILE))
+            results["amfi"] = build_ranking(meta, prices, _variant_profile("amfi"),
+                                            lambda name, ticker: amfi.classify_sector(name))
+        else:
+            print(f"[skip]   amfi: {nav_file.name} not found")
+
+    with pd.ExcelWriter(args.out) as writer:
+        for name, df in results.items():
+            df.to_excel(writer, sheet_name=name, index=False)
+    print(f"\n{len(results)} profile(s) ranked in {time.perf_counter() - t0:.2f}s -> {args.out}")
+    for name, df in results.items():
+        top = df[df["RANK_INVESTABLE"].fillna(0) > 0].head(5)["TICKER"].tolist()
+        print(f"  {name:<10} top 5: {', '.join(top)}")
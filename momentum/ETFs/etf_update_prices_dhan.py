@@ -65,7 +65,7 @@ Known differences vs. the AMFI-NAV-sourced ETF.xlsx
   (e.g. ETF.xlsx's AXISBNKETF -> Dhan's BNKETFAXIS) -- pre-populated in
   ALIAS_MAP below. Verified match rate: 283/292 direct, 9/9 via alias ->
   292/292 (100%) of ETF.xlsx's current universe resolves on Dhan.
-* Regime index (^CRSLDX via yfinance, cached in nifty500_cache.csv) and its
+* Regime index (^CRSLDX via ../Sharpe/benchmark_store.py) and its
   ETF.xlsx-based fallback tickers (MONIFTY500, BSE500IETF, HDFCBSE500,
   NIFTYBEES) are untouched by this script -- that pipeline stays exactly
   as it is today. MONIFTY500 happens to also be one of the 292 ETFs in the
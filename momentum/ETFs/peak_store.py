@@ -0,0 +1,259 @@
+"""
+peak_store.py
+=============
+Running-peak store behind the trailing-stop checks of
+etf_momentum_ranking.py (--tsl) and etf_dashboard.py (Active Holdings).
+
+compute_holding_peak() filters prices_df[ticker] to the dates since the
+first buy and takes .max() — for every holding, on every dashboard rerun —
+and --tsl kept one peak per model slot in holdings_log.json, refreshed
+only from the weekly NAV and the live quote. Here each position, keyed by
+(ticker, entry date), keeps
+
+    peak       running max of the closes since entry (inclusive)
+    peak_date  the bar that set it
+    last_bar   last bar folded in
+
+in holding_peaks.json (the dashboard's tradelog holdings; --tsl keeps the
+model slots in tsl_peaks.json). update() folds only the bars from each position's
+last_bar on (re-reading last_bar, so a provisional close that is revised
+upward still counts) for every position in one masked max, and
+exit_table() evaluates the TSL, 52-week-high and rank exits for all
+holdings as column comparisons, with should_exit()'s reasons. save(keep=)
+drops positions that are no longer held, so the file does not grow with
+every round trip (a re-entry is a new key: its entry date differs).
+
+Functions
+---------
+position_key(ticker, entry_date)           — "TICKER@YYYY-MM-DD" (None without a date)
+load(path) / save(path, store, keep)       — JSON store; save() only writes after changes
+open_position(store, ticker, entry_date, seed, seed_date) — register a holding
+update(store, bars, keys)                  — fold new (dates × tickers) bars into the peaks
+peaks(store, keys)                         — peak / peak_date / last_bar per key
+exit_table(holdings, ranking, store, ...)  — TSL / 52wk-high / rank exits for all holdings
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# =========================================================
+# CONFIG
+# =========================================================
+PEAK_STORE_FILE = "holding_peaks.json"    # etf_dashboard.py: tradelog holdings
+TSL_STORE_FILE  = "tsl_peaks.json"        # --tsl: holdings_log model slots
+STORE_VERSION   = 1
+
+
+def _day(value) -> str | None:
+    """ISO date of `value` (date, datetime, Timestamp or string); None when unparseable."""
+    if value is None:
+        return None
+    try:
+        ts = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        return None
+    return None if pd.isna(ts) else ts.strftime("%Y-%m-%d")
+
+
+def position_key(ticker: str, entry_date) -> str | None:
+    day = _day(entry_date)
+    return f"{ticker}@{day}" if day else None
+
+
+# =========================================================
+# STORAGE
+# =========================================================
+def new_store() -> dict:
+    return {"version": STORE_VERSION, "positions": {}}
+
+
+def load(path) -> dict:
+    """The store at `path` (empty when missing or unreadable)."""
+    p = Path(path)
+    if not p.exists():
+        return new_store()
+    try:
+        with open(p) as f:
+            store = json.load(f)
+    except (OSError, ValueError):
+        return new_store()
+    if store.get("version") != STORE_VERSION:
+        return new_store()
+    return store
+
+
+def save(path, store: dict, keep=None) -> bool:
+    """
+    Write the store atomically if open_position() / update() changed it;
+    True if written. With `keep` (the keys still held) every other
+    position is dropped first.
+    """
+    if keep is not None:
+        keep   = set(keep)
+        closed = [k for k in store["positions"] if k not in keep]
+        for k in closed:
+            del store["positions"][k]
+        if closed:
+            store["_dirty"] = True
+    if not store.pop("_dirty", False):
+        return False
+    p   = Path(path)
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(store, f, indent=2)
+    os.replace(tmp, p)
+    return True
+
+
+def open_position(store: dict, ticker: str, entry_date, seed: float | None = None,
+                  seed_date=None) -> str | None:
+    """
+    Register (ticker, entry_date) if new and return its key. `seed` is a
+    peak already known from elsewhere (e.g. the holdings_log slot peak)
+    for history the bars passed to update() won't cover; it is folded into
+    the running max on every call, so a higher seed raises a stored peak.
+    """
+    key = position_key(ticker, entry_date)
+    if key is None:
+        return key
+    seed = float(seed) if seed is not None and seed > 0 else None
+    rec  = store["positions"].get(key)
+    if rec is not None:
+        if seed is not None and (rec["peak"] is None or seed > rec["peak"]):
+            rec["peak"], rec["peak_date"] = seed, _day(seed_date)
+            store["_dirty"] = True
+        return key
+    store["positions"][key] = {
+        "ticker":     ticker,
+        "entry_date": _day(entry_date),
+        "peak":       seed,
+        "peak_date":  _day(seed_date) if seed is not None else None,
+        "last_bar":   None,
+    }
+    store["_dirty"] = True
+    return key
+
+
+# =========================================================
+# UPDATE
+# =========================================================
+def update(store: dict, bars: pd.DataFrame, keys=None) -> int:
+    """
+    Fold the rows of `bars` (dates × tickers) dated on or after each
+    position's last_bar (entry date for a new one) into its peak. Returns
+    the number of positions whose peak or last_bar moved.
+    """
+    positions = store["positions"]
+    keys = [k for k in (keys if keys is not None else list(positions))
+            if k in positions and positions[k]["ticker"] in bars.columns]
+    if not keys or bars.empty:
+        return 0
+
+    recs  = [positions[k] for k in keys]
+    dates = pd.DatetimeIndex(bars.index).normalize()
+    vals  = bars.to_numpy(dtype=float)[:, bars.columns.get_indexer([r["ticker"] for r in recs])]
+    start = pd.to_datetime([r["last_bar"] or r["entry_date"] for r in recs]).to_numpy()
+    fresh = (dates.to_numpy()[:, None] >= start[None, :]) & ~np.isnan(vals)
+
+    masked = np.where(fresh, vals, -np.inf)
+    best   = masked.max(axis=0)
+    at     = masked.argmax(axis=0)
+    last   = len(dates) - 1 - fresh[::-1].argmax(axis=0)
+
+    changed = 0
+    for k, rec in enumerate(recs):
+        if not fresh[:, k].any():
+            continue
+        last_bar = dates[last[k]].strftime("%Y-%m-%d")
+        moved    = rec["peak"] is None or best[k] > rec["peak"]
+        if moved:
+            rec["peak"], rec["peak_date"] = float(best[k]), dates[at[k]].strftime("%Y-%m-%d")
+        if moved or last_bar != rec["last_bar"]:
+            rec["last_bar"] = max(last_bar, rec["last_bar"] or last_bar)
+            changed += 1
+    if changed:
+        store["_dirty"] = True
+    return changed
+
+
+def peaks(store: dict, keys: list) -> pd.DataFrame:
+    """peak / peak_date / last_bar for `keys` in order (NaN / None for unknown keys)."""
+    recs = [store["positions"].get(k) or {} for k in keys]
+    return pd.DataFrame({
+        "peak":      [r.get("peak") if r.get("peak") is not None else np.nan for r in recs],
+        "peak_date": [r.get("peak_date") for r in recs],
+        "last_bar":  [r.get("last_bar") for r in recs],
+    })
+
+
+# =========================================================
+# EXIT EVALUATION
+# =========================================================
+def exit_table(holdings: pd.DataFrame, ranking: pd.DataFrame | None, store: dict,
+               tsl: float, max_dd: float = 0.25, max_rank: int = 20) -> pd.DataFrame:
+    """
+    Exit rules for every holding at once. `holdings` has TICKER, ENTRY_DATE
+    and PRICE (current price) columns; the TSL peak is max(stored peak,
+    current price). With a `ranking` frame the 52-week-high (PCT_FROM_HIGH
+    > max_dd) and rank (RANK_INVESTABLE > max_rank) exits are applied too,
+    and a ticker missing from it exits as should_exit() does.
+
+    Returns holdings plus PEAK, PEAK_DATE, TSL_PRICE, DD_FROM_PEAK,
+    PCT_FROM_HIGH, RANK_INVESTABLE, EXIT and EXIT_REASON ("" to hold).
+    """
+    out    = holdings.reset_index(drop=True).copy()
+    keys   = [position_key(t, d) for t, d in zip(out["TICKER"], out["ENTRY_DATE"])]
+    stored = peaks(store, keys)
+    price  = pd.to_numeric(out["PRICE"], errors="coerce").to_numpy(dtype=float)
+    peak   = np.fmax(stored["peak"].to_numpy(dtype=float), price)
+
+    out["PEAK"]      = peak
+    out["PEAK_DATE"] = np.where(price >= stored["peak"].fillna(-np.inf).to_numpy(),
+                                None, stored["peak_date"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        live = (peak > 0) & (price > 0)
+        dd   = np.where(live, (peak - price) / peak, np.nan)
+    out["TSL_PRICE"]    = peak * (1 - tsl)
+    out["DD_FROM_PEAK"] = dd
+    tsl_hit = np.nan_to_num(dd, nan=-1.0) >= tsl
+
+    if ranking is not None:
+        ranked  = ranking.drop_duplicates("TICKER").set_index("TICKER")
+        missing = ~out["TICKER"].isin(ranked.index).to_numpy()
+        rows    = ranked.reindex(out["TICKER"])
+        pct  = (rows["PCT_FROM_HIGH"] if "PCT_FROM_HIGH" in rows else
+                pd.Series(0.0, index=rows.index)).to_numpy(dtype=float)
+        rank = (rows["RANK_INVESTABLE"] if "RANK_INVESTABLE" in rows else
+                pd.Series(np.inf, index=rows.index)).to_numpy(dtype=float)
+        dd_hit   = np.abs(np.nan_to_num(pct)) > max_dd * 100
+        rank_hit = np.nan_to_num(rank, nan=-np.inf) > max_rank
+    else:
+        missing = np.zeros(len(out), dtype=bool)
+        pct = rank = np.full(len(out), np.nan)
+        dd_hit = rank_hit = missing
+
+    out["PCT_FROM_HIGH"]   = pct
+    out["RANK_INVESTABLE"] = rank
+    reasons = []
+    for k in range(len(out)):
+        if missing[k]:
+            reasons.append("Ticker no longer in ranking universe")
+            continue
+        parts = []
+        if dd_hit[k]:
+            parts.append(f"52wk high DD {pct[k]:.1f}% > {max_dd * 100:.0f}%")
+        if rank_hit[k]:
+            parts.append(f"Rank {rank[k]:.0f} > {max_rank}")
+        if tsl_hit[k]:
+            parts.append(f"TSL {dd[k] * 100:.1f}% >= {tsl * 100:.0f}%")
+        reasons.append(" | ".join(parts))
+    out["EXIT_REASON"] = reasons
+    out["EXIT"]        = out["EXIT_REASON"] != ""
+    return out
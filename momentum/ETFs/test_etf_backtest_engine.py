@@ -0,0 +1,167 @@
+"""
+Unit tests for etf_backtest_engine.py — the precomputed per-date statistics
+and ranks must match the per-date ranking, and the segment-at-a-time
+simulation must match a plain day-by-day hold-and-replace loop. Where the
+v13 research script's own dependencies (matplotlib, yfinance) are
+installed, v13_CURRENT / v13_V2 are also checked against its engines on a
+fixture with stale price windows.
+
+Run:  python test_etf_backtest_engine.py
+"""
+
+import contextlib
+import importlib.util
+import io
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import etf_backtest_engine as ebe
+import etf_rank_core as erc
+
+
+def make_panel(n_etfs: int = 14, n_days: int = 420, seed: int = 11):
+    """Forward-filled prices, some ETFs listed late, volatile enough to trip the stops."""
+    rng    = np.random.default_rng(seed)
+    dates  = pd.bdate_range("2024-01-01", periods=n_days)
+    px     = 100 * np.cumprod(1 + rng.normal(0.0004, rng.uniform(0.008, 0.03, n_etfs),
+                                             (n_days, n_etfs)), axis=0)
+    px[:150, 0] = np.nan
+    px[:300, 1] = np.nan
+    tickers = [f"ETF{i:02d}" for i in range(n_etfs)]
+    prices  = pd.DataFrame(px, index=dates, columns=tickers)
+    meta    = pd.DataFrame({"TICKER": tickers, "ETF_NAME": [f"{t} Fund" for t in tickers]})
+    return meta, prices
+
+
+def load_v13():
+    """backtest results/etf_backtest_v13_current_vs_v2.py as a module (None without its deps)."""
+    path = Path(__file__).resolve().parent / "backtest results" / "etf_backtest_v13_current_vs_v2.py"
+    spec = importlib.util.spec_from_file_location("etf_backtest_v13", path)
+    mod  = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(mod)
+    except ImportError:
+        return None
+    return mod
+
+
+V13 = load_v13()
+
+
+def sector(name: str, ticker: str) -> str:
+    return f"S{int(ticker[3:]) % 5}"
+
+
+def reference_hold(panel: dict, var: dict) -> np.ndarray:
+    """Day-by-day weekly hold-and-replace (the v13 CURRENT loop) on the engine's ranks."""
+    P, dates = panel["PRICE"], panel["dates"]
+    reb = list(ebe.rebalance_days(dates, "W"))
+    rk  = ebe.rank_matrix(panel, var, np.maximum(np.array(reb) - 1, 0))
+    g, cost = 1 + ebe.CONFIG.CASH_INTEREST_PA / 365, ebe.CONFIG.TRADE_COST_FIXED
+    cash, held, equity = ebe.CONFIG.START_CAPITAL, [], []
+    for t in range(len(dates)):
+        cash *= g
+        if t in reb:
+            j = reb.index(t)
+            equity_now = cash + sum(s * P[t, c] for c, s, _, _ in held)
+            slot, kept = equity_now / var["top_n"], []
+            for c, s, entry, peak in held:
+                p = P[t, c]
+                out = (rk["PCT"][j, c] > var["dd_exit"] or rk["RANK"][j, c] > var["rank_exit"]
+                       or (peak - p) / peak >= var["tsl"])
+                if out:
+                    cash += s * p - cost
+                else:
+                    kept.append((c, s, entry, max(peak, p)))
+            held = kept
+            order = rk["RANK"][j]
+            cands = [c for c in np.argsort(np.nan_to_num(order, nan=1e9), kind="quicksort")
+                     if rk["PASS"][j, c] and order[c] > 0]
+            taken = {c for c, *_ in held}
+            secs  = [panel["sectors"][c] for c in taken]
+            for c in cands:
+                if len(held) >= var["top_n"]:
+                    break
+                if c in taken or panel["sectors"][c] in secs or not P[t, c] > 0:
+                    continue
+                held.append((c, slot / P[t, c], P[t, c], P[t, c]))
+                taken.add(c)
+                secs.append(panel["sectors"][c])
+                cash -= slot + cost
+        equity.append(cash + sum(s * P[t, c] for c, s, _, _ in held))
+    return np.array(equity)
+
+
+class TestBacktestEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.meta, self.prices = make_panel()
+        self.panel = ebe.build_panel(self.meta, self.prices, None, sector)
+
+    def test_stats_and_ranks_match_per_date_ranking(self):
+        for row in (200, 330, 419):
+            cut   = self.prices.iloc[:row + 1]
+            stats = erc.panel_stats(cut)
+            for kind, w in (("SHARPE", 126), ("SHARPE", 63), ("CLENOW", 126)):
+                got = ebe.window_stat(self.panel, kind, w, 0.07 / 252)[row]
+                np.testing.assert_allclose(got, erc.window_stat(stats, kind, w, 0.07 / 252),
+                                           rtol=1e-8, equal_nan=True)
+            exp = erc.build_ranking(self.meta, cut, erc.profile("live"), stats=stats)
+            exp = exp.set_index("TICKER")["RANK_INVESTABLE"].reindex(self.prices.columns)
+            got = ebe.rank_matrix(self.panel, ebe.variant("v13_CURRENT"), np.array([row]))
+            np.testing.assert_array_equal(got["RANK"][0], exp.to_numpy(dtype=float))
+
+    def test_hold_engine_matches_daily_loop(self):
+        var = ebe.variant("v13_CURRENT", regime=None)
+        res = ebe.run_variant(self.panel, var)
+        np.testing.assert_allclose(res["equity"]["equity"].to_numpy(),
+                                   reference_hold(self.panel, var), rtol=1e-10)
+        sells = res["trades"][res["trades"]["TYPE"] == "SELL"]
+        self.assertGreater(len(sells), 0)
+
+    def test_bear_regime_stays_in_cash(self):
+        regime = pd.Series(np.linspace(200, 100, len(self.prices)), index=self.prices.index)
+        panel  = ebe.build_panel(self.meta, self.prices, regime, sector)
+        res    = ebe.run_variant(panel, "v11_MONTHLY_EQUAL_DDEXIT")
+        eq     = res["equity"]
+        growth = (1 + ebe.CONFIG.CASH_INTEREST_PA / 365) ** np.arange(1, len(eq) + 1)
+        self.assertTrue(res["trades"].empty)
+        self.assertTrue((eq["regime"] == "BEAR").all())
+        self.assertEqual(eq["n_holdings"].max(), 0)
+        np.testing.assert_allclose(eq["equity"], ebe.CONFIG.START_CAPITAL * growth, rtol=1e-10)
+
+    @unittest.skipIf(V13 is None, "v13 script dependencies (matplotlib, yfinance) not installed")
+    def test_v13_variants_match_legacy_engines(self):
+        # two stale ETFs: one quote frozen at its high for 70 days, one delisted
+        # (forward-filled) — their ±1e16 Sharpe flattens the other Z-scores
+        meta, prices = make_panel(n_days=360, seed=5)
+        prices.iloc[150:220, 2] = prices.iloc[:150, 2].max()
+        prices.iloc[250:, 3]    = prices.iloc[250, 3]
+        regime = pd.Series(100 * np.cumprod(np.r_[1.0, np.full(len(prices) - 1, 1.0004)]),
+                           index=prices.index)
+        fast   = regime.ewm(span=ebe.CONFIG.TREND_FAST_EMA, adjust=False).mean()
+        slow   = regime.ewm(span=ebe.CONFIG.TREND_SLOW_EMA, adjust=False).mean()
+        panel  = ebe.build_panel(meta, prices, regime, V13.classify_sector)
+
+        row = 215                                        # ETF02's 3M window is all stale
+        leg = V13.build_ranking_v2(meta, prices, prices.index[row]).set_index("TICKER")
+        got = ebe.rank_matrix(panel, ebe.variant("v13_V2"), np.array([row]))["RANK"][0]
+        self.assertLess(leg["SHARPE_3M"].min(), -1e10)
+        np.testing.assert_array_equal(got, leg["RANK_INVESTABLE"].reindex(panel["tickers"]))
+
+        for name, legacy in (("v13_CURRENT", V13.run_backtest_current),
+                             ("v13_V2", V13.run_backtest_v2)):
+            with contextlib.redirect_stdout(io.StringIO()):
+                exp = legacy(meta, prices, regime, fast, slow)
+            res = ebe.run_variant(panel, name)
+            np.testing.assert_allclose(res["equity"]["equity"].to_numpy(),
+                                       exp["equity"]["equity"].to_numpy(), rtol=1e-12)
+            self.assertEqual(list(res["trades"]["TICKER"]), list(exp["trades"]["TICKER"]))
+            self.assertEqual(list(res["trades"]["REASON"]), list(exp["trades"]["REASON"]))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,74 @@
+"""
+Unit tests for etf_rank_core.py — panel statistics must match the
+per-series scoring functions the ranking scripts loop over, and the
+profiles must differ only in their composite rules.
+
+Run:  python test_etf_rank_core.py
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import etf_momentum_ranking as emr
+import etf_momentum_ranking_blend as blend
+import etf_rank_core as erc
+
+
+def make_panel(n_etfs: int = 12, n_days: int = 300, seed: int = 5):
+    """Forward-filled price panel with ETFs listed part-way through."""
+    rng    = np.random.default_rng(seed)
+    dates  = pd.bdate_range("2025-06-02", periods=n_days)
+    px     = 100 * np.cumprod(1 + rng.normal(0.0005, rng.uniform(0.005, 0.03, n_etfs),
+                                             (n_days, n_etfs)), axis=0)
+    px[:-200, 0] = np.nan                             # no 12M history
+    px[:-90, 1]  = np.nan                             # no 6M history
+    px[:-60, 2]  = np.nan                             # no 3M history, partial Clenow
+    tickers = [f"ETF{i:02d}" for i in range(n_etfs)]
+    prices  = pd.DataFrame(px, index=dates, columns=tickers)
+    meta    = pd.DataFrame({"TICKER": tickers, "ETF_NAME": [f"{t} Fund" for t in tickers]})
+    return meta, prices
+
+
+class TestRankCore(unittest.TestCase):
+
+    def setUp(self):
+        self.meta, self.prices = make_panel()
+        self.stats = erc.panel_stats(self.prices)
+
+    def test_window_stats_match_series_functions(self):
+        for w in (252, 126, 63):
+            got = erc.window_stat(self.stats, "SHARPE", w, daily_rf=0.05 / 252)
+            for i, t in enumerate(self.prices.columns):
+                exp = emr.sharpe_score(self.prices[t], w, daily_rf=0.05 / 252)
+                np.testing.assert_allclose(got[i], exp, rtol=1e-10, equal_nan=True)
+        for w in (126, 63):
+            got = erc.window_stat(self.stats, "CLENOW", w)
+            for i, t in enumerate(self.prices.columns):
+                np.testing.assert_allclose(got[i], blend.clenow_score(self.prices[t], w),
+                                           rtol=1e-10, equal_nan=True)
+        ema = self.prices["ETF03"].ewm(span=100, adjust=False).mean().iloc[-1]
+        self.assertAlmostEqual(self.stats["EMA_100"][3], ema, places=10)
+        self.assertTrue(np.isnan(self.stats["EMA_100"][2]))     # < 100 prices
+
+    def test_profiles(self):
+        out = erc.rank_all(self.meta, self.prices,
+                           [erc.profile("live"), erc.profile("3wstrict"), erc.profile("blend")])
+        live, strict, mix = out["live"], out["3wstrict"], out["blend"]
+
+        wtd = strict.set_index("TICKER")["WTD_SHARPE"]
+        self.assertTrue(np.isnan(wtd["ETF00"]))                 # strict: 12M required
+        self.assertFalse(np.isnan(live.set_index("TICKER")["WTD_SHARPE"]["ETF00"]))
+        self.assertEqual(list(strict.columns[8:11]), ["SHARPE_12M", "SHARPE_6M", "SHARPE_3M"])
+        self.assertIn("WTD_BLEND", mix.columns)
+
+        for df in out.values():
+            ranks = df["RANK_INVESTABLE"].dropna()                # investable first, best first
+            self.assertEqual(ranks.iloc[0], 1)
+            self.assertTrue((np.diff(ranks) >= 0).all())
+            self.assertEqual(len(df), len(self.meta))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
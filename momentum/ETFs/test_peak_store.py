@@ -0,0 +1,116 @@
+"""
+Unit tests for peak_store.py — incremental running peaks keyed by
+(ticker, entry date) must equal compute_holding_peak()'s rescan, closed
+positions are dropped on save, and the vectorized exit table must agree with
+should_exit() holding by holding.
+
+Run:  python test_peak_store.py
+"""
+
+import json
+import tempfile
+import types
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import etf_momentum_ranking as emr
+import peak_store as pk
+
+
+def make_prices(n_days: int = 120, n_etfs: int = 6, seed: int = 3) -> pd.DataFrame:
+    rng   = np.random.default_rng(seed)
+    dates = pd.bdate_range("2026-01-05", periods=n_days)
+    px    = 100 * np.cumprod(1 + rng.normal(0.0, 0.02, (n_days, n_etfs)), axis=0)
+    px[:30, 5] = np.nan                               # listed late
+    return pd.DataFrame(px, index=dates, columns=[f"ETF{i}" for i in range(n_etfs)])
+
+
+class TestPeakStore(unittest.TestCase):
+
+    def setUp(self):
+        self.prices  = make_prices()
+        self.entries = [("ETF0", self.prices.index[10]), ("ETF1", self.prices.index[50]),
+                        ("ETF5", self.prices.index[5]), ("ETF2", self.prices.index[90])]
+
+    def test_incremental_update_matches_rescan(self):
+        store = pk.new_store()
+        keys  = [pk.open_position(store, t, d) for t, d in self.entries]
+        pk.update(store, self.prices.iloc[:60], keys)
+        for end in (61, 95, len(self.prices)):            # new bars (plus a few old) arriving
+            pk.update(store, self.prices.iloc[end - 40:end], keys)
+        self.assertEqual(pk.update(store, self.prices.iloc[-3:], keys), 0)
+
+        got = pk.peaks(store, keys)
+        for (t, d), peak, peak_date in zip(self.entries, got["peak"], got["peak_date"]):
+            self.assertEqual(peak, emr.compute_holding_peak(t, d, self.prices, 0.0))
+            self.assertEqual(self.prices.loc[peak_date, t], peak)
+        self.assertEqual(got["last_bar"].iloc[0], str(self.prices.index[-1].date()))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / pk.PEAK_STORE_FILE
+            self.assertTrue(pk.save(path, store))
+            self.assertFalse(pk.save(path, store))        # nothing changed since
+            self.assertEqual(pk.load(path)["positions"], store["positions"])
+
+            self.assertTrue(pk.save(path, store, keep=keys[1:]))   # ETF0 sold
+            self.assertEqual(sorted(pk.load(path)["positions"]), sorted(keys[1:]))
+            self.assertFalse(pk.save(path, store, keep=keys[1:]))
+
+    def test_exit_table_matches_should_exit(self):
+        store = pk.new_store()
+        keys  = [pk.open_position(store, t, d) for t, d in self.entries]
+        pk.update(store, self.prices, keys)
+        ranking = pd.DataFrame({"TICKER": ["ETF0", "ETF1", "ETF5"],
+                                "PCT_FROM_HIGH": [30.0, 4.0, 12.0],
+                                "RANK_INVESTABLE": [3, 25, 7]})
+        current = self.prices.iloc[-1]
+        table = pk.exit_table(pd.DataFrame({
+            "TICKER":     [t for t, _ in self.entries],
+            "ENTRY_DATE": [d for _, d in self.entries],
+            "PRICE":      [current[t] for t, _ in self.entries],
+        }), ranking, store, emr.CONFIG.TSL_THRESHOLD, emr.CONFIG.EXIT_MAX_DD_FROM_HIGH,
+            emr.CONFIG.EXIT_MAX_RANK)
+
+        for (t, _), (_, row) in zip(self.entries, table.iterrows()):
+            flag, reason = emr.should_exit(t, ranking, row["PEAK"], current[t])
+            self.assertEqual(bool(row["EXIT"]), flag)
+            self.assertEqual(row["EXIT_REASON"], reason)
+        self.assertEqual(table.loc[3, "EXIT_REASON"], "Ticker no longer in ranking universe")
+
+    def test_check_tsl_keeps_higher_log_peak(self):
+        # store seeded at 100 on an earlier run; the weekly log since raised the slot peak to 110
+        bars = pd.DataFrame({("Close", "AAA.NS"): [103.0, 104.0, 104.0]},
+                            index=pd.bdate_range("2026-10-12", periods=3))
+        yf = types.SimpleNamespace(download=lambda *a, **k: bars)
+        with mock.patch.object(emr, "yf", yf, create=True), \
+             mock.patch.object(emr, "_YF_AVAILABLE", True), \
+             tempfile.TemporaryDirectory() as tmp:
+            tmp   = Path(tmp)
+            store = pk.new_store()
+            pk.open_position(store, "AAA", "2026-09-01", seed=100.0)
+            pk.open_position(store, "BBB", "2026-08-03", seed=50.0)        # sold since
+            pk.save(tmp / pk.TSL_STORE_FILE, store)
+            log = {emr._week_key(): {"run_date": "2026-10-12 09:00", "allocation": [
+                {"slot": 1, "ticker": "AAA", "etf_name": "A", "entry_price": 95.0,
+                 "entry_date": "2026-09-01", "peak": 110.0}]}}
+            with open(tmp / emr.HOLDINGS_LOG_FILE, "w") as f:
+                json.dump(log, f)
+
+            result = emr.check_tsl(tmp)
+            row    = result["rows"][0]
+            self.assertEqual(row["Peak"], 110.0)
+            self.assertEqual(row["DD%"], 5.5)
+            self.assertEqual(len(result["breaches"]), 1)
+            saved = emr.load_holdings_log(tmp)[emr._week_key()]["allocation"][0]
+            self.assertEqual(saved["peak"], 110.0)
+            positions = pk.load(tmp / pk.TSL_STORE_FILE)["positions"]
+            self.assertEqual(list(positions), ["AAA@2026-09-01"])
+            self.assertEqual(positions["AAA@2026-09-01"]["peak"], 110.0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
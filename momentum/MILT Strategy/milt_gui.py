@@ -54,18 +54,19 @@ import tkinter as tk
 from pathlib import Path
 from tkinter import messagebox, scrolledtext, ttk
 
-import pandas as pd
-import yfinance as yf
-
 import momentum_lib as ml
 from milt_strategy import (
     DEFAULT_FILE, LEDGER_FILE, STATE_FILE, TRADELOG_FILE, EQUITY_HISTORY_FILE,
     CONFIG_DEFAULTS, load_milt_config, save_milt_config,
     load_ledger, save_ledger,
 )
-from milt_update_prices import ns
 
 SCRIPT_DIR = Path(__file__).resolve().parent
+# The shared live-quote service lives with the Sharpe modules; appended (not
+# inserted) so this folder's own momentum_lib keeps precedence
+sys.path.append(str(SCRIPT_DIR.parent / "Sharpe"))
+import live_quotes as lq
+
 PYTHON = sys.executable
 STRATEGY_SCRIPT = SCRIPT_DIR / "milt_strategy.py"
 
@@ -83,39 +84,19 @@ def _read_json(path: Path, default):
 def fetch_live_prices(tickers: list[str]) -> dict[str, float]:
     """
     Fetch the latest available close for a small list of held tickers via
-    yfinance -- NOT the full 750-ticker universe, just what's actually in
-    the ledger, so this stays fast (a few seconds).
-
-    period="5d" (not "1d") so weekends/holidays where today has no bar yet
-    still resolve to the most recent trading day. Returns {ticker: price}
-    for whichever tickers succeeded; missing/failed ones are simply absent
-    -- callers should fall back to a cached price for those.
+    the shared live-quote service -- NOT the full 750-ticker universe, just
+    what's actually in the ledger, so this stays fast (a few seconds).
+
+    One batched yfinance download (period="5d", so weekends/holidays still
+    resolve to the most recent trading day); quotes fetched within the last
+    lq.DEFAULT_TTL seconds -- by this GUI or either dashboard -- are served
+    from the shared cache. Returns {ticker: price} for whichever tickers
+    succeeded; missing/failed ones are simply absent -- callers should fall
+    back to a cached price for those.
     """
     if not tickers:
         return {}
-    symbols = [ns(t) for t in tickers]
-    try:
-        data = yf.download(symbols, period="5d", auto_adjust=True,
-                           progress=False, threads=True)
-    except Exception:
-        return {}
-    if data is None or data.empty:
-        return {}
-
-    if isinstance(data.columns, pd.MultiIndex):
-        close = data["Close"] if "Close" in data.columns.get_level_values(0) else pd.DataFrame()
-    else:
-        # yfinance collapses the MultiIndex when only one symbol is requested
-        close = data[["Close"]].rename(columns={"Close": symbols[0]}) if "Close" in data.columns else pd.DataFrame()
-
-    out = {}
-    for t, sym in zip(tickers, symbols):
-        if sym not in close.columns:
-            continue
-        s = close[sym].dropna()
-        if len(s):
-            out[t] = float(s.iloc[-1])
-    return out
+    return lq.get_quotes(tickers, exchanges=("NS",))
 
 
 class MiltDashboard:
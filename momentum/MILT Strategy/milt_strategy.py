@@ -54,7 +54,8 @@ Persistent state (created/updated on each non-dry-run call):
   MILT_positions_ledger.json  — open positions (entry price, shares, peak close)
   MILT_portfolio_state.json   — cash balance (drives compounding position sizing)
   MILT_tradelog.json          — closed-trade history
-  MILT_equity_history.json    — one NAV snapshot per calendar day run
+  MILT_equity_history.jsonl   — one NAV snapshot per calendar day run
+                                (journal; imported once from the legacy .json)
 
 Configuration (MILT_config.json, editable via the GUI's Configuration tab
 or by hand): capital, max_positions, bb_window, bb_std, stop_loss_pct,
@@ -77,6 +78,11 @@ import pandas as pd
 
 import momentum_lib as ml
 
+# The shared history journal lives with the Sharpe modules; appended (not
+# inserted) so this folder's own momentum_lib keeps precedence
+sys.path.append(str(Path(__file__).resolve().parent.parent / "Sharpe"))
+import history_journal as hj
+
 # ── STRATEGY CONFIG ────────────────────────────────────────────────────────────
 # The parameters below are user-configurable (via MILT_config.json, or the
 # GUI's Configuration tab) -- CONFIG_DEFAULTS holds the current
@@ -235,19 +241,14 @@ def save_state(state: dict, path: str):
 
 
 def load_equity_history(path: str) -> list:
-    p = Path(path)
-    if not p.exists():
-        return []
-    with open(p, "r") as f:
-        return json.load(f)
+    """One record per day, oldest first, from the journal next to `path`
+    (MILT_equity_history.jsonl; the legacy JSON is imported the first time)."""
+    return hj.read_records(hj.ensure_journal(path))
 
 
-def append_equity_history(history: list, record: dict, path: str):
-    # one record per calendar day -- overwrite if we already ran today
-    history = [h for h in history if h["date"] != record["date"]]
-    history.append(record)
-    with open(path, "w") as f:
-        json.dump(history, f, indent=2, default=str)
+def append_equity_history(record: dict, path: str):
+    # one record per calendar day -- re-running today supersedes today's record
+    hj.append_record(hj.ensure_journal(path), record)
 
 
 # ── SIGNAL ENGINE ──────────────────────────────────────────────────────────────
@@ -542,8 +543,7 @@ def main():
         save_state({"cash": cash}, args.state)
         for rec in executed_exits:
             append_tradelog(rec)
-        history = load_equity_history(EQUITY_HISTORY_FILE)
-        append_equity_history(history, {
+        append_equity_history({
             "date": today_str, "nav": round(final_equity, 2),
             "cash": round(cash, 2), "n_positions": len(ledger),
         }, EQUITY_HISTORY_FILE)
@@ -24,6 +24,9 @@ dates-in-columns (row 1 = literal date values):
   HIGH    — High
   LOW     — Low
   VOLUME  — Volume
+
+A columnar price store (<output>.<SHEET>.npz, one per sheet) is written next
+to the workbook so momentum_lib.load_ohlc can skip openpyxl parsing.
 """
 
 import argparse
@@ -35,6 +38,8 @@ import openpyxl
 import pandas as pd
 import yfinance as yf
 
+import momentum_lib as ml
+
 # ── Config ────────────────────────────────────────────────────────────────────
 BATCH_SIZE = 50          # tickers per yfinance batch download
 SLEEP_SEC  = 2            # pause between batches (avoid rate-limiting)
@@ -201,6 +206,10 @@ def main(template_path: str, output_file: str, period: str):
     wb.save(output_file)
     print("Done.")
 
+    print("Writing columnar price store...")
+    for p in ml.write_price_store(output_file):
+        print(f"  -> {p.name}")
+
     # ── Report tickers with no data at all ─────────────────────────────────────
     errors = [t for t in tickers if not all_data["Close"].get(t)]
     if errors:
@@ -6,9 +6,14 @@ Reusable computation library for momentum scoring of NSE stocks.
 Functions
 ---------
 load_prices(filepath)
-    Load price data from the DATA sheet of an n500-format xlsx file.
+    Load price data from the DATA sheet of an n500-format xlsx file
+    (served from the columnar .npz store when it is fresh).
     Returns (prices_df, nifty_series, stock_tickers, dates)
 
+write_price_store(filepath, sheets) / read_price_store(filepath, sheet_name)
+    Columnar NumPy store per sheet (<stem>.<SHEET>.npz) with ticker and date
+    indexes, fingerprinted against the xlsx it was parsed from.
+
 compute_sharpe(prices_df, stock_tickers, windows, rfr_daily, trading_days)
     Compute per-window Sharpe ratios and cross-sectional Z-scores.
     Returns (sharpe_df, z_df)
@@ -52,7 +57,7 @@ normalise_composite(v)
     Non-linear normalisation: v>1 → v+1, v<0 → 1/(1-v), else unchanged.
 
 load_volume(filepath)
-    Load the VOLUME sheet from the xlsx file (same format as DATA).
+    Load the VOLUME sheet from the xlsx file (same format as DATA, store-first).
     Returns volume_df (index=ticker, columns=dates) or None if sheet absent.
 
 compute_turnover(prices_df, volume_df, stock_tickers, windows)
@@ -85,7 +90,9 @@ build_weekly_indicators(ohlc, ticker, ...)
 """
 
 import datetime
+import hashlib
 import json
+import os
 import warnings
 
 import numpy as np
@@ -205,27 +212,31 @@ def _infer_dates_for_columns(date_indices: list[int]) -> list:
     return result
 
 
-def load_prices(filepath: str):
+def _parse_wide_sheet(filepath: str, sheet_name: str):
     """
-    Load the DATA sheet from an n500-format xlsx file.
+    Parse one tickers × dates sheet (DATA / OPEN / HIGH / LOW / VOLUME
+    layout) with openpyxl.
 
     The date header row is driven by a dynamic Excel array formula whose
-    cached values are wiped whenever openpyxl saves the file.  This function
-    first tries to read dates from the header; if none are found it infers
-    them by replicating the formula logic anchored to today's date.
+    cached values are wiped whenever openpyxl saves the file.  Dates are
+    read from the header when present, otherwise inferred by replicating
+    the formula logic anchored to today's date.
 
-    Returns
-    -------
-    prices_df     : DataFrame  (index=ticker, columns=dates) — stocks only
-    nifty_series  : Series     — NIFTY500 daily closes
-    stock_tickers : list[str]  — all tickers except NIFTY500
-    dates         : list       — date objects for each price column
+    Prices must be > 0 to count as valid; VOLUME also accepts 0.
+    Returns a DataFrame (index=ticker, columns=dates, duplicates dropped)
+    or None if the sheet is absent or holds no data.
     """
-    wb       = openpyxl.load_workbook(filepath, data_only=True, read_only=True)
-    ws       = wb["DATA"]
+    wb = openpyxl.load_workbook(filepath, data_only=True, read_only=True)
+    if sheet_name not in wb.sheetnames:
+        wb.close()
+        return None
+    ws       = wb[sheet_name]
     all_rows = list(ws.iter_rows(values_only=True))
     wb.close()
 
+    if not all_rows:
+        return None
+
     header = all_rows[0]
 
     # ── Try to read dates directly from the header row ────────────────────────
@@ -236,9 +247,7 @@ def load_prices(filepath: str):
         dates = [h.date() if isinstance(h, datetime.datetime) else h
                  for h in (header[i] for i in date_indices)]
     else:
-        # ── Fallback: infer from where numeric price data sits ────────────────
-        print("  Note: date headers not cached in file — inferring dates from "
-              "price column positions and today's date.")
+        # ── Fallback: infer from where numeric data sits ──────────────────────
         candidate: set[int] = set()
         for row in all_rows[1: min(11, len(all_rows))]:
             for i, v in enumerate(row):
@@ -250,38 +259,183 @@ def load_prices(filepath: str):
                 except (TypeError, ValueError):
                     pass
         if not candidate:
-            raise ValueError(
-                "load_prices: no date columns found in header and no numeric "
-                "price data detected. Ensure the file was populated by "
-                "update_stock_price.py before running Sharpe.py."
-            )
+            return None
         date_indices = sorted(candidate)
         dates        = _infer_dates_for_columns(date_indices)
-        print(f"  Inferred {len(dates)} trading dates: "
+        print(f"  Note: {sheet_name} date headers not cached in file — inferred "
+              f"{len(dates)} trading dates from column positions: "
               f"{dates[0].strftime('%d-%b-%Y')} -> {dates[-1].strftime('%d-%b-%Y')}")
 
-    tickers, price_matrix = [], []
+    allow_zero = sheet_name == "VOLUME"
+    tickers, matrix = [], []
     for row in all_rows[1:]:
         if row[0] is None:
             continue
-        px = []
+        vals = []
         for i in date_indices:
             v = row[i] if i < len(row) else None
             try:
-                px.append(float(v) if v and float(v) > 0 else np.nan)
+                f = float(v) if v is not None else np.nan
+                vals.append(f if (f > 0 or (allow_zero and f == 0)) else np.nan)
             except Exception:
-                px.append(np.nan)
+                vals.append(np.nan)
         ticker_name = str(row[0]).strip()
         if ticker_name.upper() == "NIFTY 500":
             ticker_name = "NIFTY500"
         tickers.append(ticker_name)
-        price_matrix.append(px)
+        matrix.append(vals)
 
-    prices_df = pd.DataFrame(price_matrix, index=tickers, columns=dates)
-    n_dupes   = prices_df.index.duplicated(keep="first").sum()
+    df      = pd.DataFrame(matrix, index=tickers, columns=dates)
+    n_dupes = df.index.duplicated(keep="first").sum()
     if n_dupes:
-        print(f"  Warning: {n_dupes} duplicate ticker row(s) found — keeping first occurrence only.")
-    prices_df     = prices_df[~prices_df.index.duplicated(keep="first")]
+        print(f"  Warning: {n_dupes} duplicate ticker row(s) in {sheet_name} — "
+              f"keeping first occurrence only.")
+    return df[~df.index.duplicated(keep="first")]
+
+
+# ── COLUMNAR PRICE STORE ──────────────────────────────────────────────────────
+#
+# Parsing a 2.5 MB xlsx with openpyxl costs seconds per sheet; the same panel
+# saved as a NumPy .npz (float64 values + ticker / date indexes) loads in
+# milliseconds. One store file per sheet sits next to the workbook:
+#
+#   MILT_N750_updated.xlsx  ->  MILT_N750_updated.DATA.npz, .OPEN.npz,
+#                               .HIGH.npz, .LOW.npz, .VOLUME.npz
+#
+# Each store records the SHA-1 of the xlsx it was parsed from. A store whose
+# fingerprint no longer matches the workbook is stale and ignored; the
+# loaders then parse the xlsx and rewrite the store (best effort).
+
+PRICE_STORE_SHEETS = ("DATA", "OPEN", "HIGH", "LOW", "VOLUME")
+
+
+def _file_fingerprint(path) -> str:
+    """SHA-1 of a file's bytes (a few ms for a multi-MB workbook)."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def price_store_path(filepath: str, sheet_name: str) -> Path:
+    """Store file for one sheet of `filepath` (same folder, same stem)."""
+    p = Path(filepath)
+    return p.with_name(f"{p.stem}.{sheet_name}.npz")
+
+
+def _save_store_frame(df: pd.DataFrame, store_path: Path, source_sha1: str):
+    """Atomically write one parsed sheet to `store_path`."""
+    tmp_path = store_path.with_name(store_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            values=df.to_numpy(dtype=np.float64),
+            tickers=np.array(df.index, dtype=str),
+            dates=np.array(list(df.columns), dtype="datetime64[D]"),
+            source_sha1=np.array(source_sha1),
+        )
+    os.replace(tmp_path, store_path)
+
+
+def write_price_store(filepath: str, sheets=PRICE_STORE_SHEETS) -> list:
+    """
+    Parse `sheets` of an xlsx once and write a columnar store per sheet.
+    Called by update_stock_price.py / milt_update_prices.py right after
+    they save the workbook.
+    Sheets absent from the workbook are skipped.
+
+    Returns the list of store paths written.
+    """
+    sha1    = _file_fingerprint(filepath)
+    written = []
+    for sheet_name in sheets:
+        df = _parse_wide_sheet(filepath, sheet_name)
+        if df is None:
+            continue
+        store_path = price_store_path(filepath, sheet_name)
+        _save_store_frame(df, store_path, sha1)
+        written.append(store_path)
+    return written
+
+
+def read_price_store(filepath: str, sheet_name: str, source_sha1: str = None):
+    """
+    Load one sheet from its columnar store.
+
+    Returns a DataFrame (index=ticker, columns=date objects), or None if the
+    store is missing, unreadable, or stale (its recorded fingerprint differs
+    from the current xlsx). If the xlsx itself is gone the store is served
+    as-is.
+    """
+    store_path = price_store_path(filepath, sheet_name)
+    if not store_path.exists():
+        return None
+    try:
+        with np.load(store_path, allow_pickle=False) as z:
+            if Path(filepath).exists():
+                if source_sha1 is None:
+                    source_sha1 = _file_fingerprint(filepath)
+                if str(z["source_sha1"]) != source_sha1:
+                    return None
+            return pd.DataFrame(
+                z["values"],
+                index=z["tickers"].tolist(),
+                columns=z["dates"].astype(object).tolist(),
+            )
+    except Exception:
+        return None
+
+
+def _load_sheet(filepath: str, sheet_name: str, use_store: bool = True):
+    """
+    Store-first sheet loader shared by load_prices / load_volume /
+    _load_wide_sheet.
+    Falls back to openpyxl when the store is missing or stale, then
+    refreshes the store so the next load is fast again.
+    """
+    if not use_store:
+        return _parse_wide_sheet(filepath, sheet_name)
+
+    sha1 = _file_fingerprint(filepath) if Path(filepath).exists() else None
+    df   = read_price_store(filepath, sheet_name, source_sha1=sha1)
+    if df is not None:
+        return df
+
+    df = _parse_wide_sheet(filepath, sheet_name)
+    if df is not None and sha1 is not None:
+        try:
+            _save_store_frame(df, price_store_path(filepath, sheet_name), sha1)
+        except OSError:
+            pass  # read-only folder — keep serving from xlsx
+    return df
+
+
+def load_prices(filepath: str, use_store: bool = True):
+    """
+    Load the DATA sheet from an n500-format xlsx file.
+
+    Reads from the columnar store (N750_updated.DATA.npz) when it is fresh,
+    otherwise parses the xlsx (see _parse_wide_sheet for the date-header
+    fallback) and refreshes the store. Pass use_store=False to force the
+    xlsx path.
+
+    Returns
+    -------
+    prices_df     : DataFrame  (index=ticker, columns=dates) — stocks only
+    nifty_series  : Series     — NIFTY500 daily closes
+    stock_tickers : list[str]  — all tickers except NIFTY500
+    dates         : list       — date objects for each price column
+    """
+    prices_df = _load_sheet(filepath, "DATA", use_store=use_store)
+    if prices_df is None:
+        raise ValueError(
+            "load_prices: no date columns found in header and no numeric "
+            "price data detected. Ensure the file was populated by "
+            "update_stock_price.py before running Sharpe.py."
+        )
+
+    dates         = list(prices_df.columns)
     nifty_series  = prices_df.loc["NIFTY500"].copy()
     stock_tickers = [t for t in prices_df.index if t != "NIFTY500"]
     prices_df     = prices_df.loc[stock_tickers]
@@ -291,76 +445,20 @@ def load_prices(filepath: str):
 
 # ── VOLUME LOADING ────────────────────────────────────────────────────────────
 
-def load_volume(filepath: str):
+def load_volume(filepath: str, use_store: bool = True):
     """
-    Load the VOLUME sheet from the xlsx file.
+    Load the VOLUME sheet from the xlsx file (store-first, like load_prices).
 
     Same layout as DATA: tickers in col A, daily traded volume across date
     columns.  Returns a DataFrame (index=ticker, columns=dates) or None if
     the VOLUME sheet does not exist (backward-compatible with older files).
     """
-    wb = openpyxl.load_workbook(filepath, data_only=True, read_only=True)
-    if "VOLUME" not in wb.sheetnames:
-        wb.close()
-        return None
-
-    ws = wb["VOLUME"]
-    all_rows = list(ws.iter_rows(values_only=True))
-    wb.close()
-
-    if not all_rows:
+    volume_df = _load_sheet(filepath, "VOLUME", use_store=use_store)
+    if volume_df is None:
         return None
 
-    header = all_rows[0]
-
-    # Identify date columns from the header
-    date_indices = [i for i, h in enumerate(header)
-                    if isinstance(h, (datetime.datetime, datetime.date))]
-
-    if not date_indices:
-        # Fallback: use same column positions as DATA sheet would
-        candidate: set[int] = set()
-        for row in all_rows[1: min(11, len(all_rows))]:
-            for i, v in enumerate(row):
-                if i == 0:
-                    continue
-                try:
-                    if v is not None and float(v) > 0:
-                        candidate.add(i)
-                except (TypeError, ValueError):
-                    pass
-        if not candidate:
-            return None
-        date_indices = sorted(candidate)
-        # Mirror DATA fallback so price and volume columns align by date.
-        dates = _infer_dates_for_columns(date_indices)
-    else:
-        dates = [h.date() if isinstance(h, datetime.datetime) else h
-                 for h in (header[i] for i in date_indices)]
-
-    tickers, vol_matrix = [], []
-    for row in all_rows[1:]:
-        if row[0] is None:
-            continue
-        vols = []
-        for i in date_indices:
-            v = row[i] if i < len(row) else None
-            try:
-                vols.append(float(v) if v is not None and float(v) >= 0 else np.nan)
-            except Exception:
-                vols.append(np.nan)
-        ticker_name = str(row[0]).strip()
-        if ticker_name.upper() == "NIFTY 500":
-            ticker_name = "NIFTY500"
-        tickers.append(ticker_name)
-        vol_matrix.append(vols)
-
-    volume_df = pd.DataFrame(vol_matrix, index=tickers, columns=dates)
-    volume_df = volume_df[~volume_df.index.duplicated(keep="first")]
     # Exclude NIFTY500 — no meaningful volume for the index
-    volume_df = volume_df.loc[[t for t in volume_df.index if t != "NIFTY500"]]
-
-    return volume_df
+    return volume_df.loc[[t for t in volume_df.index if t != "NIFTY500"]]
 
 
 # ── TURNOVER ──────────────────────────────────────────────────────────────────
@@ -1348,43 +1446,10 @@ def _load_wide_sheet(filepath: str, sheet_name: str):
     """
     Generic loader for any DATA/VOLUME-shaped sheet (tickers x dates).
     Returns a DataFrame (index=ticker, columns=dates) or None if the sheet
-    is absent. Shares the same date-header handling as load_prices/load_volume.
+    is absent. Store-first, sharing the date-header handling of
+    load_prices/load_volume.
     """
-    wb = openpyxl.load_workbook(filepath, data_only=True, read_only=True)
-    if sheet_name not in wb.sheetnames:
-        wb.close()
-        return None
-    ws = wb[sheet_name]
-    all_rows = list(ws.iter_rows(values_only=True))
-    wb.close()
-
-    if not all_rows:
-        return None
-
-    header = all_rows[0]
-    date_indices = [i for i, h in enumerate(header)
-                    if isinstance(h, (datetime.datetime, datetime.date))]
-    if not date_indices:
-        return None
-    dates = [h.date() if isinstance(h, datetime.datetime) else h
-             for h in (header[i] for i in date_indices)]
-
-    tickers, matrix = [], []
-    for row in all_rows[1:]:
-        if row[0] is None:
-            continue
-        vals = []
-        for i in date_indices:
-            v = row[i] if i < len(row) else None
-            try:
-                vals.append(float(v) if v is not None and float(v) > 0 else np.nan)
-            except Exception:
-                vals.append(np.nan)
-        tickers.append(str(row[0]).strip())
-        matrix.append(vals)
-
-    df = pd.DataFrame(matrix, index=tickers, columns=dates)
-    return df[~df.index.duplicated(keep="first")]
+    return _load_sheet(filepath, sheet_name)
 
 
 def load_ohlc(filepath: str) -> dict:
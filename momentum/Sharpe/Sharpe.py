@@ -69,6 +69,10 @@ from openpyxl.utils import get_column_letter
 from pathlib import Path
 
 import momentum_lib as ml
+import ranking_state as rs
+import history_journal as hj
+import equity_curve as eqc
+import allocator as al
 
 # -- ARGUMENT PARSING ----------------------------------------------------------
 _parser = argparse.ArgumentParser(description="Sharpe Momentum Ranking")
@@ -264,108 +268,45 @@ print(f"Loading position ledger ...")
 ledger = load_ledger(LEDGER_FILE)
 
 # -- EQUITY CURVE TRACKING -----------------------------------------------------
-EQUITY_FILE = f"{UNIVERSE}_equity_history.json"
-
-def _load_equity_history(path: str) -> list:
-    p = Path(path)
-    if not p.exists():
-        return []
-    with open(p, "r") as f:
-        return json.load(f)
-
-def _save_equity_history(data: list, path: str):
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
+# One NAV point per day in an append-only journal ({UNIVERSE}_equity_history.jsonl,
+# imported once from the legacy JSON): only the last point is ever read here.
+# Price columns missed since that point are backfilled one day at a time
+# (equity_curve: vectorized over the panel, current ledger held throughout)
+EQUITY_FILE = hj.ensure_journal(f"{UNIVERSE}_equity_history.json")
 
 print(f"Updating equity curve ...")
-eq_history = _load_equity_history(EQUITY_FILE)
+last_eq = hj.last_record(EQUITY_FILE)
 today_str = TODAY.isoformat()
 
 # Only record once per day
-if not any(e["date"] == today_str for e in eq_history):
+if last_eq is None or last_eq["date"] != today_str:
     held_tickers = list(ledger.keys())
     n_held = len(held_tickers)
 
-    # Determine the reference date: last recorded equity date, or second-to-last price column
-    last_eq_date = None
-    if eq_history:
-        last_eq_date = datetime.date.fromisoformat(eq_history[-1]["date"])
-
-    # Find the price column index for the reference date (gap-aware)
-    date_cols = prices_df.columns  # these are datetime/date objects
-    ref_col_idx = -2  # default: previous day's column
-    if last_eq_date is not None:
-        # Find the column on or just before the last equity date
-        for i, d in enumerate(date_cols):
-            col_date = d.date() if hasattr(d, 'date') else d
-            if col_date <= last_eq_date:
-                ref_col_idx = i
-        # If ref_col_idx is still the last column, fall back to second-to-last
-        if ref_col_idx == len(date_cols) - 1:
+    # Reference column: the one on or before the last recorded equity date,
+    # else (no history yet / no new column since) the previous day's column
+    date_cols = eqc.column_dates(prices_df.columns)
+    ref_col_idx = -2
+    if last_eq is not None:
+        ref_col_idx = eqc.column_index(date_cols, datetime.date.fromisoformat(last_eq["date"]))
+        if ref_col_idx < 0 or ref_col_idx == len(date_cols) - 1:
             ref_col_idx = -2
-
-    # Calculate gap days for cash return proration
-    ref_col_date = date_cols[ref_col_idx]
-    ref_date = ref_col_date.date() if hasattr(ref_col_date, 'date') else ref_col_date
-    latest_date = date_cols[-1].date() if hasattr(date_cols[-1], 'date') else date_cols[-1]
-    gap_calendar_days = max((latest_date - ref_date).days, 1)
-
-    # Portfolio multi-day return (weighted equally across held positions)
-    if n_held > 0 and len(prices_df.columns) >= 2:
-        port_rets = []
-        for t in held_tickers:
-            if t in prices_df.index:
-                px_now = prices_df.loc[t].iloc[-1]
-                px_ref = prices_df.loc[t].iloc[ref_col_idx]
-                if pd.notna(px_now) and pd.notna(px_ref) and px_ref > 0:
-                    port_rets.append(px_now / px_ref - 1.0)
-        avg_stock_ret = float(np.mean(port_rets)) if port_rets else 0.0
-    else:
-        avg_stock_ret = 0.0
-
-    # Cash drag: prorate by calendar days in gap
+    ref_col_idx %= len(date_cols)
+    gap_calendar_days = max(int((date_cols[-1] - date_cols[ref_col_idx]).astype(int)), 1)
+
+    start_nav = ((last_eq["portfolio_nav"], last_eq["benchmark_nav"])
+                 if last_eq is not None else (eqc.START_NAV, eqc.START_NAV))
+    eq_frame = eqc.nav_frame(prices_df, nifty_series,
+                             eqc.holdings_from_ledger(held_tickers, date_cols),
+                             MAX_N, LIQUID_YIELD_PA, start=ref_col_idx, start_nav=start_nav)
+    # Backfilled points keep their price-column date; the latest is dated today
+    for rec in eqc.to_records(eq_frame, last_date=today_str):
+        hj.append_record(EQUITY_FILE, rec)
+
+    port_nav, bench_nav = eq_frame["portfolio_nav"].iloc[-1], eq_frame["benchmark_nav"].iloc[-1]
     invested_frac = min(n_held / MAX_N, 1.0)
-    cash_frac = 1.0 - invested_frac
-    cash_ret_for_gap = cash_frac * (LIQUID_YIELD_PA / 365.0) * gap_calendar_days
-    portfolio_ret = invested_frac * avg_stock_ret + cash_ret_for_gap
-
-    # Benchmark multi-day return (NIFTY 500)
-    nifty_px = nifty_series.dropna()
-    if len(nifty_px) >= 2:
-        # Use same reference logic for benchmark
-        nifty_dates = nifty_px.index
-        nifty_ref_idx = -2
-        if last_eq_date is not None:
-            for i, d in enumerate(nifty_dates):
-                nd = d.date() if hasattr(d, 'date') else d
-                if nd <= last_eq_date:
-                    nifty_ref_idx = i
-            if nifty_ref_idx == len(nifty_dates) - 1:
-                nifty_ref_idx = -2
-        bench_ret = float(nifty_px.iloc[-1] / nifty_px.iloc[nifty_ref_idx] - 1.0)
-    else:
-        bench_ret = 0.0
-
-    # Compound NAV
-    if eq_history:
-        prev = eq_history[-1]
-        port_nav  = prev["portfolio_nav"] * (1.0 + portfolio_ret)
-        bench_nav = prev["benchmark_nav"] * (1.0 + bench_ret)
-    else:
-        port_nav  = 100.0 * (1.0 + portfolio_ret)
-        bench_nav = 100.0 * (1.0 + bench_ret)
-
-    eq_history.append({
-        "date":          today_str,
-        "portfolio_nav": round(port_nav, 4),
-        "benchmark_nav": round(bench_nav, 4),
-        "portfolio_ret": round(portfolio_ret, 6),
-        "benchmark_ret": round(bench_ret, 6),
-        "n_held":        n_held,
-        "invested_frac": round(invested_frac, 3),
-    })
-    _save_equity_history(eq_history, EQUITY_FILE)
-    _gap_str = f"  (gap: {gap_calendar_days}d)" if gap_calendar_days > 1 else ""
+    _gap_str = (f"  (gap: {gap_calendar_days}d, {len(eq_frame)} day(s) recorded)"
+                if gap_calendar_days > 1 else "")
     print(f"  Portfolio NAV: {port_nav:.2f}  |  Benchmark NAV: {bench_nav:.2f}  "
           f"|  Held: {n_held}/{MAX_N}  |  Invested: {invested_frac:.0%}{_gap_str}")
 else:
@@ -374,8 +315,11 @@ else:
 # -- COMPUTE RANKINGS (unified pipeline from momentum_lib) ---------------------
 # ACTIVE: Raw Sharpe (production baseline: CAGR 38.3% / MDD -16.3%)
 # DORMANT: Adjusted Sharpe (Skew + Kurtosis penalty: CAGR 42.2% / MDD -20.2%)
+print("\nUpdating incremental ranking state ...")
+rank_state = rs.update_ranking_state(FILE, prices_df, stock_tickers, SHARPE_WINDOWS)
+
 print("\nComputing Sharpe rankings ...")
-result, regime_score, regime_detail = ml.compute_universe_rankings(
+result, regime_score, regime_detail = ml.cached_universe_rankings(
     prices_df, nifty_series, stock_tickers,
     volume_df=volume_df,
     min_turnover_cr=MIN_TURNOVER_CR,
@@ -390,6 +334,7 @@ result, regime_score, regime_detail = ml.compute_universe_rankings(
     min_n=MIN_N,
     max_n=MAX_N,
     new_entry_threshold=NEW_ENTRY_THRESHOLD,
+    precomputed=rs.ranking_state_frame(rank_state, RFR_ANNUAL / TRADING_DAYS, TRADING_DAYS),
 )
 dynamic_n  = regime_detail["dynamic_n"]
 allow_new  = regime_detail["allow_new"]
@@ -682,33 +627,10 @@ print("\nCalculating Dynamic Volatility Weights for Top N Portfolio ...")
 result["TARGET_WT"] = np.nan
 result["ALLOC_INR"] = np.nan
 
-raw_weights = {}
-for ticker in top_n_tickers:
-    comp_score = result.loc[ticker, "COMPOSITE"]
-    px = prices_df.loc[ticker].dropna()
-
-    if len(px) > 10:
-        vols = []
-        for w in [252, 189, 126, 63]:
-            px_w  = px.iloc[-w:] if len(px) >= w else px
-            log_r = np.diff(np.log(px_w.values))
-            if len(log_r) > 5:
-                vols.append(np.std(log_r, ddof=1) * np.sqrt(252))
-        if vols and np.mean(vols) > 0:
-            raw_weights[ticker] = comp_score / np.mean(vols)
-        else:
-            raw_weights[ticker] = comp_score
-    else:
-        raw_weights[ticker] = comp_score
-
-total_raw = sum(raw_weights.values())
-for ticker in top_n_tickers:
-    norm_w      = raw_weights[ticker] / total_raw if total_raw > 0 else 1.0 / len(top_n_tickers)
-    raw_alloc   = norm_w * PORTFOLIO_CAPITAL
-    capped_alloc = min(raw_alloc, MAX_POSITION_SIZE_INR)
-    capped_w    = capped_alloc / PORTFOLIO_CAPITAL if PORTFOLIO_CAPITAL > 0 else 0.0
-    result.loc[ticker, "TARGET_WT"] = capped_w
-    result.loc[ticker, "ALLOC_INR"] = capped_alloc
+# COMPOSITE / mean 12M-9M-6M-3M realised vol, capped at MAX_WT; excess stays in cash
+target_wts = al.target_weights(result.loc[top_n_tickers, "COMPOSITE"], prices_df, MAX_WT)
+result.loc[top_n_tickers, "TARGET_WT"] = target_wts
+result.loc[top_n_tickers, "ALLOC_INR"] = target_wts * PORTFOLIO_CAPITAL
 
 total_equity_weight = result.head(TOP_N)["TARGET_WT"].sum()
 total_cash_weight   = max(0.0, 1.0 - total_equity_weight)
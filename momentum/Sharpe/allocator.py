@@ -0,0 +1,136 @@
+"""
+allocator.py
+============
+Target weights for the Top-N portfolio: COMPOSITE / realised volatility,
+capped per position, remainder in cash.
+
+Sharpe.py looped over the Top-N tickers, re-slicing prices_df.loc[t].dropna()
+and computing four window volatilities one ticker at a time; the same loop
+was copied into the backtests (compute_inv_vol_weights). Here the whole
+candidate set is one matrix:
+
+  * realized_vols()  — each ticker's valid prices are packed to the right
+    of a (tickers × days) matrix (momentum_lib._right_align_valid, as in the
+    Sharpe engine), so "the last w valid prices" is the last w columns for
+    every row at once;
+  * raw_weights()    — COMPOSITE / mean(VOL_<w>) over the windows that have
+    a volatility, raw COMPOSITE when none do;
+  * cap_weights()    — per-position cap. By default the excess stays in cash
+    (live Sharpe.py behaviour); redistribute=True instead hands it to the
+    uncapped names pro rata, repeating until nothing is over the cap.
+
+walkforward.composite_inv_vol_weights() uses the same raw / cap steps on the
+VOL_<w> columns of its precomputed cross-section.
+
+Functions
+---------
+realized_vols(prices_df, tickers, windows, trading_days)  — VOL_<w> per ticker
+raw_weights(composite, vols)                              — COMPOSITE / mean vol
+normalise(raw)                                            — sum to 1 (equal if total <= 0)
+cap_weights(weights, max_weight, redistribute)            — cap, optional redistribution
+target_weights(composite, prices_df, max_weight, ...)     — the full pipeline
+"""
+
+import numpy as np
+import pandas as pd
+
+import momentum_lib as ml
+
+
+# ── DEFAULTS ──────────────────────────────────────────────────────────────────
+DEFAULT_VOL_WINDOWS = (252, 189, 126, 63)
+TRADING_DAYS        = 252
+MIN_PRICES          = 10      # vol weighting needs more valid prices than this
+MIN_RETURNS         = 5       # a window's vol needs more returns than this
+CAP_EPS             = 1e-12
+
+
+# ── VOLATILITY ────────────────────────────────────────────────────────────────
+
+def realized_vols(prices_df: pd.DataFrame, tickers: list,
+                  windows: tuple = DEFAULT_VOL_WINDOWS,
+                  trading_days: int = TRADING_DAYS) -> pd.DataFrame:
+    """
+    Annualised std (ddof=1) of log returns over each ticker's last `w` valid
+    prices (all of them if fewer), one VOL_<w> column per window. NaN for a
+    ticker with <= MIN_PRICES prices or a window with <= MIN_RETURNS returns.
+    Tickers missing from prices_df get NaN.
+    """
+    values  = prices_df.reindex(tickers).to_numpy(dtype=float)
+    count   = (~np.isnan(values)).sum(axis=1)
+    longest = min(max(windows), values.shape[1])
+    packed  = ml._right_align_valid(values)[:, values.shape[1] - longest:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_r = np.diff(np.log(packed), axis=1)
+
+    cols = {}
+    for w in windows:
+        tail  = log_r[:, max(log_r.shape[1] - (w - 1), 0):]
+        valid = ~np.isnan(tail)
+        n_ret = valid.sum(axis=1)
+        ok    = (count > MIN_PRICES) & (n_ret > MIN_RETURNS)
+        x     = np.where(valid, tail, 0.0)
+        mean  = x.sum(axis=1) / np.maximum(n_ret, 1)
+        dev   = np.where(valid, tail - mean[:, None], 0.0)
+        var   = (dev * dev).sum(axis=1) / np.maximum(n_ret - 1, 1)
+        cols[f"VOL_{w}"] = np.where(ok, np.sqrt(var * trading_days), np.nan)
+    return pd.DataFrame(cols, index=list(tickers))
+
+
+# ── WEIGHTING ─────────────────────────────────────────────────────────────────
+
+def raw_weights(composite: np.ndarray, vols: np.ndarray) -> np.ndarray:
+    """COMPOSITE / mean of the available window vols; COMPOSITE when there are none."""
+    composite = np.asarray(composite, dtype=float)
+    if not len(composite):
+        return composite
+    vols      = np.asarray(vols, dtype=float).reshape(len(composite), -1)
+    has_vol   = ~np.isnan(vols).all(axis=1)
+    mean_vol  = np.nanmean(np.where(has_vol[:, None], vols, 0.0), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(has_vol & (mean_vol > 0), composite / mean_vol, composite)
+
+
+def normalise(raw: np.ndarray) -> np.ndarray:
+    total = raw.sum()
+    return raw / total if total > 0 else np.full(len(raw), 1.0 / max(len(raw), 1))
+
+
+def cap_weights(weights: np.ndarray, max_weight: float,
+                redistribute: bool = False) -> np.ndarray:
+    """
+    Cap each weight at `max_weight`. Without redistribution the excess is
+    left as cash. With it, the excess is spread over the uncapped names in
+    proportion to their weight, repeating until none exceeds the cap (at most
+    one pass per name); whatever cannot be placed stays in cash.
+    """
+    w = np.asarray(weights, dtype=float).copy()
+    if not redistribute:
+        return np.minimum(w, max_weight)
+    for _ in range(len(w)):
+        over   = w > max_weight + CAP_EPS
+        excess = (w[over] - max_weight).sum()
+        w[over] = max_weight
+        free   = w < max_weight - CAP_EPS
+        if excess <= CAP_EPS or not free.any():
+            break
+        base     = w[free].sum()
+        share    = w[free] / base if base > 0 else np.full(free.sum(), 1.0 / free.sum())
+        w[free] += excess * share
+    return np.minimum(w, max_weight)
+
+
+def target_weights(composite: pd.Series, prices_df: pd.DataFrame, max_weight: float,
+                   vol_windows: tuple = DEFAULT_VOL_WINDOWS,
+                   trading_days: int = TRADING_DAYS,
+                   redistribute: bool = False) -> pd.Series:
+    """
+    Capped target weight per ticker of `composite` (index = tickers, in
+    portfolio order). The cash weight is 1 - result.sum().
+    """
+    if composite.empty:
+        return pd.Series(dtype=float)
+    vols = realized_vols(prices_df, composite.index.tolist(), vol_windows, trading_days)
+    raw  = raw_weights(composite.to_numpy(dtype=float), vols.to_numpy())
+    return pd.Series(cap_weights(normalise(raw), max_weight, redistribute),
+                     index=composite.index)
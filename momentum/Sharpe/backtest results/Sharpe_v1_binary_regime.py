@@ -64,6 +64,7 @@ from openpyxl.utils import get_column_letter
 from pathlib import Path
 
 import momentum_lib as ml
+import allocator as al
 
 # ── CONFIG ────────────────────────────────────────────────────────────────────
 UNIVERSE          = sys.argv[1] if len(sys.argv) >= 2 else "N500"
@@ -356,24 +357,9 @@ print("\nCalculating Dynamic Volatility Weights for Top N Portfolio ...")
 result["TARGET_WT"] = np.nan
 result["ALLOC_INR"] = np.nan
 
-raw_weights = {}
-for ticker in top_n_tickers:
-    comp_score = result.loc[ticker, "COMPOSITE"]
-    px = prices_df.loc[ticker].dropna()
-
-    if len(px) > 10:
-        vols = []
-        for w in [252, 189, 126, 63]:
-            px_w  = px.iloc[-w:] if len(px) >= w else px
-            log_r = np.diff(np.log(px_w.values))
-            if len(log_r) > 5:
-                vols.append(np.std(log_r, ddof=1) * np.sqrt(252))
-        if vols and np.mean(vols) > 0:
-            raw_weights[ticker] = comp_score / np.mean(vols)
-        else:
-            raw_weights[ticker] = comp_score
-    else:
-        raw_weights[ticker] = comp_score
+raw_weights = dict(zip(top_n_tickers, al.raw_weights(
+    result.loc[top_n_tickers, "COMPOSITE"].to_numpy(dtype=float),
+    al.realized_vols(prices_df, top_n_tickers).to_numpy())))
 
 total_raw = sum(raw_weights.values())
 for ticker in top_n_tickers:
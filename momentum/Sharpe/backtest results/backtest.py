@@ -7,9 +7,9 @@ import numpy as np
 import pandas as pd
 import shutil
 import matplotlib.pyplot as plt
-from contextlib import contextmanager
 
 import momentum_lib as ml
+import walkforward as wf
 
 warnings.filterwarnings("ignore")
 
@@ -32,77 +32,12 @@ EMA_TREND_BAND      = 0.05
 SIGNAL_WEIGHTS      = {"ema50": 0.35, "ema_trend": 0.25,
                         "breadth": 0.25, "momentum": 0.15}
 
-# Temporarily swallows stdout from momentum_lib functions
-@contextmanager
-def suppress_stdout():
-    with open(os.devnull, "w") as devnull:
-        old_stdout = sys.stdout
-        sys.stdout = devnull
-        try:
-            yield
-        finally:
-            sys.stdout = old_stdout
-
-
-def compute_regime_score(nifty_s, eligible_mask, composite_series):
-    """Continuous Regime Strength Score (0.0 to 1.0) from 4 signals + Vol Penalty."""
-    px = nifty_s.dropna()
-    if len(px) < 200:
-        return 0.5, {"dynamic_n": 15, "allow_new": True}
-    price  = px.iloc[-1]
-    ema50  = px.ewm(span=50,  adjust=False).mean().iloc[-1]
-    ema200 = px.ewm(span=200, adjust=False).mean().iloc[-1]
-    ema50_score     = float(np.clip((price / ema50  - 1.0) / EMA50_BAND     + 0.5, 0.0, 1.0))
-    ema_trend_score = float(np.clip((ema50  / ema200 - 1.0) / EMA_TREND_BAND + 0.5, 0.0, 1.0))
-    total  = len(eligible_mask)
-    elig   = int(eligible_mask.sum())
-    breadth_score  = elig / total if total > 0 else 0.5
-    pos_mom        = int((composite_series[eligible_mask] > 1.5).sum())
-    momentum_score = pos_mom / max(1, elig)
-    
-    raw_score = (
-        ema50_score     * SIGNAL_WEIGHTS["ema50"]     +
-        ema_trend_score * SIGNAL_WEIGHTS["ema_trend"] +
-        breadth_score   * SIGNAL_WEIGHTS["breadth"]   +
-        momentum_score  * SIGNAL_WEIGHTS["momentum"]
-    )
-
-    # NEW: Volatility Panic Brake
-    # Calculate 20-day annualized realized volatility of the NIFTY500
-    if len(px) >= 21:
-        px_20 = px.iloc[-21:]
-        log_rets = np.diff(np.log(px_20.values))
-        ann_vol = np.std(log_rets, ddof=1) * np.sqrt(252)
-        
-        # Linear penalty: 0 at 15% vol, scales up to max 0.50 penalty at 25% vol
-        if ann_vol > 0.15:
-            vol_penalty = min(0.50, (ann_vol - 0.15) * (0.50 / 0.10))
-        else:
-            vol_penalty = 0.0
-    else:
-        vol_penalty = 0.0
-
-    score = max(0.0, raw_score - vol_penalty)
-    dyn_n = int(MIN_N + min(score / 0.75, 1.0) * (MAX_N - MIN_N))
-    return score, {"dynamic_n": dyn_n, "allow_new": score >= NEW_ENTRY_THRESHOLD}
-
 print(f"Loading {FILE} for historical simulation ...")
 prices_df, nifty_series, stock_tickers, dates = ml.load_prices(FILE)
 
-# Map dates to pandas DatetimeIndex for week-end detection
-dt_idx = pd.DatetimeIndex(dates)
-eow_dates = []
-
-# Detect week-ends (where the week changes compared to the next date)
-for i in range(len(dt_idx) - 1):
-    if dt_idx[i].isocalendar().week != dt_idx[i+1].isocalendar().week:
-        eow_dates.append(dates[i])
-# Always evaluate the absolute final day available in the dataset too
-eow_dates.append(dates[-1])
-
-# We need 252 days buffer for the first 12M calculation
-start_idx = 252
-valid_dates = [d for d in eow_dates if dates.index(d) >= start_idx]
+# Week-end rebalance points, after the 252-day buffer for the first 12M Sharpe
+rebalance_idx = wf.week_end_indices(dates, warmup=252)
+valid_dates   = [dates[i] for i in rebalance_idx]
 
 print(f"Total trading days available: {len(dates)}")
 print(f"Valid rebalance points (week-ends): {len(valid_dates)}")
@@ -114,191 +49,24 @@ if len(valid_dates) < 2:
     print("    Your current n500.xlsx file seems to only contain ~1 year of data.")
     sys.exit(0)
 
-equity = 2000000.0
-nifty_equity = 2000000.0
-current_portfolio = {} # dict of ticker: {'entry_date': date, 'weight': w}
-results_log = []
-
-# Forward fill prices across the whole sheet to handle missing days/halts
-prices_df_ffill = prices_df.ffill(axis=1)
-nifty_series_ffill = nifty_series.ffill()
+# Rolling Sharpe / 52H / vol statistics for every date, computed once
+print("Precomputing rolling statistics ...")
+panel = wf.build_walk_forward_panel(prices_df, nifty_series, stock_tickers,
+                                    rfr_daily, TRADING_DAYS)
 
 print("\nStarting Point-in-Time Vectorised Backtest:")
 print("-" * 80)
 
-for i in range(len(valid_dates) - 1):
-    t_date    = valid_dates[i]
-    next_date = valid_dates[i+1]
-    
-    idx       = dates.index(t_date)
-    next_idx  = dates.index(next_date)
-    
-    # 1. ── SLICE DATA POINT-IN-TIME ───────────────────────────────────
-    sliced_prices = prices_df.iloc[:, :idx+1]
-    sliced_nifty  = nifty_series_ffill.iloc[:idx+1]
-    
-    # 2. ── RUN MOMENTUM LOGIC (silently) ──────────────────────────────
-    with suppress_stdout():
-        sharpe_df, z_df = ml.compute_sharpe(sliced_prices, stock_tickers, SHARPE_WINDOWS, rfr_daily, TRADING_DAYS)
-        pct_52h = ml.compute_pct_from_52h(sliced_prices, stock_tickers)
-        
-    result = z_df.copy()
-    result["PCT_FROM_52H"] = pct_52h
-    
-    # COMPOSITE = SHARPE_ALL (mean of 12M, 9M, 6M, 3M)
-    core_labels = [l for l in SHARPE_WINDOWS if l != "1M"]
-    z_cols = [f"Z_{l}" for l in core_labels]
-    result["COMPOSITE"] = z_df[z_cols].mean(axis=1)
-    result["COMPOSITE"] = result["COMPOSITE"].map(ml.normalise_composite)
-    
-    # 3. ── FILTER AND RANK ────────────────────────────────────────────
-    # Compute base ranks for everyone eligible (52H >= -25)
-    eligible_mask = result["PCT_FROM_52H"] >= -25
-    elig_df = result[eligible_mask].copy()
-    elig_df["RANK"] = elig_df["COMPOSITE"].rank(ascending=False, method="first", na_option="bottom")
-    elig_df = elig_df.sort_values("RANK", ascending=True)
-    
-    # 4. ── FILTER AND RANK ──────────────────────────────────────
-    elig_df = result[eligible_mask].copy()
-    elig_df["RANK"] = elig_df["COMPOSITE"].rank(ascending=False, method="first", na_option="bottom")
-    elig_df = elig_df.sort_values("RANK", ascending=True)
-    top_candidates = elig_df.index.tolist()
-
-    # Calculate dynamic regime score
-    regime_score, regime_detail = compute_regime_score(sliced_nifty, eligible_mask, result["COMPOSITE"])
-    allow_new = regime_detail["allow_new"]
-    dynamic_n = regime_detail["dynamic_n"]
-    is_cash = not allow_new
-    regime = f"BUY ({regime_score:.2f})" if allow_new else f"CASH ({regime_score:.2f})"
-
-    # 5. ── PORTFOLIO CONSTRUCTION (Dynamic Regime) ──────────────────
-    next_portfolio_tickers = []
-
-    # Pass 1: retain held stocks (exit evaluation always runs)
-    for ticker, state in current_portfolio.items():
-        entry_date  = state['entry_date']
-        days_held   = (t_date - entry_date).days
-        if ticker in top_candidates:
-            rank        = elig_df.loc[ticker, "RANK"]
-            pct_from_52 = elig_df.loc[ticker, "PCT_FROM_52H"]
-            if pct_from_52 < -25:
-                continue  # 52H breach
-            if rank <= 40 or days_held < 28:
-                next_portfolio_tickers.append(ticker)
-
-    # Pass 2: fill new slots up to dynamic_n, gated by regime score
-    if allow_new:
-        slots_to_fill = dynamic_n - len(next_portfolio_tickers)
-        for ticker in top_candidates:
-            if slots_to_fill <= 0:
-                break
-            if ticker not in next_portfolio_tickers:
-                next_portfolio_tickers.append(ticker)
-                slots_to_fill -= 1
-                    
-    # Calculate Volatility-Adjusted Weights for exactly next_portfolio_tickers
-    raw_weights = {}
-    for ticker in next_portfolio_tickers:
-        comp_score = result.loc[ticker, "COMPOSITE"] 
-        # Calculate equal-weighted volatility of last 252 days
-        px = sliced_prices.loc[ticker].dropna()
-        if len(px) > 10:
-            vols = []
-            for w in [252, 189, 126, 63]:
-                px_w = px.iloc[-w:] if len(px) >= w else px
-                log_r = np.diff(np.log(px_w.values))
-                if len(log_r) > 5:
-                    vols.append( np.std(log_r, ddof=1) * np.sqrt(252) )
-            if vols and np.mean(vols) > 0:
-                mean_vol = np.mean(vols)
-                raw_weights[ticker] = comp_score / mean_vol
-            else:
-                raw_weights[ticker] = comp_score # fallback
-        else:
-            raw_weights[ticker] = comp_score # fallback
-
-    # Normalize weights and apply 5% cap
-    total_raw = sum(raw_weights.values())
-    actual_portfolio = {}
-    for ticker in next_portfolio_tickers:
-        # Normalize strictly to sum=1.0 initially
-        norm_w = raw_weights[ticker] / total_raw if total_raw > 0 else 1.0 / len(next_portfolio_tickers)
-        # Cap strictly at 5% — matches live Sharpe.py
-        capped_w = min(0.05, norm_w)
-        
-        if ticker in current_portfolio:
-            actual_portfolio[ticker] = {'entry_date': current_portfolio[ticker]['entry_date'], 'weight': capped_w}
-        else:
-            actual_portfolio[ticker] = {'entry_date': t_date, 'weight': capped_w}
-    
-    # 4. ── CALCULATE RETURNS ──────────────────────────────────────────
-    if is_cash:
-        # Cash/Liquid Funds regime (~6% p.a. mapped to weekly return)
-        gross_ret = (1.06 ** (1/52)) - 1.0
-    else:
-        # Look ahead to next rebalance date
-        actual_port_list = list(actual_portfolio.keys())
-        total_equity_weight = sum([state['weight'] for state in actual_portfolio.values()])
-        cash_weight = max(0.0, 1.0 - total_equity_weight)
-        
-        if actual_port_list:
-            start_px = prices_df_ffill.loc[actual_port_list].iloc[:, idx]
-            end_px   = prices_df_ffill.loc[actual_port_list].iloc[:, next_idx]
-            stock_returns = (end_px / start_px) - 1.0
-            
-            # Weighted Dot Product
-            weights_series = pd.Series({t: actual_portfolio[t]['weight'] for t in actual_port_list})
-            gross_ret = (stock_returns * weights_series).sum() + (cash_weight * ((1.06 ** (1/52)) - 1.0))
-        else:
-            gross_ret = (1.06 ** (1/52)) - 1.0
-            
-        if pd.isna(gross_ret):
-            gross_ret = 0.0
-    
-    # Turnover and Slippage calculation (based on absolute weight changes)
-    all_tickers = set(current_portfolio.keys()) | set(actual_portfolio.keys())
-    abs_weight_change = 0.0
-    
-    for t in all_tickers:
-        old_w = current_portfolio[t]['weight'] if t in current_portfolio else 0.0
-        new_w = actual_portfolio[t]['weight'] if t in actual_portfolio else 0.0
-        abs_weight_change += abs(new_w - old_w)
-        
-    friction_cost = abs_weight_change * FRICTION # total weight traded * 0.20%
-    turnover = abs_weight_change / 2.0 # for display purposes (100% turnover = 2.0 abs change)
-        
-    net_ret = gross_ret - friction_cost
-    
-    # Benchmark return
-    n_start   = nifty_series_ffill.iloc[idx]
-    n_end     = nifty_series_ffill.iloc[next_idx]
-    nifty_ret = (n_end / n_start) - 1.0
-    
-    # Compounding
-    equity *= (1 + net_ret)
-    nifty_equity *= (1 + nifty_ret)
-    
-    # Print status
-    sys.stdout.write(f"\r  [{i+1}/{len(valid_dates)-1}] {t_date.strftime('%b %Y')} | "
-                     f"Eq: {equity:12,.0f} | RS: {regime_score:.2f} | N={dynamic_n:2d} | "
-                     f"Held: {len(actual_portfolio):2d}")
-    sys.stdout.flush()
-    
-    # Log loop variables
-    results_log.append({
-        "Rebalance_Date": t_date.strftime("%Y-%m-%d"),
-        "Regime": regime,
-        "Eligible_Count": len(elig_df),
-        "Turnover_Pct": turnover * 100,
-        "Gross_Return": gross_ret,
-        "Net_Return": net_ret,
-        "Nifty_Return": nifty_ret,
-        "Equity": equity,
-        "Nifty_Equity": nifty_equity,
-        "Top20_Tickers": ", ".join(actual_portfolio) if actual_portfolio else "CASH"
-    })
-    
-    current_portfolio = actual_portfolio
+df_res = wf.run_walk_forward(
+    panel, rebalance_idx, SHARPE_WINDOWS,
+    regime_fn=wf.nifty_ema_regime(MIN_N, MAX_N, NEW_ENTRY_THRESHOLD, SIGNAL_WEIGHTS,
+                                  EMA50_BAND, EMA_TREND_BAND),
+    select_fn=wf.hold_buffer_selector(hold_rank=40, min_hold_days=28),
+    weight_fn=wf.composite_inv_vol_weights(max_weight=0.05),
+    friction=FRICTION,
+)
+equity       = df_res["Equity"].iloc[-1]
+nifty_equity = df_res["Nifty_Equity"].iloc[-1]
 
 print("\n" + "-" * 80)
 print("Backtest complete!")
@@ -312,7 +80,6 @@ output_csv = os.path.join(run_dir, "backtest_results.csv")
 output_png = os.path.join(run_dir, "equity_curve.png")
 
 # ── PERFORMANCE METRICS ───────────────────────────────────────────────────────
-df_res = pd.DataFrame(results_log)
 df_res.to_csv(output_csv, index=False)
 print(f"Results saved to {output_csv}")
 
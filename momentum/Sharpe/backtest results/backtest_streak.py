@@ -26,6 +26,7 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parent))
 import momentum_lib as ml
+import allocator as al
 
 # ── CONFIG ────────────────────────────────────────────────────────────────────
 FILE            = "n500_bt.xlsx"
@@ -54,47 +55,14 @@ def suppress_stdout():
         sys.stdout = old
 
 
-def compute_streak(score_history):
-    """Count consecutive rising entries from the tail of the list."""
-    if len(score_history) < 2:
-        return 0
-    streak = 0
-    for i in range(len(score_history) - 1, 0, -1):
-        if score_history[i] > score_history[i - 1]:
-            streak += 1
-        else:
-            break
-    return streak
-
-
 def compute_inv_vol_weights(tickers, prices_slice, result_df, max_weight):
-    """Inverse-volatility weighted allocation, capped at max_weight."""
-    raw_w = {}
-    for t in tickers:
-        if t not in prices_slice.index:
-            continue
-        px = prices_slice.loc[t].dropna()
-        comp = result_df.loc[t, "COMPOSITE"] if t in result_df.index else 1.0
-        if len(px) > 10:
-            vols = []
-            for w in [252, 189, 126, 63]:
-                pw = px.iloc[-w:] if len(px) >= w else px
-                lr = np.diff(np.log(pw.values))
-                if len(lr) > 5:
-                    vols.append(np.std(lr, ddof=1) * np.sqrt(252))
-            if vols and np.mean(vols) > 0:
-                raw_w[t] = comp / np.mean(vols)
-            else:
-                raw_w[t] = comp
-        else:
-            raw_w[t] = comp
-
-    total = sum(raw_w.values())
-    weights = {}
-    for t in raw_w:
-        nw = raw_w[t] / total if total > 0 else 1.0 / len(raw_w)
-        weights[t] = min(max_weight, nw)
-    return weights
+    """Inverse-volatility weighted allocation, capped at max_weight (allocator.py)."""
+    tickers = [t for t in tickers if t in prices_slice.index]
+    if not tickers:
+        return {}
+    comp = result_df["COMPOSITE"].reindex(tickers)
+    comp = comp.where(comp.index.isin(result_df.index), 1.0)
+    return al.target_weights(comp, prices_slice, max_weight).to_dict()
 
 
 # ── LOAD DATA ─────────────────────────────────────────────────────────────────
@@ -131,8 +99,8 @@ nifty_equity = STARTING_EQUITY
 # Portfolio: {ticker: {entry_date, weight, peak_price, entry_price}}
 current_portfolio = {}
 
-# Score history for streak computation: {ticker: [score_at_each_rebalance]}
-score_history_all = {t: [] for t in stock_tickers}
+# Score history for streak computation: one COMPOSITE row per rebalance
+score_rows = []
 
 results_log = []
 trade_log = []  # individual trades
@@ -170,18 +138,11 @@ for i in range(len(valid_dates) - 1):
         ascending=False, method="first", na_option="bottom")
 
     # 3. ── UPDATE SCORE HISTORY & COMPUTE STREAKS ────────────────────────
-    for t in stock_tickers:
-        val = result["COMPOSITE"].get(t)
-        if val is not None and pd.notna(val):
-            score_history_all[t].append(float(val))
-        else:
-            score_history_all[t].append(np.nan)
-
-    # Compute streaks for all eligible tickers
-    streaks = {}
-    for t in stock_tickers:
-        clean = [v for v in score_history_all[t] if not np.isnan(v)]
-        streaks[t] = compute_streak(clean)
+    score_rows.append(result["COMPOSITE"].reindex(stock_tickers).to_numpy(dtype=float))
+
+    # Streaks for all tickers at once (missing weeks skipped, as before)
+    streaks = ml.early_mover_signals(
+        pd.DataFrame(score_rows, columns=stock_tickers))["STREAK"].to_dict()
 
     # 4. ── EXIT EVALUATION (TSL + 52H) ───────────────────────────────────
     exits_this_week = []
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
 import momentum_lib as ml
+import allocator as al
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -12,28 +13,11 @@ df = df[df['RANK'].notna()].copy()
 prices_df, _, _, _ = ml.load_prices('N750_updated.xlsx')
 
 print('Computing Vol-Adjusted Scores...')
-vol_scores = {}
-for idx, row in df.iterrows():
-    ticker = row['TICKER']
-    comp = row['RES_MOM']  # Wait, composite score is RES_MOM? Let's check column name. It might be COMPOSITE. Let's use SHARPE_ALL or whatever is used for ranking.
-    
-    if ticker not in prices_df.index:
-        continue
-        
-    px = prices_df.loc[ticker].dropna()
-    if len(px) > 10:
-        vols = []
-        for w in [252, 189, 126, 63]:
-            px_w = px.iloc[-w:] if len(px) >= w else px
-            log_r = np.diff(np.log(px_w.values))
-            if len(log_r) > 5:
-                vols.append(np.std(log_r, ddof=1) * np.sqrt(252))
-        if vols and np.mean(vols) > 0:
-            vol_scores[ticker] = comp / np.mean(vols)
-        else:
-            vol_scores[ticker] = comp
-    else:
-        vol_scores[ticker] = comp
+# RES_MOM is the score this comparison ranks on
+known   = df['TICKER'].isin(prices_df.index)
+tickers = df.loc[known, 'TICKER'].tolist()
+vol_scores = dict(zip(tickers, al.raw_weights(df.loc[known, 'RES_MOM'].to_numpy(dtype=float),
+                                              al.realized_vols(prices_df, tickers).to_numpy())))
 
 df['VOL_ADJ_SCORE'] = df['TICKER'].map(vol_scores)
 
@@ -4,7 +4,8 @@ Early Movers signal backtest.
 Walks weekly through 10 years of N750 price history, re-running the live
 scoring pipeline (momentum_lib.compute_universe_rankings) as of each date
 using only data available up to that date, then replays the Early Movers
-rising-candidate logic (streak/velocity/zone, ported from
+rising-candidate logic (streak/velocity/zone, same rules and the same
+momentum_lib.early_mover_signals engine as
 sharpe_dashboard.compute_rising_candidates) against the rolling score
 history built up during the walk. Forward returns of flagged tickers are
 then measured against NIFTY500 to see whether the signal has real
@@ -41,12 +42,13 @@ from pathlib import Path
 import numpy as np
 import pandas as pd
 import openpyxl
-import yfinance as yf
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 SHARPE_DIR = SCRIPT_DIR.parent
 sys.path.insert(0, str(SHARPE_DIR))
 import momentum_lib as ml  # noqa: E402
+sys.path.append(str(SCRIPT_DIR.parent.parent))
+import benchmark_store as bs  # noqa: E402
 
 # ── CONFIG ─────────────────────────────────────────────────────────────────
 BACKTEST_FILE = SHARPE_DIR.parent / "ETFs" / "backtest results" / "N750 - Backtest.xlsx"
@@ -63,32 +65,27 @@ HISTORY_KEEP_RUNS    = 60           # weekly runs kept for streak/velocity (~1yr
 
 SIGNALS_LOG_PATH = SCRIPT_DIR / "signals_log.csv"
 SUMMARY_PATH     = SCRIPT_DIR / "summary.csv"
-NIFTY_CACHE_PATH = SCRIPT_DIR / "nifty500_benchmark_cache.csv"
+
+# One rankings-cache entry per weekly slice: kept in its own folder (and
+# budget) so a backtest run never evicts the dashboard's live entries in
+# Sharpe/rankings_cache/, while a rerun of the backtest is still all hits.
+RANKINGS_CACHE_DIR    = SCRIPT_DIR / "rankings_cache"
+RANKINGS_CACHE_MAX_MB = 1024
 
 
 def get_nifty500_series(target_dates):
     """
     The NIFTY500 row in the backtest file is entirely empty (0/2557 non-null --
     a cached-formula gap, same issue documented in momentum_lib.load_prices).
-    Substitute Nifty 500 index history fetched via yfinance (^CRSLDX), cached
-    locally, aligned to the backtest file's own trading-date columns.
+    Substitute Nifty 500 index history (^CRSLDX) from the shared benchmark
+    store (Sharpe/benchmark_store.py), aligned to the backtest file's own
+    trading-date columns. The store only fetches what it doesn't hold yet.
     """
     target_dates = pd.DatetimeIndex(target_dates)
-
-    if NIFTY_CACHE_PATH.exists():
-        cached = pd.read_csv(NIFTY_CACHE_PATH, index_col=0, parse_dates=True)["Close"]
-        if cached.index.min() <= target_dates.min() and cached.index.max() >= target_dates.max():
-            return cached.reindex(target_dates).ffill()
-
-    print("Fetching NIFTY500 (^CRSLDX) benchmark history from yfinance ...")
-    hist = yf.Ticker("^CRSLDX").history(
-        start=(target_dates.min() - pd.Timedelta(days=5)).strftime("%Y-%m-%d"),
-        end=(target_dates.max() + pd.Timedelta(days=5)).strftime("%Y-%m-%d"))
-    close = hist["Close"]
-    close.index = pd.DatetimeIndex(close.index.date)
-    close.to_frame(name="Close").to_csv(NIFTY_CACHE_PATH)
-    print(f"  fetched {len(close)} rows ({close.index[0].date()} -> {close.index[-1].date()}), "
-          f"cached -> {NIFTY_CACHE_PATH.name}")
+    start = (target_dates.min() - pd.Timedelta(days=5)).date()
+    close = bs.get_frame(bs.NIFTY500, start=start)["Close"]
+    print(f"  NIFTY500 benchmark: {len(close)} rows "
+          f"({close.index[0].date()} -> {close.index[-1].date()}) from benchmark store")
 
     aligned = close.reindex(target_dates).ffill()
     n_missing = aligned.isna().sum()
@@ -153,81 +150,36 @@ def get_weekly_eval_dates(all_dates, start_idx):
     return sorted(buckets.values())
 
 
-# ── EARLY MOVERS LOGIC (ported from sharpe_dashboard.compute_rising_candidates) ──
+# ── EARLY MOVERS LOGIC (same engine as sharpe_dashboard.compute_rising_candidates) ──
 def compute_rising_candidates(history, result_df, held_tickers):
     n_runs = len(history)
     if n_runs < 3:
         return pd.DataFrame(), n_runs
 
-    all_tickers = set()
-    for entry in history:
-        all_tickers.update(entry["scores"].keys())
-
-    score_series = {t: [] for t in all_tickers}
-    z3m_series   = {t: [] for t in all_tickers}
-    for entry in history:
-        z3m_data = entry.get("z3m_scores", {})
-        for t in all_tickers:
-            score_series[t].append(entry["scores"].get(t, np.nan))
-            z3m_series[t].append(z3m_data.get(t, np.nan))
-
-    candidates = []
-    for ticker in all_tickers:
-        if ticker in held_tickers:
-            continue
-        if ticker not in result_df.index:
-            continue
-        rank_val = result_df.loc[ticker, "RANK"]
-        if pd.isna(rank_val):
-            continue
-        rank = int(rank_val)
-
-        scores_arr = np.array(score_series[ticker], dtype=float)
-        valid      = ~np.isnan(scores_arr)
-        if valid.sum() < 3:
-            continue
-        clean = scores_arr[valid]
-
-        window = clean[-5:]
-        slope  = float(np.polyfit(np.arange(len(window)), window, 1)[0]) if len(window) >= 2 else 0.0
+    scores = pd.DataFrame([entry["scores"] for entry in history], dtype=float)
+    z3m    = pd.DataFrame([entry.get("z3m_scores", {}) for entry in history], dtype=float)
+    sig    = ml.early_mover_signals(scores, z3m)
 
-        streak = 0
-        for i in range(len(clean) - 1, 0, -1):
-            if clean[i] > clean[i - 1]:
-                streak += 1
-            else:
-                break
-
-        z3m_arr   = np.array(z3m_series[ticker], dtype=float)
-        z3m_valid = ~np.isnan(z3m_arr)
-        z3m_slope  = None
-        z3m_streak = None
-        if z3m_valid.sum() >= 2:
-            z3m_clean = z3m_arr[z3m_valid]
-            z3m_win   = z3m_clean[-5:]
-            z3m_slope = float(np.polyfit(np.arange(len(z3m_win)), z3m_win, 1)[0]) if len(z3m_win) >= 2 else 0.0
-            z3m_streak = 0
-            for i in range(len(z3m_clean) - 1, 0, -1):
-                if z3m_clean[i] > z3m_clean[i - 1]:
-                    z3m_streak += 1
-                else:
-                    break
-
-        zone = "Near-Term" if rank <= 50 else ("Building" if rank <= 100 else None)
-        s_now = float(clean[-1])
-        candidates.append({
-            "Ticker": ticker, "Zone": zone,
-            "_zo": 0 if rank <= 50 else (1 if rank <= 100 else 2),
-            "Rank": rank, "Score Now": round(s_now, 3),
-            "Velocity": round(slope, 4), "Streak": streak,
-            "Z3M Vel": round(z3m_slope, 4) if z3m_slope is not None else None,
-            "Z3M Streak": z3m_streak,
-        })
-
-    if not candidates:
+    sig["RANK"] = result_df["RANK"].reindex(sig.index)
+    sig = sig[(sig["N_RUNS"] >= 3) & sig["RANK"].notna()
+              & ~sig.index.isin(list(held_tickers))]
+    if sig.empty:
         return pd.DataFrame(), n_runs
 
-    df = pd.DataFrame(candidates)
+    rank = sig["RANK"].to_numpy().astype(int)
+    df = pd.DataFrame({
+        "Ticker":     sig.index.to_numpy(dtype=object),
+        "Zone":       np.where(rank <= 50, "Near-Term",
+                               np.where(rank <= 100, "Building", None)),
+        "_zo":        np.where(rank <= 50, 0, np.where(rank <= 100, 1, 2)),
+        "Rank":       rank,
+        "Score Now":  sig["SCORE_NOW"].round(3).to_numpy(),
+        "Velocity":   sig["VELOCITY"].round(4).to_numpy(),
+        "Streak":     sig["STREAK"].to_numpy(),
+        "Z3M Vel":    sig["Z3M_VELOCITY"].round(4).to_numpy(),
+        "Z3M Streak": sig["Z3M_STREAK"].to_numpy(),
+    })
+
     none_zone    = df[df["Zone"].isna() & (df["Rank"] <= FAST_MOVER_RANK_CAP)]
     fast_tickers = none_zone.nlargest(10, "Velocity")["Ticker"].tolist()
     df.loc[df["Ticker"].isin(fast_tickers) & df["Zone"].isna(), "Zone"] = "Fast Mover"
@@ -285,12 +237,13 @@ def main():
         nifty_hist  = nifty_series.loc[nifty_series.index <= pd.Timestamp(eval_date)]
 
         try:
-            result, regime_score, regime_detail = ml.compute_universe_rankings(
+            result, regime_score, regime_detail = ml.cached_universe_rankings(
                 prices_hist, nifty_hist, stock_tickers,
                 volume_df=None, min_turnover_cr=0,
                 eq_series_filter=False, circuit_filter_enabled=False,
                 band_csv_path=None, windows=WINDOWS,
-                trading_days=TRADING_DAYS, rfr_annual=RFR_ANNUAL)
+                trading_days=TRADING_DAYS, rfr_annual=RFR_ANNUAL,
+                cache_dir=RANKINGS_CACHE_DIR, max_cache_mb=RANKINGS_CACHE_MAX_MB)
         except Exception as e:
             print(f"  [{eval_date}] scoring failed: {e}")
             continue
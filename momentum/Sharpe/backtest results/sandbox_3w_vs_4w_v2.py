@@ -18,6 +18,7 @@ import matplotlib.gridspec as gridspec
 from contextlib import contextmanager
 
 import momentum_lib as ml
+import allocator as al
 warnings.filterwarnings("ignore")
 
 # ── CONFIG ────────────────────────────────────────────────────────────────────
@@ -145,19 +146,9 @@ def run_backtest(label, description, windows):
                     next_tickers.append(t)
                     slots -= 1
 
-        raw_w = {}
-        for t in next_tickers:
-            comp = result.loc[t, "COMPOSITE"]
-            px   = sliced.loc[t].dropna()
-            if len(px) > 10:
-                vols = []
-                for w in [252, 189, 126, 63]:
-                    pw = px.iloc[-w:] if len(px) >= w else px
-                    lr = np.diff(np.log(pw.values))
-                    if len(lr) > 5: vols.append(np.std(lr, ddof=1) * np.sqrt(252))
-                raw_w[t] = comp / np.mean(vols) if vols and np.mean(vols) > 0 else comp
-            else:
-                raw_w[t] = comp
+        raw_w = dict(zip(next_tickers, al.raw_weights(
+            result.loc[next_tickers, "COMPOSITE"].to_numpy(dtype=float),
+            al.realized_vols(sliced, next_tickers).to_numpy())))
 
         actual = {}
         total_raw = sum(raw_w.values())
@@ -17,6 +17,7 @@ import matplotlib.pyplot as plt
 from contextlib import contextmanager
 
 import momentum_lib as ml
+import allocator as al
 
 warnings.filterwarnings("ignore")
 
@@ -122,19 +123,9 @@ for i in range(len(valid_dates) - 1):
                     slots -= 1
 
     # Volatility-adjusted weights, 5% cap
-    raw_weights = {}
-    for ticker in next_portfolio_tickers:
-        comp  = result.loc[ticker, "COMPOSITE"]
-        px    = sliced_prices.loc[ticker].dropna()
-        if len(px) > 10:
-            vols = []
-            for w in [252, 189, 126, 63]:
-                pw   = px.iloc[-w:] if len(px) >= w else px
-                lr   = np.diff(np.log(pw.values))
-                if len(lr) > 5: vols.append(np.std(lr, ddof=1) * np.sqrt(252))
-            raw_weights[ticker] = comp / np.mean(vols) if vols and np.mean(vols) > 0 else comp
-        else:
-            raw_weights[ticker] = comp
+    raw_weights = dict(zip(next_portfolio_tickers, al.raw_weights(
+        result.loc[next_portfolio_tickers, "COMPOSITE"].to_numpy(dtype=float),
+        al.realized_vols(sliced_prices, next_portfolio_tickers).to_numpy())))
 
     total_raw = sum(raw_weights.values())
     actual_portfolio = {}
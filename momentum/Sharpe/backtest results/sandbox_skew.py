@@ -27,6 +27,7 @@ import matplotlib.pyplot as plt
 from contextlib import contextmanager
 
 import momentum_lib as ml
+import allocator as al
 
 warnings.filterwarnings("ignore")
 
@@ -224,23 +225,9 @@ for i in range(len(valid_dates) - 1):
                     slots_to_fill -= 1
 
     # 5. Volatility-Adjusted Weights (5% cap) — identical to production
-    raw_weights = {}
-    for ticker in next_portfolio_tickers:
-        comp_score = result.loc[ticker, "COMPOSITE"]
-        px         = sliced_prices.loc[ticker].dropna()
-        if len(px) > 10:
-            vols = []
-            for w in [252, 189, 126, 63]:
-                px_w  = px.iloc[-w:] if len(px) >= w else px
-                log_r = np.diff(np.log(px_w.values))
-                if len(log_r) > 5:
-                    vols.append(np.std(log_r, ddof=1) * np.sqrt(252))
-            if vols and np.mean(vols) > 0:
-                raw_weights[ticker] = comp_score / np.mean(vols)
-            else:
-                raw_weights[ticker] = comp_score
-        else:
-            raw_weights[ticker] = comp_score
+    raw_weights = dict(zip(next_portfolio_tickers, al.raw_weights(
+        result.loc[next_portfolio_tickers, "COMPOSITE"].to_numpy(dtype=float),
+        al.realized_vols(sliced_prices, next_portfolio_tickers).to_numpy())))
 
     total_raw    = sum(raw_weights.values())
     actual_portfolio = {}
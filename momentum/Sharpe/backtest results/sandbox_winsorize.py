@@ -22,6 +22,7 @@ import matplotlib.pyplot as plt
 from contextlib import contextmanager
 
 import momentum_lib as ml
+import allocator as al
 warnings.filterwarnings("ignore")
 
 FILE         = "n500_bt.xlsx"
@@ -212,19 +213,9 @@ def run_backtest(label, winsor_returns=False, winsor_z=False):
                     next_tickers.append(ticker)
                     slots -= 1
 
-        raw_w = {}
-        for ticker in next_tickers:
-            comp = result.loc[ticker, "COMPOSITE"]
-            px   = sliced_prices.loc[ticker].dropna()
-            if len(px) > 10:
-                vols = []
-                for w in [252, 189, 126, 63]:
-                    pw = px.iloc[-w:] if len(px) >= w else px
-                    lr = np.diff(np.log(pw.values))
-                    if len(lr) > 5: vols.append(np.std(lr, ddof=1) * np.sqrt(252))
-                raw_w[ticker] = comp / np.mean(vols) if vols and np.mean(vols) > 0 else comp
-            else:
-                raw_w[ticker] = comp
+        raw_w = dict(zip(next_tickers, al.raw_weights(
+            result.loc[next_tickers, "COMPOSITE"].to_numpy(dtype=float),
+            al.realized_vols(sliced_prices, next_tickers).to_numpy())))
 
         actual = {}
         total_raw = sum(raw_w.values())
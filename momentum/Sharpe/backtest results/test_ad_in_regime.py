@@ -1,5 +1,5 @@
 import pandas as pd
-import json
+import history_journal as hj
 import momentum_lib as ml
 import numpy as np
 import warnings
@@ -22,8 +22,7 @@ s1_ema50_breadth = float((last_px[valid] > last_ema50[valid]).sum()) / n_valid
 s2_ema_trend     = float((last_ema50[valid] > last_ema200[valid]).sum()) / n_valid
 
 # Signal 3: 52H Breadth (from history)
-with open('N750_regime_history.json', 'r') as f:
-    latest = json.load(f)[-1]
+latest = hj.last_record(hj.ensure_journal('N750_regime_history.json'))
 s3_breadth = latest['Breadth']
 s4_momentum = latest['Momentum']
 
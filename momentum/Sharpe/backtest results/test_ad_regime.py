@@ -1,5 +1,5 @@
 import pandas as pd
-import json
+import history_journal as hj
 import momentum_lib as ml
 import warnings
 warnings.filterwarnings('ignore')
@@ -25,10 +25,8 @@ ema50_score = float(np.clip((price / ema50  - 1.0) / EMA50_BAND + 0.5, 0.0, 1.0)
 
 # 3. Read current regime composite
 try:
-    with open('N750_regime_history.json', 'r') as f:
-        history = json.load(f)
-        latest = history[-1]
-        curr_composite = latest['Composite']
+    latest = hj.last_record(hj.ensure_journal('N750_regime_history.json'))
+    curr_composite = latest['Composite']
 except Exception:
     curr_composite = 0.5
 
@@ -1,5 +1,5 @@
 import pandas as pd
-import json
+import history_journal as hj
 import momentum_lib as ml
 import warnings
 warnings.filterwarnings('ignore')
@@ -31,11 +31,9 @@ a2_score = ema50_above_ema200 / valid_count if valid_count > 0 else 0
 
 # 3. Get current regime components
 try:
-    with open('N750_regime_history.json', 'r') as f:
-        history = json.load(f)
-        latest = history[-1]
-        breadth_score = latest['Breadth']
-        momentum_score = latest['Momentum']
+    latest = hj.last_record(hj.ensure_journal('N750_regime_history.json'))
+    breadth_score = latest['Breadth']
+    momentum_score = latest['Momentum']
 except Exception:
     breadth_score = 0.5
     momentum_score = 0.5
@@ -1,14 +1,12 @@
 import pandas as pd
-import json
+import history_journal as hj
 
 # Read current regime stats from Sharpe.py / dashboard's history
 try:
-    with open('N750_regime_history.json', 'r') as f:
-        history = json.load(f)
-        latest = history[-1]
-        print("Current Regime Score:", latest['Composite'])
-        print("Current Momentum Breadth:", latest['Momentum'])
-        # Wait, the history only stores the final component scores, not the raw composite scores of all stocks.
+    latest = hj.last_record(hj.ensure_journal('N750_regime_history.json'))
+    print("Current Regime Score:", latest['Composite'])
+    print("Current Momentum Breadth:", latest['Momentum'])
+    # Wait, the history only stores the final component scores, not the raw composite scores of all stocks.
 except Exception as e:
     pass
 
@@ -0,0 +1,333 @@
+"""
+bench.py
+========
+Offline benchmark suite for the momentum ranking pipeline.
+
+Generates synthetic N500 / N750 / NSEAll-sized price, volume and price-band
+panels (no network, no yfinance), times every stage of
+compute_universe_rankings() on its own plus the whole pipeline and
+load_prices() (xlsx parse and columnar store), and writes the timings as
+JSON. A run can be compared against a saved baseline; any stage slower than
+`threshold` × baseline is flagged and the CLI exits with status 1.
+
+    python bench.py                          # all universes, compare to baseline if present
+    python bench.py --universes N750 --repeat 5
+    python bench.py --save-baseline          # record benchmarks/baseline.json
+    python bench.py --threshold 1.5 --baseline other.json
+
+Timings are the best of `repeat` runs (the least noisy estimate of the
+code's cost on an otherwise idle machine). Stages that take less than
+MIN_SECONDS in both runs are never flagged — at that scale the ratio is
+timer noise.
+
+Functions
+---------
+make_synthetic_universe(n_tickers, n_days, seed) — prices / nifty / volume / bands
+write_synthetic_workbook(path, prices_df, nifty_series, volume_df) — n500-format xlsx
+run_benchmarks(universes, n_days, repeat, include_load) — {universe: {stage: seconds}}
+compare_to_baseline(current, baseline, threshold) — per-stage comparison rows
+"""
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+import momentum_lib as ml
+
+
+# ── CONFIG ────────────────────────────────────────────────────────────────────
+UNIVERSE_SIZES = {"N500": 500, "N750": 750, "NSEAll": 2078}
+DEFAULT_DAYS   = 300
+DEFAULT_REPEAT = 3
+THRESHOLD      = 1.25      # flag stages more than 25% slower than baseline
+MIN_SECONDS    = 0.005     # below this both ways, ratios are noise
+
+WINDOWS      = {"12M": 252, "9M": 189, "6M": 126, "3M": 63}
+TRADING_DAYS = 252
+RFR_ANNUAL   = 0.07
+
+BENCH_DIR     = Path(__file__).resolve().parent / "benchmarks"
+BASELINE_FILE = BENCH_DIR / "baseline.json"
+
+STAGES = ["sharpe", "returns", "pct_52h", "residual_momentum", "beta",
+          "turnover", "circuit_hits", "regime_score", "rankings_total",
+          "load_prices_xlsx", "load_prices_store"]
+
+
+# ── SYNTHETIC DATA ────────────────────────────────────────────────────────────
+
+def make_synthetic_universe(n_tickers: int, n_days: int = DEFAULT_DAYS,
+                            seed: int = 42):
+    """
+    Synthetic universe shaped like the real workbooks: recent listings,
+    suspensions, scattered holes, a few circuit-locked names and a
+    Price_Band_List-style band table (EQ / BE / SM series, 2–20% bands).
+
+    Returns
+    -------
+    prices_df    : DataFrame (index=ticker, columns=dates) — stocks only
+    nifty_series : Series    — NIFTY500 closes
+    volume_df    : DataFrame — same shape as prices_df
+    bands_csv    : DataFrame — Symbol / Series / Security Name / Band / Remarks
+    """
+    rng     = np.random.default_rng(seed)
+    dates   = list(pd.bdate_range("2024-01-01", periods=n_days).date)
+    tickers = [f"SYN{i:04d}" for i in range(n_tickers)]
+
+    market = rng.normal(0.0004, 0.01, n_days)
+    beta   = rng.uniform(0.5, 1.5, (n_tickers, 1))
+    rets   = beta * market + rng.normal(0.0, 0.018, (n_tickers, n_days))
+    px     = rng.uniform(20, 2000, (n_tickers, 1)) * np.exp(np.cumsum(rets, axis=1))
+
+    listing = rng.integers(0, n_days, n_tickers)
+    recent  = rng.random(n_tickers) < 0.08
+    for i in np.flatnonzero(recent):
+        px[i, :listing[i]] = np.nan
+    holes = rng.random((n_tickers, n_days)) < 0.01
+    px[holes] = np.nan
+    suspended = rng.random(n_tickers) < 0.02
+    px[suspended, -rng.integers(5, 40):] = np.nan
+
+    # Circuit-locked names: a run of +5% closes
+    locked = np.flatnonzero(rng.random(n_tickers) < 0.03)
+    for i in locked:
+        start = rng.integers(1, max(2, n_days - 20))
+        run   = px[i, start - 1] * 1.05 ** np.arange(1, 21)
+        px[i, start:start + 20] = run[:len(px[i, start:start + 20])]
+
+    prices_df    = pd.DataFrame(np.round(px, 2), index=tickers, columns=dates)
+    nifty_series = pd.Series(20000 * np.exp(np.cumsum(market)), index=dates,
+                             name="NIFTY500").round(2)
+    volume       = rng.lognormal(11, 1.5, (n_tickers, n_days)).round()
+    volume_df    = pd.DataFrame(np.where(np.isnan(px), np.nan, volume),
+                                index=tickers, columns=dates)
+
+    series = rng.choice(["EQ", "BE", "SM"], n_tickers, p=[0.85, 0.1, 0.05])
+    band   = rng.choice(["2", "5", "10", "20", "No Band"], n_tickers,
+                        p=[0.1, 0.3, 0.2, 0.3, 0.1])
+    band[locked] = "5"
+    bands_csv = pd.DataFrame({"Symbol": tickers, "Series": series,
+                              "Security Name": tickers, "Band": band,
+                              "Remarks": "-"})
+    return prices_df, nifty_series, volume_df, bands_csv
+
+
+def write_synthetic_workbook(path, prices_df: pd.DataFrame,
+                             nifty_series: pd.Series, volume_df: pd.DataFrame):
+    """Write DATA / VOLUME sheets in the layout update_stock_price.py produces."""
+    wb = openpyxl.Workbook(write_only=True)
+    header = ["TICKER"] + [datetime.datetime.combine(d, datetime.time())
+                           for d in prices_df.columns]
+    for sheet, frame in (("DATA", pd.concat([nifty_series.to_frame().T, prices_df])),
+                         ("VOLUME", volume_df)):
+        ws = wb.create_sheet(sheet)
+        ws.append(header)
+        for ticker, row in zip(frame.index, frame.to_numpy()):
+            ws.append([ticker] + [None if np.isnan(v) else float(v) for v in row])
+    wb.save(path)
+
+
+# ── TIMING ────────────────────────────────────────────────────────────────────
+
+def _best_of(fn, repeat: int) -> float:
+    """Best wall-clock time of `repeat` calls (pipeline prints suppressed)."""
+    best = np.inf
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_universe(n_tickers: int, n_days: int = DEFAULT_DAYS,
+                   repeat: int = DEFAULT_REPEAT, include_load: bool = True,
+                   seed: int = 42) -> dict:
+    """Per-stage best-of-`repeat` seconds for one synthetic universe."""
+    prices_df, nifty, volume_df, bands_csv = make_synthetic_universe(n_tickers, n_days, seed)
+    tickers   = list(prices_df.index)
+    rfr_daily = RFR_ANNUAL / TRADING_DAYS
+    timings   = {}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        band_path = Path(tmp) / "Price_Band_List.csv"
+        bands_csv.to_csv(band_path, index=False)
+        bands = ml.load_price_bands(band_path)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            _, z_df = ml.compute_sharpe(prices_df, tickers, WINDOWS, rfr_daily, TRADING_DAYS)
+            pct_52h = ml.compute_pct_from_52h(prices_df, tickers)
+
+        stages = {
+            "sharpe":            lambda: ml.compute_sharpe(prices_df, tickers, WINDOWS,
+                                                           rfr_daily, TRADING_DAYS),
+            "returns":           lambda: ml.compute_returns(prices_df, tickers),
+            "pct_52h":           lambda: ml.compute_pct_from_52h(prices_df, tickers),
+            "residual_momentum": lambda: ml.compute_residual_momentum(
+                prices_df, tickers, nifty, WINDOWS, TRADING_DAYS, rfr_daily),
+            "beta":              lambda: ml.compute_beta(prices_df, tickers, nifty,
+                                                         window=TRADING_DAYS),
+            "turnover":          lambda: ml.compute_turnover(prices_df, volume_df, tickers),
+            "circuit_hits":      lambda: ml.compute_circuit_hits(
+                prices_df, tickers, str(band_path), lookback_period=252, bands=bands),
+            "regime_score":      lambda: ml.compute_regime_score(
+                nifty, pct_52h >= -25, z_df["COMPOSITE"].map(ml.normalise_composite),
+                prices_df=prices_df),
+            "rankings_total":    lambda: ml.compute_universe_rankings(
+                prices_df, nifty, tickers, volume_df=volume_df,
+                band_csv_path=str(band_path), windows=WINDOWS,
+                trading_days=TRADING_DAYS, rfr_annual=RFR_ANNUAL),
+        }
+        for name, fn in stages.items():
+            timings[name] = _best_of(fn, repeat)
+
+        if include_load:
+            xlsx = Path(tmp) / "SYN_updated.xlsx"
+            write_synthetic_workbook(xlsx, prices_df, nifty, volume_df)
+            timings["load_prices_xlsx"] = _best_of(
+                lambda: ml.load_prices(str(xlsx), use_store=False), repeat)
+            ml.write_price_store(str(xlsx))
+            timings["load_prices_store"] = _best_of(
+                lambda: ml.load_prices(str(xlsx)), repeat)
+
+    return timings
+
+
+def run_benchmarks(universes: dict = None, n_days: int = DEFAULT_DAYS,
+                   repeat: int = DEFAULT_REPEAT, include_load: bool = True) -> dict:
+    """
+    Benchmark every universe in `universes` (name → ticker count).
+
+    Returns dict: {"meta": {...}, "universes": {name: {"tickers", "days",
+    "stages": {stage: seconds}}}} — the JSON document bench.py writes.
+    """
+    universes = UNIVERSE_SIZES if universes is None else universes
+    out = {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python":    platform.python_version(),
+            "numpy":     np.__version__,
+            "pandas":    pd.__version__,
+            "machine":   platform.platform(),
+            "repeat":    repeat,
+        },
+        "universes": {},
+    }
+    for name, n_tickers in universes.items():
+        print(f"Benchmarking {name} ({n_tickers} tickers × {n_days} days) ...")
+        stages = bench_universe(n_tickers, n_days, repeat, include_load)
+        out["universes"][name] = {"tickers": n_tickers, "days": n_days, "stages": stages}
+        for stage, secs in stages.items():
+            print(f"  {stage:<20} {secs * 1000:>10.1f} ms")
+    return out
+
+
+# ── BASELINE COMPARISON ───────────────────────────────────────────────────────
+
+def compare_to_baseline(current: dict, baseline: dict,
+                        threshold: float = THRESHOLD,
+                        min_seconds: float = MIN_SECONDS) -> pd.DataFrame:
+    """
+    Stage-by-stage comparison of two run_benchmarks() documents.
+
+    Only (universe, stage) pairs present in both are compared. A stage is a
+    REGRESSION when current / baseline > threshold and it takes at least
+    `min_seconds` now.
+
+    Returns DataFrame: universe, stage, baseline_s, current_s, ratio, regression
+    """
+    rows = []
+    for name, cur in current["universes"].items():
+        base = baseline.get("universes", {}).get(name)
+        if base is None:
+            continue
+        for stage, secs in cur["stages"].items():
+            if stage not in base["stages"]:
+                continue
+            base_secs = base["stages"][stage]
+            ratio     = secs / base_secs if base_secs > 0 else np.inf
+            rows.append({
+                "universe":   name,
+                "stage":      stage,
+                "baseline_s": base_secs,
+                "current_s":  secs,
+                "ratio":      ratio,
+                "regression": bool(ratio > threshold and secs >= min_seconds),
+            })
+    return pd.DataFrame(rows, columns=["universe", "stage", "baseline_s",
+                                       "current_s", "ratio", "regression"])
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline ranking-pipeline benchmarks")
+    parser.add_argument("--universes", nargs="+", default=list(UNIVERSE_SIZES),
+                        choices=list(UNIVERSE_SIZES), help="Universe sizes to run")
+    parser.add_argument("--days", type=int, default=DEFAULT_DAYS,
+                        help=f"Trading days per synthetic panel (default: {DEFAULT_DAYS})")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"Runs per stage, best kept (default: {DEFAULT_REPEAT})")
+    parser.add_argument("--skip-load", action="store_true",
+                        help="Skip the load_prices xlsx / store stages")
+    parser.add_argument("--out", default=None,
+                        help="Results JSON (default: benchmarks/bench_<timestamp>.json)")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE),
+                        help="Baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help=f"Slowdown ratio that counts as a regression (default: {THRESHOLD})")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="Also write this run as the baseline")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks({u: UNIVERSE_SIZES[u] for u in args.universes},
+                             args.days, args.repeat, include_load=not args.skip_load)
+
+    BENCH_DIR.mkdir(exist_ok=True)
+    out = args.out
+    if out is None:
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        out = BENCH_DIR / f"bench_{timestamp}.json"
+    with open(out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {out}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not Path(args.baseline).exists():
+        print(f"No baseline at {args.baseline} — run with --save-baseline to record one.")
+        return 0
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+
+    table = compare_to_baseline(results, baseline, args.threshold)
+    with pd.option_context("display.width", 160, "display.float_format", "{:,.4f}".format):
+        print(f"\nComparison vs {args.baseline} (threshold {args.threshold:.2f}×):")
+        print(table.to_string(index=False))
+    slow = table[table["regression"]]
+    if len(slow):
+        print(f"\n[!] {len(slow)} stage(s) slower than {args.threshold:.2f}× baseline:")
+        for _, r in slow.iterrows():
+            print(f"    {r['universe']:<8} {r['stage']:<20} {r['ratio']:.2f}×")
+        return 1
+    print("\nNo regressions.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
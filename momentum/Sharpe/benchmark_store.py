@@ -0,0 +1,292 @@
+"""
+benchmark_store.py
+==================
+Shared store of benchmark index series (Nifty 500 = ^CRSLDX first) for the
+ETF, Sharpe and MILT pipelines.
+
+The ETF ranking scripts each kept a nifty500_cache.csv judged fresh by its
+file mtime (so a cache written on Friday was refetched in full on Monday, and
+one written an hour before the close was served all evening), the Early
+Movers backtest kept its own nifty500_benchmark_cache.csv, and the other
+scripts downloaded ^CRSLDX themselves. Here:
+
+  * one CSV per symbol under benchmark_series/ holds Date, Close and the
+    precomputed EMA_50 / EMA_100 / EMA_200 columns;
+  * benchmark_series/store.json records, per symbol, the first and last date
+    contained in the data plus when the provider was last asked;
+  * update() asks the provider only for the days after the last stored
+    date (re-reading OVERLAP_DAYS so a provisional close gets revised), and
+    for history before the first stored date when a caller needs it. A
+    bar for today fetched before MARKET_CLOSE is marked provisional and
+    re-read on the next call after RECHECK_MINUTES. A symbol whose data
+    already runs to today (final close), or was checked in the last
+    RECHECK_MINUTES, costs no network call at all.
+
+The other folders import it the way they import the other shared modules:
+    sys.path.append(str(SCRIPT_DIR.parent / "Sharpe"))
+    import benchmark_store as bs
+
+Providers are plain callables  provider(symbol, start, end) -> Series of
+closes indexed by date (end exclusive), so the store can be filled offline
+with series_provider(...).
+
+Functions
+---------
+yahoo_provider(symbol, start, end)          — daily closes via yf.download
+series_provider(series)                     — provider serving a fixed Series
+load(symbol, store_dir)                     — stored frame (no network)
+last_date(symbol, store_dir)                — last date held for `symbol` (None if none)
+update(symbol, start, provider, store_dir, now) — fetch only the missing days
+get_frame(symbol, start, provider, store_dir)   — update(), then the frame from `start`
+regime_inputs(frame, fast, slow)            — price / fast EMA / slow EMA on the last row
+
+Usage:  python benchmark_store.py [SYMBOL ...]     (default ^CRSLDX)
+        Brings each symbol up to date and prints its last date and EMAs.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# ── CONFIG ────────────────────────────────────────────────────────────────────
+SCRIPT_DIR      = Path(__file__).resolve().parent
+STORE_DIR       = SCRIPT_DIR / "benchmark_series"
+INDEX_FILE      = "store.json"
+NIFTY500        = "^CRSLDX"
+EMA_SPANS       = (50, 100, 200)
+HISTORY_DAYS    = 1500        # calendar days fetched for a new symbol (EMA200 warm-up)
+OVERLAP_DAYS    = 5           # re-read this many days before the last stored date
+RECHECK_MINUTES = 60          # don't ask the provider again within this window
+MARKET_CLOSE    = datetime.time(15, 45)   # NSE close (15:30 IST) + settle; earlier = provisional
+
+
+# ── PROVIDERS ─────────────────────────────────────────────────────────────────
+
+def yahoo_provider(symbol: str, start: datetime.date, end: datetime.date) -> pd.Series:
+    """Daily closes for [start, end) from yf.download (auto-adjusted)."""
+    import yfinance as yf
+    data = yf.download(symbol, start=start.isoformat(), end=end.isoformat(),
+                       progress=False, auto_adjust=True)
+    if data is None or data.empty:
+        return pd.Series(dtype=float)
+    close = data["Close"]
+    if isinstance(close, pd.DataFrame):       # yfinance can return a 1-col DataFrame
+        close = close.iloc[:, 0]
+    close.index = pd.DatetimeIndex(pd.to_datetime(close.index).date)
+    return close.dropna()
+
+
+def series_provider(series: pd.Series):
+    """Provider serving slices of a fixed close series (offline runs, tests)."""
+    series = series.copy()
+    series.index = pd.DatetimeIndex(series.index)
+    calls  = []
+
+    def provider(symbol, start, end):
+        calls.append((symbol, start, end))
+        mask = (series.index >= pd.Timestamp(start)) & (series.index < pd.Timestamp(end))
+        return series[mask]
+
+    provider.calls = calls
+    return provider
+
+
+# ── STORAGE ───────────────────────────────────────────────────────────────────
+
+def _file_name(symbol: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", symbol.lstrip("^")) + ".csv"
+
+
+def _read_index(store_dir: Path) -> dict:
+    path = store_dir / INDEX_FILE
+    if not path.exists():
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomic(path: Path, write) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    write(tmp)
+    os.replace(tmp, path)
+
+
+def _with_emas(close: pd.Series) -> pd.DataFrame:
+    """Close plus EMA_<span> (adjust=False, as the regime filters compute it)."""
+    frame = close.rename("Close").to_frame()
+    for span in EMA_SPANS:
+        frame[f"EMA_{span}"] = close.ewm(span=span, adjust=False).mean()
+    frame.index.name = "Date"
+    return frame
+
+
+def load(symbol: str = NIFTY500, store_dir: Path = None) -> pd.DataFrame:
+    """The stored frame for `symbol` (empty if none); never touches the network."""
+    path = Path(store_dir or STORE_DIR) / _file_name(symbol)
+    if not path.exists():
+        return pd.DataFrame(columns=["Close"] + [f"EMA_{s}" for s in EMA_SPANS], dtype=float)
+    return pd.read_csv(path, index_col=0, parse_dates=True, float_precision="round_trip")
+
+
+def last_date(symbol: str = NIFTY500, store_dir: Path = None):
+    """Last date contained in the stored data for `symbol`, or None."""
+    entry = _read_index(Path(store_dir or STORE_DIR)).get(symbol)
+    return datetime.date.fromisoformat(entry["last_date"]) if entry else None
+
+
+def _save(symbol: str, close: pd.Series, store_dir: Path, index: dict,
+          checked: datetime.datetime, requested_from: datetime.date,
+          provisional: bool = False) -> pd.DataFrame:
+    store_dir.mkdir(parents=True, exist_ok=True)
+    frame = _with_emas(close)
+    _write_atomic(store_dir / _file_name(symbol), lambda p: frame.to_csv(p))
+    index[symbol] = {
+        "file":           _file_name(symbol),
+        "first_date":     str(frame.index[0].date()),
+        "last_date":      str(frame.index[-1].date()),
+        "rows":           len(frame),
+        "requested_from": str(requested_from),
+        "checked_at":     checked.isoformat(timespec="seconds"),
+        "provisional":    bool(provisional),
+    }
+
+    def write_index(p):
+        with open(p, "w") as f:
+            json.dump(index, f, indent=2)
+    _write_atomic(store_dir / INDEX_FILE, write_index)
+    return frame
+
+
+# ── UPDATE ────────────────────────────────────────────────────────────────────
+
+def update(symbol: str = NIFTY500, start: datetime.date = None, provider=None,
+           store_dir: Path = None, now: datetime.datetime = None) -> pd.DataFrame:
+    """
+    Bring `symbol` up to date and return its full stored frame.
+
+    Fetches [last stored date - OVERLAP_DAYS, today] when the data stops
+    before today, or its bar for today is provisional (fetched before
+    MARKET_CLOSE), and the provider wasn't asked within RECHECK_MINUTES, and
+    [start, first stored date) when `start` is earlier than anything asked
+    for before. Fetched closes replace stored ones on the same date. A
+    provider error keeps the stored data (printed as a warning); a failed
+    head fetch leaves requested_from alone, so the next call asks again.
+    """
+    store_dir = Path(store_dir or STORE_DIR)
+    provider  = provider or yahoo_provider
+    now       = now or datetime.datetime.now()
+    today     = now.date()
+    index     = _read_index(store_dir)
+    entry     = index.get(symbol)
+    stored    = load(symbol, store_dir)["Close"].dropna() if entry else pd.Series(dtype=float)
+
+    requests = []
+    head     = None
+    tail     = None
+    if stored.empty:
+        first_wanted = start or today - datetime.timedelta(days=HISTORY_DAYS)
+        tail = (first_wanted, today + datetime.timedelta(days=1))
+        requests.append(tail)
+    else:
+        first_wanted = datetime.date.fromisoformat(entry["requested_from"])
+        if start is not None and start < first_wanted:
+            head = (start, stored.index[0].date())
+            requests.append(head)
+        last    = stored.index[-1].date()
+        checked = datetime.datetime.fromisoformat(entry["checked_at"])
+        stale   = last < today or entry.get("provisional", False)
+        if stale and now - checked >= datetime.timedelta(minutes=RECHECK_MINUTES):
+            tail = (last - datetime.timedelta(days=OVERLAP_DAYS),
+                    today + datetime.timedelta(days=1))
+            requests.append(tail)
+    if not requests:
+        return load(symbol, store_dir)
+
+    fetched     = []
+    provisional = bool(entry and entry.get("provisional", False))
+    for lo, hi in requests:
+        try:
+            fetched.append(provider(symbol, lo, hi))
+            if (lo, hi) == head:
+                first_wanted = start
+            if (lo, hi) == tail:
+                provisional = now.time() < MARKET_CLOSE
+        except Exception as e:
+            print(f"  [warn] {symbol} fetch {lo} -> {hi} failed: {e}")
+    fetched = [s.dropna() for s in fetched if s is not None and len(s)]
+    if not fetched and stored.empty:
+        return load(symbol, store_dir)
+
+    close = pd.concat([stored] + fetched)
+    close.index = pd.DatetimeIndex(close.index)
+    close = close[~close.index.duplicated(keep="last")].sort_index()
+    n_new = len(close.index.difference(stored.index))
+    provisional = provisional and close.index[-1].date() == today
+    frame = _save(symbol, close, store_dir, index, now, first_wanted, provisional)
+    if n_new:
+        print(f"  [bench] {symbol}: +{n_new} day(s) -> {frame.index[-1].date()} "
+              f"({len(frame)} rows)")
+    return frame
+
+
+def get_frame(symbol: str = NIFTY500, start: datetime.date = None, provider=None,
+              store_dir: Path = None) -> pd.DataFrame:
+    """update(), then the rows from `start` on. The EMAs still use the full history."""
+    frame = update(symbol, start, provider, store_dir)
+    if start is not None and len(frame):
+        frame = frame[frame.index >= pd.Timestamp(start)]
+    return frame
+
+
+# ── REGIME INPUTS ─────────────────────────────────────────────────────────────
+
+def regime_inputs(frame: pd.DataFrame, fast: int = 50, slow: int = 100) -> dict:
+    """
+    {date, price, ema_fast, ema_slow} on the last row of a Close frame, using
+    the stored EMA_<span> columns when present (computed otherwise). The
+    EMAs are NaN when there are fewer than `slow` closes.
+    """
+    close = frame["Close"].dropna() if len(frame) else pd.Series(dtype=float)
+    if close.empty:
+        return {"date": None, "price": np.nan, "ema_fast": np.nan, "ema_slow": np.nan}
+
+    def ema(span):
+        col = f"EMA_{span}"
+        if col in frame.columns and pd.notna(frame[col].iloc[-1]):
+            return float(frame[col].iloc[-1])
+        return float(close.ewm(span=span, adjust=False).mean().iloc[-1])
+
+    enough = len(close) >= slow
+    return {
+        "date":     close.index[-1].date(),
+        "price":    float(close.iloc[-1]),
+        "ema_fast": ema(fast) if enough else np.nan,
+        "ema_slow": ema(slow) if enough else np.nan,
+    }
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update the shared benchmark store")
+    parser.add_argument("symbols", nargs="*", default=[NIFTY500])
+    args = parser.parse_args()
+    for sym in args.symbols:
+        frame = update(sym)
+        if frame.empty:
+            print(f"{sym}: no data")
+            continue
+        last = frame.iloc[-1]
+        emas = "  ".join(f"EMA{s} {last[f'EMA_{s}']:,.2f}" for s in EMA_SPANS)
+        print(f"{sym}: {len(frame)} rows {frame.index[0].date()} -> {frame.index[-1].date()}  "
+              f"close {last['Close']:,.2f}  {emas}")
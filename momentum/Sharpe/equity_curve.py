@@ -0,0 +1,240 @@
+"""
+equity_curve.py
+===============
+Vectorized equity-curve engine for the {universe}_equity_history journal.
+
+The model is the one Sharpe.py has always recorded: the held tickers are
+equal-weighted at 1/MAX_N each (so invested_frac = min(n_held / MAX_N, 1)),
+idle cash earns LIQUID_YIELD_PA prorated by calendar days, and the
+benchmark is NIFTY500. Sharpe.py used to record one point per run, so a
+run after a few missed days booked the whole gap as a single multi-day
+jump, and it located its reference column with linear scans.
+
+Here the whole curve comes out of one pass over the price panel:
+
+    held      (dates × tickers)  positions at the end of each price column
+    returns   (dates × tickers)  column-to-column returns of the ffilled panel
+    port_ret  = invested_frac × mean(returns over yesterday's held) + cash carry
+
+Date lookups are np.searchsorted on the sorted column dates. Prices are
+treated as the per-run step treated them: a stock with no price in a
+column is left out of that column's average, a zero reference price
+leaves it out of the next one, and a zero price is a -100% return. The
+one deliberate difference is a missing reference price (holiday column,
+suspension): the old step dropped the stock, here the last close before
+it is carried forward as the reference, so chained daily returns
+telescope to the same stock moves a multi-day step would see. The
+positions come from the current ledger (backfill: nothing changes
+between runs) or from a tradelog (full rebuild).
+
+Functions
+---------
+column_dates(columns)                          — datetime64[D] array of price-column dates
+column_index(dates, day)                       — last column on or before `day` (-1 if none)
+holdings_from_ledger(tickers, dates)           — constant positions matrix
+holdings_from_tradelog(transactions, dates)    — signed-quantity positions matrix
+nav_frame(prices_df, nifty, held, max_n, ...)  — daily returns / NAV from column `start`
+to_records(frame, last_date)                   — journal records for a nav_frame
+anchor_nav(existing, day)                      — journal NAVs a rebuild continues from
+merge_records(existing, records)               — journal history before `records`, then them
+
+Usage:  python equity_curve.py <UNIVERSE> [--write]
+        Rebuilds the curve from <UNIVERSE>_tradelog.json over the price
+        panel; --write replaces the journal from the first rebuilt date on,
+        continuing from the last journal NAV before it. Older history (dates
+        the rolling panel no longer covers) is kept.
+"""
+
+import argparse
+import bisect
+import datetime
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import history_journal as hj
+import momentum_lib as ml
+
+
+# ── CONFIG ────────────────────────────────────────────────────────────────────
+SCRIPT_DIR      = Path(__file__).resolve().parent
+START_NAV       = 100.0
+LIQUID_YIELD_PA = 0.06
+CALENDAR_DAYS   = 365.0
+
+
+# ── DATES ─────────────────────────────────────────────────────────────────────
+
+def column_dates(columns) -> np.ndarray:
+    """Price-panel column labels (date / datetime / ISO str) as datetime64[D]."""
+    return pd.to_datetime(pd.Index(columns)).values.astype("datetime64[D]")
+
+
+def column_index(dates: np.ndarray, day) -> int:
+    """Index of the last column dated on or before `day`; -1 if all are later."""
+    return int(np.searchsorted(dates, np.datetime64(day, "D"), side="right")) - 1
+
+
+# ── POSITIONS ─────────────────────────────────────────────────────────────────
+
+def holdings_from_ledger(tickers: list, dates: np.ndarray) -> pd.DataFrame:
+    """The ledger's tickers held at every column (1.0 = held)."""
+    return pd.DataFrame(np.ones((len(dates), len(tickers))), index=dates, columns=list(tickers))
+
+
+def holdings_from_tradelog(transactions: list, dates: np.ndarray) -> pd.DataFrame:
+    """
+    Quantity held at the end of each column. A trade dated on a holiday or
+    weekend counts from the last column before it; one dated before the
+    panel counts from the first column.
+    """
+    if not transactions:
+        return pd.DataFrame(index=dates, dtype=float)
+    tx   = pd.DataFrame(transactions)
+    sign = np.where(tx["action"].str.upper() == "SELL", -1.0, 1.0)
+    qty  = sign * pd.to_numeric(tx["quantity"], errors="coerce").fillna(0.0).to_numpy()
+    idx  = np.searchsorted(dates, pd.to_datetime(tx["date"]).values.astype("datetime64[D]"),
+                           side="right") - 1
+    tickers, col = np.unique(tx["ticker"].to_numpy(), return_inverse=True)
+    delta = np.zeros((len(dates), len(tickers)))
+    np.add.at(delta, (np.clip(idx, 0, None), col), qty)
+    held = np.cumsum(delta, axis=0)
+    held[np.abs(held) < 1e-9] = 0.0
+    return pd.DataFrame(held, index=dates, columns=list(tickers))
+
+
+# ── ENGINE ────────────────────────────────────────────────────────────────────
+
+def _returns(panel: np.ndarray) -> np.ndarray:
+    """
+    Column-to-column returns of a (dates × series) panel, measured from the
+    last price on or before the previous column. The return is NaN where
+    the price is missing or that reference is not positive.
+    """
+    ref = pd.DataFrame(panel).ffill().to_numpy()
+    ret = np.full(panel.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ret[1:] = np.where(ref[:-1] > 0, panel[1:] / ref[:-1] - 1.0, np.nan)
+    return ret
+
+
+def nav_frame(prices_df: pd.DataFrame, nifty: pd.Series, held: pd.DataFrame,
+              max_n: int, liquid_yield_pa: float = LIQUID_YIELD_PA,
+              start: int = 0, start_nav: tuple = (START_NAV, START_NAV)) -> pd.DataFrame:
+    """
+    Daily curve for every column after `start` (whose NAVs are `start_nav`).
+
+    prices_df : DataFrame (index=ticker, columns=dates) — the price panel
+    nifty     : Series    (index=dates)                 — benchmark closes
+    held      : DataFrame (index=column dates, columns=tickers), > 0 = held;
+                the return of column t is earned on the positions held at t-1
+
+    Returns a DataFrame indexed by column date with portfolio_ret,
+    benchmark_ret, portfolio_nav, benchmark_nav, n_held, invested_frac.
+    """
+    dates  = column_dates(prices_df.columns)
+    start  = start % len(dates)
+    panel  = prices_df.reindex(held.columns).to_numpy(dtype=float).T
+    ret    = _returns(panel)
+    bench  = _returns(pd.to_numeric(nifty.reindex(prices_df.columns), errors="coerce")
+                      .to_numpy(dtype=float)[:, None])[:, 0]
+
+    prev   = np.zeros(held.shape, dtype=bool)
+    prev[1:] = held.to_numpy()[:-1] > 0
+    n_held = prev.sum(axis=1)
+    valid  = prev & ~np.isnan(ret)
+    n_ret  = valid.sum(axis=1)
+    avg    = np.divide(np.where(valid, ret, 0.0).sum(axis=1), n_ret,
+                       out=np.zeros(len(dates)), where=n_ret > 0)
+
+    gap       = np.ones(len(dates))
+    gap[1:]   = np.maximum(np.diff(dates).astype(float), 1.0)
+    invested  = np.minimum(n_held / max_n, 1.0)
+    port_ret  = invested * avg + (1.0 - invested) * (liquid_yield_pa / CALENDAR_DAYS) * gap
+    bench_ret = np.nan_to_num(bench, nan=0.0)
+
+    sl = slice(start + 1, None)
+    return pd.DataFrame({
+        "portfolio_ret": port_ret[sl],
+        "benchmark_ret": bench_ret[sl],
+        "portfolio_nav": start_nav[0] * np.cumprod(1.0 + port_ret[sl]),
+        "benchmark_nav": start_nav[1] * np.cumprod(1.0 + bench_ret[sl]),
+        "n_held":        n_held[sl],
+        "invested_frac": invested[sl],
+    }, index=dates[sl])
+
+
+def to_records(frame: pd.DataFrame, last_date: str = None) -> list:
+    """
+    Journal records (rounded as Sharpe.py writes them), dated by price
+    column; `last_date` re-dates the final point (Sharpe.py uses the run date).
+    """
+    records = [{
+        "date":          str(d)[:10],
+        "portfolio_nav": round(float(r.portfolio_nav), 4),
+        "benchmark_nav": round(float(r.benchmark_nav), 4),
+        "portfolio_ret": round(float(r.portfolio_ret), 6),
+        "benchmark_ret": round(float(r.benchmark_ret), 6),
+        "n_held":        int(r.n_held),
+        "invested_frac": round(float(r.invested_frac), 3),
+    } for d, r in zip(frame.index, frame.itertuples())]
+    if records and last_date:
+        records[-1]["date"] = last_date
+    return records
+
+
+def anchor_nav(existing: list, day) -> tuple:
+    """
+    (portfolio, benchmark) NAV of the last of the date-sorted journal records
+    `existing` dated on or before `day`, so a curve rebuilt from that column
+    continues the recorded history; (START_NAV, START_NAV) if there is none.
+    """
+    i = bisect.bisect_right([r["date"] for r in existing], str(day)[:10]) - 1
+    if i < 0:
+        return START_NAV, START_NAV
+    return existing[i]["portfolio_nav"], existing[i]["benchmark_nav"]
+
+
+def merge_records(existing: list, records: list) -> list:
+    """The journal records dated before the first of `records`, then `records`."""
+    if not records:
+        return list(existing)
+    return [r for r in existing if r["date"] < records[0]["date"]] + list(records)
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the equity curve from the tradelog")
+    parser.add_argument("universe", nargs="?", default="N500")
+    parser.add_argument("--write", action="store_true",
+                        help="replace the journal from the first rebuilt date on")
+    args = parser.parse_args()
+
+    cfg = ml.load_config(str(SCRIPT_DIR))
+    prices_df, nifty, _, _ = ml.load_prices(str(SCRIPT_DIR / f"{args.universe}_updated.xlsx"))
+    with open(SCRIPT_DIR / f"{args.universe}_tradelog.json", "r") as f:
+        txs = json.load(f)
+
+    dates = column_dates(prices_df.columns)
+    held  = holdings_from_tradelog(txs, dates)
+    first = min(tx["date"] for tx in txs) if txs else str(dates[-1])
+    start = max(column_index(dates, datetime.date.fromisoformat(first)), 0)
+    # only --write imports a legacy JSON into the journal; a preview reads what exists
+    legacy   = SCRIPT_DIR / f"{args.universe}_equity_history.json"
+    path     = hj.ensure_journal(legacy) if args.write else hj.journal_path(legacy)
+    existing = hj.read_records(path)
+    frame = nav_frame(prices_df, nifty, held, cfg["max_n"], start=start,
+                      start_nav=anchor_nav(existing, dates[start]))
+    records = to_records(frame)
+    if records:
+        print(f"{len(records)} day(s) {records[0]['date']} -> {records[-1]['date']}  |  "
+              f"Portfolio NAV {records[-1]['portfolio_nav']:.2f}  |  "
+              f"Benchmark NAV {records[-1]['benchmark_nav']:.2f}")
+    if args.write:
+        merged = merge_records(existing, records)
+        hj.replace_records(path, merged)
+        print(f"Journal rewritten -> {path.name}  "
+              f"({len(merged) - len(records)} earlier day(s) kept)")
@@ -0,0 +1,257 @@
+"""
+history_journal.py
+==================
+Append-only daily time-series journal shared by the equity / regime
+histories:
+
+    Sharpe.py            {universe}_equity_history   one NAV point per day
+    sharpe_dashboard.py  {universe}_regime_history   one regime score per day
+    milt_strategy.py     MILT_equity_history         one NAV point per run day
+
+Each used to load, modify and rewrite a whole JSON array to add a single
+day (the dashboard on every rerun, with a linear scan for today's date).
+A journal is a newline-delimited JSON file next to the legacy one
+
+    N750_equity_history.json  →  N750_equity_history.jsonl
+
+with one record per line, in date order:
+
+  * append_record() is one O(1) line append. Writing a date again appends
+    a superseding line (upsert) — readers keep the last line per date — and
+    re-writing an identical last record is a no-op, so reruns are idempotent.
+  * read_records() parses only the bytes appended since the previous read
+    in this process and bisects the sorted dates for a start / end range.
+  * last_record() reads just the tail of the file.
+  * Superseded lines are dropped by compact(), which read_records() runs
+    automatically once they outnumber the live records.
+  * Writers (append, compact, replace, the one-time import) take an
+    exclusive cross-process lock on <journal>.lock, so a compaction in one
+    process cannot drop a line another process appends while it rewrites.
+
+The legacy JSON is imported once, the first time its journal is opened
+(ensure_journal), and left in place untouched.
+
+Functions
+---------
+journal_path(json_path)                   — <stem>.jsonl next to a legacy JSON file
+ensure_journal(json_path)                 — import the legacy JSON once; journal path
+append_record(path, record)               — O(1) append / same-date upsert
+read_records(path, start, end)            — last record per date, sorted, in [start, end]
+last_record(path)                         — most recent record (tail read)
+compact(path)                             — rewrite without superseded lines
+replace_records(path, records)            — rewrite the journal with `records`
+"""
+
+import bisect
+import contextlib
+import json
+import os
+import threading
+from pathlib import Path
+
+
+# ── CONFIG ────────────────────────────────────────────────────────────────────
+JOURNAL_SUFFIX = ".jsonl"
+KEY            = "date"       # ISO date string; one live record per key
+COMPACT_MIN    = 50           # never auto-compact for fewer superseded lines
+TAIL_BYTES     = 4096
+LOCK_SUFFIX    = ".lock"
+
+_lock  = threading.Lock()
+_cache = {}                   # path → {"stamp", "offset", "records", "dates", "lines"}
+
+
+def journal_path(json_path) -> Path:
+    p = Path(json_path)
+    return p.with_name(p.stem + JOURNAL_SUFFIX)
+
+
+def _dumps(record: dict) -> str:
+    return json.dumps(record, default=str, separators=(", ", ": "))
+
+
+@contextlib.contextmanager
+def _journal_lock(path: Path):
+    """Exclusive cross-process (and cross-thread) lock on the journal's writers."""
+    with open(path.with_name(path.name + LOCK_SUFFIX), "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:             # LK_LOCK gives up after ~10 s; keep waiting
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+# ── MIGRATION ─────────────────────────────────────────────────────────────────
+
+def ensure_journal(json_path) -> Path:
+    """
+    Journal for the legacy JSON array at `json_path`. The first time (no
+    journal yet) the array is imported — sorted by date, last entry per date
+    winning — and written atomically; the JSON file itself is not touched.
+    """
+    path = journal_path(json_path)
+    if path.exists():
+        return path
+    with _journal_lock(path):
+        if path.exists():                       # imported by another process meanwhile
+            return path
+        records = []
+        try:
+            with open(json_path, "r") as f:
+                records = json.load(f)
+        except Exception:
+            pass
+        live = {}
+        for rec in records if isinstance(records, list) else []:
+            if isinstance(rec, dict) and rec.get(KEY):
+                live[str(rec[KEY])] = rec
+        _write(path, [live[k] for k in sorted(live)])
+    return path
+
+
+def _write(path: Path, records: list):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        for rec in records:
+            f.write(_dumps(rec) + "\n")
+    os.replace(tmp, path)
+    with _lock:
+        _cache.pop(str(path), None)
+
+
+# ── WRITE ─────────────────────────────────────────────────────────────────────
+
+def append_record(path, record: dict) -> bool:
+    """
+    Append `record` (which must carry a "date"). A record for a date already
+    in the journal supersedes it; a record identical to the current last
+    one is not written again. Returns True if a line was appended.
+    """
+    path = Path(path)
+    with _journal_lock(path):
+        if last_record(path) == json.loads(_dumps(record)):
+            return False
+        with open(path, "a") as f:
+            f.write(_dumps(record) + "\n")
+    return True
+
+
+def compact(path):
+    """Rewrite the journal keeping only the live (last-per-date) records."""
+    path = Path(path)
+    with _journal_lock(path):
+        _write(path, read_records(path, _compact=False))
+
+
+def replace_records(path, records: list):
+    """Rewrite the journal with `records` (sorted, last entry per date winning)."""
+    path = Path(path)
+    live = {str(rec[KEY]): rec for rec in records}
+    with _journal_lock(path):
+        _write(path, [live[k] for k in sorted(live)])
+
+
+# ── READ ──────────────────────────────────────────────────────────────────────
+
+def _stamp(path: Path):
+    try:
+        st = path.stat()
+        return st.st_mtime_ns, st.st_size
+    except OSError:
+        return None
+
+
+def _load(path: Path) -> dict:
+    """Parsed journal state, extended with just the bytes appended since the
+    last call (a shrunk or rewritten file is parsed from the start)."""
+    key   = str(path)
+    stamp = _stamp(path)
+    with _lock:
+        state = _cache.get(key)
+        if stamp is None:
+            _cache.pop(key, None)
+            return {"records": {}, "dates": [], "lines": 0}
+        if state is not None and state["stamp"] == stamp:
+            return state
+        if state is None or stamp[1] < state["offset"]:
+            state = {"stamp": None, "offset": 0, "records": {}, "dates": [], "lines": 0}
+        with open(path, "rb") as f:
+            f.seek(state["offset"])
+            chunk = f.read()
+        end = chunk.rfind(b"\n") + 1           # ignore a partially written last line
+        records, dates = dict(state["records"]), list(state["dates"])
+        lines = state["lines"]
+        for line in chunk[:end].splitlines():
+            try:
+                rec = json.loads(line)
+                date = str(rec[KEY])
+            except Exception:
+                continue
+            lines += 1
+            if date not in records:
+                if dates and date < dates[-1]:
+                    bisect.insort(dates, date)
+                else:
+                    dates.append(date)
+            records[date] = rec
+        state = {"stamp": stamp if end == len(chunk) else None,
+                 "offset": state["offset"] + end,
+                 "records": records, "dates": dates, "lines": lines}
+        _cache[key] = state
+        return state
+
+
+def read_records(path, start: str = None, end: str = None, _compact: bool = True) -> list:
+    """
+    Live records (last line per date) sorted by date, optionally limited to
+    start <= date <= end (ISO strings). An empty list if the journal is missing.
+    """
+    path  = Path(path)
+    state = _load(path)
+    dates = state["dates"]
+    lo = bisect.bisect_left(dates, start) if start else 0
+    hi = bisect.bisect_right(dates, end) if end else len(dates)
+    out = [state["records"][d] for d in dates[lo:hi]]
+    if _compact and state["lines"] - len(dates) > max(COMPACT_MIN, len(dates)):
+        try:
+            compact(path)
+        except OSError:
+            pass
+    return out
+
+
+def last_record(path):
+    """The most recent record (last line), read from the file's tail; None if empty."""
+    path = Path(path)
+    try:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(0, size - TAIL_BYTES))
+            tail = f.read()
+    except OSError:
+        return None
+    lines = tail.rstrip(b"\n").split(b"\n")
+    if size > TAIL_BYTES and len(lines) < 2:          # one line longer than the tail
+        records = read_records(path, _compact=False)
+        return records[-1] if records else None
+    try:
+        return json.loads(lines[-1]) if lines[-1] else None
+    except Exception:
+        return None
@@ -0,0 +1,240 @@
+"""
+live_quotes.py
+==============
+Shared live-quote service for the holdings "Refresh" buttons in
+sharpe_dashboard.py, ETFs/etf_dashboard.py, ETFs/etf_momentum_gui_v2.py and
+MILT Strategy/milt_gui.py.
+
+Each app used to fetch quotes its own way, mostly one
+yf.Ticker(...).fast_info.last_price call per holding on a 20-thread pool
+(plus a serial .BO retry). get_quotes() instead:
+
+  * serves any ticker quoted within `ttl` seconds from a cache persisted
+    to live_quotes_cache.json and shared by all the apps, keyed by ticker
+    and exchange chain ("RELIANCE.NS|BO"), so an NS-only caller never gets
+    a BSE fallback price;
+  * fetches every remaining ticker in ONE batched provider call (Yahoo:
+    a single yf.download for all .NS symbols, a second only for the
+    symbols that came back empty when .BO fallback is enabled);
+  * coalesces concurrent requests — a ticker already being fetched for
+    another tab / thread is waited on, not fetched again.
+
+Providers are plain callables  provider(tickers, exchanges) -> {ticker: price}.
+For offline testing, point LIVE_QUOTES_STUB at a JSON file of
+{ticker: price} (or pass provider=stub_provider({...})) and no network call
+is made.
+
+Functions
+---------
+yahoo_provider(tickers, exchanges)      — batched yf.download, latest close per ticker
+stub_provider(prices)                   — provider serving a fixed {ticker: price} dict
+file_provider(path)                     — provider reading {ticker: price} from JSON
+default_provider()                      — LIVE_QUOTES_STUB file if set, else Yahoo
+get_quotes(tickers, ttl, exchanges, provider, cache_path)
+clear_cache(cache_path)
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+# ── CONFIG ────────────────────────────────────────────────────────────────────
+SCRIPT_DIR     = Path(__file__).resolve().parent
+CACHE_FILE     = SCRIPT_DIR / "live_quotes_cache.json"
+DEFAULT_TTL    = 120          # seconds a quote is served from cache
+WAIT_TIMEOUT   = 60           # max seconds to wait on another caller's fetch
+STUB_ENV       = "LIVE_QUOTES_STUB"
+SYMBOL_OVERRIDES = {"NIFTY500": "^CRSLDX"}    # index tickers: no exchange suffix
+
+_lock      = threading.Lock()
+_inflight  = {}               # ticker → threading.Event set when its fetch ends
+_memory    = {"path": None, "stamp": None, "quotes": {}}
+
+
+# ── PROVIDERS ─────────────────────────────────────────────────────────────────
+
+def _latest_closes(data, symbols: list) -> dict:
+    """{symbol: last non-NaN close} from a yf.download frame."""
+    import pandas as pd
+    if data is None or data.empty:
+        return {}
+    if isinstance(data.columns, pd.MultiIndex):
+        if "Close" not in data.columns.get_level_values(0):
+            return {}
+        close = data["Close"]
+    else:
+        # yfinance collapses the MultiIndex when only one symbol is requested
+        if "Close" not in data.columns:
+            return {}
+        close = data[["Close"]].rename(columns={"Close": symbols[0]})
+    out = {}
+    for sym in symbols:
+        if sym in close.columns:
+            s = close[sym].dropna()
+            if len(s):
+                out[sym] = float(s.iloc[-1])
+    return out
+
+
+def _symbol(ticker: str, exchange: str) -> str:
+    """Yahoo symbol for a sheet ticker on `exchange` (indices are used as is)."""
+    if ticker in SYMBOL_OVERRIDES:
+        return SYMBOL_OVERRIDES[ticker]
+    t = ticker.upper()
+    return t if t.startswith("^") else f"{t}.{exchange}"
+
+
+def yahoo_provider(tickers: list, exchanges: tuple = ("NS", "BO")) -> dict:
+    """
+    Latest price per ticker from one yf.download per exchange: all tickers on
+    the first exchange, then only the misses on the next. period="5d" so a
+    weekend / holiday still resolves to the last trading day.
+
+    This is the price fast_info.last_price reported: yfinance derives it
+    from the last unadjusted daily bar, which during market hours is the
+    current session's bar (hence auto_adjust=False).
+    """
+    import yfinance as yf
+    out, todo = {}, list(tickers)
+    for exchange in exchanges:
+        if not todo:
+            break
+        symbols = {_symbol(t, exchange): t for t in todo}
+        try:
+            data = yf.download(list(symbols), period="5d", auto_adjust=False,
+                               progress=False, threads=True)
+        except Exception:
+            continue
+        for sym, px in _latest_closes(data, list(symbols)).items():
+            out[symbols[sym]] = px
+        todo = [t for t in todo if t not in out]
+    return out
+
+
+def stub_provider(prices: dict):
+    """Provider serving a fixed {ticker: price} dict (offline tests / demos)."""
+    def provider(tickers, exchanges=None):
+        return {t: float(prices[t]) for t in tickers if t in prices}
+    return provider
+
+
+def file_provider(path):
+    """Provider reading {ticker: price} from a JSON file on every call."""
+    def provider(tickers, exchanges=None):
+        with open(path, "r") as f:
+            prices = json.load(f)
+        return stub_provider(prices)(tickers)
+    return provider
+
+
+def default_provider():
+    """The LIVE_QUOTES_STUB file provider if that variable is set, else Yahoo."""
+    stub = os.environ.get(STUB_ENV)
+    return file_provider(stub) if stub else yahoo_provider
+
+
+# ── CACHE ─────────────────────────────────────────────────────────────────────
+
+def _load_cache(path: Path) -> dict:
+    """{key: [price, fetched_at]}; the in-memory copy is reused until the file changes."""
+    try:
+        st    = path.stat()
+        stamp = (st.st_mtime, st.st_size)
+    except OSError:
+        return {}
+    if _memory["path"] == path and _memory["stamp"] == stamp:
+        return _memory["quotes"]
+    try:
+        with open(path, "r") as f:
+            quotes = json.load(f)
+    except Exception:
+        quotes = {}
+    _memory.update(path=path, stamp=stamp, quotes=quotes)
+    return quotes
+
+
+def _cache_key(ticker: str, exchanges: tuple) -> str:
+    return f"{ticker}.{'|'.join(exchanges)}"
+
+
+def _store_quotes(path: Path, fetched: dict):
+    """Merge `fetched` into the cache file (re-read first: other apps share it)."""
+    now    = time.time()
+    quotes = dict(_load_cache(path))
+    quotes.update({t: [px, now] for t, px in fetched.items()})
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp, "w") as f:
+            json.dump(quotes, f, indent=1)
+        os.replace(tmp, path)
+        st = path.stat()
+        _memory.update(path=path, stamp=(st.st_mtime, st.st_size), quotes=quotes)
+    except OSError:
+        _memory.update(path=path, stamp=None, quotes=quotes)
+
+
+def clear_cache(cache_path=CACHE_FILE):
+    with _lock:
+        try:
+            Path(cache_path).unlink()
+        except OSError:
+            pass
+        _memory.update(path=None, stamp=None, quotes={})
+
+
+# ── SERVICE ───────────────────────────────────────────────────────────────────
+
+def get_quotes(tickers: list, ttl: float = DEFAULT_TTL,
+               exchanges: tuple = ("NS", "BO"), provider=None,
+               cache_path=CACHE_FILE) -> dict:
+    """
+    Latest price for each of `tickers` — from cache if quoted within `ttl`
+    seconds, otherwise in one batched provider call shared with any
+    concurrent caller. Returns {ticker: price} for tickers that resolved;
+    failed ones are simply absent (callers keep their fallback price).
+    """
+    cache_path = Path(cache_path)
+    provider   = provider or default_provider()
+    tickers    = list(dict.fromkeys(tickers))
+    exchanges  = tuple(exchanges)
+    key        = {t: _cache_key(t, exchanges) for t in tickers}
+    now        = time.time()
+
+    with _lock:
+        quotes = _load_cache(cache_path)
+        out    = {t: quotes[key[t]][0] for t in tickers
+                  if key[t] in quotes and now - quotes[key[t]][1] <= ttl}
+        waits, mine = [], []
+        for t in tickers:
+            if t in out:
+                continue
+            if key[t] in _inflight:
+                waits.append(_inflight[key[t]])
+            else:
+                _inflight[key[t]] = threading.Event()
+                mine.append(t)
+
+    if mine:
+        try:
+            fetched = provider(mine, exchanges) or {}
+        except Exception:
+            fetched = {}
+        with _lock:
+            if fetched:
+                _store_quotes(cache_path, {key[t]: px for t, px in fetched.items() if t in key})
+            for t in mine:
+                _inflight.pop(key[t]).set()
+        out.update({t: fetched[t] for t in mine if t in fetched})
+
+    for event in waits:
+        event.wait(WAIT_TIMEOUT)
+    if waits:
+        with _lock:
+            quotes = _load_cache(cache_path)
+        out.update({t: quotes[key[t]][0] for t in tickers
+                    if t not in out and key[t] in quotes
+                    and now - quotes[key[t]][1] <= ttl + WAIT_TIMEOUT})
+    return {t: out[t] for t in tickers if t in out}
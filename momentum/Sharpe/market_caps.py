@@ -0,0 +1,255 @@
+"""
+market_caps.py
+==============
+Offline market-cap snapshot store for the cap-tier momentum view.
+
+The dashboard's Yahoo cap-tier view used to fire ~750 yf.Ticker().fast_info
+calls on 30 threads (with a .BO retry per failure) whenever its 24h cache
+expired, blocking the page for ~15s. Market caps now live in a local store
+
+    market_caps.npz     ticker, market cap (INR), fetched-at (epoch s), exchange
+
+refreshed in bulk at most once a day by the precompute service (or the CLI
+below). Only tickers that are missing or older than MAX_AGE_HOURS are
+fetched, in batches on a bounded thread pool; the store is written after
+every batch so an interrupted refresh keeps what it fetched. Reading the
+store and computing the tier table never touches the network, so the view
+works offline from the last snapshot.
+
+    python market_caps.py                     # refresh stale tickers if due
+    python market_caps.py --force --workers 4 # refresh now
+
+Functions
+---------
+market_cap_store_path(base_dir)                  — store file
+load_market_caps(path)                           — DataFrame MCAP / FETCHED_AT / EXCHANGE
+save_market_caps(path, caps, last_refresh)
+stale_tickers(caps, tickers, max_age_hours)      — tickers due for a fetch
+refresh_due(path, min_interval_hours)            — has the daily refresh window passed?
+fetch_market_caps(tickers, fetcher, max_workers, batch_size, on_batch)
+refresh_market_caps(path, tickers, ...)          — fetch stale tickers into the store
+cap_tier_momentum(prices_df, stock_tickers, caps) — % positive 63-day momentum per tier
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+import momentum_lib as ml
+
+
+# ── CONFIG ────────────────────────────────────────────────────────────────────
+STORE_FILENAME       = "market_caps.npz"
+MAX_AGE_HOURS        = 24         # a ticker's cap is refetched once older than this
+MIN_INTERVAL_HOURS   = 24         # at most one bulk refresh per day
+MAX_WORKERS          = 8
+BATCH_SIZE           = 100
+EXCHANGES            = ("NS", "BO")
+
+TIER_BOUNDS = [(100, "Large Cap (1-100)"),
+               (250, "Mid Cap (101-250)"),
+               (500, "Small Cap (251-500)"),
+               (None, "Micro Cap (501+)")]
+
+
+def market_cap_store_path(base_dir=SCRIPT_DIR) -> Path:
+    return Path(base_dir) / STORE_FILENAME
+
+
+# ── STORE ─────────────────────────────────────────────────────────────────────
+
+def _empty_caps() -> pd.DataFrame:
+    return pd.DataFrame({"MCAP": pd.Series(dtype=float),
+                         "FETCHED_AT": pd.Series(dtype=float),
+                         "EXCHANGE": pd.Series(dtype=object)})
+
+
+def load_market_caps(path) -> pd.DataFrame:
+    """
+    The stored snapshot, indexed by ticker.
+
+    Returns DataFrame:
+      MCAP        : float   market cap in INR (NaN if every fetch failed)
+      FETCHED_AT  : float   epoch seconds of the last successful fetch
+      EXCHANGE    : str     "NS" / "BO"
+    DataFrame.attrs["last_refresh"] holds the epoch of the last bulk refresh.
+    """
+    path = Path(path)
+    if not path.exists():
+        caps = _empty_caps()
+        caps.attrs["last_refresh"] = 0.0
+        return caps
+    with np.load(path, allow_pickle=False) as z:
+        caps = pd.DataFrame({"MCAP":       z["mcap"],
+                             "FETCHED_AT": z["fetched_at"],
+                             "EXCHANGE":   z["exchange"].astype(object)},
+                            index=pd.Index(z["tickers"].tolist()))
+        caps.attrs["last_refresh"] = float(z["last_refresh"])
+    return caps
+
+
+def save_market_caps(path, caps: pd.DataFrame, last_refresh: float = None):
+    """Write `caps` atomically (.tmp + os.replace)."""
+    path = Path(path)
+    if last_refresh is None:
+        last_refresh = caps.attrs.get("last_refresh", 0.0)
+    tmp = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp,
+             tickers=np.array([str(t) for t in caps.index], dtype=str),
+             mcap=caps["MCAP"].to_numpy(dtype=float),
+             fetched_at=caps["FETCHED_AT"].to_numpy(dtype=float),
+             exchange=np.array([str(e) for e in caps["EXCHANGE"]], dtype=str),
+             last_refresh=np.float64(last_refresh))
+    os.replace(tmp, path)
+
+
+def stale_tickers(caps: pd.DataFrame, tickers: list,
+                  max_age_hours: float = MAX_AGE_HOURS, now: float = None) -> list:
+    """Tickers with no stored cap, or one fetched more than max_age_hours ago."""
+    now     = time.time() if now is None else now
+    fetched = caps["FETCHED_AT"].reindex(tickers).to_numpy(dtype=float)
+    due     = np.isnan(fetched) | (now - fetched > max_age_hours * 3600)
+    return [t for t, d in zip(tickers, due) if d]
+
+
+def refresh_due(path, min_interval_hours: float = MIN_INTERVAL_HOURS,
+                now: float = None) -> bool:
+    """True if no bulk refresh has run in the last min_interval_hours."""
+    now = time.time() if now is None else now
+    return now - load_market_caps(path).attrs["last_refresh"] >= min_interval_hours * 3600
+
+
+# ── FETCH ─────────────────────────────────────────────────────────────────────
+
+def _yahoo_market_cap(ticker: str):
+    """(market_cap, exchange) from Yahoo fast_info, NSE first then BSE."""
+    try:
+        import yfinance as yf
+    except ImportError:
+        return None, None
+    for exchange in EXCHANGES:
+        try:
+            mcap = yf.Ticker(f"{ticker}.{exchange}").fast_info.market_cap
+        except Exception:
+            continue
+        if mcap and mcap > 0:
+            return float(mcap), exchange
+    return None, None
+
+
+def fetch_market_caps(tickers: list, fetcher=None, max_workers: int = MAX_WORKERS,
+                      batch_size: int = BATCH_SIZE, on_batch=None) -> dict:
+    """
+    Fetch market caps for `tickers` in batches of `batch_size`, at most
+    `max_workers` requests in flight. `fetcher(ticker) -> (mcap, exchange)`
+    defaults to Yahoo fast_info. `on_batch(partial_dict)` is called after each
+    batch. Returns {ticker: (mcap, exchange)} for successful fetches only.
+    """
+    fetcher = fetcher or _yahoo_market_cap
+    fetched = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as exe:
+        for start in range(0, len(tickers), batch_size):
+            batch = tickers[start:start + batch_size]
+            part  = {}
+            for t, (mcap, exchange) in zip(batch, exe.map(fetcher, batch)):
+                if mcap is not None and mcap > 0:
+                    part[t] = (mcap, exchange)
+            fetched.update(part)
+            if on_batch is not None:
+                on_batch(part)
+    return fetched
+
+
+def refresh_market_caps(path, tickers: list, force: bool = False,
+                        max_age_hours: float = MAX_AGE_HOURS,
+                        min_interval_hours: float = MIN_INTERVAL_HOURS,
+                        fetcher=None, max_workers: int = MAX_WORKERS,
+                        batch_size: int = BATCH_SIZE) -> int:
+    """
+    Fetch every stale ticker into the store at `path` — unless a bulk
+    refresh already ran within min_interval_hours (`force` overrides).
+    Tickers that fail keep their previous value. Returns tickers updated.
+    """
+    path = Path(path)
+    if not force and not refresh_due(path, min_interval_hours):
+        return 0
+    caps  = load_market_caps(path)
+    stale = stale_tickers(caps, list(dict.fromkeys(tickers)), max_age_hours)
+    state = {"caps": caps, "n": 0}
+
+    def _merge(part):
+        if not part:
+            return
+        now  = time.time()
+        rows = pd.DataFrame({"MCAP":       [v[0] for v in part.values()],
+                             "FETCHED_AT": now,
+                             "EXCHANGE":   [v[1] for v in part.values()]},
+                            index=list(part))
+        merged = pd.concat([state["caps"].drop(index=rows.index, errors="ignore"), rows])
+        save_market_caps(path, merged, last_refresh=caps.attrs["last_refresh"])
+        state["caps"], state["n"] = merged, state["n"] + len(part)
+
+    fetch_market_caps(stale, fetcher, max_workers, batch_size, on_batch=_merge)
+    save_market_caps(path, state["caps"], last_refresh=time.time())
+    return state["n"]
+
+
+# ── TIERS ─────────────────────────────────────────────────────────────────────
+
+def cap_tier_momentum(prices_df: pd.DataFrame, stock_tickers: list,
+                      caps: pd.DataFrame) -> pd.DataFrame:
+    """
+    % of stocks with positive 63-day momentum per market-cap tier, ranking
+    the stored caps (largest = rank 1). Tickers without a stored cap are
+    left out. Returns the summary indexed by tier: Total Stocks,
+    Positive Mom Stocks, % Positive.
+    """
+    mcap = caps["MCAP"].reindex(stock_tickers)
+    mcap = mcap[mcap > 0]
+    if mcap.empty:
+        return pd.DataFrame(columns=["Total Stocks", "Positive Mom Stocks", "% Positive"])
+
+    vals   = ml._right_align_valid(prices_df.loc[mcap.index].to_numpy(dtype=float))
+    n_obs  = (~np.isnan(vals)).sum(axis=1)
+    mom_63 = np.where(n_obs >= 63, vals[:, -1] / vals[:, -63] - 1.0, np.nan)
+
+    rank   = mcap.rank(ascending=False, method="first").to_numpy()
+    bounds = [b for b, _ in TIER_BOUNDS[:-1]]
+    labels = [lbl for _, lbl in TIER_BOUNDS]
+    df = pd.DataFrame({"Cap Tier":    np.array(labels, dtype=object)[np.searchsorted(bounds, rank)],
+                       "Is_Positive": mom_63 > 0})
+
+    summary = df.groupby("Cap Tier")["Is_Positive"].agg(["count", "sum"])
+    summary["% Positive"] = (summary["sum"] / summary["count"] * 100).round(1)
+    summary = summary.rename(columns={"count": "Total Stocks", "sum": "Positive Mom Stocks"})
+    return summary.reindex(labels).dropna()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the market-cap snapshot store")
+    parser.add_argument("files", nargs="*", help="workbooks whose tickers to cover "
+                                                 "(default: every *_updated.xlsx)")
+    parser.add_argument("--force", action="store_true", help="ignore the once-a-day limit")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS)
+    parser.add_argument("--max-age", type=float, default=MAX_AGE_HOURS,
+                        help="refetch tickers older than this many hours")
+    args = parser.parse_args()
+
+    files = ([SCRIPT_DIR / f for f in args.files] if args.files else
+             sorted(SCRIPT_DIR.glob("*_updated.xlsx")))
+    tickers = []
+    for f in files:
+        tickers += ml.load_prices(str(f))[2]
+    store = market_cap_store_path(SCRIPT_DIR)
+    n = refresh_market_caps(store, tickers, force=args.force,
+                            max_age_hours=args.max_age, max_workers=args.workers)
+    caps = load_market_caps(store)
+    print(f"{n} ticker(s) fetched; {len(caps)} in {store.name}")
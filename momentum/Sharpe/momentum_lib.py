@@ -6,14 +6,27 @@ Reusable computation library for momentum scoring of NSE stocks.
 Functions
 ---------
 load_prices(filepath)
-    Load price data from the DATA sheet of an n500-format xlsx file.
+    Load price data from the DATA sheet of an n500-format xlsx file
+    (served from the columnar .npz store when it is fresh).
     Returns (prices_df, nifty_series, stock_tickers, dates)
 
+write_price_store(filepath, sheets) / read_price_store(filepath, sheet_name)
+    Columnar NumPy store per sheet (<stem>.<SHEET>.npz) with ticker and date
+    indexes, fingerprinted against the xlsx it was parsed from.
+
 compute_sharpe(prices_df, stock_tickers, windows, rfr_daily, trading_days)
     Compute per-window Sharpe ratios and cross-sectional Z-scores.
     Returns (sharpe_df, z_df)
     z_df contains Z_<label> columns plus COMPOSITE, SHARPE_ALL, SHARPE_3.
 
+sharpe_z_scores(sharpe_df, windows)
+    Quiet Z-scoring half of compute_sharpe (shared with walkforward.py).
+
+compute_sharpe_matrix(prices_df, stock_tickers, windows, rfr_daily, trading_days, adjusted)
+    Matrix backend for compute_sharpe / compute_adjusted_sharpe: log returns
+    are computed once for the whole panel, every window in a few reductions.
+    Returns sharpe_df (index=ticker, cols=window labels).
+
 compute_adjusted_sharpe(prices_df, stock_tickers, windows, rfr_daily, trading_days)
     [DORMANT — not used in live ranking. Activate by swapping into Sharpe.py]
     Compute Pezier-White Adjusted Sharpe per window and cross-sectional Z-scores.
@@ -32,6 +45,7 @@ compute_residual_momentum(prices_df, stock_tickers, nifty_series, windows, tradi
     OLS vs NIFTY500: alpha / residual volatility) and Z-scores.
     Returns (resmom_df, rs_z_df)
     rs_z_df contains RZ_<label> columns plus RES_MOM.
+    Batched closed-form OLS over the shared date axis (engine="matrix").
 
 compute_returns(prices_df, stock_tickers)
     Compute 1M / 3M / 12M price returns for each stock.
@@ -52,16 +66,31 @@ normalise_composite(v)
     Non-linear normalisation: v>1 → v+1, v<0 → 1/(1-v), else unchanged.
 
 load_volume(filepath)
-    Load the VOLUME sheet from the xlsx file (same format as DATA).
+    Load the VOLUME sheet from the xlsx file (same format as DATA, store-first).
     Returns volume_df (index=ticker, columns=dates) or None if sheet absent.
 
 compute_turnover(prices_df, volume_df, stock_tickers, windows)
     Compute median daily turnover (price × volume) per stock per window.
     Returns turnover_df with TURNOVER_12M, TURNOVER_6M columns (in ₹ Cr).
+
+load_price_bands(band_csv_path) / compute_circuit_hits(...) / circuit_hit_history(...)
+    Price_Band_List.csv parsed once (SERIES, BAND); UC/LC circuit-close
+    counts for the whole panel, latest or point-in-time per date.
+
+early_mover_signals(scores, z3m, n_points)
+    Early Movers velocity (trailing OLS slope) and consecutive-rise streak for
+    every ticker of a (runs × tickers) score history at once — shared by the
+    dashboard and the streak / Early Movers backtests.
+
+cached_universe_rankings(prices_df, nifty_series, stock_tickers, volume_df, ...)
+    compute_universe_rankings() behind a persistent content-addressed cache
+    (rankings_cache/<sha1>.npz, LRU-evicted by total size).
 """
 
 import datetime
+import hashlib
 import json
+import os
 import warnings
 
 import numpy as np
@@ -181,27 +210,30 @@ def _infer_dates_for_columns(date_indices: list[int]) -> list:
     return result
 
 
-def load_prices(filepath: str):
+def _parse_wide_sheet(filepath: str, sheet_name: str):
     """
-    Load the DATA sheet from an n500-format xlsx file.
+    Parse one tickers × dates sheet (DATA / VOLUME layout) with openpyxl.
 
     The date header row is driven by a dynamic Excel array formula whose
-    cached values are wiped whenever openpyxl saves the file.  This function
-    first tries to read dates from the header; if none are found it infers
-    them by replicating the formula logic anchored to today's date.
+    cached values are wiped whenever openpyxl saves the file.  Dates are
+    read from the header when present, otherwise inferred by replicating
+    the formula logic anchored to today's date.
 
-    Returns
-    -------
-    prices_df     : DataFrame  (index=ticker, columns=dates) — stocks only
-    nifty_series  : Series     — NIFTY500 daily closes
-    stock_tickers : list[str]  — all tickers except NIFTY500
-    dates         : list       — date objects for each price column
+    Prices must be > 0 to count as valid; VOLUME also accepts 0.
+    Returns a DataFrame (index=ticker, columns=dates, duplicates dropped)
+    or None if the sheet is absent or holds no data.
     """
-    wb       = openpyxl.load_workbook(filepath, data_only=True, read_only=True)
-    ws       = wb["DATA"]
+    wb = openpyxl.load_workbook(filepath, data_only=True, read_only=True)
+    if sheet_name not in wb.sheetnames:
+        wb.close()
+        return None
+    ws       = wb[sheet_name]
     all_rows = list(ws.iter_rows(values_only=True))
     wb.close()
 
+    if not all_rows:
+        return None
+
     header = all_rows[0]
 
     # ── Try to read dates directly from the header row ────────────────────────
@@ -212,9 +244,7 @@ def load_prices(filepath: str):
         dates = [h.date() if isinstance(h, datetime.datetime) else h
                  for h in (header[i] for i in date_indices)]
     else:
-        # ── Fallback: infer from where numeric price data sits ────────────────
-        print("  Note: date headers not cached in file — inferring dates from "
-              "price column positions and today's date.")
+        # ── Fallback: infer from where numeric data sits ──────────────────────
         candidate: set[int] = set()
         for row in all_rows[1: min(11, len(all_rows))]:
             for i, v in enumerate(row):
@@ -226,38 +256,180 @@ def load_prices(filepath: str):
                 except (TypeError, ValueError):
                     pass
         if not candidate:
-            raise ValueError(
-                "load_prices: no date columns found in header and no numeric "
-                "price data detected. Ensure the file was populated by "
-                "update_stock_price.py before running Sharpe.py."
-            )
+            return None
         date_indices = sorted(candidate)
         dates        = _infer_dates_for_columns(date_indices)
-        print(f"  Inferred {len(dates)} trading dates: "
+        print(f"  Note: {sheet_name} date headers not cached in file — inferred "
+              f"{len(dates)} trading dates from column positions: "
               f"{dates[0].strftime('%d-%b-%Y')} -> {dates[-1].strftime('%d-%b-%Y')}")
 
-    tickers, price_matrix = [], []
+    allow_zero = sheet_name == "VOLUME"
+    tickers, matrix = [], []
     for row in all_rows[1:]:
         if row[0] is None:
             continue
-        px = []
+        vals = []
         for i in date_indices:
             v = row[i] if i < len(row) else None
             try:
-                px.append(float(v) if v and float(v) > 0 else np.nan)
+                f = float(v) if v is not None else np.nan
+                vals.append(f if (f > 0 or (allow_zero and f == 0)) else np.nan)
             except Exception:
-                px.append(np.nan)
+                vals.append(np.nan)
         ticker_name = str(row[0]).strip()
         if ticker_name.upper() == "NIFTY 500":
             ticker_name = "NIFTY500"
         tickers.append(ticker_name)
-        price_matrix.append(px)
+        matrix.append(vals)
 
-    prices_df = pd.DataFrame(price_matrix, index=tickers, columns=dates)
-    n_dupes   = prices_df.index.duplicated(keep="first").sum()
+    df      = pd.DataFrame(matrix, index=tickers, columns=dates)
+    n_dupes = df.index.duplicated(keep="first").sum()
     if n_dupes:
-        print(f"  Warning: {n_dupes} duplicate ticker row(s) found — keeping first occurrence only.")
-    prices_df     = prices_df[~prices_df.index.duplicated(keep="first")]
+        print(f"  Warning: {n_dupes} duplicate ticker row(s) in {sheet_name} — "
+              f"keeping first occurrence only.")
+    return df[~df.index.duplicated(keep="first")]
+
+
+# ── COLUMNAR PRICE STORE ──────────────────────────────────────────────────────
+#
+# Parsing a 2.5 MB xlsx with openpyxl costs seconds per sheet; the same panel
+# saved as a NumPy .npz (float64 values + ticker / date indexes) loads in
+# milliseconds. One store file per sheet sits next to the workbook:
+#
+#   N750_updated.xlsx  ->  N750_updated.DATA.npz, N750_updated.VOLUME.npz
+#
+# Each store records the SHA-1 of the xlsx it was parsed from. A store whose
+# fingerprint no longer matches the workbook is stale and ignored; the
+# loaders then parse the xlsx and rewrite the store (best effort).
+
+PRICE_STORE_SHEETS = ("DATA", "VOLUME")
+
+
+def _file_fingerprint(path) -> str:
+    """SHA-1 of a file's bytes (a few ms for a multi-MB workbook)."""
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def price_store_path(filepath: str, sheet_name: str) -> Path:
+    """Store file for one sheet of `filepath` (same folder, same stem)."""
+    p = Path(filepath)
+    return p.with_name(f"{p.stem}.{sheet_name}.npz")
+
+
+def _save_store_frame(df: pd.DataFrame, store_path: Path, source_sha1: str):
+    """Atomically write one parsed sheet to `store_path`."""
+    tmp_path = store_path.with_name(store_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(
+            f,
+            values=df.to_numpy(dtype=np.float64),
+            tickers=np.array(df.index, dtype=str),
+            dates=np.array(list(df.columns), dtype="datetime64[D]"),
+            source_sha1=np.array(source_sha1),
+        )
+    os.replace(tmp_path, store_path)
+
+
+def write_price_store(filepath: str, sheets=PRICE_STORE_SHEETS) -> list:
+    """
+    Parse `sheets` of an xlsx once and write a columnar store per sheet.
+    Called by update_stock_price.py right after it saves the workbook.
+    Sheets absent from the workbook are skipped.
+
+    Returns the list of store paths written.
+    """
+    sha1    = _file_fingerprint(filepath)
+    written = []
+    for sheet_name in sheets:
+        df = _parse_wide_sheet(filepath, sheet_name)
+        if df is None:
+            continue
+        store_path = price_store_path(filepath, sheet_name)
+        _save_store_frame(df, store_path, sha1)
+        written.append(store_path)
+    return written
+
+
+def read_price_store(filepath: str, sheet_name: str, source_sha1: str = None):
+    """
+    Load one sheet from its columnar store.
+
+    Returns a DataFrame (index=ticker, columns=date objects), or None if the
+    store is missing, unreadable, or stale (its recorded fingerprint differs
+    from the current xlsx). If the xlsx itself is gone the store is served
+    as-is.
+    """
+    store_path = price_store_path(filepath, sheet_name)
+    if not store_path.exists():
+        return None
+    try:
+        with np.load(store_path, allow_pickle=False) as z:
+            if Path(filepath).exists():
+                if source_sha1 is None:
+                    source_sha1 = _file_fingerprint(filepath)
+                if str(z["source_sha1"]) != source_sha1:
+                    return None
+            return pd.DataFrame(
+                z["values"],
+                index=z["tickers"].tolist(),
+                columns=z["dates"].astype(object).tolist(),
+            )
+    except Exception:
+        return None
+
+
+def _load_sheet(filepath: str, sheet_name: str, use_store: bool = True):
+    """
+    Store-first sheet loader shared by load_prices / load_volume.
+    Falls back to openpyxl when the store is missing or stale, then
+    refreshes the store so the next load is fast again.
+    """
+    if not use_store:
+        return _parse_wide_sheet(filepath, sheet_name)
+
+    sha1 = _file_fingerprint(filepath) if Path(filepath).exists() else None
+    df   = read_price_store(filepath, sheet_name, source_sha1=sha1)
+    if df is not None:
+        return df
+
+    df = _parse_wide_sheet(filepath, sheet_name)
+    if df is not None and sha1 is not None:
+        try:
+            _save_store_frame(df, price_store_path(filepath, sheet_name), sha1)
+        except OSError:
+            pass  # read-only folder — keep serving from xlsx
+    return df
+
+
+def load_prices(filepath: str, use_store: bool = True):
+    """
+    Load the DATA sheet from an n500-format xlsx file.
+
+    Reads from the columnar store (N750_updated.DATA.npz) when it is fresh,
+    otherwise parses the xlsx (see _parse_wide_sheet for the date-header
+    fallback) and refreshes the store. Pass use_store=False to force the
+    xlsx path.
+
+    Returns
+    -------
+    prices_df     : DataFrame  (index=ticker, columns=dates) — stocks only
+    nifty_series  : Series     — NIFTY500 daily closes
+    stock_tickers : list[str]  — all tickers except NIFTY500
+    dates         : list       — date objects for each price column
+    """
+    prices_df = _load_sheet(filepath, "DATA", use_store=use_store)
+    if prices_df is None:
+        raise ValueError(
+            "load_prices: no date columns found in header and no numeric "
+            "price data detected. Ensure the file was populated by "
+            "update_stock_price.py before running Sharpe.py."
+        )
+
+    dates         = list(prices_df.columns)
     nifty_series  = prices_df.loc["NIFTY500"].copy()
     stock_tickers = [t for t in prices_df.index if t != "NIFTY500"]
     prices_df     = prices_df.loc[stock_tickers]
@@ -267,76 +439,20 @@ def load_prices(filepath: str):
 
 # ── VOLUME LOADING ────────────────────────────────────────────────────────────
 
-def load_volume(filepath: str):
+def load_volume(filepath: str, use_store: bool = True):
     """
-    Load the VOLUME sheet from the xlsx file.
+    Load the VOLUME sheet from the xlsx file (store-first, like load_prices).
 
     Same layout as DATA: tickers in col A, daily traded volume across date
     columns.  Returns a DataFrame (index=ticker, columns=dates) or None if
     the VOLUME sheet does not exist (backward-compatible with older files).
     """
-    wb = openpyxl.load_workbook(filepath, data_only=True, read_only=True)
-    if "VOLUME" not in wb.sheetnames:
-        wb.close()
+    volume_df = _load_sheet(filepath, "VOLUME", use_store=use_store)
+    if volume_df is None:
         return None
 
-    ws = wb["VOLUME"]
-    all_rows = list(ws.iter_rows(values_only=True))
-    wb.close()
-
-    if not all_rows:
-        return None
-
-    header = all_rows[0]
-
-    # Identify date columns from the header
-    date_indices = [i for i, h in enumerate(header)
-                    if isinstance(h, (datetime.datetime, datetime.date))]
-
-    if not date_indices:
-        # Fallback: use same column positions as DATA sheet would
-        candidate: set[int] = set()
-        for row in all_rows[1: min(11, len(all_rows))]:
-            for i, v in enumerate(row):
-                if i == 0:
-                    continue
-                try:
-                    if v is not None and float(v) > 0:
-                        candidate.add(i)
-                except (TypeError, ValueError):
-                    pass
-        if not candidate:
-            return None
-        date_indices = sorted(candidate)
-        # Mirror DATA fallback so price and volume columns align by date.
-        dates = _infer_dates_for_columns(date_indices)
-    else:
-        dates = [h.date() if isinstance(h, datetime.datetime) else h
-                 for h in (header[i] for i in date_indices)]
-
-    tickers, vol_matrix = [], []
-    for row in all_rows[1:]:
-        if row[0] is None:
-            continue
-        vols = []
-        for i in date_indices:
-            v = row[i] if i < len(row) else None
-            try:
-                vols.append(float(v) if v is not None and float(v) >= 0 else np.nan)
-            except Exception:
-                vols.append(np.nan)
-        ticker_name = str(row[0]).strip()
-        if ticker_name.upper() == "NIFTY 500":
-            ticker_name = "NIFTY500"
-        tickers.append(ticker_name)
-        vol_matrix.append(vols)
-
-    volume_df = pd.DataFrame(vol_matrix, index=tickers, columns=dates)
-    volume_df = volume_df[~volume_df.index.duplicated(keep="first")]
     # Exclude NIFTY500 — no meaningful volume for the index
-    volume_df = volume_df.loc[[t for t in volume_df.index if t != "NIFTY500"]]
-
-    return volume_df
+    return volume_df.loc[[t for t in volume_df.index if t != "NIFTY500"]]
 
 
 # ── TURNOVER ──────────────────────────────────────────────────────────────────
@@ -455,11 +571,101 @@ def _adjusted_sharpe_ratio(series: pd.Series, window: int,
     return raw_sharpe * adjustment
 
 
+# ── MATRIX SHARPE ENGINE ──────────────────────────────────────────────────────
+
+def _right_align_valid(values: np.ndarray) -> np.ndarray:
+    """
+    Shift each row's non-NaN values to the right edge (order preserved),
+    padding the left with NaN. Row-wise equivalent of `series.dropna()`
+    anchored on the latest observation.
+    """
+    order = np.argsort(~np.isnan(values), axis=1, kind="stable")
+    return np.take_along_axis(values, order, axis=1)
+
+
+def _log_return_matrix(prices_df: pd.DataFrame, stock_tickers: list):
+    """
+    Log returns between consecutive valid closes for the whole
+    (ticker × date) panel, computed once.
+
+    Returns
+    -------
+    rets  : ndarray (n_tickers, n_dates - 1), right-aligned — a ticker with
+            k valid prices has its k-1 returns in the last k-1 columns and
+            NaN before them (gaps are collapsed exactly like dropna()).
+    n_obs : ndarray (n_tickers,) count of valid prices per ticker.
+    """
+    px = prices_df.loc[stock_tickers].to_numpy(dtype=float, copy=True)
+    n_obs = np.sum(~np.isnan(px), axis=1)
+    aligned = _right_align_valid(px)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rets = np.diff(np.log(aligned), axis=1)
+    return rets, n_obs
+
+
+def _window_sharpe_matrix(rets: np.ndarray, n_obs: np.ndarray, window: int,
+                          rfr_daily: float, trading_days: int,
+                          adjusted: bool = False) -> np.ndarray:
+    """
+    Vectorised _sharpe_ratio / _adjusted_sharpe_ratio for one window.
+
+    Uses the trailing `window` returns of each row of `rets` (fewer if the
+    ticker has less history), the same 90% price-coverage rule, the same
+    ddof=1 volatility and the same NaN semantics as the per-ticker path.
+    """
+    excess = rets[:, -window:] - rfr_daily
+    valid  = ~np.isnan(excess)
+    n      = valid.sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(valid, excess, 0.0).sum(axis=1) / n
+        dev  = np.where(valid, excess - mean[:, None], 0.0)
+        m2   = (dev ** 2).sum(axis=1)
+        sd   = np.sqrt(m2 / (n - 1))
+        out  = (mean / sd) * np.sqrt(trading_days)
+
+        if adjusted:
+            # Biased (population) moments — matches scipy.stats skew/kurtosis
+            pop_var     = m2 / n
+            skewness    = (dev ** 3).sum(axis=1) / n / pop_var ** 1.5
+            excess_kurt = (dev ** 4).sum(axis=1) / n / pop_var ** 2 - 3.0
+            out = out * (1 + (skewness / 6) * out
+                         - (excess_kurt / 24) * out ** 2)
+
+    out[(n_obs < window * 0.90) | ~(sd >= 1e-12)] = np.nan
+    return out
+
+
+def compute_sharpe_matrix(prices_df: pd.DataFrame,
+                          stock_tickers: list,
+                          windows: dict,
+                          rfr_daily: float,
+                          trading_days: int = 252,
+                          adjusted: bool = False) -> pd.DataFrame:
+    """
+    Raw (or Pezier-White adjusted) Sharpe for every ticker and window from a
+    single log-return matrix. Backend for compute_sharpe() and
+    compute_adjusted_sharpe().
+
+    Returns
+    -------
+    DataFrame  index = stock_tickers, cols = window labels
+    """
+    rets, n_obs = _log_return_matrix(prices_df, stock_tickers)
+    return pd.DataFrame(
+        {label: _window_sharpe_matrix(rets, n_obs, window, rfr_daily,
+                                      trading_days, adjusted=adjusted)
+         for label, window in windows.items()},
+        index=stock_tickers,
+    )
+
+
 def compute_sharpe(prices_df: pd.DataFrame,
                    stock_tickers: list,
                    windows: dict,
                    rfr_daily: float,
-                   trading_days: int = 252):
+                   trading_days: int = 252,
+                   engine: str = "matrix"):
     """
     Compute Sharpe ratios and cross-sectional Z-scores for all windows.
 
@@ -470,6 +676,9 @@ def compute_sharpe(prices_df: pd.DataFrame,
               Short-term for MOM_ACCEL = mean(Z_1M, Z_3M, Z_6M) if 1M present,
               else mean(Z_3M, Z_6M).
               Long-term = mean(Z_9M, Z_12M).
+    engine  : "matrix" (default) — one log-return matrix for the whole panel
+              via compute_sharpe_matrix(); "loop" — legacy per-ticker
+              _sharpe_ratio() path, kept as the parity reference.
 
     Returns
     -------
@@ -478,52 +687,69 @@ def compute_sharpe(prices_df: pd.DataFrame,
                            SHARPE_ST / SHARPE_LT / SHARPE_3 / MOM_ACCEL
     """
     print("Computing Sharpe ratios ...")
-    sharpe_data = {}
+    if engine == "matrix":
+        sharpe_df = compute_sharpe_matrix(
+            prices_df, stock_tickers, windows, rfr_daily, trading_days)
+    else:
+        sharpe_df = pd.DataFrame(
+            {label: [_sharpe_ratio(prices_df.loc[t], window, rfr_daily, trading_days)
+                     for t in stock_tickers]
+             for label, window in windows.items()},
+            index=stock_tickers,
+        )
     for label, window in windows.items():
-        col = [_sharpe_ratio(prices_df.loc[t], window, rfr_daily, trading_days)
-               for t in stock_tickers]
-        valid = sum(1 for v in col if not np.isnan(v))
-        sharpe_data[label] = col
+        valid = int(sharpe_df[label].notna().sum())
         print(f"  {label} ({window}d): {valid}/{len(stock_tickers)} valid")
 
-    sharpe_df = pd.DataFrame(sharpe_data, index=stock_tickers)
-
     print("\nZ-scoring Sharpe cross-sectionally ...")
-    z_df = pd.DataFrame(index=stock_tickers)
-    for label in windows:
-        z_df[f"Z_{label}"] = _cross_section_z(sharpe_df[label])
-
     # Stocks with insufficient data for a window get Z = 0 (universe average)
     # so they can still receive a composite score rather than being dropped.
-    z_label_cols = [f"Z_{l}" for l in windows]
-    missing_mask = z_df[z_label_cols].isna()
+    missing_mask = sharpe_df[list(windows)].isna()
     n_affected   = missing_mask.any(axis=1).sum()
     if n_affected > 0:
-        affected = (missing_mask.sum(axis=1)[missing_mask.any(axis=1)]
-                    .rename("missing_windows"))
         print(f"  Note: {n_affected} stock(s) have partial window coverage; "
               f"missing Z-scores set to 0 (universe mean):")
-        for ticker, count in affected.items():
-            missing_lbls = [l for l in windows
-                            if pd.isna(z_df.loc[ticker, f"Z_{l}"])]
+        for ticker in missing_mask.index[missing_mask.any(axis=1)]:
+            missing_lbls = [l for l in windows if missing_mask.loc[ticker, l]]
             print(f"    {ticker:<16}  missing: {', '.join(missing_lbls)}")
+
+    z_df = sharpe_z_scores(sharpe_df, windows)
+    return sharpe_df, z_df
+
+
+def sharpe_z_scores(sharpe_df: pd.DataFrame, windows: dict) -> pd.DataFrame:
+    """
+    Cross-sectional Z-scores of a raw Sharpe table (cols = window labels),
+    the scoring half of compute_sharpe() without any console output.
+
+    Missing windows get Z = 0 (universe mean). COMPOSITE = mean of all
+    windows except "1M"; SHARPE_3 = mean(Z_12M, Z_6M, Z_3M) when present.
+    COMPOSITE is returned un-normalised (see normalise_composite).
+    """
+    z_df = pd.DataFrame(index=sharpe_df.index)
+    for label in windows:
+        z_df[f"Z_{label}"] = _cross_section_z(sharpe_df[label])
+
+    z_label_cols = [f"Z_{l}" for l in windows]
     z_df[z_label_cols] = z_df[z_label_cols].fillna(0.0)
 
     # COMPOSITE / SHARPE_ALL: 4 core windows (exclude 1M if present)
-    core_labels = [l for l in windows if l != "1M"]
+    core_labels        = [l for l in windows if l != "1M"]
     z_cols             = [f"Z_{l}" for l in core_labels]
     z_df["COMPOSITE"]  = z_df[z_cols].mean(axis=1)
 
-    z_df["SHARPE_3"]  = z_df[["Z_12M", "Z_6M", "Z_3M"]].mean(axis=1)
+    if all(k in windows for k in ["12M", "6M", "3M"]):
+        z_df["SHARPE_3"] = z_df[["Z_12M", "Z_6M", "Z_3M"]].mean(axis=1)
 
-    return sharpe_df, z_df
+    return z_df
 
 
 def compute_adjusted_sharpe(prices_df: pd.DataFrame,
                              stock_tickers: list,
                              windows: dict,
                              rfr_daily: float,
-                             trading_days: int = 252):
+                             trading_days: int = 252,
+                             engine: str = "matrix"):
     """
     [DORMANT — not wired into live ranking]
 
@@ -540,7 +766,7 @@ def compute_adjusted_sharpe(prices_df: pd.DataFrame,
 
     Parameters
     ----------
-    Same as compute_sharpe().
+    Same as compute_sharpe() (including `engine`).
 
     Returns
     -------
@@ -554,16 +780,21 @@ def compute_adjusted_sharpe(prices_df: pd.DataFrame,
     Trade-off: +3.9 pp CAGR at the cost of -3.9 pp extra max drawdown.
     """
     print("Computing Adjusted Sharpe ratios (Skew + Kurtosis) ...")
-    adj_data = {}
+    if engine == "matrix":
+        adj_sharpe_df = compute_sharpe_matrix(
+            prices_df, stock_tickers, windows, rfr_daily, trading_days,
+            adjusted=True)
+    else:
+        adj_sharpe_df = pd.DataFrame(
+            {label: [_adjusted_sharpe_ratio(prices_df.loc[t], window, rfr_daily, trading_days)
+                     for t in stock_tickers]
+             for label, window in windows.items()},
+            index=stock_tickers,
+        )
     for label, window in windows.items():
-        col = [_adjusted_sharpe_ratio(prices_df.loc[t], window, rfr_daily, trading_days)
-               for t in stock_tickers]
-        valid = sum(1 for v in col if not np.isnan(v))
-        adj_data[label] = col
+        valid = int(adj_sharpe_df[label].notna().sum())
         print(f"  {label} ({window}d): {valid}/{len(stock_tickers)} valid")
 
-    adj_sharpe_df = pd.DataFrame(adj_data, index=stock_tickers)
-
     print("\nZ-scoring Adjusted Sharpe cross-sectionally ...")
     z_df = pd.DataFrame(index=stock_tickers)
     for label in windows:
@@ -642,6 +873,72 @@ def compute_clenow(prices_df: pd.DataFrame,
     return slope_df, r2_df, raw_df, cz_df
 
 
+# ── BATCHED OLS vs NIFTY500 ──────────────────────────────────────────────────
+
+def _aligned_return_matrices(prices_df: pd.DataFrame, stock_tickers: list,
+                             nifty_series: pd.Series):
+    """
+    Stock and NIFTY500 log returns on the shared date axis.
+
+    A return is stamped on the date of its closing price and spans back to
+    the previous valid close (so gaps collapse exactly like dropna() +
+    np.diff). A (ticker, date) pair is usable only where both the stock and
+    the market have a return — the matrix form of the per-ticker
+    pd.concat(..., join="inner").dropna().
+
+    Returns
+    -------
+    s_rets : ndarray (n_tickers, n_dates)  NaN where unusable
+    m_rets : ndarray (n_dates,)
+    joint  : bool ndarray (n_tickers, n_dates)
+    """
+    px = prices_df.loc[stock_tickers].to_numpy(dtype=float, copy=True)
+    prev = pd.DataFrame(px).ffill(axis=1).shift(1, axis=1).to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s_rets = np.log(px / prev)
+
+    nifty_px = nifty_series.dropna()
+    mkt      = pd.Series(np.diff(np.log(nifty_px.values)), index=nifty_px.index[1:])
+    m_rets   = mkt.reindex(prices_df.columns).to_numpy(dtype=float)
+
+    joint = ~np.isnan(s_rets) & ~np.isnan(m_rets)[None, :]
+    return np.where(joint, s_rets, np.nan), m_rets, joint
+
+
+def _window_ols_matrix(s_rets: np.ndarray, m_rets: np.ndarray,
+                       joint: np.ndarray, window: int, rfr_daily: float = 0.0):
+    """
+    Single-regressor OLS  s = alpha + beta·m  for every row at once, on each
+    ticker's trailing `window` jointly-observed days. Closed form from
+    masked sums; the centred second pass keeps it as accurate as lstsq.
+
+    Returns dict of ndarrays: n_total (joint obs before truncation), n, alpha,
+    beta, resid_sd (ddof=1), m_var (ddof=1). Rows with < 2 obs are NaN.
+    """
+    n_total = joint.sum(axis=1)
+    from_end = np.cumsum(joint[:, ::-1], axis=1)[:, ::-1]
+    use      = joint & (from_end <= window)
+    n        = use.sum(axis=1).astype(float)
+
+    y = np.where(use, s_rets - rfr_daily, 0.0)
+    x = np.where(use, m_rets[None, :] - rfr_daily, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x_mean = x.sum(axis=1) / n
+        y_mean = y.sum(axis=1) / n
+        dx     = np.where(use, x - x_mean[:, None], 0.0)
+        dy     = np.where(use, y - y_mean[:, None], 0.0)
+        sxx    = (dx * dx).sum(axis=1)
+        sxy    = (dx * dy).sum(axis=1)
+        beta   = np.where(sxx > 0, sxy / sxx, np.nan)
+        alpha  = y_mean - beta * x_mean
+        resid  = np.where(use, dy - beta[:, None] * dx, 0.0)
+        resid_sd = np.sqrt((resid * resid).sum(axis=1) / (n - 1))
+        m_var  = sxx / (n - 1)
+
+    return {"n_total": n_total, "n": n, "alpha": alpha, "beta": beta,
+            "resid_sd": resid_sd, "m_var": m_var}
+
+
 # ── RESIDUAL MOMENTUM ─────────────────────────────────────────────────────────
 
 def _residual_information_ratio(stock_series: pd.Series, mkt_rets: pd.Series,
@@ -683,12 +980,16 @@ def compute_residual_momentum(prices_df: pd.DataFrame,
                                nifty_series: pd.Series,
                                windows: dict,
                                trading_days: int = 252,
-                               rfr_daily: float = 0.0):
+                               rfr_daily: float = 0.0,
+                               engine: str = "matrix"):
     """
     Compute residual Information Ratio (alpha / residual volatility) from a
     date-aligned OLS regression of each stock's excess returns against
     NIFTY500's excess returns.
 
+    engine : "matrix" (default) — every ticker and window in one batch via
+             _window_ols_matrix(); "loop" — per-ticker lstsq reference path.
+
     Returns
     -------
     resmom_df : DataFrame  RS_<label>  residual Information Ratio per window
@@ -698,12 +999,23 @@ def compute_residual_momentum(prices_df: pd.DataFrame,
     nifty_px = nifty_series.dropna()
     mkt_rets = pd.Series(np.diff(np.log(nifty_px.values)), index=nifty_px.index[1:])
 
+    if engine == "matrix":
+        s_rets, m_rets, joint = _aligned_return_matrices(
+            prices_df, stock_tickers, nifty_series)
+
     resmom_data = {}
     for label, window in windows.items():
-        col = [_residual_information_ratio(prices_df.loc[t], mkt_rets,
-                                window, trading_days, rfr_daily)
-               for t in stock_tickers]
-        valid = sum(1 for v in col if not np.isnan(v))
+        if engine == "matrix":
+            fit = _window_ols_matrix(s_rets, m_rets, joint, window, rfr_daily)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                col = fit["alpha"] / fit["resid_sd"] * np.sqrt(trading_days)
+            col[(fit["n_total"] < max(window * 0.90, 10))
+                | ~(fit["resid_sd"] >= 1e-12)] = np.nan
+        else:
+            col = np.array([_residual_information_ratio(prices_df.loc[t], mkt_rets,
+                                        window, trading_days, rfr_daily)
+                            for t in stock_tickers])
+        valid = int(np.sum(~np.isnan(col)))
         resmom_data[f"RS_{label}"] = col
         print(f"  {label} ({window}d): {valid}/{len(stock_tickers)} valid")
 
@@ -818,7 +1130,8 @@ def compute_beta(prices_df: pd.DataFrame,
                   stock_tickers: list,
                   nifty_series: pd.Series,
                   window: int = 252,
-                  min_periods: int = 60) -> pd.Series:
+                  min_periods: int = 60,
+                  engine: str = "matrix") -> pd.Series:
     """
     Compute Beta vs NIFTY500 over a trailing window of daily log-returns.
 
@@ -826,10 +1139,20 @@ def compute_beta(prices_df: pd.DataFrame,
     date-aligned per ticker. Tickers with fewer than min_periods overlapping
     return observations get NaN.
 
+    engine : "matrix" (default) batched OLS slope; "loop" per-ticker np.cov.
+
     Returns
     -------
     pd.Series  BETA, indexed by ticker
     """
+    if engine == "matrix":
+        s_rets, m_rets, joint = _aligned_return_matrices(
+            prices_df, stock_tickers, nifty_series)
+        fit  = _window_ols_matrix(s_rets, m_rets, joint, window)
+        beta = np.where((fit["n_total"] >= min_periods) & (fit["m_var"] > 1e-12),
+                        fit["beta"], np.nan)
+        return pd.Series(beta, index=stock_tickers, name="BETA")
+
     nifty_px = nifty_series.dropna()
     mkt_rets = pd.Series(np.diff(np.log(nifty_px.values)), index=nifty_px.index[1:])
 
@@ -981,6 +1304,101 @@ def normalise_composite(v: float) -> float:
 
 # ── CIRCUIT CLOSE HIGHLIGHTER & COUNTER ─────────────────────────────────────────
 
+def load_price_bands(band_csv_path: str = "Price_Band_List.csv") -> pd.DataFrame:
+    """
+    Parse Price_Band_List.csv once into a frame indexed by symbol with
+    SERIES (str) and BAND (circuit %, float) columns — the single source for
+    the EQ-series map and the circuit-band vector.
+
+    Later rows win for duplicate symbols. Non-numeric bands ("No Band")
+    are NaN and fall back to the default band downstream.
+    Returns an empty frame if the file is missing or unreadable.
+    """
+    empty = pd.DataFrame({"SERIES": pd.Series(dtype=object),
+                          "BAND":   pd.Series(dtype=float)})
+    if not band_csv_path or not Path(band_csv_path).exists():
+        return empty
+    try:
+        b_df  = pd.read_csv(band_csv_path)
+        bands = pd.DataFrame({
+            "SERIES": b_df["Series"].map(lambda v: str(v).strip()).astype(object).values,
+            "BAND":   pd.to_numeric(b_df["Band"], errors="coerce").values,
+        }, index=b_df["Symbol"].map(lambda v: str(v).strip()).values)
+    except Exception:
+        return empty
+    return bands[~bands.index.duplicated(keep="last")]
+
+
+def _band_vector(bands: pd.DataFrame, stock_tickers: list,
+                 default_circuit_percent: float) -> np.ndarray:
+    """Circuit band (fraction) per ticker, aligned to stock_tickers."""
+    pct = bands["BAND"].reindex(stock_tickers).fillna(default_circuit_percent)
+    return pct.to_numpy(dtype=float) / 100.0
+
+
+def _circuit_hit_matrices(prices_df: pd.DataFrame, stock_tickers: list,
+                          band: np.ndarray, lookback_period: int,
+                          upper_buffer: float, lower_buffer: float):
+    """
+    Rolling UC / LC counts for every ticker and date.
+
+    Each close is compared with the previous valid close (gaps collapse
+    like dropna() + shift(1)); a date's count covers the ticker's last
+    `lookback_period` such comparisons up to and including that date.
+
+    Returns (uc, lc) int ndarrays (n_tickers, n_dates).
+    """
+    px     = prices_df.reindex(stock_tickers).to_numpy(dtype=float)
+    order  = np.argsort(np.isnan(px), axis=1, kind="stable")
+    packed = np.take_along_axis(px, order, axis=1)      # valid closes, left-packed
+    prev, cur = packed[:, :-1], packed[:, 1:]
+
+    b = band[:, None]
+    with np.errstate(invalid="ignore"):
+        hit_u = (cur >= prev * (1.0 + b) * upper_buffer) & (prev > 0)
+        hit_l = (cur <= prev * (1.0 - b) * lower_buffer) & (prev > 0)
+
+    n_cmp = np.clip(np.cumsum(~np.isnan(px), axis=1) - 1, 0, None)  # comparisons so far
+    start = np.clip(n_cmp - lookback_period, 0, None)
+    rows  = np.arange(px.shape[0])[:, None]
+
+    out = []
+    for hits in (hit_u, hit_l):
+        cum = np.hstack([np.zeros((px.shape[0], 1), dtype=np.int64),
+                         np.cumsum(hits, axis=1)])
+        out.append(cum[rows, n_cmp] - cum[rows, start])
+    return out[0], out[1]
+
+
+def circuit_hit_history(
+    prices_df: pd.DataFrame,
+    stock_tickers: list,
+    band_csv_path: str = "Price_Band_List.csv",
+    lookback_period: int = 252,
+    default_circuit_percent: float = 5.0,
+    upper_buffer: float = 0.998,
+    lower_buffer: float = 1.002,
+    bands: pd.DataFrame = None,
+):
+    """
+    Point-in-time circuit counts: the value on date d equals what
+    compute_circuit_hits() returns on prices_df sliced up to d, so
+    backtests can apply the circuit filter historically.
+
+    Returns
+    -------
+    (uc_df, lc_df) : DataFrames, index = ticker, columns = dates
+    """
+    if bands is None:
+        bands = load_price_bands(band_csv_path)
+    uc, lc = _circuit_hit_matrices(
+        prices_df, stock_tickers,
+        _band_vector(bands, stock_tickers, default_circuit_percent),
+        lookback_period, upper_buffer, lower_buffer)
+    return (pd.DataFrame(uc, index=stock_tickers, columns=prices_df.columns),
+            pd.DataFrame(lc, index=stock_tickers, columns=prices_df.columns))
+
+
 def compute_circuit_hits(
     prices_df: pd.DataFrame,
     stock_tickers: list,
@@ -988,13 +1406,15 @@ def compute_circuit_hits(
     lookback_period: int = 252,
     default_circuit_percent: float = 5.0,
     upper_buffer: float = 0.998,
-    lower_buffer: float = 1.002
+    lower_buffer: float = 1.002,
+    bands: pd.DataFrame = None,
 ) -> pd.DataFrame:
     """
     Python implementation of Pine Script 'Circuit Close Highlighter & Counter'.
 
     Calculates upper and lower circuit close counts over `lookback_period` (default 252 bars).
-    Reads price band per stock from Price_Band_List.csv if available.
+    Reads price band per stock from Price_Band_List.csv if available (or
+    from `bands`, an already-parsed load_price_bands() frame).
 
     Formula (matches Pine Script v6):
       prev_close   = close[1]
@@ -1003,71 +1423,27 @@ def compute_circuit_hits(
       closed_upper = close >= upper_limit * 0.998
       closed_lower = close <= lower_limit * 1.002
 
+    Evaluated for the whole panel at once (see _circuit_hit_matrices).
+
     Returns
     -------
     pd.DataFrame with columns:
       ['UC_COUNT', 'LC_COUNT', 'TOTAL_CIRCUIT_HITS'] indexed by ticker.
     """
-    from pathlib import Path
-
-    band_map = {}
-    if band_csv_path and Path(band_csv_path).exists():
-        try:
-            b_df = pd.read_csv(band_csv_path)
-            for _, row in b_df.iterrows():
-                sym = str(row["Symbol"]).strip()
-                try:
-                    band_map[sym] = float(row["Band"])
-                except (ValueError, TypeError):
-                    pass
-        except Exception:
-            pass
-
-    records = []
-    for ticker in stock_tickers:
-        if ticker not in prices_df.index:
-            records.append({
-                "TICKER": ticker,
-                "UC_COUNT": 0,
-                "LC_COUNT": 0,
-                "TOTAL_CIRCUIT_HITS": 0
-            })
-            continue
-
-        px = prices_df.loc[ticker].dropna()
-        if len(px) < 2:
-            records.append({
-                "TICKER": ticker,
-                "UC_COUNT": 0,
-                "LC_COUNT": 0,
-                "TOTAL_CIRCUIT_HITS": 0
-            })
-            continue
-
-        px_win = px.iloc[-lookback_period - 1:] if len(px) > lookback_period else px
-        prev_close = px_win.shift(1)
-
-        c_percent = band_map.get(ticker, default_circuit_percent) / 100.0
-        upper_limit = prev_close * (1.0 + c_percent)
-        lower_limit = prev_close * (1.0 - c_percent)
-
-        closed_upper = (px_win >= upper_limit * upper_buffer) & (prev_close > 0)
-        closed_lower = (px_win <= lower_limit * lower_buffer) & (prev_close > 0)
-
-        closed_upper_lb = closed_upper.iloc[-lookback_period:]
-        closed_lower_lb = closed_lower.iloc[-lookback_period:]
-
-        uc_cnt = int(closed_upper_lb.sum())
-        lc_cnt = int(closed_lower_lb.sum())
-
-        records.append({
-            "TICKER": ticker,
-            "UC_COUNT": uc_cnt,
-            "LC_COUNT": lc_cnt,
-            "TOTAL_CIRCUIT_HITS": uc_cnt + lc_cnt
-        })
-
-    res_df = pd.DataFrame(records).set_index("TICKER")
+    if bands is None:
+        bands = load_price_bands(band_csv_path)
+    uc, lc = _circuit_hit_matrices(
+        prices_df, stock_tickers,
+        _band_vector(bands, stock_tickers, default_circuit_percent),
+        lookback_period, upper_buffer, lower_buffer)
+
+    if uc.shape[1] == 0:
+        uc_cnt = lc_cnt = np.zeros(len(stock_tickers), dtype=np.int64)
+    else:
+        uc_cnt, lc_cnt = uc[:, -1], lc[:, -1]
+    res_df = pd.DataFrame({"UC_COUNT": uc_cnt, "LC_COUNT": lc_cnt,
+                           "TOTAL_CIRCUIT_HITS": uc_cnt + lc_cnt},
+                          index=pd.Index(stock_tickers, name="TICKER"))
     return res_df
 
 
@@ -1094,6 +1470,7 @@ def compute_regime_score(
     min_n: int = None,
     max_n: int = None,
     new_entry_threshold: float = None,
+    universe_emas: pd.DataFrame = None,
 ) -> tuple:
     """
     Compute a continuous Regime Strength Score (0.0 to 1.0) from 4 signals.
@@ -1114,6 +1491,11 @@ def compute_regime_score(
     `pct52h_mask` : boolean Series indexed by ticker — PCT_FROM_52H >= -25 only
     (NOT the full ranking-eligibility gate). Drives Signals 3 & 4.
 
+    `universe_emas` : optional DataFrame (index=ticker) with LAST_PX, EMA50
+    and EMA200 as of the last date of prices_df — e.g. the incremental
+    ranking_state table — used for Signals 1 & 2 instead of running ewm()
+    over the whole panel.
+
     Returns (regime_score: float, detail: dict)
     """
     if signal_weights is None:
@@ -1137,11 +1519,15 @@ def compute_regime_score(
 
     # Signal 1 & 2: Universe EMA breadth (whole universe, no eligibility gates)
     if prices_df is not None and len(prices_df.columns) >= 200:
-        ema50_all   = prices_df.T.ewm(span=50,  adjust=False).mean().T
-        ema200_all  = prices_df.T.ewm(span=200, adjust=False).mean().T
-        last_px     = prices_df.iloc[:, -1]
-        last_ema50  = ema50_all.iloc[:, -1]
-        last_ema200 = ema200_all.iloc[:, -1]
+        if universe_emas is not None:
+            emas        = universe_emas.reindex(prices_df.index)
+            last_px     = emas["LAST_PX"]
+            last_ema50  = emas["EMA50"]
+            last_ema200 = emas["EMA200"]
+        else:
+            last_px     = prices_df.iloc[:, -1]
+            last_ema50  = prices_df.T.ewm(span=50,  adjust=False).mean().iloc[-1]
+            last_ema200 = prices_df.T.ewm(span=200, adjust=False).mean().iloc[-1]
         valid       = last_px.notna() & last_ema200.notna()
         n_valid     = int(valid.sum())
         if n_valid > 0:
@@ -1207,6 +1593,7 @@ def compute_universe_rankings(
     min_n: int = None,
     max_n: int = None,
     new_entry_threshold: float = None,
+    precomputed: pd.DataFrame = None,
 ) -> tuple:
     """
     Single source-of-truth ranking pipeline shared by Sharpe.py and
@@ -1222,6 +1609,12 @@ def compute_universe_rankings(
       7. Master eligibility gate → rank eligible stocks by COMPOSITE
       8. Compute Dynamic Market Regime Score & dynamic N
 
+    `precomputed` : optional per-ticker table from
+    ranking_state.ranking_state_frame() (raw Sharpe per window label,
+    PCT_FROM_52H, EMA50, EMA200, LAST_PX) for the same last date as
+    prices_df. When given, steps 1's Sharpe / 52H and the regime EMAs are
+    read from it instead of being recomputed over the full history.
+
     Returns
     -------
     (result_df: pd.DataFrame, regime_score: float, regime_detail: dict)
@@ -1232,10 +1625,17 @@ def compute_universe_rankings(
     rfr_daily = rfr_annual / trading_days
 
     # 1. Sharpe & Composite
-    sharpe_df, z_df = compute_sharpe(
-        prices_df, stock_tickers, windows, rfr_daily, trading_days)
+    if precomputed is not None:
+        print("Sharpe ratios / 52W high from the incremental ranking state ...")
+        precomputed = precomputed.reindex(stock_tickers)
+        sharpe_df   = precomputed[list(windows)]
+        z_df        = sharpe_z_scores(sharpe_df, windows)
+        pct_52h     = precomputed["PCT_FROM_52H"].rename("PCT_FROM_52H")
+    else:
+        sharpe_df, z_df = compute_sharpe(
+            prices_df, stock_tickers, windows, rfr_daily, trading_days)
+        pct_52h = compute_pct_from_52h(prices_df, stock_tickers)
     ret_df  = compute_returns(prices_df, stock_tickers)
-    pct_52h = compute_pct_from_52h(prices_df, stock_tickers)
     resmom_df, rs_z = compute_residual_momentum(
         prices_df, stock_tickers, nifty_series, windows, trading_days, rfr_daily)
     beta_series = compute_beta(
@@ -1262,18 +1662,11 @@ def compute_universe_rankings(
         adtv_ok = pd.Series(True, index=result.index)
         result["ADTV_ELIGIBLE"] = True
 
-    # 3. Series EQ Filter & Mapping
-    series_map = {}
+    # 3. Series EQ Filter & Mapping (band CSV parsed once, reused by step 4)
     csv_p = Path(band_csv_path) if band_csv_path else None
-    if csv_p and csv_p.exists():
-        try:
-            b_df = pd.read_csv(csv_p)
-            for _, r in b_df.iterrows():
-                series_map[str(r["Symbol"]).strip()] = str(r["Series"]).strip()
-        except Exception:
-            pass
+    bands = load_price_bands(csv_p)
 
-    result["SERIES"] = [series_map.get(t, "EQ") for t in result.index]
+    result["SERIES"] = bands["SERIES"].reindex(result.index).fillna("EQ").astype(str)
 
     if eq_series_filter:
         eq_ok = pd.Series(
@@ -1285,7 +1678,7 @@ def compute_universe_rankings(
     if circuit_filter_enabled and csv_p and csv_p.exists():
         try:
             c_df = compute_circuit_hits(
-                prices_df, stock_tickers, str(csv_p), lookback_period=252)
+                prices_df, stock_tickers, str(csv_p), lookback_period=252, bands=bands)
             result["UC_COUNT"]           = c_df["UC_COUNT"].reindex(result.index).fillna(0).astype(int)
             result["LC_COUNT"]           = c_df["LC_COUNT"].reindex(result.index).fillna(0).astype(int)
             result["TOTAL_CIRCUIT_HITS"] = c_df["TOTAL_CIRCUIT_HITS"].reindex(result.index).fillna(0).astype(int)
@@ -1323,8 +1716,229 @@ def compute_universe_rankings(
         min_n=min_n,
         max_n=max_n,
         new_entry_threshold=new_entry_threshold,
+        universe_emas=precomputed,
     )
 
     return result, regime_score, regime_detail
 
 
+
+
+
+# ── EARLY MOVERS: SCORE VELOCITY & STREAK ─────────────────────────────────────
+
+def _score_trend(values: np.ndarray, n_points: int):
+    """
+    Velocity and streak for every row of `values` (tickers × runs, NaN =
+    ticker not scored that run; missing runs are skipped, like dropna()).
+
+    Velocity — OLS slope of the last k = min(n_points, n_valid) valid points
+    on x = 0..k-1, closed form: Σ (x - x̄)·y / (k(k²-1)/12). 0.0 if k < 2.
+    Streak   — length of the trailing run of strict rises, read as the
+    distance from the last non-rise position (no per-ticker loop).
+
+    Returns (velocity, streak, n_valid, aligned) — aligned holds each row's
+    valid points right-aligned (aligned[:, -1] = latest score).
+    """
+    n_valid = np.sum(~np.isnan(values), axis=1)
+    aligned = _right_align_valid(values)
+    n_runs  = aligned.shape[1]
+
+    tail = aligned[:, -n_points:]
+    w    = tail.shape[1]
+    k    = np.minimum(n_valid, w).astype(float)
+    x    = np.arange(w, dtype=float)[None, :] - (w - (k[:, None] + 1) / 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        velocity = np.where(np.isnan(tail), 0.0, x * tail).sum(axis=1) / (k * (k ** 2 - 1) / 12)
+    velocity[k < 2] = 0.0
+
+    rises      = aligned[:, 1:] > aligned[:, :-1]            # NaN compares False
+    last_break = np.where(rises, 0, np.arange(1, n_runs)).max(axis=1, initial=0)
+    streak     = (n_runs - 1) - last_break if n_runs else np.zeros(len(values), dtype=int)
+    return velocity, streak, n_valid, aligned
+
+
+def early_mover_signals(scores: pd.DataFrame,
+                        z3m: pd.DataFrame = None,
+                        n_points: int = 5) -> pd.DataFrame:
+    """
+    Early Movers trend signals from a score history.
+
+    Parameters
+    ----------
+    scores   : DataFrame (runs × tickers) — COMPOSITE per run, oldest first;
+               NaN where a ticker was not scored
+    z3m      : DataFrame (runs × tickers), optional — SHARPE_3 (Z_3M) history
+    n_points : velocity look-back in valid runs (default 5)
+
+    Returns
+    -------
+    DataFrame indexed by ticker:
+      N_RUNS                       valid runs recorded
+      SCORE_NOW / SCORE_1 / SCORE_2 latest, previous and one-before valid score
+      VELOCITY, STREAK             trailing slope / consecutive rises
+      Z3M_VELOCITY, Z3M_STREAK     same on Z_3M (NaN with fewer than 2 runs)
+    """
+    vals = scores.to_numpy(dtype=float).T
+    velocity, streak, n_valid, aligned = _score_trend(vals, n_points)
+    if aligned.shape[1] < 3:
+        aligned = np.hstack([np.full((len(vals), 3 - aligned.shape[1]), np.nan), aligned])
+    out = pd.DataFrame({
+        "N_RUNS":    n_valid,
+        "SCORE_NOW": aligned[:, -1],
+        "SCORE_1":   aligned[:, -2],
+        "SCORE_2":   aligned[:, -3],
+        "VELOCITY":  velocity,
+        "STREAK":    streak,
+    }, index=scores.columns)
+
+    if z3m is not None:
+        z_vals = z3m.reindex(columns=scores.columns).to_numpy(dtype=float).T
+        z_vel, z_streak, z_valid, _ = _score_trend(z_vals, n_points)
+        out["Z3M_VELOCITY"] = np.where(z_valid >= 2, z_vel, np.nan)
+        out["Z3M_STREAK"]   = np.where(z_valid >= 2, z_streak, np.nan)
+    return out
+
+
+# ── RANKINGS CACHE ────────────────────────────────────────────────────────────
+# Content-addressed on-disk cache for compute_universe_rankings(). The key is
+# a SHA-1 over the price / NIFTY / volume panels, the ticker list, the
+# Price_Band_List.csv bytes, every ranking parameter and this module's own
+# source — so any change to data, config or scoring code is a miss, and an
+# unchanged file is served instantly across restarts. Entries are .npz files
+# (one array per column); least-recently-used entries are evicted once the
+# directory exceeds the size budget.
+
+RANKINGS_CACHE_DIR    = Path(__file__).resolve().parent / "rankings_cache"
+RANKINGS_CACHE_MAX_MB = 256
+_LIB_FINGERPRINT      = None
+
+
+def _hash_frame(h, obj):
+    """Feed a DataFrame / Series (values, index, columns) into hashlib `h`."""
+    if obj is None:
+        h.update(b"<none>")
+        return
+    values = np.ascontiguousarray(obj.to_numpy(dtype=float))
+    h.update(str(values.shape).encode())
+    h.update(values.tobytes())
+    h.update("\x1f".join(map(str, obj.index)).encode())
+    if isinstance(obj, pd.DataFrame):
+        h.update("\x1f".join(map(str, obj.columns)).encode())
+
+
+def rankings_cache_key(prices_df, nifty_series, stock_tickers,
+                       volume_df=None, **params) -> str:
+    """SHA-1 key for one compute_universe_rankings() call."""
+    global _LIB_FINGERPRINT
+    if _LIB_FINGERPRINT is None:
+        _LIB_FINGERPRINT = _file_fingerprint(__file__)
+
+    h = hashlib.sha1(_LIB_FINGERPRINT.encode())
+    _hash_frame(h, prices_df)
+    _hash_frame(h, nifty_series)
+    _hash_frame(h, volume_df)
+    h.update("\x1f".join(stock_tickers).encode())
+
+    # A precomputed state table (ranking_state.py) need not be bit-identical
+    # to a full recompute on prices_df, so its contents are part of the key
+    precomputed = params.get("precomputed")
+    params = {k: v for k, v in params.items() if k != "precomputed"}
+    if precomputed is not None:
+        h.update(b"<precomputed>")
+        _hash_frame(h, precomputed)
+    band_csv = params.get("band_csv_path", "Price_Band_List.csv")
+    if band_csv and Path(band_csv).exists():
+        h.update(_file_fingerprint(band_csv).encode())
+        params = {**params, "band_csv_path": str(Path(band_csv).resolve())}
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def _json_default(o):
+    return o.item() if isinstance(o, np.generic) else str(o)
+
+
+def _save_rankings_entry(path: Path, result: pd.DataFrame,
+                         regime_score: float, regime_detail: dict):
+    arrays, text_cols = {}, {}
+    for i, col in enumerate(result.columns):
+        series = result[col]
+        if series.dtype.kind in "biuf":
+            arrays[f"c{i}"] = series.to_numpy()
+        else:
+            text_cols[str(i)] = [str(series.dtype), series.tolist()]
+    meta = {
+        "columns":       [str(c) for c in result.columns],
+        "text_cols":     text_cols,
+        "regime_score":  regime_score,
+        "regime_detail": regime_detail,
+    }
+    tmp = path.with_name(path.stem + ".tmp.npz")
+    np.savez(tmp, index=np.array([str(t) for t in result.index], dtype=str),
+             meta=np.array(json.dumps(meta, default=_json_default)), **arrays)
+    os.replace(tmp, path)
+
+
+def _load_rankings_entry(path: Path):
+    with np.load(path, allow_pickle=False) as z:
+        meta  = json.loads(str(z["meta"]))
+        index = z["index"].tolist()
+        cols  = {}
+        for i, col in enumerate(meta["columns"]):
+            if str(i) in meta["text_cols"]:
+                dtype, values = meta["text_cols"][str(i)]
+                cols[col] = pd.Series(values, index=index).astype(dtype)
+            else:
+                cols[col] = pd.Series(z[f"c{i}"], index=index)
+    result = pd.DataFrame(cols, index=index)
+    return result, meta["regime_score"], meta["regime_detail"]
+
+
+def _evict_rankings_cache(cache_dir: Path, max_bytes: int):
+    """Drop least-recently-used entries until the directory fits the budget."""
+    entries = sorted(cache_dir.glob("*.npz"), key=lambda p: p.stat().st_mtime)
+    total   = sum(p.stat().st_size for p in entries)
+    for p in entries:
+        if total <= max_bytes:
+            break
+        total -= p.stat().st_size
+        p.unlink(missing_ok=True)
+
+
+def cached_universe_rankings(prices_df: pd.DataFrame,
+                             nifty_series: pd.Series,
+                             stock_tickers: list,
+                             volume_df: pd.DataFrame = None,
+                             cache_dir: str = None,
+                             max_cache_mb: float = RANKINGS_CACHE_MAX_MB,
+                             **params) -> tuple:
+    """
+    compute_universe_rankings() behind the persistent rankings cache.
+    Same arguments (plus cache_dir / max_cache_mb) and same return value.
+    A hit skips the whole pipeline; a miss computes, stores and evicts.
+    """
+    cache_dir = Path(cache_dir) if cache_dir else RANKINGS_CACHE_DIR
+    key       = rankings_cache_key(prices_df, nifty_series, stock_tickers,
+                                   volume_df, **params)
+    path      = cache_dir / f"{key}.npz"
+
+    if path.exists():
+        try:
+            out = _load_rankings_entry(path)
+            os.utime(path)                      # mark as recently used
+            print(f"Rankings cache hit ({key[:12]})")
+            return out
+        except Exception as e:
+            print(f"  Warning: unreadable rankings cache entry {path.name} ({e}); recomputing")
+
+    result, regime_score, regime_detail = compute_universe_rankings(
+        prices_df, nifty_series, stock_tickers, volume_df=volume_df, **params)
+
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        _save_rankings_entry(path, result, regime_score, regime_detail)
+        _evict_rankings_cache(cache_dir, int(max_cache_mb * 1024 * 1024))
+    except OSError as e:
+        print(f"  Warning: could not write rankings cache ({e})")
+    return result, regime_score, regime_detail
@@ -0,0 +1,333 @@
+"""
+position_book.py
+================
+Shared position book for the tradelog-driven dashboards
+(sharpe_dashboard.py, ETFs/etf_dashboard.py, ETFs/etf_momentum_gui_v2.py).
+
+Each of them used to sort and replay the whole tradelog on every rerun to
+validate it and to rebuild holdings / P&L. The book keeps that replay
+materialized instead:
+
+    positions  ticker → qty, avg_price, total_cost, first_buy_date, realized_pnl
+    checkpoint count of transactions applied, SHA-1 of that log prefix,
+               sort key (date, timestamp) of the last one, tradelog stamp
+
+and is persisted next to the tradelog (N750_tradelog.json →
+N750_tradelog.book.json). An appended transaction dated on or after the
+checkpoint touches only its own ticker; an edit, a delete or a back-dated
+entry changes the log prefix and triggers one full replay. Holdings and
+P&L are served from the book in O(holdings).
+
+Replay semantics (avg-cost P&L, SELL clamped to the held quantity,
+validation failing on the first SELL that exceeds holdings) are exactly
+those of the dashboards' former calculate_holdings_and_pnl /
+validate_tradelog_integrity.
+
+Functions
+---------
+book_path(tradelog_path)                      — persisted book next to a tradelog
+replay(transactions)                          — full rebuild (sorted by date, timestamp)
+apply_transaction(book, tx)                   — incremental append, one ticker
+sync_book(book, transactions)                 — append-only catch-up, else replay
+open_book(tradelog_path, transactions)        — load + sync + persist
+validate_transactions(transactions)           — full-replay integrity check
+validate_append(book, transactions, tx)       — integrity check for one new transaction
+holdings_and_pnl(book, latest_prices)         — active holdings / metrics / P&L
+calculate_holdings_and_pnl(transactions, latest_prices) — one-shot replay + holdings_and_pnl
+"""
+
+import datetime
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+# ── CONFIG ────────────────────────────────────────────────────────────────────
+BOOK_VERSION = 1
+QTY_EPS      = 1e-9     # float tolerance when checking a SELL against holdings
+
+
+def book_path(tradelog_path) -> Path:
+    """Book file for `tradelog_path` (same folder, same stem)."""
+    p = Path(tradelog_path)
+    return p.with_name(f"{p.stem}.book.json")
+
+
+def _sort_key(tx: dict) -> list:
+    return [tx.get("date", ""), tx.get("timestamp", "")]
+
+
+def _tx_date(tx: dict):
+    tx_date = tx.get("date", "")
+    if isinstance(tx_date, str):
+        try:
+            tx_date = datetime.date.fromisoformat(tx_date)
+        except Exception:
+            tx_date = datetime.date.today()
+    return tx_date
+
+
+def _chain(digest: str, tx: dict) -> str:
+    """Chained SHA-1: digest of a log prefix extended by one transaction."""
+    return hashlib.sha1((digest + json.dumps(tx, sort_keys=True, default=str)).encode()).hexdigest()
+
+
+def _digest(transactions: list) -> str:
+    digest = ""
+    for tx in transactions:
+        digest = _chain(digest, tx)
+    return digest
+
+
+def _stamp(path) -> list:
+    try:
+        st = Path(path).stat()
+        return [st.st_mtime, st.st_size]
+    except OSError:
+        return None
+
+
+def new_book() -> dict:
+    return {"version":      BOOK_VERSION,
+            "positions":    {},
+            "realized_pnl": 0.0,
+            "error":        "",       # first integrity violation, "" if valid
+            "checkpoint":   {"count": 0, "digest": _digest([]),
+                             "last_key": None, "stamp": None}}
+
+
+# ── REPLAY ────────────────────────────────────────────────────────────────────
+
+def _apply(book: dict, tx: dict):
+    """Apply one transaction to its ticker's position (no ordering checks)."""
+    ticker = tx["ticker"]
+    action = tx["action"].upper()
+    qty    = float(tx["quantity"])
+    price  = float(tx["price"])
+    h = book["positions"].setdefault(ticker, {"qty": 0.0, "avg_price": 0.0,
+                                              "first_buy_date": None,
+                                              "total_cost": 0.0, "realized_pnl": 0.0})
+    if action == "BUY":
+        if h["qty"] == 0:
+            d = _tx_date(tx)
+            h["first_buy_date"] = d.isoformat() if hasattr(d, "isoformat") else d
+        h["total_cost"] += qty * price
+        h["qty"]        += qty
+        h["avg_price"]   = h["total_cost"] / h["qty"]
+    elif action == "SELL":
+        if qty > h["qty"] + QTY_EPS and not book["error"]:
+            book["error"] = (f"{ticker}: SELL of {qty:.0f} shares exceeds "
+                             f"holding of {h['qty']:.0f} shares on {tx.get('date', '?')}")
+        if h["qty"] > 0:
+            sell_qty = min(qty, h["qty"])
+            pnl      = sell_qty * (price - h["avg_price"])
+            book["realized_pnl"] += pnl
+            h["realized_pnl"]    += pnl
+            h["qty"]             -= sell_qty
+            h["total_cost"]       = h["qty"] * h["avg_price"]
+            if h["qty"] == 0:
+                h["avg_price"]      = 0.0
+                h["first_buy_date"] = None
+
+
+def replay(transactions: list) -> dict:
+    """Build a book from scratch: sort by (date, timestamp), apply in order."""
+    try:
+        sorted_txs = sorted(transactions, key=_sort_key)
+    except Exception:
+        sorted_txs = transactions
+    book = new_book()
+    for tx in sorted_txs:
+        _apply(book, tx)
+    book["checkpoint"] = {"count":    len(transactions),
+                          "digest":   _digest(transactions),
+                          "last_key": max((_sort_key(tx) for tx in transactions), default=None),
+                          "stamp":    None}
+    return book
+
+
+def apply_transaction(book: dict, tx: dict) -> dict:
+    """
+    Apply one transaction appended to the log. It must sort on or after the
+    checkpoint (a back-dated entry needs replay()); raises ValueError if not.
+    """
+    cp  = book["checkpoint"]
+    key = _sort_key(tx)
+    if cp["last_key"] is not None and key < cp["last_key"]:
+        raise ValueError(f"transaction dated {tx.get('date')} precedes the book checkpoint")
+    _apply(book, tx)
+    cp["digest"]   = _chain(cp["digest"], tx)
+    cp["count"]   += 1
+    cp["last_key"] = key
+    cp["stamp"]    = None
+    return book
+
+
+def sync_book(book: dict, transactions: list) -> tuple:
+    """
+    Bring `book` up to date with `transactions`. If the log is the checkpoint
+    prefix plus appended entries dated on or after it, only those are applied;
+    anything else (edit, delete, back-dated insert) replays the whole log.
+    Returns (book, replayed).
+    """
+    cp = book.get("checkpoint") if book else None
+    if (not cp or book.get("version") != BOOK_VERSION
+            or len(transactions) < cp["count"]
+            or _digest(transactions[:cp["count"]]) != cp["digest"]):
+        return replay(transactions), True
+
+    new = transactions[cp["count"]:]
+    try:
+        new_sorted = sorted(new, key=_sort_key)     # stable, like replay()
+    except Exception:
+        return replay(transactions), True
+    if new and cp["last_key"] is not None and _sort_key(new_sorted[0]) < cp["last_key"]:
+        return replay(transactions), True
+    for tx in new_sorted:
+        _apply(book, tx)
+    for tx in new:
+        cp["digest"] = _chain(cp["digest"], tx)
+    cp["count"] = len(transactions)
+    if new:
+        cp["last_key"] = _sort_key(new_sorted[-1])
+    return book, False
+
+
+# ── PERSISTENCE ───────────────────────────────────────────────────────────────
+
+def load_book(path):
+    """Persisted book, or None if missing / unreadable."""
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def save_book(path, book: dict):
+    """Atomic write (.tmp + os.replace)."""
+    path = Path(path)
+    tmp  = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(book, f, indent=1)
+    os.replace(tmp, path)
+
+
+def _on_disk(tradelog_path, transactions: list) -> bool:
+    """True if the tradelog file currently holds exactly `transactions`."""
+    try:
+        with open(tradelog_path, "r") as f:
+            return json.load(f) == transactions
+    except Exception:
+        return False
+
+
+def open_book(tradelog_path, transactions: list) -> dict:
+    """
+    The book for the tradelog at `tradelog_path`, whose parsed contents are
+    `transactions`. If the tradelog file is unchanged since the book was
+    saved (mtime + size) it is returned as is; otherwise it is synced and
+    saved — but only if the file really holds `transactions`, so a failed
+    tradelog write never leaves a book stamped with the old file. Failing
+    to persist the book is never fatal.
+    """
+    path  = book_path(tradelog_path)
+    book  = load_book(path)
+    stamp = _stamp(tradelog_path)
+    if (book and stamp is not None and book.get("version") == BOOK_VERSION
+            and book["checkpoint"].get("stamp") == stamp
+            and book["checkpoint"]["count"] == len(transactions)):
+        return book
+    book, _ = sync_book(book, transactions)
+    book["checkpoint"]["stamp"] = stamp
+    if stamp is not None and _on_disk(tradelog_path, transactions):
+        try:
+            save_book(path, book)
+        except Exception:
+            pass
+    return book
+
+
+# ── QUERIES ───────────────────────────────────────────────────────────────────
+
+def validate_transactions(transactions: list) -> tuple:
+    """Replay all transactions chronologically and check no ticker ever goes negative.
+    Returns (is_valid: bool, error_message: str)."""
+    error = replay(transactions)["error"]
+    return not error, error
+
+
+def validate_append(book: dict, transactions: list, tx: dict) -> tuple:
+    """
+    Integrity check for `transactions + [tx]` given the synced `book` of
+    `transactions`. Touches only tx's ticker when tx sorts on or after the
+    checkpoint; a back-dated tx is checked by full replay.
+    Returns (is_valid: bool, error_message: str).
+    """
+    if book["error"]:
+        return False, book["error"]
+    last_key = book["checkpoint"]["last_key"]
+    if last_key is not None and _sort_key(tx) < last_key:
+        return validate_transactions(transactions + [tx])
+    if tx["action"].upper() == "SELL":
+        qty  = float(tx["quantity"])
+        held = book["positions"].get(tx["ticker"], {}).get("qty", 0.0)
+        if qty > held + QTY_EPS:
+            return False, (f"{tx['ticker']}: SELL of {qty:.0f} shares exceeds "
+                           f"holding of {held:.0f} shares on {tx.get('date', '?')}")
+    return True, ""
+
+
+def holdings_and_pnl(book: dict, latest_prices: dict = None) -> dict:
+    """
+    Holdings and P&L from the book — the calculate_holdings_and_pnl() result:
+    active_holdings, holdings_metrics, realized_pnl, realized_pnl_by_ticker,
+    unrealized_pnl.
+    """
+    active_holdings = {}
+    for ticker, h in book["positions"].items():
+        if h["qty"] > 0:
+            d = h["first_buy_date"]
+            if isinstance(d, str):
+                try:
+                    d = datetime.date.fromisoformat(d)
+                except ValueError:
+                    pass
+            active_holdings[ticker] = {"qty": h["qty"], "avg_price": h["avg_price"],
+                                       "first_buy_date": d, "total_cost": h["total_cost"]}
+
+    unrealized_pnl   = 0.0
+    holdings_metrics = []
+    for ticker, h in active_holdings.items():
+        curr_price = h["avg_price"]
+        if latest_prices and ticker in latest_prices:
+            curr_price = latest_prices[ticker]
+        market_val = h["qty"] * curr_price
+        u_pnl      = market_val - h["total_cost"]
+        unrealized_pnl += u_pnl
+        u_pnl_pct  = (u_pnl / h["total_cost"] * 100) if h["total_cost"] > 0 else 0.0
+        holdings_metrics.append({
+            "Ticker":            ticker,
+            "Qty":               h["qty"],
+            "Avg Price":         h["avg_price"],
+            "Current Price":     curr_price,
+            "Cost Value":        h["total_cost"],
+            "Market Value":      market_val,
+            "Unrealized PnL":    u_pnl,
+            "Unrealized PnL %":  u_pnl_pct,
+            "First Buy Date":    h["first_buy_date"],
+        })
+
+    return {
+        "active_holdings":        active_holdings,
+        "holdings_metrics":       holdings_metrics,
+        "realized_pnl":           book["realized_pnl"],
+        "realized_pnl_by_ticker": {t: h["realized_pnl"] for t, h in book["positions"].items()},
+        "unrealized_pnl":         unrealized_pnl,
+    }
+
+
+def calculate_holdings_and_pnl(transactions: list, latest_prices: dict = None) -> dict:
+    """One-shot replay + holdings_and_pnl(), for callers without a persisted book."""
+    return holdings_and_pnl(replay(transactions), latest_prices)
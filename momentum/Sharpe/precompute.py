@@ -0,0 +1,485 @@
+"""
+precompute.py
+=============
+Background precompute service for the Sharpe dashboard.
+
+Every Streamlit rerun of a cold dashboard used to parse the workbook, rank
+the universe, walk the STOCKDB cap tiers ticker by ticker and rebuild the
+Early Movers signals before the first tab could draw. This module does that
+work off the request path: it watches the *_updated.xlsx workbooks and,
+whenever one changes, writes a snapshot next to it
+
+    N750_updated.xlsx  →  N750_updated.snapshot.npz
+
+holding the rankings table (with SERIES), regime score and detail, the
+STOCKDB dual cap-tier table, the 1-day A/D ratio and the Early Movers
+signal table. The dashboard loads the snapshot in milliseconds and only
+computes itself when the snapshot is missing or stale — a snapshot is used
+only if the workbook, Price_Band_List.csv and STOCKDB.csv fingerprints and
+the ranking settings (dashboard_config.json) all match.
+
+A second, slower loop keeps the offline market-cap store (market_caps.py)
+fresh: one bulk refresh per day, on its own thread so network calls never
+delay a snapshot.
+
+The service runs as daemon threads started by the dashboard, or stand-alone:
+
+    python precompute.py                 # rebuild stale snapshots once
+    python precompute.py --watch         # keep watching (poll every 10s)
+    python precompute.py --force N750_updated.xlsx
+
+Functions
+---------
+snapshot_path(filepath)                          — snapshot file for a workbook
+snapshot_params(min_turnover_cr, ...)            — ranking settings a snapshot is keyed on
+load_stockdb(stockdb_path)                       — STOCKDB.csv SYMBOL → MARKETCAP tier
+compute_ad_ratio(prices_df)                      — 1-day advancers / decliners
+compute_cap_tier_dual(result_df, prices_df, stock_tickers, stockdb)
+build_snapshot(filepath, params)                 — compute every dashboard artifact
+save_snapshot(path, snapshot) / load_snapshot(filepath, params)
+snapshot_stamps(filepath)                        — cheap (mtime, size) change key for caching loads
+refresh_snapshots(base_dir, force)               — rebuild stale snapshots for every workbook
+watch(base_dir, interval, stop_event)            — poll loop around refresh_snapshots
+refresh_market_cap_store(base_dir, force)        — daily market-cap refresh for every workbook's tickers
+watch_market_caps(base_dir, interval, stop_event) — loop around refresh_market_cap_store
+start_background_service(base_dir, interval)     — the daemon threads, once per process
+"""
+
+import argparse
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+import market_caps as mc
+import momentum_lib as ml
+import ranking_state as rs
+import score_history as sh
+
+
+# ── CONFIG ────────────────────────────────────────────────────────────────────
+SNAPSHOT_VERSION  = 1
+RFR_ANNUAL        = 0.07
+TRADING_DAYS      = 252
+WINDOWS           = {"12M": 252, "9M": 189, "6M": 126, "3M": 63}
+BAND_CSV          = "Price_Band_List.csv"
+STOCKDB_CSV       = "STOCKDB.csv"
+WATCH_PATTERN     = "*_updated.xlsx"
+POLL_SECONDS      = 10
+CAPS_POLL_SECONDS = 3600
+
+CAP_ORDER  = ["LARGECAP", "MIDCAP", "SMALLCAP", "MICROCAP"]
+CAP_LABELS = {
+    "LARGECAP":  "Large Cap",
+    "MIDCAP":    "Mid Cap",
+    "SMALLCAP":  "Small Cap",
+    "MICROCAP":  "Micro Cap",
+}
+
+_service_lock   = threading.Lock()
+_service_thread = None
+_caps_thread    = None
+
+
+def snapshot_path(filepath) -> Path:
+    """Snapshot file for `filepath` (same folder, same stem)."""
+    p = Path(filepath)
+    return p.with_name(f"{p.stem}.snapshot.npz")
+
+
+def snapshot_params(min_turnover_cr, eq_series_filter, circuit_filter_enabled,
+                    circuit_threshold) -> dict:
+    """The ranking settings a snapshot was built with (JSON-comparable)."""
+    return {
+        "min_turnover_cr":        float(min_turnover_cr),
+        "eq_series_filter":       bool(eq_series_filter),
+        "circuit_filter_enabled": bool(circuit_filter_enabled),
+        "circuit_threshold":      int(circuit_threshold),
+        "windows":                WINDOWS,
+        "rfr_annual":             RFR_ANNUAL,
+        "trading_days":           TRADING_DAYS,
+    }
+
+
+def _config_params(base_dir) -> dict:
+    cfg = ml.load_config(str(base_dir))
+    return snapshot_params(cfg["min_turnover"], cfg["eq_series_filter"],
+                           cfg["circuit_filter_enabled"], cfg["circuit_threshold"])
+
+
+def _input_fingerprints(filepath) -> dict:
+    """SHA-1 of the workbook and the side files its artifacts depend on."""
+    base   = Path(filepath).parent
+    prints = {}
+    for path in (Path(filepath), base / BAND_CSV, base / STOCKDB_CSV):
+        prints[path.name] = ml._file_fingerprint(path) if path.exists() else None
+    return prints
+
+
+# ── ARTIFACTS ─────────────────────────────────────────────────────────────────
+
+def load_stockdb(stockdb_path) -> dict:
+    """Load stock cap classification from STOCKDB.csv. Fast — no network call needed."""
+    stockdb_path = Path(stockdb_path)
+    if not stockdb_path.exists():
+        return {}
+    df = pd.read_csv(stockdb_path)
+    return dict(zip(df["SYMBOL"].str.strip(), df["MARKETCAP"].str.strip()))
+
+
+def compute_ad_ratio(prices_df: pd.DataFrame) -> tuple:
+    """Calculate 1-Day Advance/Decline ratio."""
+    if len(prices_df.columns) < 2:
+        return 0, 0, None
+    last_two = prices_df.iloc[:, -2:]
+    rets = last_two.iloc[:, 1] - last_two.iloc[:, 0]
+    adv = (rets > 0).sum()
+    dec = (rets < 0).sum()
+    ratio = adv / dec if dec > 0 else float('inf')
+    return int(adv), int(dec), ratio
+
+
+def compute_cap_tier_dual(result_df: pd.DataFrame, prices_df: pd.DataFrame,
+                          stock_tickers: list, stockdb: dict) -> pd.DataFrame:
+    """
+    Compute dual market cap momentum breakdown using STOCKDB classification.
+    Signal 1: 63-day raw price return > 0%  (existing metric)
+    Signal 2: 3M Sharpe score > 0           (new metric — risk-adjusted)
+    Returns a DataFrame with both signals and delta per cap tier.
+    """
+    tiers = pd.Series([stockdb.get(t) for t in stock_tickers], index=stock_tickers,
+                      dtype=object).dropna()
+    if tiers.empty:
+        return pd.DataFrame()
+
+    # 63-day raw return on each ticker's own valid history
+    vals   = ml._right_align_valid(prices_df.loc[tiers.index].to_numpy(dtype=float))
+    n_obs  = (~np.isnan(vals)).sum(axis=1)
+    ret_63 = np.where(n_obs >= 63, vals[:, -1] / vals[:, -63] - 1.0, np.nan)
+    s3m    = (result_df["S_3M"].reindex(tiers.index).to_numpy(dtype=float)
+              if "S_3M" in result_df.columns else np.full(len(tiers), np.nan))
+
+    df = pd.DataFrame({"Cap_Tier":      tiers.to_numpy(),
+                       "Ret_63_Pos":    ret_63 > 0,
+                       "Sharpe_3M_Pos": s3m > 0})
+    counts = df.groupby("Cap_Tier").agg(Total=("Cap_Tier", "size"),
+                                        Ret=("Ret_63_Pos", "sum"),
+                                        Sharpe=("Sharpe_3M_Pos", "sum"))
+    counts = counts.reindex([t for t in CAP_ORDER if t in counts.index])
+
+    rows = []
+    for tier, row in counts.iterrows():
+        total      = int(row["Total"])
+        ret_pos    = int(row["Ret"])
+        sharpe_pos = int(row["Sharpe"])
+        rows.append({
+            "Cap Tier":            CAP_LABELS.get(tier, tier),
+            "Total":               total,
+            "63D Ret +ve":         ret_pos,
+            "63D Ret % +ve":       round(ret_pos    / total * 100, 1),
+            "3M Sharpe +ve":       sharpe_pos,
+            "3M Sharpe % +ve":     round(sharpe_pos / total * 100, 1),
+            "Delta (Sharpe-Ret)": sharpe_pos - ret_pos,
+        })
+    return pd.DataFrame(rows)
+
+
+def early_signal_table(history: dict, result_df: pd.DataFrame) -> pd.DataFrame:
+    """ml.early_mover_signals() over the score store, plus today's RANK."""
+    tickers = history["tickers"]
+    if len(history["run_dates"]) == 0:
+        return pd.DataFrame()
+    # Scores are stored rounded to 4 dp in float32; rounding again in float64
+    # restores the exact recorded values before slopes / display rounding.
+    sig = ml.early_mover_signals(
+        pd.DataFrame(history["scores"].astype(float).round(4), columns=tickers),
+        pd.DataFrame(history["z3m"].astype(float).round(4), columns=tickers))
+    sig["RANK"] = result_df["RANK"].reindex(tickers).to_numpy(dtype=float)
+    return sig
+
+
+def build_snapshot(filepath, params: dict = None, record_scores: bool = True) -> dict:
+    """
+    Compute every precomputable dashboard artifact for one workbook.
+
+    Also records the run into the Early Movers score store (same skip rules
+    as the dashboard) so the signal table reflects it.
+
+    Returns dict:
+      result, regime_score, regime_detail, cap_tiers, ad, early_signals,
+      score_runs (n_runs, last run_date, last file_mtime), inputs, params,
+      last_date, built_at
+    """
+    filepath = Path(filepath)
+    base_dir = filepath.parent
+    params   = params or _config_params(base_dir)
+    inputs   = _input_fingerprints(filepath)
+
+    prices_df, nifty_series, stock_tickers, dates = ml.load_prices(str(filepath))
+    try:
+        volume_df = ml.load_volume(str(filepath))
+    except Exception:
+        volume_df = None
+
+    state = rs.update_ranking_state(str(filepath), prices_df, stock_tickers, WINDOWS)
+    band_csv = str(base_dir / BAND_CSV)
+    result, regime_score, regime_detail = ml.cached_universe_rankings(
+        prices_df, nifty_series, stock_tickers,
+        volume_df=volume_df,
+        min_turnover_cr=params["min_turnover_cr"],
+        eq_series_filter=params["eq_series_filter"],
+        circuit_filter_enabled=params["circuit_filter_enabled"],
+        circuit_threshold=params["circuit_threshold"],
+        band_csv_path=band_csv,
+        windows=WINDOWS,
+        trading_days=TRADING_DAYS,
+        rfr_annual=RFR_ANNUAL,
+        precomputed=rs.ranking_state_frame(state, RFR_ANNUAL / TRADING_DAYS, TRADING_DAYS),
+    )
+    result["SERIES"] = (ml.load_price_bands(band_csv)["SERIES"]
+                        .reindex(result.index).fillna("EQ").astype(str))
+
+    universe  = filepath.name.replace("_updated.xlsx", "").replace(".xlsx", "")
+    store_dir = sh.ensure_score_store(base_dir, universe)
+    history   = sh.load_score_store(store_dir)
+    if record_scores and sh.record_score_run(store_dir, filepath, result, history):
+        history = sh.load_score_store(store_dir)
+
+    return {
+        "result":        result,
+        "regime_score":  float(regime_score),
+        "regime_detail": regime_detail,
+        "cap_tiers":     compute_cap_tier_dual(result, prices_df, stock_tickers,
+                                               load_stockdb(base_dir / STOCKDB_CSV)),
+        "ad":            list(compute_ad_ratio(prices_df)),
+        "early_signals": early_signal_table(history, result),
+        "score_runs":    [len(history["run_dates"]),
+                          history["run_dates"][-1] if history["run_dates"] else None,
+                          history["file_mtimes"][-1] if history["file_mtimes"] else None],
+        "inputs":        inputs,
+        "params":        params,
+        "last_date":     pd.Timestamp(dates[-1]).isoformat(),
+        "built_at":      datetime.datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+# ── SNAPSHOT I/O ──────────────────────────────────────────────────────────────
+SNAPSHOT_FRAMES = ("result", "cap_tiers", "early_signals")
+
+
+def save_snapshot(path, snapshot: dict):
+    """Write `snapshot` atomically: numeric columns as arrays, the rest as JSON."""
+    path   = Path(path)
+    arrays = {}
+    meta   = {k: v for k, v in snapshot.items() if k not in SNAPSHOT_FRAMES}
+    meta["version"] = SNAPSHOT_VERSION
+    meta["frames"]  = {}
+    for name in SNAPSHOT_FRAMES:
+        df, text_cols = snapshot[name], {}
+        for i, col in enumerate(df.columns):
+            series = df[col]
+            if series.dtype.kind in "biuf":
+                arrays[f"{name}.c{i}"] = series.to_numpy()
+            else:
+                text_cols[str(i)] = [str(series.dtype), series.tolist()]
+        meta["frames"][name] = {"index":     df.index.tolist(),
+                                "columns":   [str(c) for c in df.columns],
+                                "text_cols": text_cols}
+    # per-writer tmp name: the CLI, the service thread and a second dashboard
+    # process may save the same snapshot at once
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp.npz")
+    np.savez(tmp, meta=np.array(json.dumps(meta, default=ml._json_default)), **arrays)
+    os.replace(tmp, path)
+
+
+def _read_snapshot(path: Path) -> dict:
+    with np.load(path, allow_pickle=False) as z:
+        meta = json.loads(str(z["meta"]))
+        snapshot = {k: v for k, v in meta.items() if k != "frames"}
+        for name, frame in meta["frames"].items():
+            index = frame["index"]
+            cols  = {}
+            for i, col in enumerate(frame["columns"]):
+                if str(i) in frame["text_cols"]:
+                    dtype, values = frame["text_cols"][str(i)]
+                    cols[col] = pd.Series(values, index=index).astype(dtype)
+                else:
+                    cols[col] = pd.Series(z[f"{name}.c{i}"], index=index)
+            snapshot[name] = pd.DataFrame(cols, index=index, columns=frame["columns"])
+    return snapshot
+
+
+def load_snapshot(filepath, params: dict = None):
+    """
+    The snapshot for `filepath`, or None if it is missing, unreadable or
+    stale (inputs changed, or built with different ranking settings).
+    """
+    path = snapshot_path(filepath)
+    if not path.exists():
+        return None
+    try:
+        snapshot = _read_snapshot(path)
+    except Exception:
+        return None
+    if snapshot.get("version") != SNAPSHOT_VERSION:
+        return None
+    if params is not None and snapshot["params"] != json.loads(json.dumps(params)):
+        return None
+    if snapshot["inputs"] != _input_fingerprints(filepath):
+        return None
+    return snapshot
+
+
+def snapshot_stamps(filepath) -> tuple:
+    """(mtime, size) of the snapshot and its inputs — a cheap cache key for
+    callers that memoise load_snapshot() between file changes."""
+    base  = Path(filepath).parent
+    stamp = []
+    for p in (snapshot_path(filepath), Path(filepath), base / BAND_CSV, base / STOCKDB_CSV):
+        try:
+            st = p.stat()
+            stamp.append((st.st_mtime, st.st_size))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+# ── SERVICE ───────────────────────────────────────────────────────────────────
+
+def refresh_snapshots(base_dir=SCRIPT_DIR, force: bool = False, files: list = None) -> list:
+    """
+    Rebuild the snapshot of every *_updated.xlsx in `base_dir` (or `files`)
+    whose snapshot is missing or stale. Returns the workbooks rebuilt.
+    """
+    base_dir = Path(base_dir)
+    params   = _config_params(base_dir)
+    paths    = ([Path(f) for f in files] if files else
+                sorted(p for p in base_dir.glob(WATCH_PATTERN) if not p.name.startswith("~")))
+    built    = []
+    for path in paths:
+        if not force and load_snapshot(path, params) is not None:
+            continue
+        t0 = time.perf_counter()
+        try:
+            save_snapshot(snapshot_path(path), build_snapshot(path, params))
+        except Exception as e:
+            print(f"  precompute: {path.name} failed — {e}")
+            continue
+        print(f"  precompute: {path.name} snapshot in {time.perf_counter() - t0:.1f}s")
+        built.append(path)
+    return built
+
+
+def _stamps(base_dir: Path) -> dict:
+    """(mtime, size) of every watched workbook and the config / side files."""
+    stamps = {}
+    for p in list(base_dir.glob(WATCH_PATTERN)) + [base_dir / BAND_CSV,
+                                                   base_dir / STOCKDB_CSV,
+                                                   base_dir / ml.CONFIG_FILENAME]:
+        try:
+            st = p.stat()
+            stamps[p.name] = (st.st_mtime, st.st_size)
+        except OSError:
+            pass
+    return stamps
+
+
+def watch(base_dir=SCRIPT_DIR, interval: float = POLL_SECONDS,
+          stop_event: threading.Event = None):
+    """
+    Poll `base_dir` every `interval` seconds and refresh snapshots when a
+    watched file changes. A change is acted on only once the file stamps
+    are unchanged across two polls, so a workbook still being written by
+    update_stock_price.py is never read half-way.
+    """
+    base_dir   = Path(base_dir)
+    stop_event = stop_event or threading.Event()
+    refresh_snapshots(base_dir)
+    done, seen = _stamps(base_dir), None
+    while not stop_event.wait(interval):
+        now = _stamps(base_dir)
+        if now != done and now == seen:
+            refresh_snapshots(base_dir)
+            done = now
+        seen = now
+
+
+def refresh_market_cap_store(base_dir=SCRIPT_DIR, force: bool = False) -> int:
+    """
+    Bulk-refresh the market-cap store for the tickers of every watched
+    workbook — a no-op unless the daily window has passed (or `force`).
+    Returns tickers fetched.
+    """
+    base_dir = Path(base_dir)
+    store    = mc.market_cap_store_path(base_dir)
+    if not force and not mc.refresh_due(store):
+        return 0
+    tickers = []
+    for path in sorted(base_dir.glob(WATCH_PATTERN)):
+        if not path.name.startswith("~"):
+            tickers += ml.load_prices(str(path))[2]
+    return mc.refresh_market_caps(store, tickers, force=force)
+
+
+def watch_market_caps(base_dir=SCRIPT_DIR, interval: float = CAPS_POLL_SECONDS,
+                      stop_event: threading.Event = None):
+    """Check every `interval` seconds whether the daily market-cap refresh is due."""
+    stop_event = stop_event or threading.Event()
+    while True:
+        try:
+            n = refresh_market_cap_store(base_dir)
+            if n:
+                print(f"  precompute: {n} market cap(s) refreshed")
+        except Exception as e:
+            print(f"  precompute: market-cap refresh failed — {e}")
+        if stop_event.wait(interval):
+            return
+
+
+def start_background_service(base_dir=SCRIPT_DIR, interval: float = POLL_SECONDS):
+    """Start the snapshot watcher and the market-cap loop as daemon threads
+    (once per process). Returns the watcher thread."""
+    global _service_thread, _caps_thread
+    with _service_lock:
+        if _service_thread is None or not _service_thread.is_alive():
+            _service_thread = threading.Thread(
+                target=watch, args=(base_dir, interval),
+                name="sharpe-precompute", daemon=True)
+            _service_thread.start()
+        if _caps_thread is None or not _caps_thread.is_alive():
+            _caps_thread = threading.Thread(
+                target=watch_market_caps, args=(base_dir,),
+                name="sharpe-market-caps", daemon=True)
+            _caps_thread.start()
+    return _service_thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute Sharpe dashboard snapshots")
+    parser.add_argument("files", nargs="*", help="workbooks (default: every *_updated.xlsx)")
+    parser.add_argument("--watch", action="store_true", help="keep watching for changes")
+    parser.add_argument("--interval", type=float, default=POLL_SECONDS,
+                        help="poll interval in seconds for --watch")
+    parser.add_argument("--force", action="store_true", help="rebuild even if fresh")
+    args = parser.parse_args()
+
+    if args.watch:
+        print(f"Watching {SCRIPT_DIR / WATCH_PATTERN} every {args.interval:g}s (Ctrl+C to stop)")
+        threading.Thread(target=watch_market_caps, args=(SCRIPT_DIR,),
+                         name="sharpe-market-caps", daemon=True).start()
+        try:
+            watch(SCRIPT_DIR, args.interval)
+        except KeyboardInterrupt:
+            pass
+    else:
+        built = refresh_snapshots(SCRIPT_DIR, force=args.force,
+                                  files=[SCRIPT_DIR / f for f in args.files])
+        print(f"{len(built)} snapshot(s) rebuilt")
@@ -0,0 +1,412 @@
+"""
+ranking_state.py
+================
+Incremental daily ranking state for Sharpe.py.
+
+Each morning the price panel gains one column and the oldest bar of every
+window rolls off, yet compute_sharpe() / compute_pct_from_52h() /
+compute_regime_score() re-derive every statistic from the full history.
+This module keeps the per-ticker running state in a small file next to the
+workbook so a new trading day costs O(tickers) instead of O(tickers × days):
+
+    N750_updated.xlsx  ->  N750_updated.rankstate.npz
+
+State per ticker
+----------------
+buf      last M valid closes, right-aligned (M = longest window + 1) — the
+         rolling window itself; the oldest return of each window and the
+         52-week high are read straight off it
+count    number of valid closes in the panel
+s1, s2   running Σr and Σr² of the log returns inside each Sharpe window
+         (the risk-free rate is subtracted when the Sharpe is read, so the
+         state stays valid if RFR_ANNUAL changes)
+ema      EMA state per span + bars since the last print (gap-aware, same
+         recurrence as pandas ewm(adjust=False))
+check    raw closes of the last CHECK_DAYS dates
+
+On every advance the stored `check` closes are compared with the same
+dates in the new panel. A ticker whose history moved (split / bonus /
+dividend back-adjustment) or that is new to the universe is rebuilt from
+its full row; everything else only rolls forward. Running sums are re-summed
+exactly from `buf` every RESYNC_EVERY advances so float drift cannot build
+up.
+
+The workbooks are a rolling window (N750: 261 columns), so the state also
+records the panel's first date. When columns have rolled off the front,
+count is re-read from the panel, closes older than the panel are dropped
+from `buf` (and those rows' sums re-summed), and the EMAs — whose seed is
+the first close in the panel — are recomputed from the panel, so the
+state keeps matching a full recompute on the same panel.
+
+Functions
+---------
+build_ranking_state(prices_df, stock_tickers, windows)  — full recompute
+advance_ranking_state(state, prices_df, stock_tickers)  — roll forward to the panel's last date
+ranking_state_frame(state, rfr_daily, trading_days)     — raw Sharpe / PCT_FROM_52H / EMA table
+save_ranking_state(state, path), load_ranking_state(path)
+update_ranking_state(filepath, prices_df, stock_tickers, windows) — load → advance/build → save
+"""
+
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import momentum_lib as ml
+
+
+# ── CONFIG ────────────────────────────────────────────────────────────────────
+STATE_VERSION       = 2
+DEFAULT_EMA_SPANS   = (50, 200)
+DEFAULT_HIGH_WINDOW = 252
+CHECK_DAYS          = 5       # trailing raw closes compared for corporate actions
+RESYNC_EVERY        = 21      # advances between exact re-sums of s1 / s2
+CHECK_RTOL          = 1e-9    # any real restatement moves prices far more than this
+
+
+def ranking_state_path(filepath: str) -> Path:
+    """State file for a price workbook (same folder, same stem)."""
+    p = Path(filepath)
+    return p.with_name(f"{p.stem}.rankstate.npz")
+
+
+def _date_array(dates) -> np.ndarray:
+    return np.array(list(dates), dtype="datetime64[D]")
+
+
+@lru_cache(maxsize=None)
+def _ema_weight(span: int, k: int) -> float:
+    """
+    Weight of a new close that arrives `k` bars after the previous one in
+    pandas' ewm(span, adjust=False) with NaN gaps: ema' = (1-w)·ema + w·x.
+    Calibrated on pandas itself so the state follows the installed version.
+    """
+    probe = pd.Series([0.0] + [np.nan] * (k - 1) + [1.0])
+    return float(probe.ewm(span=span, adjust=False).mean().iloc[-1])
+
+
+# ── FULL BUILD ────────────────────────────────────────────────────────────────
+
+def _window_sums(buf: np.ndarray, windows: dict):
+    """Exact Σr / Σr² over the trailing returns of each window (from `buf`)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rets = np.diff(np.log(buf), axis=1)
+    s1 = np.empty((len(buf), len(windows)))
+    s2 = np.empty((len(buf), len(windows)))
+    for j, w in enumerate(windows.values()):
+        tail     = np.nan_to_num(rets[:, -w:])
+        s1[:, j] = tail.sum(axis=1)
+        s2[:, j] = (tail ** 2).sum(axis=1)
+    return s1, s2
+
+
+def _ema_rows(values: np.ndarray, ema_spans: tuple):
+    """Last ewm(span, adjust=False) value per span and bars since the last print."""
+    n, t  = values.shape
+    valid = ~np.isnan(values)
+    frame = pd.DataFrame(values.T)
+    ema   = np.column_stack(
+        [frame.ewm(span=span, adjust=False).mean().iloc[-1].to_numpy()
+         if t else np.full(n, np.nan) for span in ema_spans]
+    ) if ema_spans else np.empty((n, 0))
+    last_valid = np.where(valid.any(axis=1),
+                          t - 1 - np.argmax(valid[:, ::-1], axis=1), -1)
+    gap = np.where(last_valid >= 0, t - 1 - last_valid, 0)
+    return ema, gap
+
+
+def _build_rows(values: np.ndarray, windows: dict, ema_spans: tuple,
+                buf_len: int) -> dict:
+    """
+    State arrays for the rows of `values` (tickers × dates, full history up
+    to the state date) — the vectorised equivalent of the per-ticker loop.
+    """
+    n, t    = values.shape
+    aligned = ml._right_align_valid(values)
+    if t < buf_len:
+        aligned = np.hstack([np.full((n, buf_len - t), np.nan), aligned])
+    buf   = aligned[:, -buf_len:].copy()
+    count = (~np.isnan(values)).sum(axis=1)
+    s1, s2 = _window_sums(buf, windows)
+    ema, gap = _ema_rows(values, ema_spans)
+
+    check = values[:, -CHECK_DAYS:]
+    if check.shape[1] < CHECK_DAYS:
+        check = np.hstack([np.full((n, CHECK_DAYS - check.shape[1]), np.nan), check])
+    return {"buf": buf, "count": count, "s1": s1, "s2": s2,
+            "ema": ema, "gap": gap, "check": check.copy()}
+
+
+def build_ranking_state(prices_df: pd.DataFrame,
+                        stock_tickers: list,
+                        windows: dict,
+                        ema_spans: tuple = DEFAULT_EMA_SPANS,
+                        high_window: int = DEFAULT_HIGH_WINDOW) -> dict:
+    """
+    Full recompute of the ranking state from the whole price panel.
+
+    Returns dict: tickers, dates_tail, windows, ema_spans, high_window,
+    since_resync + the per-ticker arrays described in the module docstring.
+    """
+    buf_len = max(max(windows.values()) + 1, high_window)
+    values  = prices_df.reindex(stock_tickers).to_numpy(dtype=float)
+    state   = {
+        "tickers":      list(stock_tickers),
+        "first_date":   _date_array(prices_df.columns)[:1],
+        "dates_tail":   _date_array(prices_df.columns)[-CHECK_DAYS:],
+        "windows":      dict(windows),
+        "ema_spans":    tuple(int(s) for s in ema_spans),
+        "high_window":  int(high_window),
+        "since_resync": 0,
+    }
+    state.update(_build_rows(values, windows, state["ema_spans"], buf_len))
+    return state
+
+
+# ── DAILY ADVANCE ─────────────────────────────────────────────────────────────
+
+def _advance_one(state: dict, x: np.ndarray):
+    """Roll every ticker forward by one date column `x` (NaN = no print)."""
+    buf, count = state["buf"], state["count"]
+    buf_len    = buf.shape[1]
+    valid      = ~np.isnan(x)
+    has_prev   = valid & (count > 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_new = np.where(has_prev, np.log(x / buf[:, -1]), 0.0)
+        for j, w in enumerate(state["windows"].values()):
+            full  = has_prev & (count - 1 >= w)
+            r_old = np.where(full, np.log(buf[:, buf_len - w] / buf[:, buf_len - w - 1]), 0.0)
+            state["s1"][:, j] += r_new - r_old
+            state["s2"][:, j] += r_new ** 2 - r_old ** 2
+
+    rows = np.flatnonzero(valid)
+    buf[rows, :-1] = buf[rows, 1:]
+    buf[rows, -1]  = x[rows]
+    count += valid
+
+    ema, gap = state["ema"], state["gap"]
+    if len(rows):
+        ks, inv = np.unique(gap[rows] + 1, return_inverse=True)
+        for j, span in enumerate(state["ema_spans"]):
+            wt   = np.array([_ema_weight(span, int(k)) for k in ks])[inv]
+            prev = ema[rows, j]
+            ema[rows, j] = np.where(np.isnan(prev), x[rows],
+                                    (1.0 - wt) * prev + wt * x[rows])
+    started = ~np.isnan(ema[:, 0]) if ema.shape[1] else count > 0
+    state["gap"] = np.where(valid, 0, np.where(started, gap + 1, 0))
+
+    state["check"] = np.hstack([state["check"][:, 1:], x[:, None]])
+    state["since_resync"] += 1
+    if state["since_resync"] >= RESYNC_EVERY:
+        state["s1"], state["s2"] = _window_sums(buf, state["windows"])
+        state["since_resync"] = 0
+
+
+def _trim_to_panel(state: dict, values: np.ndarray):
+    """
+    Drop what the state still holds from before the panel's first column:
+    count is re-read from the panel, older closes leave `buf` (those rows'
+    sums are re-summed) and the EMAs are re-seeded on the panel.
+    """
+    buf     = state["buf"]
+    buf_len = buf.shape[1]
+    count   = (~np.isnan(values)).sum(axis=1)
+    stale   = np.arange(buf_len)[None, :] < (buf_len - count)[:, None]
+    rows    = np.flatnonzero((stale & ~np.isnan(buf)).any(axis=1))
+    buf[stale] = np.nan
+    if len(rows):
+        s1, s2 = _window_sums(buf[rows], state["windows"])
+        state["s1"][rows], state["s2"][rows] = s1, s2
+    state["count"] = count
+    state["ema"], state["gap"] = _ema_rows(values, state["ema_spans"])
+
+
+def advance_ranking_state(state: dict,
+                          prices_df: pd.DataFrame,
+                          stock_tickers: list) -> tuple:
+    """
+    Bring `state` up to the last date of `prices_df` in place.
+
+    Tickers that are new, or whose stored trailing closes no longer match
+    the panel (corporate-action back-adjustment), are rebuilt from their
+    full row; dropped tickers are removed. Columns that rolled off the
+    front of the panel are dropped from the state (_trim_to_panel). If the
+    state's dates are no longer in the panel, or the panel now starts
+    earlier than the state, a full rebuild is returned instead.
+
+    Returns (state, info) — info: {"advanced": n_dates, "rebuilt": n_rows,
+    "full_rebuild": bool}
+    """
+    dates    = _date_array(prices_df.columns)
+    pos      = {d: i for i, d in enumerate(dates)}
+    tail_pos = [pos.get(d) for d in state["dates_tail"]]
+    earlier  = len(dates) and dates[0] < state["first_date"][0]   # history prepended
+    if not tail_pos or any(p is None for p in tail_pos) or earlier:
+        fresh = build_ranking_state(prices_df, stock_tickers, state["windows"],
+                                    state["ema_spans"], state["high_window"])
+        return fresh, {"advanced": 0, "rebuilt": len(stock_tickers), "full_rebuild": True}
+
+    last_pos = tail_pos[-1]
+    values   = prices_df.reindex(stock_tickers).to_numpy(dtype=float)
+    buf_len  = state["buf"].shape[1]
+
+    # ── Re-key rows to the current ticker list ────────────────────────────────
+    old_row = {t: i for i, t in enumerate(state["tickers"])}
+    take    = np.array([old_row.get(t, -1) for t in stock_tickers], dtype=int)
+    known   = take >= 0
+    for key in ("buf", "count", "s1", "s2", "ema", "gap", "check"):
+        arr = state[key][np.where(known, take, 0)]
+        arr[~known] = 0 if key in ("count", "gap") else np.nan
+        state[key] = arr
+    state["tickers"] = list(stock_tickers)
+
+    # ── Corporate-action probe on the stored trailing closes ──────────────────
+    stored  = state["check"][:, -len(tail_pos):]
+    current = values[:, tail_pos]
+    moved   = ~np.all(np.isclose(current, stored, rtol=CHECK_RTOL, atol=0.0,
+                                 equal_nan=True), axis=1)
+    # A ticker with no print in the probe window cannot be verified — rebuild
+    # it (cheap: only suspended names) rather than trust stale closes.
+    unverified = np.isnan(stored).all(axis=1) & (state["count"] > 0)
+    rebuild    = ~known | moved | unverified
+    idx        = np.flatnonzero(rebuild)
+    if len(idx):
+        rows = _build_rows(values[idx, :last_pos + 1], state["windows"],
+                           state["ema_spans"], buf_len)
+        for key, arr in rows.items():
+            state[key][idx] = arr
+
+    for col in range(last_pos + 1, values.shape[1]):
+        _advance_one(state, values[:, col])
+    if len(dates) and dates[0] != state["first_date"][0]:
+        _trim_to_panel(state, values)
+    state["first_date"] = dates[:1]
+    state["dates_tail"] = dates[max(0, len(dates) - CHECK_DAYS):]
+
+    return state, {"advanced": values.shape[1] - 1 - last_pos,
+                   "rebuilt": len(idx), "full_rebuild": False}
+
+
+# ── READ-OUT ──────────────────────────────────────────────────────────────────
+
+def ranking_state_frame(state: dict, rfr_daily: float,
+                        trading_days: int = 252) -> pd.DataFrame:
+    """
+    Per-ticker statistics as of the state date, with the same semantics as
+    the full-panel functions:
+
+      <window label>  raw Sharpe        (compute_sharpe_matrix)
+      PCT_FROM_52H    % from 52W high   (compute_pct_from_52h)
+      EMA<span>       last EMA value    (ewm(span, adjust=False))
+      LAST_PX         close on the last date (NaN if no print)
+
+    Pass it to compute_universe_rankings(precomputed=...).
+    """
+    count = state["count"].astype(float)
+    out   = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for j, (label, w) in enumerate(state["windows"].items()):
+            n    = np.clip(np.minimum(w, count - 1), 0, None)
+            s1   = state["s1"][:, j]
+            s2   = state["s2"][:, j]
+            var  = np.clip((s2 - s1 ** 2 / n) / (n - 1), 0.0, None)
+            sd   = np.sqrt(var)
+            shp  = (s1 / n - rfr_daily) / sd * np.sqrt(trading_days)
+            shp[(count < w * 0.90) | ~(sd >= 1e-12)] = np.nan
+            out[label] = shp
+
+        buf  = state["buf"]
+        high = np.nanmax(np.where(np.isnan(buf[:, -state["high_window"]:]), -np.inf,
+                                  buf[:, -state["high_window"]:]), axis=1)
+        pct  = (buf[:, -1] / high - 1) * 100
+        pct[(count < 2) | ~(high > 0)] = np.nan
+    out["PCT_FROM_52H"] = pct
+
+    for j, span in enumerate(state["ema_spans"]):
+        out[f"EMA{span}"] = state["ema"][:, j]
+    out["LAST_PX"] = state["check"][:, -1]
+    return pd.DataFrame(out, index=state["tickers"])
+
+
+# ── PERSISTENCE ───────────────────────────────────────────────────────────────
+
+_ARRAY_KEYS = ("buf", "count", "s1", "s2", "ema", "gap", "check", "first_date", "dates_tail")
+
+
+def save_ranking_state(state: dict, path) -> Path:
+    """Atomically write `state` to `path` (.npz)."""
+    path     = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    meta = {
+        "version":      STATE_VERSION,
+        "windows":      state["windows"],
+        "ema_spans":    list(state["ema_spans"]),
+        "high_window":  state["high_window"],
+        "since_resync": state["since_resync"],
+    }
+    with open(tmp_path, "wb") as f:
+        np.savez(f,
+                 tickers=np.array([str(t) for t in state["tickers"]], dtype=str),
+                 meta=np.array(json.dumps(meta)),
+                 **{k: state[k] for k in _ARRAY_KEYS})
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_ranking_state(path):
+    """Load a state written by save_ranking_state(); None if missing / unreadable."""
+    path = Path(path)
+    if not path.exists():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(str(z["meta"]))
+            if meta.get("version") != STATE_VERSION:
+                return None
+            state = {k: z[k].copy() for k in _ARRAY_KEYS}
+            state["tickers"] = z["tickers"].tolist()
+    except Exception:
+        return None
+    state["windows"]      = {k: int(v) for k, v in meta["windows"].items()}
+    state["ema_spans"]    = tuple(meta["ema_spans"])
+    state["high_window"]  = int(meta["high_window"])
+    state["since_resync"] = int(meta["since_resync"])
+    return state
+
+
+def update_ranking_state(filepath: str,
+                         prices_df: pd.DataFrame,
+                         stock_tickers: list,
+                         windows: dict,
+                         ema_spans: tuple = DEFAULT_EMA_SPANS,
+                         high_window: int = DEFAULT_HIGH_WINDOW) -> dict:
+    """
+    Load the state beside `filepath`, bring it up to date with `prices_df`
+    (or rebuild it if missing / built with other windows) and save it back.
+
+    Returns the up-to-date state dict.
+    """
+    path  = ranking_state_path(filepath)
+    state = load_ranking_state(path)
+    if (state is None or state["windows"] != dict(windows)
+            or state["ema_spans"] != tuple(ema_spans)
+            or state["high_window"] != high_window):
+        print("  Building ranking state (full recompute) ...")
+        state = build_ranking_state(prices_df, stock_tickers, windows,
+                                    ema_spans, high_window)
+    else:
+        state, info = advance_ranking_state(state, prices_df, stock_tickers)
+        if info["full_rebuild"]:
+            print("  Ranking state dates no longer in the panel — rebuilt in full.")
+        else:
+            print(f"  Ranking state advanced {info['advanced']} day(s); "
+                  f"{info['rebuilt']} ticker(s) rebuilt (new / restated history).")
+    try:
+        save_ranking_state(state, path)
+    except OSError as e:
+        print(f"  Warning: could not write ranking state ({e})")
+    return state
@@ -0,0 +1,356 @@
+"""
+score_history.py
+================
+Columnar, append-only store for the Early Movers score history.
+
+The dashboard used to keep {universe}_score_history.json — up to 262 runs ×
+~750 ticker→score dicts — and rewrite the whole file on every refresh, then
+walk every entry for every ticker to rebuild per-ticker lists. This store
+keeps the same history as (run × ticker) float32 matrices:
+
+    N750_score_history/
+        values.0.f32    one row per run: COMPOSITE scores, then Z_3M scores
+        tickers.txt     column order (append-only, one ticker per line)
+        runs.ndjson     one line per row: run_date, file_mtime, offset, width, file
+
+A new run appends one row to the data file, any new tickers to tickers.txt
+and one line to runs.ndjson — O(tickers) bytes, never a rewrite. Rows
+written before a ticker first appeared are simply shorter (read back as
+NaN). A later run on the same calendar day appends a row that supersedes
+the earlier one. Once the log holds more than 2 × max_runs rows it is
+compacted into a new data file; the index is switched atomically, so a
+reader never sees a half-written store. Writers (the dashboard and the
+precompute service thread) take an exclusive lock on store.lock around the
+JSON import and every append, so tickers.txt is always re-read under the
+lock before new columns are added.
+
+Functions
+---------
+score_store_dir(base_dir, universe_name)        — store folder for a universe
+load_score_store(store_dir, max_runs)           — {"run_dates", "file_mtimes", "tickers", "scores", "z3m"}
+empty_score_store()                             — the same dict with no runs
+append_score_run(store_dir, run_date, file_mtime, scores, z3m, max_runs)
+import_score_json(json_path, store_dir)         — one-time migration from the JSON history
+ensure_score_store(base_dir, universe_name)     — store folder, migrating the JSON history once
+record_score_run(store_dir, input_path, result_df) — append a run unless it repeats the last one
+"""
+
+import contextlib
+import datetime
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# ── CONFIG ────────────────────────────────────────────────────────────────────
+MAX_HISTORY_RUNS = 262
+COMPACT_FACTOR   = 2          # compact once raw rows exceed this × max_runs
+INDEX_FILE       = "runs.ndjson"
+TICKERS_FILE     = "tickers.txt"
+LOCK_FILE        = "store.lock"
+
+
+def score_store_dir(base_dir, universe_name: str) -> Path:
+    """Store folder for `universe_name` (e.g. N750_score_history/)."""
+    return Path(base_dir) / f"{universe_name}_score_history"
+
+
+def empty_score_store() -> dict:
+    """A store with no runs, shaped like load_score_store()'s result."""
+    return {"run_dates": [], "file_mtimes": [], "tickers": [],
+            "scores": np.empty((0, 0), dtype=np.float32),
+            "z3m":    np.empty((0, 0), dtype=np.float32)}
+
+
+@contextlib.contextmanager
+def _store_lock(store_dir: Path):
+    """Exclusive cross-process (and cross-thread) lock on the store's writers."""
+    store_dir.mkdir(parents=True, exist_ok=True)
+    with open(store_dir / LOCK_FILE, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:             # LK_LOCK gives up after ~10 s; keep waiting
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _read_index(store_dir: Path) -> list:
+    """Parsed runs.ndjson lines; a torn last line (crash mid-append) is ignored."""
+    path = store_dir / INDEX_FILE
+    if not path.exists():
+        return []
+    rows = []
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                continue
+    return rows
+
+
+def _read_tickers(store_dir: Path) -> list:
+    path = store_dir / TICKERS_FILE
+    if not path.exists():
+        return []
+    with open(path, "r") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def _live_rows(index: list, max_runs: int = None) -> list:
+    """Index rows after same-day supersession, oldest first, capped at max_runs."""
+    latest = {}
+    for row in index:
+        latest[row["run_date"]] = row           # later row for a date wins
+    rows = sorted(latest.values(), key=lambda r: r["run_date"])
+    return rows[-max_runs:] if max_runs else rows
+
+
+# ── READ ──────────────────────────────────────────────────────────────────────
+
+def _read_rows(store_dir: Path, rows: list, n_tick: int):
+    """(scores, z3m) float32 matrices for index `rows`, in tickers.txt column order."""
+    scores = np.full((len(rows), n_tick), np.nan, dtype=np.float32)
+    z3m    = np.full((len(rows), n_tick), np.nan, dtype=np.float32)
+    maps   = {}
+    for i, row in enumerate(rows):
+        data = maps.get(row["file"])
+        if data is None:
+            data = maps[row["file"]] = np.memmap(store_dir / row["file"],
+                                                 dtype=np.float32, mode="r")
+        w     = row["width"]
+        start = row["offset"] // 4
+        scores[i, :w] = data[start:start + w]
+        z3m[i, :w]    = data[start + w:start + 2 * w]
+    del maps
+    return scores, z3m
+
+
+def load_score_store(store_dir, max_runs: int = MAX_HISTORY_RUNS) -> dict:
+    """
+    Load the last `max_runs` runs as dense matrices.
+
+    Returns dict:
+      run_dates   : list[str]   ISO dates, oldest first
+      file_mtimes : list[str]   price-file mtime recorded with each run
+      tickers     : list[str]   column order (unique)
+      scores      : float32 ndarray (runs × tickers) — COMPOSITE, NaN = absent
+      z3m         : float32 ndarray (runs × tickers) — SHARPE_3 (Z_3M)
+    """
+    store_dir = Path(store_dir)
+    rows      = _live_rows(_read_index(store_dir), max_runs)
+    if not rows:
+        return empty_score_store()
+    tickers     = _read_tickers(store_dir)
+    scores, z3m = _read_rows(store_dir, rows, len(tickers))
+
+    # A store written before the writers were locked may list a ticker twice;
+    # keep the first column so callers can .reindex() on the tickers
+    dup = pd.Index(tickers).duplicated()
+    if dup.any():
+        tickers     = [t for t, d in zip(tickers, dup) if not d]
+        scores, z3m = scores[:, ~dup], z3m[:, ~dup]
+
+    return {"run_dates":   [r["run_date"] for r in rows],
+            "file_mtimes": [r["file_mtime"] for r in rows],
+            "tickers":     tickers,
+            "scores":      scores,
+            "z3m":         z3m}
+
+
+# ── WRITE ─────────────────────────────────────────────────────────────────────
+
+def _row_vector(values: pd.Series, tickers: list) -> np.ndarray:
+    """Values aligned to `tickers`, rounded to 4 dp like the JSON history."""
+    vec = pd.Series(values, dtype=float).reindex(tickers).to_numpy(dtype=float)
+    return np.round(vec, 4).astype(np.float32)
+
+
+def _compact(store_dir: Path, max_runs: int):
+    """Rewrite the live rows into a fresh data file and swap the index over."""
+    index   = _read_index(store_dir)
+    rows    = _live_rows(index, max_runs)
+    current = {r["file"] for r in index}
+    gen     = 1 + max(int(name.split(".")[1]) for name in current)
+    new_file = f"values.{gen}.f32"
+
+    width       = len(_read_tickers(store_dir))       # raw layout: tickers.txt is kept
+    scores, z3m = _read_rows(store_dir, rows, width)
+    lines       = []
+    with open(store_dir / new_file, "wb") as f:
+        for i, row in enumerate(rows):
+            lines.append(json.dumps({"run_date": row["run_date"],
+                                     "file_mtime": row["file_mtime"],
+                                     "offset": f.tell(), "width": width,
+                                     "file": new_file}))
+            f.write(scores[i].tobytes())
+            f.write(z3m[i].tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    tmp = store_dir / (INDEX_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, store_dir / INDEX_FILE)
+    for name in current:
+        try:
+            (store_dir / name).unlink()
+        except OSError:
+            pass
+
+
+def _append(store_dir: Path, run_date: str, file_mtime: str,
+            scores: pd.Series, z3m: pd.Series, max_runs: int, sync: bool = True):
+    """append_score_run() body; the caller holds the store lock."""
+    index   = _read_index(store_dir)
+    tickers = _read_tickers(store_dir)
+
+    z3m    = pd.Series(dtype=float) if z3m is None else z3m
+    known  = set(tickers)
+    new    = [t for t in dict.fromkeys(list(scores.index) + list(z3m.index))
+              if t not in known]
+    if new:
+        with open(store_dir / TICKERS_FILE, "a") as f:
+            f.write("".join(f"{t}\n" for t in new))
+        tickers = tickers + new
+
+    data_file = index[-1]["file"] if index else "values.0.f32"
+    row = np.concatenate([_row_vector(scores, tickers), _row_vector(z3m, tickers)])
+    with open(store_dir / data_file, "ab") as f:
+        offset = f.tell()
+        f.write(row.tobytes())
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+
+    # The index line is written last: until it lands, the row is invisible
+    with open(store_dir / INDEX_FILE, "a") as f:
+        f.write(json.dumps({"run_date": run_date, "file_mtime": file_mtime,
+                            "offset": offset, "width": len(tickers),
+                            "file": data_file}) + "\n")
+
+    if len(index) + 1 > COMPACT_FACTOR * max_runs:
+        _compact(store_dir, max_runs)
+
+
+def append_score_run(store_dir, run_date: str, file_mtime: str,
+                     scores: pd.Series, z3m: pd.Series = None,
+                     max_runs: int = MAX_HISTORY_RUNS):
+    """
+    Append one run (ticker → COMPOSITE, ticker → Z_3M). A run with the same
+    run_date as an earlier one supersedes it. New tickers get new columns.
+    """
+    store_dir = Path(store_dir)
+    with _store_lock(store_dir):
+        _append(store_dir, run_date, file_mtime, scores, z3m, max_runs)
+
+
+def _import_json(json_path, store_dir: Path, max_runs: int) -> int:
+    with open(json_path, "r") as f:
+        history = json.load(f)
+    for entry in history[-max_runs:]:
+        _append(store_dir, entry["run_date"], entry.get("file_mtime", ""),
+                pd.Series(entry.get("scores", {}), dtype=float),
+                pd.Series(entry.get("z3m_scores", {}), dtype=float),
+                max_runs, sync=False)
+    for row in _read_index(store_dir)[-1:]:     # one fsync for the import, not one per run
+        with open(store_dir / row["file"], "rb+") as f:
+            os.fsync(f.fileno())
+    return min(len(history), max_runs)
+
+
+def import_score_json(json_path, store_dir, max_runs: int = MAX_HISTORY_RUNS) -> int:
+    """
+    One-time migration of a legacy {universe}_score_history.json into the
+    columnar store. The JSON file is left in place. Returns runs imported.
+    """
+    store_dir = Path(store_dir)
+    with _store_lock(store_dir):
+        return _import_json(json_path, store_dir, max_runs)
+
+
+def ensure_score_store(base_dir, universe_name: str,
+                       max_runs: int = MAX_HISTORY_RUNS) -> Path:
+    """
+    Store folder for `universe_name`. A legacy {universe}_score_history.json
+    is imported the first time, before anything else writes to the store;
+    the check runs under the store lock, so concurrent callers import once.
+    """
+    store_dir = score_store_dir(base_dir, universe_name)
+    legacy    = Path(base_dir) / f"{universe_name}_score_history.json"
+    if (store_dir / INDEX_FILE).exists() or not legacy.exists():
+        return store_dir
+    with _store_lock(store_dir):
+        if not (store_dir / INDEX_FILE).exists():
+            try:
+                _import_json(legacy, store_dir, max_runs)
+            except Exception:
+                pass
+    return store_dir
+
+
+def record_score_run(store_dir, input_path, result_df: pd.DataFrame,
+                     history: dict = None, max_runs: int = MAX_HISTORY_RUNS,
+                     run_date: str = None) -> bool:
+    """
+    Record one run's COMPOSITE / SHARPE_3 scores from `result_df`.
+    Only writes if the price file mtime has changed since the last recorded run.
+
+    Also skips recording entirely if the computed scores are identical to the
+    last recorded entry, even across different calendar days / mtimes — this
+    happens when the pipeline is re-run before a new trading day's close is
+    actually available (e.g. a file resave for an unrelated reason). Without
+    this check, a same-value entry stamped with a new date would read as a
+    flat (non-rising) step and zero out Streak/Velocity in Early Movers even
+    though no real market data changed.
+
+    `history` is the already-loaded store (loaded here if None). Returns True
+    if a row was appended.
+    """
+    if history is None:
+        history = load_score_store(store_dir, max_runs)
+
+    try:
+        mtime_ts  = Path(input_path).stat().st_mtime
+        mtime_str = datetime.datetime.fromtimestamp(mtime_ts).strftime("%Y-%m-%dT%H:%M:%S")
+    except Exception:
+        mtime_str = datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+
+    # Skip if this exact file version was already recorded
+    if history["file_mtimes"] and history["file_mtimes"][-1] == mtime_str:
+        return False
+
+    scores = result_df["COMPOSITE"].dropna()
+    z3m    = result_df.get("SHARPE_3", pd.Series(dtype=float)).dropna()
+
+    # Skip if the underlying data hasn't actually moved since the last
+    # recorded run (no new trading day's prices were reflected)
+    if history["run_dates"]:
+        tickers = list(dict.fromkeys(history["tickers"] + list(scores.index)))
+        last    = pd.Series(history["scores"][-1], index=history["tickers"]).reindex(tickers)
+        now     = scores.round(4).astype(np.float32).reindex(tickers)
+        if np.array_equal(last.to_numpy(), now.to_numpy(), equal_nan=True):
+            return False
+
+    append_score_run(store_dir, run_date or datetime.date.today().isoformat(),
+                     mtime_str, scores, z3m, max_runs)
+    return True
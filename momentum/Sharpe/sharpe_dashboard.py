@@ -10,11 +10,17 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import yfinance as yf
-from concurrent.futures import ThreadPoolExecutor
 
 SCRIPT_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(SCRIPT_DIR))
 import momentum_lib as ml
+import allocator as al
+import score_history as sh
+import precompute as pc
+import market_caps as mc
+import position_book as pb
+import live_quotes as lq
+import history_journal as hj
 
 # ── PAGE CONFIG ───────────────────────────────────────────────────────────────
 st.set_page_config(page_title="Sharpe Momentum", page_icon="📊",
@@ -72,155 +78,15 @@ def get_live_vix():
         pass
     return None
 
-def compute_ad_ratio(prices_df):
-    """Calculate 1-Day Advance/Decline ratio."""
-    if len(prices_df.columns) < 2:
-        return 0, 0, None
-    last_two = prices_df.iloc[:, -2:]
-    rets = last_two.iloc[:, 1] - last_two.iloc[:, 0]
-    adv = (rets > 0).sum()
-    dec = (rets < 0).sum()
-    ratio = adv / dec if dec > 0 else float('inf')
-    return int(adv), int(dec), ratio
-
-@st.cache_data(ttl=86400)
-def compute_cap_tier_momentum(prices_df, stock_tickers):
-    """Calculate the % of stocks with positive 63-day momentum per cap tier. Cached 24h.
-    Uses Yahoo Finance for live market cap classification (slow, ~15s)."""
-    mom_63 = {}
-    for t in stock_tickers:
-        px = prices_df.loc[t].dropna()
-        if len(px) >= 63:
-            ret = (px.iloc[-1] / px.iloc[-63]) - 1.0
-            mom_63[t] = ret
-        else:
-            mom_63[t] = np.nan
-            
-    def fetch_mcap(ticker):
-        try:
-            info = yf.Ticker(f"{ticker}.NS").fast_info
-            return ticker, info.market_cap
-        except:
-            try:
-                info = yf.Ticker(f"{ticker}.BO").fast_info
-                return ticker, info.market_cap
-            except:
-                return ticker, 0
-                
-    market_caps = {}
-    with ThreadPoolExecutor(max_workers=30) as exe:
-        results = exe.map(fetch_mcap, stock_tickers)
-        for t, mcap in results:
-            market_caps[t] = mcap
-            
-    df = pd.DataFrame({"MOM_63": pd.Series(mom_63), "MCAP": pd.Series(market_caps)})
-    df = df[df["MCAP"] > 0]
-    df = df.sort_values("MCAP", ascending=False)
-    df["Rank"] = range(1, len(df) + 1)
-    
-    def get_tier(rank):
-        if rank <= 100: return "Large Cap (1-100)"
-        if rank <= 250: return "Mid Cap (101-250)"
-        if rank <= 500: return "Small Cap (251-500)"
-        return "Micro Cap (501+)"
-        
-    df["Cap Tier"] = df["Rank"].map(get_tier)
-    df["Is_Positive"] = df["MOM_63"] > 0
-    
-    summary = df.groupby("Cap Tier")["Is_Positive"].agg(["count", "sum"])
-    summary["% Positive"] = (summary["sum"] / summary["count"] * 100).round(1)
-    summary = summary.rename(columns={"count": "Total Stocks", "sum": "Positive Mom Stocks"})
-    
-    order = ["Large Cap (1-100)", "Mid Cap (101-250)", "Small Cap (251-500)", "Micro Cap (501+)"]
-    summary = summary.reindex(order).dropna()
-    return summary
+@st.cache_data(show_spinner=False)
+def compute_cap_tier_momentum(_prices_df, _stock_tickers, data_key, store_stamp):
+    """% of stocks with positive 63-day momentum per market-cap rank tier, from
+    the offline market-cap store (market_caps.py) — no network call. Keyed on
+    the workbook and the store stamps. Returns (summary, caps)."""
+    caps = mc.load_market_caps(mc.market_cap_store_path(SCRIPT_DIR))
+    return mc.cap_tier_momentum(_prices_df, _stock_tickers, caps), caps
 
 
-@st.cache_data
-def load_stockdb():
-    """Load stock cap classification from STOCKDB.csv. Fast — no network call needed."""
-    stockdb_path = SCRIPT_DIR / "STOCKDB.csv"
-    if not stockdb_path.exists():
-        return {}
-    df = pd.read_csv(stockdb_path)
-    return dict(zip(df["SYMBOL"].str.strip(), df["MARKETCAP"].str.strip()))
-
-
-def compute_cap_tier_dual(result_df, prices_df, stock_tickers, stockdb):
-    """
-    Compute dual market cap momentum breakdown using STOCKDB classification.
-    Signal 1: 63-day raw price return > 0%  (existing metric)
-    Signal 2: 3M Sharpe score > 0           (new metric — risk-adjusted)
-    Returns a DataFrame with both signals and delta per cap tier.
-    """
-    CAP_ORDER   = ["LARGECAP", "MIDCAP", "SMALLCAP", "MICROCAP"]
-    CAP_LABELS  = {
-        "LARGECAP":  "Large Cap",
-        "MIDCAP":    "Mid Cap",
-        "SMALLCAP":  "Small Cap",
-        "MICROCAP":  "Micro Cap",
-    }
-    records = []
-    for t in stock_tickers:
-        tier = stockdb.get(t)
-        if tier is None:
-            continue
-        # 63-day raw return
-        px     = prices_df.loc[t].dropna()
-        ret_63 = float(px.iloc[-1] / px.iloc[-63] - 1.0) if len(px) >= 63 else np.nan
-        # 3M raw Sharpe (S_3M column, not Z-score)
-        s3m    = result_df.loc[t, "S_3M"] if (t in result_df.index and "S_3M" in result_df.columns) else np.nan
-        records.append({
-            "Ticker":         t,
-            "Cap_Tier":       tier,
-            "Ret_63_Pos":     (ret_63 > 0)  if pd.notna(ret_63) else False,
-            "Sharpe_3M_Pos":  (float(s3m) > 0) if pd.notna(s3m)  else False,
-        })
-
-    df   = pd.DataFrame(records)
-    rows = []
-    for tier in CAP_ORDER:
-        sub = df[df["Cap_Tier"] == tier]
-        if sub.empty:
-            continue
-        total      = len(sub)
-        ret_pos    = int(sub["Ret_63_Pos"].sum())
-        sharpe_pos = int(sub["Sharpe_3M_Pos"].sum())
-        delta      = sharpe_pos - ret_pos
-        rows.append({
-            "Cap Tier":            CAP_LABELS.get(tier, tier),
-            "Total":               total,
-            "63D Ret +ve":         ret_pos,
-            "63D Ret % +ve":       round(ret_pos    / total * 100, 1),
-            "3M Sharpe +ve":       sharpe_pos,
-            "3M Sharpe % +ve":     round(sharpe_pos / total * 100, 1),
-            "Delta (Sharpe-Ret)": delta,
-        })
-    return pd.DataFrame(rows)
-
-
-def validate_tradelog_integrity(transactions):
-    """Replay all transactions chronologically and check no ticker ever goes negative.
-    Returns (is_valid: bool, error_message: str)."""
-    try:
-        sorted_txs = sorted(transactions, key=lambda x: (x.get("date", ""), x.get("timestamp", "")))
-    except Exception:
-        sorted_txs = transactions
-    holdings = {}
-    for tx in sorted_txs:
-        ticker = tx["ticker"]
-        action = tx["action"].upper()
-        qty = float(tx["quantity"])
-        current = holdings.get(ticker, 0.0)
-        if action == "BUY":
-            holdings[ticker] = current + qty
-        elif action == "SELL":
-            if qty > current + 1e-9:  # small epsilon for float tolerance
-                return False, (f"{ticker}: SELL of {qty:.0f} shares exceeds "
-                               f"holding of {current:.0f} shares on {tx.get('date', '?')}")
-            holdings[ticker] = current - qty
-    return True, ""
-
 def load_tradelog(universe_name):
     path = SCRIPT_DIR / f"{universe_name}_tradelog.json"
     if not path.exists():
@@ -245,6 +111,11 @@ def load_tradelog(universe_name):
                 pass
         return []
 
+def load_position_book(universe_name, tradelog):
+    """Position book for the tradelog (see position_book.py): appends are
+    applied incrementally, edits / deletes trigger one full replay."""
+    return pb.open_book(SCRIPT_DIR / f"{universe_name}_tradelog.json", tradelog)
+
 def save_tradelog(universe_name, tradelog):
     path = SCRIPT_DIR / f"{universe_name}_tradelog.json"
     try:
@@ -253,14 +124,10 @@ def save_tradelog(universe_name, tradelog):
         st.error(f"Error saving tradelog: {e}")
 
 def append_regime_history(universe_name, score, detail):
-    """Record today's regime score to a per-universe JSON file.
-    One entry per calendar day — if run multiple times, the latest overwrites."""
-    path = SCRIPT_DIR / f"{universe_name}_regime_history.json"
-    try:
-        history = json.load(open(path)) if path.exists() else []
-    except Exception:
-        history = []
-
+    """Record today's regime score in the per-universe journal
+    {universe}_regime_history.jsonl (see history_journal.py) and return the
+    full history. One entry per calendar day — if run multiple times, the
+    latest supersedes it; an unchanged score is not written again."""
     today_str = datetime.date.today().isoformat()
     entry = {
         "date":      today_str,
@@ -269,21 +136,12 @@ def append_regime_history(universe_name, score, detail):
         "Momentum":  round(detail.get("momentum_score", 0.0), 4),
         "Dynamic N": detail.get("dynamic_n", 0),
     }
-
-    # Update today's entry if it exists, otherwise append
-    for i, h in enumerate(history):
-        if h.get("date") == today_str:
-            history[i] = entry
-            break
-    else:
-        history.append(entry)
-
     try:
-        safe_write_json(path, history)
+        path = hj.ensure_journal(SCRIPT_DIR / f"{universe_name}_regime_history.json")
+        hj.append_record(path, entry)
+        return hj.read_records(path)
     except Exception:
-        pass  # Non-critical — never crash the dashboard over history writes
-
-    return history
+        return [entry]  # Non-critical — never crash the dashboard over history writes
 
 def get_latest_price(ticker, prices_df):
     if ticker in prices_df.index:
@@ -292,99 +150,6 @@ def get_latest_price(ticker, prices_df):
             return float(series.iloc[-1])
     return 0.0
 
-def calculate_holdings_and_pnl(transactions, latest_prices=None):
-    try:
-        sorted_txs = sorted(transactions, key=lambda x: (x.get("date", ""), x.get("timestamp", "")))
-    except Exception:
-        sorted_txs = transactions
-
-    holdings = {}
-    realized_pnl = 0.0
-    realized_pnl_by_ticker = {}
-
-    for tx in sorted_txs:
-        ticker = tx["ticker"]
-        action = tx["action"].upper()
-        qty = float(tx["quantity"])
-        price = float(tx["price"])
-        tx_date = tx.get("date", "")
-        if isinstance(tx_date, str):
-            try:
-                tx_date = datetime.date.fromisoformat(tx_date)
-            except Exception:
-                tx_date = datetime.date.today()
-
-        if ticker not in holdings:
-            holdings[ticker] = {
-                "qty": 0.0,
-                "avg_price": 0.0,
-                "first_buy_date": None,
-                "total_cost": 0.0
-            }
-
-        h = holdings[ticker]
-        t_pnl = realized_pnl_by_ticker.get(ticker, 0.0)
-
-        if action == "BUY":
-            if h["qty"] == 0:
-                h["first_buy_date"] = tx_date
-            h["total_cost"] += qty * price
-            h["qty"] += qty
-            h["avg_price"] = h["total_cost"] / h["qty"]
-        elif action == "SELL":
-            if h["qty"] > 0:
-                sell_qty = min(qty, h["qty"])
-                pnl = sell_qty * (price - h["avg_price"])
-                realized_pnl += pnl
-                t_pnl += pnl
-                h["qty"] -= sell_qty
-                h["total_cost"] = h["qty"] * h["avg_price"]
-                if h["qty"] == 0:
-                    h["avg_price"] = 0.0
-                    h["first_buy_date"] = None
-            else:
-                pass
-        
-        realized_pnl_by_ticker[ticker] = t_pnl
-
-    active_holdings = {
-        ticker: h for ticker, h in holdings.items() if h["qty"] > 0
-    }
-
-    unrealized_pnl = 0.0
-    holdings_metrics = []
-    
-    for ticker, h in active_holdings.items():
-        curr_price = h["avg_price"]
-        if latest_prices is not None and ticker in latest_prices:
-            curr_price = latest_prices[ticker]
-        
-        market_val = h["qty"] * curr_price
-        u_pnl = market_val - h["total_cost"]
-        unrealized_pnl += u_pnl
-        
-        u_pnl_pct = (u_pnl / h["total_cost"] * 100) if h["total_cost"] > 0 else 0.0
-        
-        holdings_metrics.append({
-            "Ticker": ticker,
-            "Qty": h["qty"],
-            "Avg Price": h["avg_price"],
-            "Current Price": curr_price,
-            "Cost Value": h["total_cost"],
-            "Market Value": market_val,
-            "Unrealized PnL": u_pnl,
-            "Unrealized PnL %": u_pnl_pct,
-            "First Buy Date": h["first_buy_date"]
-        })
-
-    return {
-        "active_holdings": active_holdings,
-        "holdings_metrics": holdings_metrics,
-        "realized_pnl": realized_pnl,
-        "realized_pnl_by_ticker": realized_pnl_by_ticker,
-        "unrealized_pnl": unrealized_pnl
-    }
-
 def sync_to_positions_ledger(ledger_path, active_holdings):
     serialisable = {}
     for ticker, h in active_holdings.items():
@@ -446,6 +211,13 @@ if "cfg_circuit_threshold" not in st.session_state:
 if "cfg_rel_dd_breach_threshold" not in st.session_state:
     st.session_state.cfg_rel_dd_breach_threshold = _saved_cfg["rel_dd_breach_threshold"]
 
+# The Configuration tab's widgets are only instantiated while that tab is
+# open, and Streamlit drops the state of widgets it did not render.
+# Re-assigning the keys makes them plain session state that outlives a
+# tab switch, so unsaved settings are not reset to dashboard_config.json.
+for _k in [k for k in st.session_state if str(k).startswith("cfg_")]:
+    st.session_state[_k] = st.session_state[_k]
+
 # Derive runtime values from session state
 selected_file = st.session_state.cfg_file
 input_path    = str(SCRIPT_DIR / selected_file)
@@ -509,7 +281,9 @@ def load_volume_data(filepath):
 def compute_all(_prices_df, _nifty_series, _stock_tickers, _volume_df,
                 _min_turnover_cr, _eq_series_filter, _circuit_filter_enabled,
                 _circuit_threshold, _band_csv):
-    return ml.compute_universe_rankings(
+    # Disk-backed cache survives Streamlit restarts; st.cache_data on top
+    # keeps reruns within a session free of even the fingerprint hash.
+    return ml.cached_universe_rankings(
         _prices_df, _nifty_series, _stock_tickers,
         volume_df=_volume_df,
         min_turnover_cr=_min_turnover_cr,
@@ -522,6 +296,22 @@ def compute_all(_prices_df, _nifty_series, _stock_tickers, _volume_df,
         rfr_annual=RFR_ANNUAL,
     )
 
+@st.cache_data(show_spinner=False)
+def load_snapshot(filepath, params_json, stamps):
+    """Artifacts precomputed by the background service (precompute.py), or
+    None if missing / stale. Keyed on the file stamps, so reruns skip even the
+    fingerprint check until a file changes."""
+    return pc.load_snapshot(filepath, json.loads(params_json))
+
+@st.cache_resource
+def start_precompute_service():
+    """One snapshot watcher thread per Streamlit server process."""
+    return pc.start_background_service(SCRIPT_DIR)
+
+# `streamlit run sharpe_dashboard.py -- --no-precompute` disables the service
+if "--no-precompute" not in sys.argv:
+    start_precompute_service()
+
 def load_ledger(path):
     p = Path(path)
     if not p.exists(): return {}
@@ -536,192 +326,92 @@ def load_ledger(path):
 
 
 # ── SCORE HISTORY TRACKING ────────────────────────────────────────────────────
-MAX_HISTORY_RUNS    = 262
+MAX_HISTORY_RUNS    = sh.MAX_HISTORY_RUNS
 FAST_MOVER_RANK_CAP = 200
 
 def load_score_history(universe_name):
-    """Load composite score history from {universe}_score_history.json."""
-    path = SCRIPT_DIR / f"{universe_name}_score_history.json"
-    if not path.exists():
-        return []
+    """
+    Load the composite score history from the columnar store
+    {universe}_score_history/ (see score_history.py). A legacy
+    {universe}_score_history.json is imported into the store the first time.
+    """
+    store_dir = sh.ensure_score_store(SCRIPT_DIR, universe_name, MAX_HISTORY_RUNS)
     try:
-        mtime = path.stat().st_mtime
+        stat = (store_dir / sh.INDEX_FILE).stat()
+        key  = (stat.st_mtime, stat.st_size)
     except Exception:
-        mtime = None
-    return _load_score_history_cached(str(path), mtime)
+        key  = None
+    return _load_score_history_cached(str(store_dir), key)
 
 
 @st.cache_data
-def _load_score_history_cached(path_str, mtime):
-    """Cached JSON read, keyed on file mtime so a rewritten file busts the cache
-    automatically without re-parsing on every Streamlit rerun (widget interactions
-    re-run the whole script)."""
+def _load_score_history_cached(store_dir, key):
+    """Cached store read, keyed on the index file's mtime/size so an appended
+    run busts the cache automatically without re-reading on every Streamlit
+    rerun (widget interactions re-run the whole script)."""
     try:
-        with open(path_str) as f:
-            return json.load(f)
+        return sh.load_score_store(store_dir, MAX_HISTORY_RUNS)
     except Exception:
-        return []
+        return sh.empty_score_store()
 
 
 def append_score_history(universe_name, input_path, result_df):
     """
-    Record the current run's composite scores into the history file.
-    Only writes if the price file mtime has changed since the last recorded run.
+    Record the current run's composite scores into the score-history store
+    if the price file has been refreshed (skip rules: sh.record_score_run).
     At most one entry per calendar day is kept — a later run on the same day
-    replaces that day's entry rather than appending a duplicate.
-
-    Also skips recording entirely if the computed scores are identical to the
-    last recorded entry, even across different calendar days / mtimes — this
-    happens when the pipeline is re-run before a new trading day's close is
-    actually available (e.g. a file resave for an unrelated reason). Without
-    this check, a same-value entry stamped with a new date would read as a
-    flat (non-rising) step and zero out Streak/Velocity in Early Movers even
-    though no real market data changed.
-
-    Caps at MAX_HISTORY_RUNS entries (rolling window).
-    Returns the updated history list.
+    supersedes that day's entry rather than adding a duplicate. The
+    precompute service usually records the run first, making this a no-op.
+
+    Appends one row (O(tickers)); the store keeps the last MAX_HISTORY_RUNS.
+    Returns the updated history (see score_history.load_score_store).
     """
     history = load_score_history(universe_name)
-
     try:
-        mtime_ts  = Path(input_path).stat().st_mtime
-        mtime_str = datetime.datetime.fromtimestamp(mtime_ts).strftime("%Y-%m-%dT%H:%M:%S")
+        appended = sh.record_score_run(sh.score_store_dir(SCRIPT_DIR, universe_name),
+                                       input_path, result_df, history, MAX_HISTORY_RUNS)
     except Exception:
-        mtime_str = datetime.datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
-
-    # Skip if this exact file version was already recorded
-    if history and history[-1].get("file_mtime") == mtime_str:
         return history
-
-    scores = {}
-    z3m_scores = {}
-    for ticker in result_df.index:
-        val = result_df["COMPOSITE"].get(ticker)
-        if val is not None and pd.notna(val):
-            scores[ticker] = round(float(val), 4)
-        z3m_val = result_df.get("SHARPE_3", pd.Series(dtype=float)).get(ticker)
-        if z3m_val is not None and pd.notna(z3m_val):
-            z3m_scores[ticker] = round(float(z3m_val), 4)
-
-    # Skip if the underlying data hasn't actually moved since the last
-    # recorded run (no new trading day's prices were reflected)
-    if history and history[-1].get("scores") == scores:
-        return history
-
-    today_str = datetime.date.today().isoformat()
-    entry = {
-        "run_date":   today_str,
-        "file_mtime": mtime_str,
-        "scores":     scores,
-        "z3m_scores": z3m_scores,
-    }
-
-    if history and history[-1].get("run_date") == today_str:
-        history[-1] = entry
-    else:
-        history.append(entry)
-
-    if len(history) > MAX_HISTORY_RUNS:
-        history = history[-MAX_HISTORY_RUNS:]
-
-    try:
-        safe_write_json(SCRIPT_DIR / f"{universe_name}_score_history.json", history)
-    except Exception:
-        pass
-
-    return history
+    return load_score_history(universe_name) if appended else history
 
 
-def compute_rising_candidates(history, result_df, held_tickers):
+def compute_rising_candidates(history, result_df, held_tickers, signals=None):
     """
     Identify unowned stocks whose composite score is rising.
-    Also computes Z_3M velocity and streak from z3m_scores, add columns to output.
+    Also computes Z_3M velocity and streak from the Z_3M history, add columns to output.
+    Velocity / streak come from ml.early_mover_signals() for every ticker at
+    once (pc.early_signal_table), or from the precomputed `signals` table.
     Requires >= 3 historical runs.
     Returns (candidates_df, n_runs).
     """
-    n_runs = len(history)
+    n_runs = len(history["run_dates"])
     if n_runs < 3:
         return pd.DataFrame(), n_runs
 
-    all_tickers = set()
-    for entry in history:
-        all_tickers.update(entry["scores"].keys())
-
-    score_series = {t: [] for t in all_tickers}
-    z3m_series   = {t: [] for t in all_tickers}
-    for entry in history:
-        z3m_data = entry.get("z3m_scores", {})
-        for t in all_tickers:
-            score_series[t].append(entry["scores"].get(t, np.nan))
-            z3m_series[t].append(z3m_data.get(t, np.nan))
-
-    candidates = []
-    for ticker in all_tickers:
-        if ticker in held_tickers:
-            continue
-        if ticker not in result_df.index:
-            continue
-        rank_val = result_df.loc[ticker, "RANK"]
-        if pd.isna(rank_val):
-            continue
-        rank = int(rank_val)
-
-        scores_arr = np.array(score_series[ticker], dtype=float)
-        valid      = ~np.isnan(scores_arr)
-        if valid.sum() < 3:
-            continue
-        clean = scores_arr[valid]
-
-        # Velocity: linear slope of last 5 valid points
-        window = clean[-5:]
-        slope  = float(np.polyfit(np.arange(len(window)), window, 1)[0]) if len(window) >= 2 else 0.0
-
-        # Streak: consecutive rising runs from the tail
-        streak = 0
-        for i in range(len(clean) - 1, 0, -1):
-            if clean[i] > clean[i - 1]:
-                streak += 1
-            else:
-                break
-
-        # Z_3M velocity and streak (may have fewer data points)
-        z3m_arr   = np.array(z3m_series[ticker], dtype=float)
-        z3m_valid = ~np.isnan(z3m_arr)
-        z3m_slope  = None
-        z3m_streak = None
-        if z3m_valid.sum() >= 2:
-            z3m_clean = z3m_arr[z3m_valid]
-            z3m_win   = z3m_clean[-5:]
-            z3m_slope = float(np.polyfit(np.arange(len(z3m_win)), z3m_win, 1)[0]) if len(z3m_win) >= 2 else 0.0
-            z3m_streak = 0
-            for i in range(len(z3m_clean) - 1, 0, -1):
-                if z3m_clean[i] > z3m_clean[i - 1]:
-                    z3m_streak += 1
-                else:
-                    break
-
-        zone = "🔴 Near-Term" if rank <= 50 else ("🟡 Building" if rank <= 100 else None)
-        s_now   = float(clean[-1])
-        s_prev  = float(clean[-2]) if len(clean) >= 2 else None
-        s_prev2 = float(clean[-3]) if len(clean) >= 3 else None
-        candidates.append({
-            "Ticker":     ticker,
-            "Zone":       zone,
-            "_zo":        0 if rank <= 50 else (1 if rank <= 100 else 2),
-            "Rank":       rank,
-            "Score Now":  round(s_now, 3),
-            "Score -1":   round(s_prev, 3) if s_prev is not None else None,
-            "Score -2":   round(s_prev2, 3) if s_prev2 is not None else None,
-            "Velocity":   round(slope, 4),
-            "Streak ↑":   streak,
-            "Z3M Vel":    round(z3m_slope, 4) if z3m_slope is not None else None,
-            "Z3M Streak": z3m_streak,
-        })
-
-    if not candidates:
+    sig = pc.early_signal_table(history, result_df) if signals is None else signals
+    sig = sig[(sig["N_RUNS"] >= 3) & sig["RANK"].notna()
+              & ~sig.index.isin(list(held_tickers))]
+    if sig.empty:
         return pd.DataFrame(), n_runs
 
-    df = pd.DataFrame(candidates)
+    def _round(col, nd):   # Python round(): exact on the binary value, unlike np.round
+        return [round(v, nd) for v in sig[col].tolist()]
+
+    rank = sig["RANK"].to_numpy().astype(int)
+    df = pd.DataFrame({
+        "Ticker":     sig.index.to_numpy(dtype=object),
+        "Zone":       np.where(rank <= 50, "🔴 Near-Term",
+                               np.where(rank <= 100, "🟡 Building", None)),
+        "_zo":        np.where(rank <= 50, 0, np.where(rank <= 100, 1, 2)),
+        "Rank":       rank,
+        "Score Now":  _round("SCORE_NOW", 3),
+        "Score -1":   _round("SCORE_1", 3),
+        "Score -2":   _round("SCORE_2", 3),
+        "Velocity":   _round("VELOCITY", 4),
+        "Streak ↑":   sig["STREAK"].to_numpy(),
+        "Z3M Vel":    _round("Z3M_VELOCITY", 4),
+        "Z3M Streak": sig["Z3M_STREAK"].to_numpy(),
+    })
 
     # Fast Mover: top 10 by velocity among rank <= FAST_MOVER_RANK_CAP, not already zoned
     none_zone   = df[df["Zone"].isna() & (df["Rank"] <= FAST_MOVER_RANK_CAP)]
@@ -733,6 +423,131 @@ def compute_rising_candidates(history, result_df, held_tickers):
     return df, n_runs
 
 
+# Every new result_key (a workbook refresh, a settings change) adds memoized
+# frames; each memoized table keeps at most this many, least recently used out
+TABLE_CACHE_ENTRIES = 32
+
+
+@st.cache_data(show_spinner=False, max_entries=TABLE_CACHE_ENTRIES)
+def cached_rising_candidates(result_key, runs_key, held, _history, _result, _signals):
+    """compute_rising_candidates(), memoized on the result fingerprint, the
+    score-history run key and the held tickers."""
+    return compute_rising_candidates(_history, _result, set(held), _signals)
+
+
+# ── TABLE RENDERING ───────────────────────────────────────────────────────────
+# Every widget interaction reruns the script. Tabs therefore run lazily,
+# table frames are memoized on the result fingerprint (`result_key`: input
+# file stamps + ranking settings), rows are coloured with one vectorized
+# Styler call, and long tables are paged so only PAGE_SIZE rows are styled
+# and sent to the browser.
+PAGE_SIZE = 100
+
+
+def lazy_tabs(labels, key):
+    """st.tabs() that tracks the selected tab and reruns on a switch, so only
+    the open tab's body has to run (see tab_open). Streamlit versions without
+    tab state tracking fall back to plain tabs, where every tab renders."""
+    try:
+        return st.tabs(labels, key=key, on_change="rerun")
+    except TypeError:
+        return st.tabs(labels)
+
+
+def tab_open(tab):
+    return getattr(tab, "open", None) is not False
+
+
+def row_styles(df, css):
+    """df.style with row i painted `css[i]` — one call for the whole frame
+    instead of a Python style function per row."""
+    css  = np.asarray(css, dtype=object)
+    grid = pd.DataFrame(np.repeat(css[:, None], df.shape[1], axis=1),
+                        index=df.index, columns=df.columns)
+    return df.style.apply(lambda _: grid, axis=None)
+
+
+def paginate(df, key, page_size=PAGE_SIZE):
+    """The rows of `df` on the page picked in a small selector, which only
+    appears when df is longer than page_size."""
+    n_pages = -(-len(df) // page_size)
+    if n_pages <= 1:
+        return df
+    if st.session_state.get(key, 1) > n_pages:      # filters shrank the table
+        st.session_state[key] = n_pages
+    pg1, pg2 = st.columns([0.2, 0.8])
+    with pg1:
+        page = st.number_input("Page", min_value=1, max_value=n_pages, step=1, key=key)
+    start = (int(page) - 1) * page_size
+    with pg2:
+        st.caption(f"Rows {start + 1}–{min(start + page_size, len(df))} of {len(df)}")
+    return df.iloc[start:start + page_size]
+
+
+@st.cache_data(show_spinner=False, max_entries=TABLE_CACHE_ENTRIES)
+def top_rankings_table(result_key, _result, _prices_df, n):
+    """
+    Rank / Composite / Res Mom / volatility columns for the top `n` rows.
+    Volatility is the mean of the allocator's VOL_<w> columns (252/189/126/
+    63-day windows, the weight-sizing engine's own numbers), for all n
+    tickers at once; tickers with <= 10 prices get none.
+    """
+    top      = _result.head(n)
+    vols     = al.realized_vols(_prices_df, list(top.index)).to_numpy()
+    n_vols   = (~np.isnan(vols)).sum(axis=1)
+    mean_vol = np.where(n_vols > 0, np.nansum(vols, axis=1) / np.maximum(n_vols, 1), np.nan)
+
+    comp    = top["COMPOSITE"].to_numpy(dtype=float)
+    res_mom = (top["RES_MOM"].to_numpy(dtype=float) if "RES_MOM" in top.columns
+               else np.full(len(top), np.nan))
+    vol_adj = [round(c / v, 3) if not (np.isnan(c) or np.isnan(v)) and v > 0 else None
+               for c, v in zip(comp, mean_vol)]
+    return pd.DataFrame({
+        "Rank":          [int(r) if pd.notna(r) else None for r in top["RANK"]],
+        "Ticker":        top.index.to_numpy(dtype=object),
+        "Composite":     [None if np.isnan(c) else c for c in comp],
+        "Res Mom":       [None if np.isnan(r) else float(r) for r in res_mom],
+        "Volatility %":  [None if np.isnan(v) else round(float(v) * 100, 1) for v in mean_vol],
+        "Vol-Adj Score": vol_adj,
+    })
+
+
+@st.cache_data(show_spinner=False, max_entries=TABLE_CACHE_ENTRIES)
+def calcs_table(result_key, _result, filter_elig, sort_col, top_n, rel_dd_threshold, dyn_n):
+    """
+    Full Rankings rows (filtered, sorted, top_n) and their row colours,
+    memoized on the result fingerprint and the view settings.
+    Returns (calcs_df, css).
+    """
+    display_cols = ["RANK", "SERIES", "COMPOSITE", "SHARPE_3"]
+    for c in ["RES_MOM", "1M%", "3M%", "12M%", "PCT_FROM_52H", "REL_52H_DD", "BETA"]:
+        if c in _result.columns: display_cols.append(c)
+
+    calcs_df = _result[[c for c in display_cols if c in _result.columns]].copy()
+    calcs_df.index.name = "TICKER"
+    calcs_df = calcs_df.reset_index()
+
+    if filter_elig == "Eligible only":
+        calcs_df = calcs_df[calcs_df["PCT_FROM_52H"] >= -25]
+    elif filter_elig == "Disqualified only":
+        calcs_df = calcs_df[calcs_df["PCT_FROM_52H"] < -25]
+
+    calcs_df = calcs_df.sort_values(
+        sort_col, ascending=(sort_col == "RANK"),
+        na_position="last").head(top_n)
+
+    # Disqualified (grey) > relative-drawdown breach (red) > within Regime N (green)
+    nan = pd.Series(np.nan, index=calcs_df.index)
+    css = np.select(
+        [calcs_df.get("PCT_FROM_52H", nan).to_numpy(dtype=float) < -25,
+         calcs_df.get("REL_52H_DD", nan).to_numpy(dtype=float) < rel_dd_threshold,
+         pd.to_numeric(calcs_df.get("RANK", nan), errors="coerce").to_numpy(dtype=float) <= dyn_n],
+        ["background-color:#FFF8F8; color:#B0B0B0;",
+         "background-color:#FCE8E6;",
+         "background-color:#E8F5E9;"], default="")
+    return calcs_df, css
+
+
 # ── TITLE ─────────────────────────────────────────────────────────────────────
 st.markdown(
     "<h1 style='color:#1F4E79; margin-bottom:0;'>📊 Sharpe Momentum Strategy</h1>"
@@ -755,26 +570,32 @@ try:
 except Exception:
     volume_df = None
 
-try:
-    result, regime_score, regime_detail = compute_all(
-        prices_df, nifty_series, stock_tickers, volume_df, min_turnover_cr,
-        eq_series_filter, circuit_filter_enabled, circuit_threshold,
-        str(SCRIPT_DIR / "Price_Band_List.csv"))
-except Exception as e:
-    st.error(f"Error computing rankings: {e}"); st.stop()
-
-# Load Series mapping from Price_Band_List.csv
-series_map = {}
-band_csv = SCRIPT_DIR / "Price_Band_List.csv"
-if band_csv.exists():
+# Rankings, regime, cap tiers and Early Movers signals come from the
+# precomputed snapshot when it matches the workbook and current settings
+_params_json = json.dumps(pc.snapshot_params(min_turnover_cr, eq_series_filter,
+                                             circuit_filter_enabled, circuit_threshold))
+_stamps      = pc.snapshot_stamps(input_path)
+snapshot     = load_snapshot(input_path, _params_json, _stamps)
+# Fingerprint of `result` for memoized tables: inputs + ranking settings
+result_key   = (_stamps, _params_json)
+
+if snapshot is not None:
+    result        = snapshot["result"]
+    regime_score  = snapshot["regime_score"]
+    regime_detail = snapshot["regime_detail"]
+else:
     try:
-        b_df = pd.read_csv(band_csv)
-        for _, r in b_df.iterrows():
-            series_map[str(r["Symbol"]).strip()] = str(r["Series"]).strip()
-    except Exception:
-        pass
+        result, regime_score, regime_detail = compute_all(
+            prices_df, nifty_series, stock_tickers, volume_df, min_turnover_cr,
+            eq_series_filter, circuit_filter_enabled, circuit_threshold,
+            str(SCRIPT_DIR / "Price_Band_List.csv"))
+    except Exception as e:
+        st.error(f"Error computing rankings: {e}"); st.stop()
 
-result["SERIES"] = [series_map.get(t, "EQ") for t in result.index]
+    # Load Series mapping from Price_Band_List.csv
+    band_csv = SCRIPT_DIR / "Price_Band_List.csv"
+    result["SERIES"] = (ml.load_price_bands(band_csv)["SERIES"]
+                        .reindex(result.index).fillna("EQ").astype(str))
 
 
 # Record today's regime score and load full history for trend chart
@@ -791,7 +612,8 @@ if "live_prices" in st.session_state:
             latest_prices[tk] = price
 
 tradelog = load_tradelog(universe)
-tradelog_result = calculate_holdings_and_pnl(tradelog, latest_prices)
+position_book = load_position_book(universe, tradelog)
+tradelog_result = pb.holdings_and_pnl(position_book, latest_prices)
 active_holdings = tradelog_result["active_holdings"]
 holdings_metrics = tradelog_result["holdings_metrics"]
 realized_pnl = tradelog_result["realized_pnl"]
@@ -801,19 +623,25 @@ unrealized_pnl = tradelog_result["unrealized_pnl"]
 sync_to_positions_ledger(LEDGER_FILE, active_holdings)
 ledger = load_ledger(LEDGER_FILE)
 
-# Score history: record scores if price file has been refreshed
+# Score history: record scores if price file has been refreshed (every
+# rerun; the rising-candidate table itself is built in the Early Movers tab)
 held_tickers_global = set(active_holdings.keys())
 try:
     score_history  = append_score_history(universe, input_path, result)
-    rising_df, n_hist_runs = compute_rising_candidates(
-        score_history, result, held_tickers_global)
+    _score_runs    = [len(score_history["run_dates"]),
+                      score_history["run_dates"][-1] if score_history["run_dates"] else None,
+                      score_history["file_mtimes"][-1] if score_history["file_mtimes"] else None]
+    early_signals  = None
+    if snapshot is not None and snapshot["score_runs"] == _score_runs:
+        early_signals = snapshot["early_signals"]
 except Exception as _eh:
-    score_history       = []
-    rising_df           = pd.DataFrame()
-    n_hist_runs         = 0
+    score_history       = sh.empty_score_store()
+    _score_runs         = None
+    early_signals       = None
     _score_history_err  = str(_eh)
 else:
     _score_history_err  = None
+n_hist_runs = len(score_history["run_dates"])
 
 
 
@@ -869,7 +697,7 @@ with st.expander("📡 Regime Score Breakdown", expanded=False):
     live_vix = get_live_vix()
     vix_str = f"{live_vix:.2f}" if live_vix else "N/A"
     
-    adv, dec, ad_ratio = compute_ad_ratio(prices_df)
+    adv, dec, ad_ratio = snapshot["ad"] if snapshot is not None else pc.compute_ad_ratio(prices_df)
     ad_str = f"{ad_ratio:.2f}" if ad_ratio is not None else "N/A"
     
     sc1, sc2, sc3, sc4, sc5, sc6 = st.columns(6)
@@ -980,12 +808,14 @@ with st.expander("📊 Market Cap Momentum Breakdown", expanded=False):
             "Red = Sharpe is more conservative.")
 
     # ── Primary view: STOCKDB-based dual metric (instant, no network) ──────────
-    stockdb = load_stockdb()
-    if stockdb:
+    stockdb_ok = (SCRIPT_DIR / pc.STOCKDB_CSV).exists()
+    if stockdb_ok:
         st.markdown(
             "Comparing **63-day raw return > 0%** vs **3M Sharpe score > 0** across cap tiers. "
             "Classification sourced from STOCKDB.csv.")
-        dual_df = compute_cap_tier_dual(result, prices_df, stock_tickers, stockdb)
+        dual_df = (snapshot["cap_tiers"] if snapshot is not None else
+                   pc.compute_cap_tier_dual(result, prices_df, stock_tickers,
+                                            pc.load_stockdb(SCRIPT_DIR / pc.STOCKDB_CSV)))
         if not dual_df.empty:
             _render_dual_bars(dual_df)
 
@@ -994,1192 +824,1117 @@ with st.expander("📊 Market Cap Momentum Breakdown", expanded=False):
     else:
         st.warning("STOCKDB.csv not found. Cap tier classification unavailable.")
 
-    # ── Optional: Yahoo Finance market cap fetch (slow) ────────────────────────
+    # ── Market-cap rank view: offline snapshot refreshed daily in the background ──
     st.markdown("---")
-    with st.expander("📡 Yahoo Finance Market Cap View (slow, ~15s)", expanded=False):
-        st.markdown("Fetches live market cap from Yahoo Finance for classification. Cached for 24h.")
-        if "cap_tier_summary" in st.session_state:
-            def _render_tier_bars(tier_summary):
-                cards_html = "<div style='display:flex; flex-direction:column; gap:5px; margin-top:6px;'>"
-                for tier, row in tier_summary.iterrows():
-                    pct      = float(row["% Positive"])
-                    total    = int(row["Total Stocks"])
-                    positive = int(row["Positive Mom Stocks"])
-                    fill, track, txt = _tier_color(pct)
-                    bar_w    = min(100, max(0, pct))
-                    cards_html += f"""
-                    <div style='background:#F8F9FA; border:1px solid #E8ECF1; border-radius:8px;
-                                padding:8px 14px; display:flex; align-items:center; gap:12px;'>
-                        <div style='min-width:160px;'>
-                            <div style='font-weight:600; font-size:13px; color:#1A1A2E;'>{tier}</div>
-                            <div style='font-size:11px; color:#9E9E9E; margin-top:1px;'>
-                                {positive} of {total} stocks
-                            </div>
-                        </div>
-                        <div style='flex:1; background:{track}; border-radius:999px; height:8px; overflow:hidden;'>
-                            <div style='width:{bar_w:.1f}%; height:100%; background:{fill};
-                                        border-radius:999px; transition:width 0.4s ease;'></div>
-                        </div>
-                        <div style='min-width:48px; text-align:right; font-weight:700;
-                                    font-size:14px; color:{txt};'>{pct:.1f}%</div>
-                    </div>"""
-                cards_html += "</div>"
-                st.markdown(cards_html, unsafe_allow_html=True)
-            _render_tier_bars(st.session_state["cap_tier_summary"])
-            if st.button("Refresh Yahoo Market Cap Data", key="refresh_cap_tier"):
-                del st.session_state["cap_tier_summary"]
-                st.rerun()
+    with st.expander("📡 Market Cap Rank View (Yahoo snapshot)", expanded=False):
+        _store = mc.market_cap_store_path(SCRIPT_DIR)
+        try:
+            _stat = _store.stat()
+            _store_stamp = (_stat.st_mtime, _stat.st_size)
+        except OSError:
+            _store_stamp = None
+        tier_summary, _caps = compute_cap_tier_momentum(
+            prices_df, stock_tickers, (input_path, Path(input_path).stat().st_mtime),
+            _store_stamp)
+        if tier_summary.empty:
+            st.info("No market-cap snapshot yet. The precompute service fetches one from "
+                    "Yahoo Finance once a day in the background, or run `python market_caps.py`.")
         else:
-            st.info("Yahoo Finance market cap data not yet loaded.")
-            if st.button("Load Yahoo Market Cap Data", key="load_cap_tier"):
-                try:
-                    with st.spinner("Fetching Market Caps from Yahoo Finance (~15 seconds)..."):
-                        st.session_state["cap_tier_summary"] = compute_cap_tier_momentum(
-                            prices_df, stock_tickers)
-                    st.rerun()
-                except Exception as e:
-                    st.error(f"Could not load Market Cap data: {e}")
+            cards_html = "<div style='display:flex; flex-direction:column; gap:5px; margin-top:6px;'>"
+            for tier, row in tier_summary.iterrows():
+                pct      = float(row["% Positive"])
+                total    = int(row["Total Stocks"])
+                positive = int(row["Positive Mom Stocks"])
+                fill, track, txt = _tier_color(pct)
+                bar_w    = min(100, max(0, pct))
+                cards_html += f"""
+                <div style='background:#F8F9FA; border:1px solid #E8ECF1; border-radius:8px;
+                            padding:8px 14px; display:flex; align-items:center; gap:12px;'>
+                    <div style='min-width:160px;'>
+                        <div style='font-weight:600; font-size:13px; color:#1A1A2E;'>{tier}</div>
+                        <div style='font-size:11px; color:#9E9E9E; margin-top:1px;'>
+                            {positive} of {total} stocks
+                        </div>
+                    </div>
+                    <div style='flex:1; background:{track}; border-radius:999px; height:8px; overflow:hidden;'>
+                        <div style='width:{bar_w:.1f}%; height:100%; background:{fill};
+                                    border-radius:999px; transition:width 0.4s ease;'></div>
+                    </div>
+                    <div style='min-width:48px; text-align:right; font-weight:700;
+                                font-size:14px; color:{txt};'>{pct:.1f}%</div>
+                </div>"""
+            cards_html += "</div>"
+            st.markdown(cards_html, unsafe_allow_html=True)
+            _refreshed = datetime.datetime.fromtimestamp(_caps["FETCHED_AT"].max())
+            st.caption(
+                f"Market caps for {int(tier_summary['Total Stocks'].sum())} of "
+                f"{len(stock_tickers)} stocks  |  Last fetch: "
+                f"{_refreshed.strftime('%d-%b-%Y %H:%M')} (refreshed daily in the background)")
 
 
 st.divider()
 
 # ── TABS ──────────────────────────────────────────────────────────────────────
-tab_top, tab_exits, tab_tradelog, tab_calcs, tab_early, tab_config, tab_perf = st.tabs([
+# Only the selected tab's body runs on a rerun (see lazy_tabs)
+tab_top, tab_exits, tab_tradelog, tab_calcs, tab_early, tab_config, tab_perf = lazy_tabs([
     "📊 Top 25 Rankings",
     "🚨 Actions Monitor",
     "📝 Tradelog & MTM",
     "📋 Full Rankings",
     "📈 Early Movers",
     "⚙️ Configuration",
-    "📈 Performance Tracker"])
+    "📈 Performance Tracker"], key="active_tab")
 
 # ── TAB 1: TOP 25 RANKINGS ────────────────────────────────────────────────────
-with tab_top:
-    st.markdown(
-        f"## 📊 Top 25 Rankings  —  "
-        f"Regime Score: **{regime_score:.2f}**  |  "
-        f"Dynamic N (Strategy): **{dynamic_n}**")
-
-    DISPLAY_N = 25
-    held_tickers = set(active_holdings.keys())
-    rows = []
-
-    for ticker, row in result.head(DISPLAY_N).iterrows():
-        ltp = latest_prices.get(ticker, 0.0)
-
-        # Compute annualised volatility — mean across 4 windows (same as weight-sizing engine)
-        mean_vol = None
-        if ticker in prices_df.index:
-            px = prices_df.loc[ticker].dropna()
-            if len(px) > 10:
-                vols = []
-                for w in [252, 189, 126, 63]:
-                    pw = px.iloc[-w:] if len(px) >= w else px
-                    lr = np.diff(np.log(pw.values))
-                    if len(lr) > 5:
-                        vols.append(np.std(lr, ddof=1) * np.sqrt(252))
-                if vols:
-                    mean_vol = float(np.mean(vols))
-
-        comp = row["COMPOSITE"] if pd.notna(row["COMPOSITE"]) else None
-        vol_adj = round(comp / mean_vol, 3) if (comp is not None and mean_vol and mean_vol > 0) else None
-
-        rows.append({
-            "Rank":          int(row["RANK"]) if pd.notna(row["RANK"]) else None,
-            "Ticker":        ticker,
-            "Composite":     comp,
-            "Res Mom":       float(row["RES_MOM"]) if pd.notna(row.get("RES_MOM")) else None,
-            "Volatility %":  round(mean_vol * 100, 1) if mean_vol is not None else None,
-            "Vol-Adj Score": vol_adj,
-            "LTP":           ltp if ltp > 0 else None,
-        })
-
-    top25_df = pd.DataFrame(rows)
-
-    def style_top25(row):
-        if row["Ticker"] in held_tickers:
-            return ["background-color:#FFFDE7;"] * len(row)
-        return ["background-color:#FFFFFF;"] * len(row)
-
-    st.dataframe(
-        top25_df.style.apply(style_top25, axis=1).format(
-            {"Rank":          "{:.0f}",
-             "Composite":     "{:.3f}",
-             "Res Mom":       "{:.3f}",
-             "Volatility %":  "{:.1f}%",
-             "Vol-Adj Score": "{:.3f}",
-             "LTP":           "Rs {:,.2f}"}, na_rep="\u2014"),
-        use_container_width=True, hide_index=True,
-        height=min(950, (DISPLAY_N + 2) * 36))
-
-
-    st.caption("🟡 Yellow rows = currently held positions  |  White rows = not yet in portfolio")
-
-    st.divider()
-    
-    # Calculate exact portfolio valuation based on active holdings
-    actual_cost_basis = sum(h["Cost Value"] for h in holdings_metrics)
-    
-    # Cash = Starting Capital - What we spent
-    actual_cash_liquid = capital - actual_cost_basis
-    actual_cash_liquid = max(0.0, actual_cash_liquid) # Prevent negative cash display
-    
-    # Weights strictly based on original configuration capital
-    actual_equity_wt = (actual_cost_basis / capital) if capital > 0 else 0.0
-    actual_cash_wt = (actual_cash_liquid / capital) if capital > 0 else 0.0
+if tab_open(tab_top):
+    with tab_top:
+        st.markdown(
+            f"## 📊 Top 25 Rankings  —  "
+            f"Regime Score: **{regime_score:.2f}**  |  "
+            f"Dynamic N (Strategy): **{dynamic_n}**")
 
-    mc1, mc2, mc3, mc4 = st.columns(4)
-    with mc1: st.metric("Equity Deployed",  f"Rs {actual_cost_basis:,.0f}")
-    with mc2: st.metric("Equity Weight",    f"{actual_equity_wt:.1%}")
-    with mc3: st.metric("Cash (Liquid)",    f"Rs {actual_cash_liquid:,.0f}")
-    with mc4: st.metric("Cash Weight",      f"{actual_cash_wt:.1%}")
+        DISPLAY_N = 25
+        held_tickers = set(active_holdings.keys())
 
+        top25_df = top_rankings_table(result_key, result, prices_df, DISPLAY_N).copy()
+        ltp = [latest_prices.get(t, 0.0) for t in top25_df["Ticker"]]
+        top25_df["LTP"] = [px if px > 0 else None for px in ltp]
 
-# ── TAB 2: ACTIONS MONITOR ────────────────────────────────────────────────────
-with tab_exits:
-    st.markdown("## 🚨 Actions Monitor")
+        st.dataframe(
+            row_styles(top25_df, np.where(top25_df["Ticker"].isin(held_tickers),
+                                          "background-color:#FFFDE7;",
+                                          "background-color:#FFFFFF;")).format(
+                {"Rank":          "{:.0f}",
+                 "Composite":     "{:.3f}",
+                 "Res Mom":       "{:.3f}",
+                 "Volatility %":  "{:.1f}%",
+                 "Vol-Adj Score": "{:.3f}",
+                 "LTP":           "Rs {:,.2f}"}, na_rep="\u2014"),
+            use_container_width=True, hide_index=True,
+            height=min(950, (DISPLAY_N + 2) * 36))
 
-    if not ledger:
-        st.info(f"No open positions found in ledger `{Path(LEDGER_FILE).name}`. "
-                "Nothing to evaluate.")
-    else:
-        # ── Build Exit Evaluation rows ────────────────────────────────────────
-        exit_rows = []
-        for ticker, rec in ledger.items():
-            held     = (TODAY - rec["entry_date"]).days
-            rank_val = result.loc[ticker, "RANK"]       if ticker in result.index else np.nan
-            pct52    = result.loc[ticker, "PCT_FROM_52H"] if ticker in result.index else np.nan
-            reldd    = result.loc[ticker, "REL_52H_DD"] if ticker in result.index else np.nan
-
-            # Determine explicit exit trigger category
-            is_52h_breach = pd.notna(pct52) and pct52 < -25
-            is_reldd_breach = pd.notna(reldd) and reldd < rel_dd_breach_threshold
-
-            is_circuit_breach = False
-            if circuit_filter_enabled and ticker in result.index and "TOTAL_CIRCUIT_HITS" in result.columns:
-                c_hits = result.loc[ticker, "TOTAL_CIRCUIT_HITS"]
-                if pd.notna(c_hits) and c_hits >= circuit_threshold:
-                    is_circuit_breach = True
-
-            is_series_breach = False
-            if eq_series_filter and ticker in result.index and "SERIES" in result.columns:
-                series_val = result.loc[ticker, "SERIES"]
-                if pd.notna(series_val) and str(series_val).strip() != "EQ":
-                    is_series_breach = True
-
-            is_adtv_breach = False
-            if ticker in result.index and "ADTV_ELIGIBLE" in result.columns:
-                if not bool(result.loc[ticker, "ADTV_ELIGIBLE"]):
-                    is_adtv_breach = True
-
-            if is_52h_breach:
-                trigger = "52H_BREACH";      action = "⚠️ SELL IMMEDIATELY (52H drop)"
-            elif is_circuit_breach:
-                trigger = "CIRCUIT_BREACH";  action = "⚠️ SELL IMMEDIATELY (Circuit limit)"
-            elif is_series_breach:
-                trigger = "SERIES_BREACH";   action = "⚠️ SELL IMMEDIATELY (Non-EQ series)"
-            elif is_adtv_breach:
-                trigger = "ADTV_BREACH";     action = "⚠️ SELL IMMEDIATELY (Low ADTV)"
-            elif pd.isna(rank_val):
-                trigger = "FILTER_BREACH";   action = "⚠️ SELL IMMEDIATELY"
-            elif is_reldd_breach and held >= 28:
-                trigger = "REL_DD_BREACH";   action = "🔻 SELL (relative 52H drawdown)"
-            elif is_reldd_breach and held < 28:
-                trigger = "REL_DD_LOCK";     action = f"🔒 Locked (Rel DD, {held}/28d)"
-            elif pd.notna(rank_val) and rank_val > int(params["Rank Buffer"]) and held >= 28:
-                trigger = "RANK_EXIT";       action = "🔻 SELL (rank dropped)"
-            elif pd.notna(rank_val) and rank_val > int(params["Rank Buffer"]) and held < 28:
-                trigger = "HOLD_LOCK";       action = f"🔒 Locked ({held}/28d)"
-            else:
-                trigger = "HEALTHY";         action = "✅ HOLD"
-
-            # Current price & unrealised P&L from tradelog
-            curr_price = latest_prices.get(ticker, rec["entry_price"])
-            shares = 0
-            for hm in holdings_metrics:
-                if hm["Ticker"] == ticker:
-                    shares = hm["Qty"]
-                    curr_price = hm["Current Price"]
-                    break
-            unrealised_pnl_val = (curr_price - rec["entry_price"]) * shares
-
-            exit_rows.append({
-                "Ticker":          ticker,
-                "Action":          action,
-                "Trigger":         trigger,
-                "Rank":            int(rank_val) if pd.notna(rank_val) else None,
-                "52H%":            round(pct52, 1) if pd.notna(pct52) else None,
-                "Rel_52H_DD":      round(reldd, 1) if pd.notna(reldd) else None,
-                "Days Held":       held,
-                "Entry Date":      rec["entry_date"].isoformat(),
-                "Unrealised P&L":  round(unrealised_pnl_val, 0),
-            })
 
-        exit_df = pd.DataFrame(exit_rows)
+        st.caption("🟡 Yellow rows = currently held positions  |  White rows = not yet in portfolio")
 
-        # ── Section 1: Exit Evaluation table ──────────────────────────────────
-        exit_triggers = exit_df[exit_df["Trigger"].str.contains("BREACH|RANK_EXIT")]
-        n_exits = len(exit_triggers)
+        st.divider()
+    
+        # Calculate exact portfolio valuation based on active holdings
+        actual_cost_basis = sum(h["Cost Value"] for h in holdings_metrics)
+    
+        # Cash = Starting Capital - What we spent
+        actual_cash_liquid = capital - actual_cost_basis
+        actual_cash_liquid = max(0.0, actual_cash_liquid) # Prevent negative cash display
+    
+        # Weights strictly based on original configuration capital
+        actual_equity_wt = (actual_cost_basis / capital) if capital > 0 else 0.0
+        actual_cash_wt = (actual_cash_liquid / capital) if capital > 0 else 0.0
 
-        if n_exits > 0:
-            st.error(f"🚨 **{n_exits} EXIT SIGNAL(S) — Action Required!**")
-            st.markdown("#### Exits Required")
+        mc1, mc2, mc3, mc4 = st.columns(4)
+        with mc1: st.metric("Equity Deployed",  f"Rs {actual_cost_basis:,.0f}")
+        with mc2: st.metric("Equity Weight",    f"{actual_equity_wt:.1%}")
+        with mc3: st.metric("Cash (Liquid)",    f"Rs {actual_cash_liquid:,.0f}")
+        with mc4: st.metric("Cash Weight",      f"{actual_cash_wt:.1%}")
 
-            def style_exit_rows(row):
-                if "SELL IMMEDIATELY" in str(row["Action"]): return ["background-color:#FFEBEE; font-weight:bold;"] * len(row)
-                if "SELL" in str(row["Action"]):             return ["background-color:#FFF3E0;"] * len(row)
-                return [""] * len(row)
 
-            st.dataframe(
-                exit_triggers.style.apply(style_exit_rows, axis=1).format(
-                    {"Rank": "{:.0f}", "Unrealised P&L": "Rs {:,.0f}"}, na_rep="—"),
-                use_container_width=True, hide_index=True)
-        else:
-            st.success(f"✅ All {len(ledger)} positions healthy. No exits triggered.")
+# ── TAB 2: ACTIONS MONITOR ────────────────────────────────────────────────────
+if tab_open(tab_exits):
+    with tab_exits:
+        st.markdown("## 🚨 Actions Monitor")
 
-        # ── Section 2: Summary Banner ─────────────────────────────────────────
-        st.divider()
-        n_current_holdings = len(ledger)
-        n_after_exits = n_current_holdings - n_exits
-        n_new_positions = dynamic_n - n_after_exits
-
-        if n_new_positions > 0 and allow_new:
-            bc1, bc2, bc3, bc4 = st.columns(4)
-            with bc1: st.metric("Max Stocks Allowed", f"{dynamic_n}")
-            with bc2: st.metric("Current Holdings", f"{n_current_holdings}")
-            with bc3: st.metric("Positions to Exit", f"{n_exits}")
-            with bc4: st.metric("New Positions", f"{n_new_positions}", delta=f"+{n_new_positions}", delta_color="normal")
+        if not ledger:
+            st.info(f"No open positions found in ledger `{Path(LEDGER_FILE).name}`. "
+                    "Nothing to evaluate.")
         else:
-            bc1, bc2, bc3 = st.columns(3)
-            with bc1: st.metric("Max Stocks Allowed", f"{dynamic_n}")
-            with bc2: st.metric("Current Holdings", f"{n_current_holdings}")
-            with bc3: st.metric("Positions to Exit", f"{n_exits}")
+            # ── Build Exit Evaluation rows ────────────────────────────────────────
+            exit_rows = []
+            for ticker, rec in ledger.items():
+                held     = (TODAY - rec["entry_date"]).days
+                rank_val = result.loc[ticker, "RANK"]       if ticker in result.index else np.nan
+                pct52    = result.loc[ticker, "PCT_FROM_52H"] if ticker in result.index else np.nan
+                reldd    = result.loc[ticker, "REL_52H_DD"] if ticker in result.index else np.nan
+
+                # Determine explicit exit trigger category
+                is_52h_breach = pd.notna(pct52) and pct52 < -25
+                is_reldd_breach = pd.notna(reldd) and reldd < rel_dd_breach_threshold
+
+                is_circuit_breach = False
+                if circuit_filter_enabled and ticker in result.index and "TOTAL_CIRCUIT_HITS" in result.columns:
+                    c_hits = result.loc[ticker, "TOTAL_CIRCUIT_HITS"]
+                    if pd.notna(c_hits) and c_hits >= circuit_threshold:
+                        is_circuit_breach = True
+
+                is_series_breach = False
+                if eq_series_filter and ticker in result.index and "SERIES" in result.columns:
+                    series_val = result.loc[ticker, "SERIES"]
+                    if pd.notna(series_val) and str(series_val).strip() != "EQ":
+                        is_series_breach = True
+
+                is_adtv_breach = False
+                if ticker in result.index and "ADTV_ELIGIBLE" in result.columns:
+                    if not bool(result.loc[ticker, "ADTV_ELIGIBLE"]):
+                        is_adtv_breach = True
+
+                if is_52h_breach:
+                    trigger = "52H_BREACH";      action = "⚠️ SELL IMMEDIATELY (52H drop)"
+                elif is_circuit_breach:
+                    trigger = "CIRCUIT_BREACH";  action = "⚠️ SELL IMMEDIATELY (Circuit limit)"
+                elif is_series_breach:
+                    trigger = "SERIES_BREACH";   action = "⚠️ SELL IMMEDIATELY (Non-EQ series)"
+                elif is_adtv_breach:
+                    trigger = "ADTV_BREACH";     action = "⚠️ SELL IMMEDIATELY (Low ADTV)"
+                elif pd.isna(rank_val):
+                    trigger = "FILTER_BREACH";   action = "⚠️ SELL IMMEDIATELY"
+                elif is_reldd_breach and held >= 28:
+                    trigger = "REL_DD_BREACH";   action = "🔻 SELL (relative 52H drawdown)"
+                elif is_reldd_breach and held < 28:
+                    trigger = "REL_DD_LOCK";     action = f"🔒 Locked (Rel DD, {held}/28d)"
+                elif pd.notna(rank_val) and rank_val > int(params["Rank Buffer"]) and held >= 28:
+                    trigger = "RANK_EXIT";       action = "🔻 SELL (rank dropped)"
+                elif pd.notna(rank_val) and rank_val > int(params["Rank Buffer"]) and held < 28:
+                    trigger = "HOLD_LOCK";       action = f"🔒 Locked ({held}/28d)"
+                else:
+                    trigger = "HEALTHY";         action = "✅ HOLD"
+
+                # Current price & unrealised P&L from tradelog
+                curr_price = latest_prices.get(ticker, rec["entry_price"])
+                shares = 0
+                for hm in holdings_metrics:
+                    if hm["Ticker"] == ticker:
+                        shares = hm["Qty"]
+                        curr_price = hm["Current Price"]
+                        break
+                unrealised_pnl_val = (curr_price - rec["entry_price"]) * shares
+
+                exit_rows.append({
+                    "Ticker":          ticker,
+                    "Action":          action,
+                    "Trigger":         trigger,
+                    "Rank":            int(rank_val) if pd.notna(rank_val) else None,
+                    "52H%":            round(pct52, 1) if pd.notna(pct52) else None,
+                    "Rel_52H_DD":      round(reldd, 1) if pd.notna(reldd) else None,
+                    "Days Held":       held,
+                    "Entry Date":      rec["entry_date"].isoformat(),
+                    "Unrealised P&L":  round(unrealised_pnl_val, 0),
+                })
+
+            exit_df = pd.DataFrame(exit_rows)
+
+            # ── Section 1: Exit Evaluation table ──────────────────────────────────
+            exit_triggers = exit_df[exit_df["Trigger"].str.contains("BREACH|RANK_EXIT")]
+            n_exits = len(exit_triggers)
+
+            if n_exits > 0:
+                st.error(f"🚨 **{n_exits} EXIT SIGNAL(S) — Action Required!**")
+                st.markdown("#### Exits Required")
+
+                def style_exit_rows(row):
+                    if "SELL IMMEDIATELY" in str(row["Action"]): return ["background-color:#FFEBEE; font-weight:bold;"] * len(row)
+                    if "SELL" in str(row["Action"]):             return ["background-color:#FFF3E0;"] * len(row)
+                    return [""] * len(row)
+
+                st.dataframe(
+                    exit_triggers.style.apply(style_exit_rows, axis=1).format(
+                        {"Rank": "{:.0f}", "Unrealised P&L": "Rs {:,.0f}"}, na_rep="—"),
+                    use_container_width=True, hide_index=True)
+            else:
+                st.success(f"✅ All {len(ledger)} positions healthy. No exits triggered.")
 
-        # ── Section 3: New Entries table ───────────────────────────────────────
-        if n_new_positions > 0 and allow_new:
+            # ── Section 2: Summary Banner ─────────────────────────────────────────
             st.divider()
-            st.markdown("#### 🆕 New Entry Candidates")
-
-            # Identify tickers to exclude (currently held + flagged for exit stays excluded)
-            held_tickers = set(ledger.keys())
-            # Pick top-ranked eligible stocks not currently held
-            entry_candidates = []
-            for ticker in result.index:
-                if ticker in held_tickers:
-                    continue
-                if len(entry_candidates) >= n_new_positions:
-                    break
-                entry_candidates.append(ticker)
-
-            if not entry_candidates:
-                st.info("No eligible entry candidates found in the current ranking.")
+            n_current_holdings = len(ledger)
+            n_after_exits = n_current_holdings - n_exits
+            n_new_positions = dynamic_n - n_after_exits
+
+            if n_new_positions > 0 and allow_new:
+                bc1, bc2, bc3, bc4 = st.columns(4)
+                with bc1: st.metric("Max Stocks Allowed", f"{dynamic_n}")
+                with bc2: st.metric("Current Holdings", f"{n_current_holdings}")
+                with bc3: st.metric("Positions to Exit", f"{n_exits}")
+                with bc4: st.metric("New Positions", f"{n_new_positions}", delta=f"+{n_new_positions}", delta_color="normal")
             else:
-                # Calculate available cash after exits
-                exit_tickers = set(exit_triggers["Ticker"].tolist()) if n_exits > 0 else set()
-                cost_basis_after_exits = sum(
-                    h["Cost Value"] for h in holdings_metrics
-                    if h["Ticker"] not in exit_tickers
-                )
-                available_cash = max(0.0, capital - cost_basis_after_exits)
-
-                # Compute inverse-vol weights for entry candidates
-                raw_entry_w = {}
-                for t in entry_candidates:
-                    if t not in prices_df.index:
+                bc1, bc2, bc3 = st.columns(3)
+                with bc1: st.metric("Max Stocks Allowed", f"{dynamic_n}")
+                with bc2: st.metric("Current Holdings", f"{n_current_holdings}")
+                with bc3: st.metric("Positions to Exit", f"{n_exits}")
+
+            # ── Section 3: New Entries table ───────────────────────────────────────
+            if n_new_positions > 0 and allow_new:
+                st.divider()
+                st.markdown("#### 🆕 New Entry Candidates")
+
+                # Identify tickers to exclude (currently held + flagged for exit stays excluded)
+                held_tickers = set(ledger.keys())
+                # Pick top-ranked eligible stocks not currently held
+                entry_candidates = []
+                for ticker in result.index:
+                    if ticker in held_tickers:
                         continue
-                    px = prices_df.loc[t].dropna()
-                    if len(px) > 10:
-                        vols = []
-                        for w in [252, 189, 126, 63]:
-                            pw = px.iloc[-w:] if len(px) >= w else px
-                            lr = np.diff(np.log(pw.values))
-                            if len(lr) > 5: vols.append(np.std(lr, ddof=1) * np.sqrt(252))
-                        comp = result.loc[t, "COMPOSITE"] if t in result.index else 1.0
-                        raw_entry_w[t] = comp / np.mean(vols) if vols and np.mean(vols) > 0 else comp
-                    else:
-                        raw_entry_w[t] = result.loc[t, "COMPOSITE"] if t in result.index else 1.0
-
-                total_w = sum(raw_entry_w.values())
-                entry_weights = {}
-                for t in raw_entry_w:
-                    nw           = raw_entry_w[t] / total_w if total_w > 0 else 1.0 / len(raw_entry_w)
-                    raw_alloc    = nw * capital
-                    capped_alloc = min(raw_alloc, max_position_size_inr)
-                    entry_weights[t] = capped_alloc / capital if capital > 0 else 0.0
-
-                # Target investment amount based on total capital
-                # (capped at Max Position Size (INR), set in Configuration)
-                total_needed = sum(entry_weights[t] * capital for t in entry_weights)
-
-                if available_cash <= 0:
-                    st.info("ℹ️ No cash available for new entries.")
+                    if len(entry_candidates) >= n_new_positions:
+                        break
+                    entry_candidates.append(ticker)
+
+                if not entry_candidates:
+                    st.info("No eligible entry candidates found in the current ranking.")
                 else:
-                    if total_needed > available_cash * 1.01:  # small tolerance
-                        st.warning("⚠️ Insufficient cash for all entries — allocation pro-rata scaled to available cash.")
-                        scale = available_cash / total_needed
-                    else:
-                        scale = 1.0
-
-                    entry_rows = []
-                    for t in entry_candidates:
-                        if t not in entry_weights:
-                            continue
-                        inv_amount = min(entry_weights[t] * capital * scale, available_cash)
-                        ltp = latest_prices.get(t, 0.0)
-                        qty = int(inv_amount // ltp) if ltp > 0 else 0
-                        rank_val = result.loc[t, "RANK"] if t in result.index else np.nan
-                        pct52 = result.loc[t, "PCT_FROM_52H"] if t in result.index else np.nan
-
-                        entry_rows.append({
-                            "Ticker":         t,
-                            "Action":         "🟢 BUY",
-                            "Rank":           int(rank_val) if pd.notna(rank_val) else None,
-                            "52H%":           round(pct52, 1) if pd.notna(pct52) else None,
-                            "Inv. Amount":    round(inv_amount, 0),
-                            "Qty to Purchase": qty,
-                        })
-
-                    if entry_rows:
-                        entry_df = pd.DataFrame(entry_rows)
-
-                        def style_entry_rows(row):
-                            return ["background-color:#E8F5E9;"] * len(row)
-
-                        st.dataframe(
-                            entry_df.style.apply(style_entry_rows, axis=1).format(
-                                {"Rank": "{:.0f}", "Inv. Amount": "Rs {:,.0f}",
-                                 "Qty to Purchase": "{:,.0f}"}, na_rep="—"),
-                            use_container_width=True, hide_index=True)
-
-                        st.caption(
-                            f"Available Cash: **Rs {available_cash:,.0f}**  |  "
-                            f"Total Allocation: **Rs {sum(r['Inv. Amount'] for r in entry_rows):,.0f}**")
+                    # Calculate available cash after exits
+                    exit_tickers = set(exit_triggers["Ticker"].tolist()) if n_exits > 0 else set()
+                    cost_basis_after_exits = sum(
+                        h["Cost Value"] for h in holdings_metrics
+                        if h["Ticker"] not in exit_tickers
+                    )
+                    available_cash = max(0.0, capital - cost_basis_after_exits)
+
+                    # Compute inverse-vol weights for entry candidates (allocator.py)
+                    entry_known = [t for t in entry_candidates if t in prices_df.index]
+                    entry_comp  = result["COMPOSITE"].reindex(entry_known)
+                    entry_comp  = entry_comp.where(entry_comp.index.isin(result.index), 1.0)
+                    raw_entry_w = dict(zip(entry_known, al.raw_weights(
+                        entry_comp.to_numpy(dtype=float),
+                        al.realized_vols(prices_df, entry_known).to_numpy())))
+
+                    total_w = sum(raw_entry_w.values())
+                    entry_weights = {}
+                    for t in raw_entry_w:
+                        nw           = raw_entry_w[t] / total_w if total_w > 0 else 1.0 / len(raw_entry_w)
+                        raw_alloc    = nw * capital
+                        capped_alloc = min(raw_alloc, max_position_size_inr)
+                        entry_weights[t] = capped_alloc / capital if capital > 0 else 0.0
+
+                    # Target investment amount based on total capital
+                    # (capped at Max Position Size (INR), set in Configuration)
+                    total_needed = sum(entry_weights[t] * capital for t in entry_weights)
+
+                    if available_cash <= 0:
+                        st.info("ℹ️ No cash available for new entries.")
                     else:
-                        st.info("No eligible entry candidates could be allocated.")
-
-        elif not allow_new:
+                        if total_needed > available_cash * 1.01:  # small tolerance
+                            st.warning("⚠️ Insufficient cash for all entries — allocation pro-rata scaled to available cash.")
+                            scale = available_cash / total_needed
+                        else:
+                            scale = 1.0
+
+                        entry_rows = []
+                        for t in entry_candidates:
+                            if t not in entry_weights:
+                                continue
+                            inv_amount = min(entry_weights[t] * capital * scale, available_cash)
+                            ltp = latest_prices.get(t, 0.0)
+                            qty = int(inv_amount // ltp) if ltp > 0 else 0
+                            rank_val = result.loc[t, "RANK"] if t in result.index else np.nan
+                            pct52 = result.loc[t, "PCT_FROM_52H"] if t in result.index else np.nan
+
+                            entry_rows.append({
+                                "Ticker":         t,
+                                "Action":         "🟢 BUY",
+                                "Rank":           int(rank_val) if pd.notna(rank_val) else None,
+                                "52H%":           round(pct52, 1) if pd.notna(pct52) else None,
+                                "Inv. Amount":    round(inv_amount, 0),
+                                "Qty to Purchase": qty,
+                            })
+
+                        if entry_rows:
+                            entry_df = pd.DataFrame(entry_rows)
+
+                            def style_entry_rows(row):
+                                return ["background-color:#E8F5E9;"] * len(row)
+
+                            st.dataframe(
+                                entry_df.style.apply(style_entry_rows, axis=1).format(
+                                    {"Rank": "{:.0f}", "Inv. Amount": "Rs {:,.0f}",
+                                     "Qty to Purchase": "{:,.0f}"}, na_rep="—"),
+                                use_container_width=True, hide_index=True)
+
+                            st.caption(
+                                f"Available Cash: **Rs {available_cash:,.0f}**  |  "
+                                f"Total Allocation: **Rs {sum(r['Inv. Amount'] for r in entry_rows):,.0f}**")
+                        else:
+                            st.info("No eligible entry candidates could be allocated.")
+
+            elif not allow_new:
+                st.divider()
+                st.warning(f"⛔ Regime Score ({regime_score:.2f}) below threshold ({NEW_ENTRY_THRESHOLD}) — no new entries permitted.")
+
+            # ── Section 4: Full holdings summary ──────────────────────────────────
             st.divider()
-            st.warning(f"⛔ Regime Score ({regime_score:.2f}) below threshold ({NEW_ENTRY_THRESHOLD}) — no new entries permitted.")
-
-        # ── Section 4: Full holdings summary ──────────────────────────────────
-        st.divider()
-        st.markdown("#### 📋 All Positions")
+            st.markdown("#### 📋 All Positions")
 
-        def style_all_positions(row):
-            if "SELL IMMEDIATELY" in str(row["Action"]): return ["background-color:#FFEBEE; font-weight:bold;"] * len(row)
-            if "SELL" in str(row["Action"]):             return ["background-color:#FFF3E0;"] * len(row)
-            if "Locked"  in str(row["Action"]):          return ["background-color:#FFF8E1;"] * len(row)
-            return ["background-color:#E8F5E9;"] * len(row)
+            def style_all_positions(row):
+                if "SELL IMMEDIATELY" in str(row["Action"]): return ["background-color:#FFEBEE; font-weight:bold;"] * len(row)
+                if "SELL" in str(row["Action"]):             return ["background-color:#FFF3E0;"] * len(row)
+                if "Locked"  in str(row["Action"]):          return ["background-color:#FFF8E1;"] * len(row)
+                return ["background-color:#E8F5E9;"] * len(row)
 
-        st.dataframe(exit_df.style.apply(style_all_positions, axis=1).format(
-                         {"Rank": "{:.0f}", "Unrealised P&L": "Rs {:,.0f}"}, na_rep="—"),
-                     use_container_width=True, hide_index=True)
+            st.dataframe(exit_df.style.apply(style_all_positions, axis=1).format(
+                             {"Rank": "{:.0f}", "Unrealised P&L": "Rs {:,.0f}"}, na_rep="—"),
+                         use_container_width=True, hide_index=True)
 
-        st.markdown(
-            f"**Positions:** {len(ledger)}  |  "
-            f"**52H Exits:** {len(exit_df[exit_df['Trigger']=='52H_BREACH'])}  |  "
-            f"**Rel DD Exits:** {len(exit_df[exit_df['Trigger']=='REL_DD_BREACH'])}  |  "
-            f"**Rank Exits:** {len(exit_df[exit_df['Trigger']=='RANK_EXIT'])}  |  "
-            f"**Hold-Locked:** {len(exit_df[exit_df['Trigger'].isin(['HOLD_LOCK', 'REL_DD_LOCK'])])}  |  "
-            f"**Healthy:** {len(exit_df[exit_df['Trigger']=='HEALTHY'])}")
+            st.markdown(
+                f"**Positions:** {len(ledger)}  |  "
+                f"**52H Exits:** {len(exit_df[exit_df['Trigger']=='52H_BREACH'])}  |  "
+                f"**Rel DD Exits:** {len(exit_df[exit_df['Trigger']=='REL_DD_BREACH'])}  |  "
+                f"**Rank Exits:** {len(exit_df[exit_df['Trigger']=='RANK_EXIT'])}  |  "
+                f"**Hold-Locked:** {len(exit_df[exit_df['Trigger'].isin(['HOLD_LOCK', 'REL_DD_LOCK'])])}  |  "
+                f"**Healthy:** {len(exit_df[exit_df['Trigger']=='HEALTHY'])}")
 
 # ── TAB 3: TRADELOG & MTM ─────────────────────────────────────────────────────
-with tab_tradelog:
-    st.markdown("## 📝 Tradelog & Real-time MTM")
-
-    # 1. Metric Cards
-    total_invested_val = sum(h["Cost Value"] for h in holdings_metrics)
-    total_market_val = sum(h["Market Value"] for h in holdings_metrics)
-    total_unrealized_pnl = total_market_val - total_invested_val
-    total_unrealized_pnl_pct = (total_unrealized_pnl / total_invested_val * 100) if total_invested_val > 0 else 0.0
-
-    tc1, tc2, tc3, tc4 = st.columns(4)
-    with tc1:
-        st.metric("Total Invested (Rs)", f"Rs {total_invested_val:,.2f}")
-    with tc2:
-        st.metric("Current Market Value (Rs)", f"Rs {total_market_val:,.2f}")
-    with tc3:
-        st.metric("Unrealized PnL (MTM)", f"Rs {total_unrealized_pnl:,.2f}", delta=f"{total_unrealized_pnl_pct:+.2f}%")
-    with tc4:
-        st.metric("Realized PnL (Rs)", f"Rs {realized_pnl:,.2f}")
-
-    st.divider()
-
-    # 2. Active Holdings Table
-    hc1, hc2 = st.columns([0.7, 0.3])
-    with hc1: 
-        st.markdown("### 💼 Active Holdings")
-    with hc2:
-        if st.button("🔄 Refresh Live Market Prices", use_container_width=True):
-            live_prices = {}
-            if holdings_metrics:
-                with st.spinner("Fetching latest prices from Yahoo Finance..."):
-                    def fetch_price(tkr):
-                        try:
-                            return tkr, yf.Ticker(f"{tkr}.NS").fast_info.last_price
-                        except:
-                            try:
-                                return tkr, yf.Ticker(f"{tkr}.BO").fast_info.last_price
-                            except:
-                                return tkr, None
-                    
-                    with ThreadPoolExecutor(max_workers=20) as exe:
-                        results = exe.map(fetch_price, [h["Ticker"] for h in holdings_metrics])
-                        for tkr, price in results:
-                            if price: live_prices[tkr] = price
-            
-            if live_prices:
-                st.session_state.live_prices = live_prices
-                st.rerun()
-
-    # Initialize state keys for tracking row selection and dropdown state
-    if "last_selected_row" not in st.session_state:
-        st.session_state.last_selected_row = None
-    if "last_seen_ticker" not in st.session_state:
-        st.session_state.last_seen_ticker = None
-
-    if not holdings_metrics:
-        st.info("No active holdings found. Log a BUY trade below to open a position.")
-    else:
-        holdings_df = pd.DataFrame(holdings_metrics)
-        cols_order = ["Ticker", "Qty", "Avg Price", "Current Price", "Cost Value", "Market Value", "Unrealized PnL", "Unrealized PnL %", "First Buy Date"]
-        holdings_df = holdings_df[cols_order].sort_values(by="Unrealized PnL", ascending=False)
+if tab_open(tab_tradelog):
+    with tab_tradelog:
+        st.markdown("## 📝 Tradelog & Real-time MTM")
+
+        # 1. Metric Cards
+        total_invested_val = sum(h["Cost Value"] for h in holdings_metrics)
+        total_market_val = sum(h["Market Value"] for h in holdings_metrics)
+        total_unrealized_pnl = total_market_val - total_invested_val
+        total_unrealized_pnl_pct = (total_unrealized_pnl / total_invested_val * 100) if total_invested_val > 0 else 0.0
+
+        tc1, tc2, tc3, tc4 = st.columns(4)
+        with tc1:
+            st.metric("Total Invested (Rs)", f"Rs {total_invested_val:,.2f}")
+        with tc2:
+            st.metric("Current Market Value (Rs)", f"Rs {total_market_val:,.2f}")
+        with tc3:
+            st.metric("Unrealized PnL (MTM)", f"Rs {total_unrealized_pnl:,.2f}", delta=f"{total_unrealized_pnl_pct:+.2f}%")
+        with tc4:
+            st.metric("Realized PnL (Rs)", f"Rs {realized_pnl:,.2f}")
 
-        def style_holdings(row):
-            pnl = row["Unrealized PnL"]
-            if pnl > 0:
-                return ["background-color:#E8F5E9;"] * len(row)
-            elif pnl < 0:
-                return ["background-color:#FFEBEE;"] * len(row)
-            return [""] * len(row)
-
-        event = st.dataframe(
-            holdings_df.style.apply(style_holdings, axis=1).format(
-                {"Qty": "{:,.0f}", "Avg Price": "Rs {:,.2f}", "Current Price": "Rs {:,.2f}",
-                 "Cost Value": "Rs {:,.2f}", "Market Value": "Rs {:,.2f}",
-                 "Unrealized PnL": "Rs {:,.2f}", "Unrealized PnL %": "{:+.2f}%",
-                 "First Buy Date": lambda x: x.isoformat() if hasattr(x, "isoformat") else str(x)}, na_rep="—"
-            ),
-            use_container_width=True, hide_index=True,
-            on_select="rerun",
-            selection_mode="single-row"
-        )
-
-        # Extract selected row details
-        rows = []
-        if event and hasattr(event, "selection"):
-            if hasattr(event.selection, "rows"):
-                rows = event.selection.rows
-            elif isinstance(event.selection, dict):
-                rows = event.selection.get("rows", [])
-
-        if rows:
-            selected_row_idx = rows[0]
-            if st.session_state.last_selected_row != selected_row_idx:
-                selected_row = holdings_df.iloc[selected_row_idx]
-                st.session_state.tradelog_select_ticker = selected_row["Ticker"]
-                st.session_state.tradelog_qty = int(selected_row["Qty"])
-                st.session_state.tradelog_price = float(selected_row["Current Price"])
-                st.session_state.last_selected_row = selected_row_idx
-                st.session_state.last_seen_ticker = selected_row["Ticker"]
-        else:
+        st.divider()
+
+        # 2. Active Holdings Table
+        hc1, hc2 = st.columns([0.7, 0.3])
+        with hc1: 
+            st.markdown("### 💼 Active Holdings")
+        with hc2:
+            if st.button("🔄 Refresh Live Market Prices", use_container_width=True):
+                live_prices = {}
+                if holdings_metrics:
+                    with st.spinner("Fetching latest prices from Yahoo Finance..."):
+                        live_prices = lq.get_quotes([h["Ticker"] for h in holdings_metrics],
+                                                    exchanges=("NS", "BO"))
+
+                if live_prices:
+                    st.session_state.live_prices = live_prices
+                    st.rerun()
+
+        # Initialize state keys for tracking row selection and dropdown state
+        if "last_selected_row" not in st.session_state:
             st.session_state.last_selected_row = None
+        if "last_seen_ticker" not in st.session_state:
+            st.session_state.last_seen_ticker = None
+
+        if not holdings_metrics:
+            st.info("No active holdings found. Log a BUY trade below to open a position.")
+        else:
+            holdings_df = pd.DataFrame(holdings_metrics)
+            cols_order = ["Ticker", "Qty", "Avg Price", "Current Price", "Cost Value", "Market Value", "Unrealized PnL", "Unrealized PnL %", "First Buy Date"]
+            holdings_df = holdings_df[cols_order].sort_values(by="Unrealized PnL", ascending=False)
+
+            def style_holdings(row):
+                pnl = row["Unrealized PnL"]
+                if pnl > 0:
+                    return ["background-color:#E8F5E9;"] * len(row)
+                elif pnl < 0:
+                    return ["background-color:#FFEBEE;"] * len(row)
+                return [""] * len(row)
 
-    st.divider()
+            event = st.dataframe(
+                holdings_df.style.apply(style_holdings, axis=1).format(
+                    {"Qty": "{:,.0f}", "Avg Price": "Rs {:,.2f}", "Current Price": "Rs {:,.2f}",
+                     "Cost Value": "Rs {:,.2f}", "Market Value": "Rs {:,.2f}",
+                     "Unrealized PnL": "Rs {:,.2f}", "Unrealized PnL %": "{:+.2f}%",
+                     "First Buy Date": lambda x: x.isoformat() if hasattr(x, "isoformat") else str(x)}, na_rep="—"
+                ),
+                use_container_width=True, hide_index=True,
+                on_select="rerun",
+                selection_mode="single-row"
+            )
 
-    # 3. Log Trade Form & Transaction History
-    st.markdown("### ➕ Log New Transaction")
+            # Extract selected row details
+            rows = []
+            if event and hasattr(event, "selection"):
+                if hasattr(event.selection, "rows"):
+                    rows = event.selection.rows
+                elif isinstance(event.selection, dict):
+                    rows = event.selection.get("rows", [])
+
+            if rows:
+                selected_row_idx = rows[0]
+                if st.session_state.last_selected_row != selected_row_idx:
+                    selected_row = holdings_df.iloc[selected_row_idx]
+                    st.session_state.tradelog_select_ticker = selected_row["Ticker"]
+                    st.session_state.tradelog_qty = int(selected_row["Qty"])
+                    st.session_state.tradelog_price = float(selected_row["Current Price"])
+                    st.session_state.last_selected_row = selected_row_idx
+                    st.session_state.last_seen_ticker = selected_row["Ticker"]
+            else:
+                st.session_state.last_selected_row = None
+
+        st.divider()
+
+        # 3. Log Trade Form & Transaction History
+        st.markdown("### ➕ Log New Transaction")
     
-    # Deferred reset: apply pending resets BEFORE widgets are instantiated
-    if st.session_state.get("_pending_trade_reset"):
-        st.session_state.tradelog_qty = 10
-        if "tradelog_select_ticker" in st.session_state:
-            st.session_state.tradelog_price = float(
-                get_latest_price(st.session_state.tradelog_select_ticker, prices_df))
-        st.session_state.last_selected_row = None
-        del st.session_state["_pending_trade_reset"]
-
-    # Initialize inputs session state if not set
-    if "tradelog_select_ticker" not in st.session_state:
-        st.session_state.tradelog_select_ticker = stock_tickers[0]
-    if "tradelog_qty" not in st.session_state:
-        st.session_state.tradelog_qty = 10
-    if "tradelog_price" not in st.session_state:
-        selected_ticker = st.session_state.tradelog_select_ticker
-        st.session_state.tradelog_price = float(get_latest_price(selected_ticker, prices_df))
+        # Deferred reset: apply pending resets BEFORE widgets are instantiated
+        if st.session_state.get("_pending_trade_reset"):
+            st.session_state.tradelog_qty = 10
+            if "tradelog_select_ticker" in st.session_state:
+                st.session_state.tradelog_price = float(
+                    get_latest_price(st.session_state.tradelog_select_ticker, prices_df))
+            st.session_state.last_selected_row = None
+            del st.session_state["_pending_trade_reset"]
+
+        # Initialize inputs session state if not set
+        if "tradelog_select_ticker" not in st.session_state:
+            st.session_state.tradelog_select_ticker = stock_tickers[0]
+        if "tradelog_qty" not in st.session_state:
+            st.session_state.tradelog_qty = 10
+        if "tradelog_price" not in st.session_state:
+            selected_ticker = st.session_state.tradelog_select_ticker
+            st.session_state.tradelog_price = float(get_latest_price(selected_ticker, prices_df))
     
-    with st.form(key="add_trade_form", clear_on_submit=True):
-        col_ticker, col_act, col_dt = st.columns([2, 1, 1])
+        with st.form(key="add_trade_form", clear_on_submit=True):
+            col_ticker, col_act, col_dt = st.columns([2, 1, 1])
         
-        with col_ticker:
-            selected_ticker = st.selectbox(
-                "Select Ticker", 
-                options=stock_tickers, 
-                index=stock_tickers.index(st.session_state.tradelog_select_ticker)
-                    if st.session_state.tradelog_select_ticker in stock_tickers else 0,
-                help="Select stock from the universe to trade"
-            )
-        with col_act:
-            trade_action = st.radio("Action", ["BUY", "SELL"], horizontal=True)
-        with col_dt:
-            trade_date = st.date_input("Transaction Date", datetime.date.today())
+            with col_ticker:
+                selected_ticker = st.selectbox(
+                    "Select Ticker", 
+                    options=stock_tickers, 
+                    index=stock_tickers.index(st.session_state.tradelog_select_ticker)
+                        if st.session_state.tradelog_select_ticker in stock_tickers else 0,
+                    help="Select stock from the universe to trade"
+                )
+            with col_act:
+                trade_action = st.radio("Action", ["BUY", "SELL"], horizontal=True)
+            with col_dt:
+                trade_date = st.date_input("Transaction Date", datetime.date.today())
         
-        col_q, col_p, col_spacer = st.columns([1, 1, 2])
-        with col_q:
-            trade_qty = st.number_input("Quantity", min_value=1, step=1, value=st.session_state.tradelog_qty)
-        with col_p:
-            trade_price = st.number_input("Price per Share (INR)", min_value=0.01, step=0.01, value=float(st.session_state.tradelog_price))
+            col_q, col_p, col_spacer = st.columns([1, 1, 2])
+            with col_q:
+                trade_qty = st.number_input("Quantity", min_value=1, step=1, value=st.session_state.tradelog_qty)
+            with col_p:
+                trade_price = st.number_input("Price per Share (INR)", min_value=0.01, step=0.01, value=float(st.session_state.tradelog_price))
             
-        submit_trade = st.form_submit_button("💾 Record Transaction", use_container_width=True)
+            submit_trade = st.form_submit_button("💾 Record Transaction", use_container_width=True)
         
-        if submit_trade:
-            # Update the ticker in session state from the form selection
-            st.session_state.tradelog_select_ticker = selected_ticker
+            if submit_trade:
+                # Update the ticker in session state from the form selection
+                st.session_state.tradelog_select_ticker = selected_ticker
             
-            # Strict validation: block SELL exceeding holdings
-            curr_qty = active_holdings.get(selected_ticker, {}).get("qty", 0.0)
-            if trade_action == "SELL" and trade_qty > curr_qty:
-                st.error(
-                    f"❌ Cannot SELL {trade_qty} shares of {selected_ticker} — "
-                    f"you only hold {curr_qty:.0f} shares. Trade not recorded."
-                )
-            else:
-                # Build candidate tradelog and validate full integrity
-                new_trade = {
-                    "id": str(uuid.uuid4()),
-                    "date": trade_date.isoformat(),
-                    "timestamp": datetime.datetime.now().isoformat(),
-                    "ticker": selected_ticker,
-                    "action": trade_action,
-                    "quantity": int(trade_qty),
-                    "price": float(trade_price)
-                }
+                # Strict validation: block SELL exceeding holdings
+                curr_qty = active_holdings.get(selected_ticker, {}).get("qty", 0.0)
+                if trade_action == "SELL" and trade_qty > curr_qty:
+                    st.error(
+                        f"❌ Cannot SELL {trade_qty} shares of {selected_ticker} — "
+                        f"you only hold {curr_qty:.0f} shares. Trade not recorded."
+                    )
+                else:
+                    # Build candidate tradelog and validate full integrity
+                    new_trade = {
+                        "id": str(uuid.uuid4()),
+                        "date": trade_date.isoformat(),
+                        "timestamp": datetime.datetime.now().isoformat(),
+                        "ticker": selected_ticker,
+                        "action": trade_action,
+                        "quantity": int(trade_qty),
+                        "price": float(trade_price)
+                    }
                 
-                updated_tradelog = tradelog + [new_trade]
-                is_valid, err_msg = validate_tradelog_integrity(updated_tradelog)
+                    updated_tradelog = tradelog + [new_trade]
+                    is_valid, err_msg = pb.validate_append(position_book, tradelog, new_trade)
                 
-                if not is_valid:
-                    st.error(f"❌ Trade rejected — would cause inconsistent state: {err_msg}")
-                else:
-                    save_tradelog(universe, updated_tradelog)
+                    if not is_valid:
+                        st.error(f"❌ Trade rejected — would cause inconsistent state: {err_msg}")
+                    else:
+                        save_tradelog(universe, updated_tradelog)
                     
-                    # Recalculate holdings & sync positions ledger
-                    new_calc = calculate_holdings_and_pnl(updated_tradelog, latest_prices)
-                    sync_to_positions_ledger(LEDGER_FILE, new_calc["active_holdings"])
+                        # Recalculate holdings & sync positions ledger
+                        new_calc = pb.holdings_and_pnl(
+                            load_position_book(universe, updated_tradelog), latest_prices)
+                        sync_to_positions_ledger(LEDGER_FILE, new_calc["active_holdings"])
                     
-                    # Set deferred reset flag — will be applied on next rerun BEFORE widgets
-                    st.session_state._pending_trade_reset = True
+                        # Set deferred reset flag — will be applied on next rerun BEFORE widgets
+                        st.session_state._pending_trade_reset = True
                     
-                    st.success(f"Successfully recorded {trade_action} {trade_qty} shares of {selected_ticker} @ Rs {trade_price:.2f}!")
-                    st.rerun()
+                        st.success(f"Successfully recorded {trade_action} {trade_qty} shares of {selected_ticker} @ Rs {trade_price:.2f}!")
+                        st.rerun()
 
-    st.divider()
+        st.divider()
 
-    # 4. Chronological Transaction Table & Deletion
-    st.markdown("### 🕒 Transaction History & Management")
-    if not tradelog:
-        st.info("No transactions logged yet.")
-    else:
-        display_tx = []
-        for tx in reversed(tradelog):
-            display_tx.append({
-                "Date": tx["date"],
-                "Ticker": tx["ticker"],
-                "Action": tx["action"],
-                "Quantity": tx["quantity"],
-                "Price": tx["price"],
-                "Total Value": tx["quantity"] * tx["price"]
-            })
-            
-        display_df = pd.DataFrame(display_tx)
-        
-        def style_txs(row):
-            if row["Action"] == "BUY":
-                return ["background-color:#E8F5E9;"] * len(row)
-            elif row["Action"] == "SELL":
-                return ["background-color:#FFEBEE;"] * len(row)
-            return [""] * len(row)
-            
-        st.dataframe(
-            display_df.style.apply(style_txs, axis=1).format(
-                {"Quantity": "{:,.0f}", "Price": "Rs {:,.2f}", "Total Value": "Rs {:,.2f}"}
-            ),
-            use_container_width=True, hide_index=True
-        )
-        st.markdown("#### ✏️ Edit Existing Transaction")
-        tx_options_edit = [
-            f"{tx['date']} | {tx['action']} {tx['quantity']} {tx['ticker']} @ Rs{tx['price']} (ID: {tx['id']})"
-            for tx in reversed(tradelog)
-        ]
-        selected_choice = st.selectbox(
-            "Select transaction to edit (useful for adjusting entry prices/quantities)",
-            options=["-- Select Transaction to Edit --"] + tx_options_edit,
-            key="edit_tx_selectbox"
-        )
+        # 4. Chronological Transaction Table & Deletion
+        st.markdown("### 🕒 Transaction History & Management")
+        if not tradelog:
+            st.info("No transactions logged yet.")
+        else:
+            display_df = pd.DataFrame(
+                [{"Date": tx["date"], "Ticker": tx["ticker"], "Action": tx["action"],
+                  "Quantity": tx["quantity"], "Price": tx["price"]} for tx in reversed(tradelog)])
+            display_df["Total Value"] = display_df["Quantity"] * display_df["Price"]
+
+            page_df = paginate(display_df, key="tx_page")
+            st.dataframe(
+                row_styles(page_df, np.select(
+                    [page_df["Action"] == "BUY", page_df["Action"] == "SELL"],
+                    ["background-color:#E8F5E9;", "background-color:#FFEBEE;"], default="")).format(
+                    {"Quantity": "{:,.0f}", "Price": "Rs {:,.2f}", "Total Value": "Rs {:,.2f}"}
+                ),
+                use_container_width=True, hide_index=True
+            )
+            st.markdown("#### ✏️ Edit Existing Transaction")
+            tx_options_edit = [
+                f"{tx['date']} | {tx['action']} {tx['quantity']} {tx['ticker']} @ Rs{tx['price']} (ID: {tx['id']})"
+                for tx in reversed(tradelog)
+            ]
+            selected_choice = st.selectbox(
+                "Select transaction to edit (useful for adjusting entry prices/quantities)",
+                options=["-- Select Transaction to Edit --"] + tx_options_edit,
+                key="edit_tx_selectbox"
+            )
         
-        if selected_choice != "-- Select Transaction to Edit --":
-            parts = selected_choice.split("(ID: ")
-            edit_id = parts[1].rstrip(")") if len(parts) > 1 else None
-            target_tx = next((tx for tx in tradelog if tx["id"] == edit_id), None)
+            if selected_choice != "-- Select Transaction to Edit --":
+                parts = selected_choice.split("(ID: ")
+                edit_id = parts[1].rstrip(")") if len(parts) > 1 else None
+                target_tx = next((tx for tx in tradelog if tx["id"] == edit_id), None)
             
-            if target_tx:
-                st.info(f"Editing transaction ID: {target_tx['id']}")
-                with st.form(key="edit_tx_form", clear_on_submit=False):
-                    col_edit_ticker, col_edit_act, col_edit_dt, col_edit_qty, col_edit_pr = st.columns(5)
+                if target_tx:
+                    st.info(f"Editing transaction ID: {target_tx['id']}")
+                    with st.form(key="edit_tx_form", clear_on_submit=False):
+                        col_edit_ticker, col_edit_act, col_edit_dt, col_edit_qty, col_edit_pr = st.columns(5)
                     
-                    with col_edit_ticker:
-                        try:
-                            ticker_idx = stock_tickers.index(target_tx["ticker"])
-                        except ValueError:
-                            ticker_idx = 0
-                        edit_ticker = st.selectbox("Ticker", options=stock_tickers, index=ticker_idx)
-                    with col_edit_act:
-                        edit_action = st.radio("Action", ["BUY", "SELL"], index=0 if target_tx["action"].upper() == "BUY" else 1, horizontal=True)
-                    with col_edit_dt:
-                        try:
-                            dt_val = datetime.date.fromisoformat(target_tx["date"])
-                        except ValueError:
-                            dt_val = datetime.date.today()
-                        edit_date = st.date_input("Date", dt_val)
-                    with col_edit_qty:
-                        edit_qty = st.number_input("Quantity", min_value=1, step=1, value=int(target_tx["quantity"]))
-                    with col_edit_pr:
-                        edit_price = st.number_input("Price (INR)", min_value=0.01, step=0.01, value=float(target_tx["price"]))
+                        with col_edit_ticker:
+                            try:
+                                ticker_idx = stock_tickers.index(target_tx["ticker"])
+                            except ValueError:
+                                ticker_idx = 0
+                            edit_ticker = st.selectbox("Ticker", options=stock_tickers, index=ticker_idx)
+                        with col_edit_act:
+                            edit_action = st.radio("Action", ["BUY", "SELL"], index=0 if target_tx["action"].upper() == "BUY" else 1, horizontal=True)
+                        with col_edit_dt:
+                            try:
+                                dt_val = datetime.date.fromisoformat(target_tx["date"])
+                            except ValueError:
+                                dt_val = datetime.date.today()
+                            edit_date = st.date_input("Date", dt_val)
+                        with col_edit_qty:
+                            edit_qty = st.number_input("Quantity", min_value=1, step=1, value=int(target_tx["quantity"]))
+                        with col_edit_pr:
+                            edit_price = st.number_input("Price (INR)", min_value=0.01, step=0.01, value=float(target_tx["price"]))
                         
-                    submit_edit = st.form_submit_button("💾 Save Changes", use_container_width=True)
+                        submit_edit = st.form_submit_button("💾 Save Changes", use_container_width=True)
                     
-                    if submit_edit:
-                        idx_to_update = next((i for i, tx in enumerate(tradelog) if tx["id"] == edit_id), None)
-                        if idx_to_update is not None:
-                            # Build candidate tradelog with the edit applied
-                            candidate_tradelog = [tx.copy() for tx in tradelog]
-                            candidate_tradelog[idx_to_update]["ticker"] = edit_ticker
-                            candidate_tradelog[idx_to_update]["action"] = edit_action
-                            candidate_tradelog[idx_to_update]["date"] = edit_date.isoformat()
-                            candidate_tradelog[idx_to_update]["quantity"] = int(edit_qty)
-                            candidate_tradelog[idx_to_update]["price"] = float(edit_price)
+                        if submit_edit:
+                            idx_to_update = next((i for i, tx in enumerate(tradelog) if tx["id"] == edit_id), None)
+                            if idx_to_update is not None:
+                                # Build candidate tradelog with the edit applied
+                                candidate_tradelog = [tx.copy() for tx in tradelog]
+                                candidate_tradelog[idx_to_update]["ticker"] = edit_ticker
+                                candidate_tradelog[idx_to_update]["action"] = edit_action
+                                candidate_tradelog[idx_to_update]["date"] = edit_date.isoformat()
+                                candidate_tradelog[idx_to_update]["quantity"] = int(edit_qty)
+                                candidate_tradelog[idx_to_update]["price"] = float(edit_price)
                             
-                            # Validate integrity of the resulting tradelog
-                            is_valid, err_msg = validate_tradelog_integrity(candidate_tradelog)
-                            if not is_valid:
-                                st.error(
-                                    f"❌ Edit rejected — would cause inconsistent holdings: {err_msg}. "
-                                    f"The original transaction has NOT been modified."
-                                )
-                            else:
-                                save_tradelog(universe, candidate_tradelog)
+                                # Validate integrity of the resulting tradelog
+                                is_valid, err_msg = pb.validate_transactions(candidate_tradelog)
+                                if not is_valid:
+                                    st.error(
+                                        f"❌ Edit rejected — would cause inconsistent holdings: {err_msg}. "
+                                        f"The original transaction has NOT been modified."
+                                    )
+                                else:
+                                    save_tradelog(universe, candidate_tradelog)
                                 
-                                new_calc = calculate_holdings_and_pnl(candidate_tradelog, latest_prices)
-                                sync_to_positions_ledger(LEDGER_FILE, new_calc["active_holdings"])
+                                    new_calc = pb.holdings_and_pnl(
+                                        load_position_book(universe, candidate_tradelog), latest_prices)
+                                    sync_to_positions_ledger(LEDGER_FILE, new_calc["active_holdings"])
                                 
-                                st.success("Successfully updated transaction and synced positions ledger!")
-                                st.rerun()
+                                    st.success("Successfully updated transaction and synced positions ledger!")
+                                    st.rerun()
 
-        st.divider()
+            st.divider()
         
-        st.markdown("#### 🗑️ Delete Transactions")
-        tx_options = [
-            f"{tx['date']} | {tx['action']} {tx['quantity']} {tx['ticker']} @ Rs{tx['price']} (ID: {tx['id']})"
-            for tx in reversed(tradelog)
-        ]
-        selected_to_delete = st.multiselect(
-            "Select transactions to delete (useful for fixing entries)",
-            options=tx_options,
-            help="Select one or more transactions to permanently delete"
-        )
+            st.markdown("#### 🗑️ Delete Transactions")
+            tx_options = [
+                f"{tx['date']} | {tx['action']} {tx['quantity']} {tx['ticker']} @ Rs{tx['price']} (ID: {tx['id']})"
+                for tx in reversed(tradelog)
+            ]
+            selected_to_delete = st.multiselect(
+                "Select transactions to delete (useful for fixing entries)",
+                options=tx_options,
+                help="Select one or more transactions to permanently delete"
+            )
         
-        if selected_to_delete:
-            if st.button("🗑️ Delete Selected", type="secondary", use_container_width=True):
-                ids_to_delete = []
-                for choice in selected_to_delete:
-                    parts = choice.split("(ID: ")
-                    if len(parts) > 1:
-                        ids_to_delete.append(parts[1].rstrip(")"))
+            if selected_to_delete:
+                if st.button("🗑️ Delete Selected", type="secondary", use_container_width=True):
+                    ids_to_delete = []
+                    for choice in selected_to_delete:
+                        parts = choice.split("(ID: ")
+                        if len(parts) > 1:
+                            ids_to_delete.append(parts[1].rstrip(")"))
                 
-                candidate_tradelog = [tx for tx in tradelog if tx["id"] not in ids_to_delete]
+                    candidate_tradelog = [tx for tx in tradelog if tx["id"] not in ids_to_delete]
                 
-                # Validate integrity of the resulting tradelog
-                is_valid, err_msg = validate_tradelog_integrity(candidate_tradelog)
-                if not is_valid:
-                    st.error(
-                        f"❌ Deletion rejected — removing these transaction(s) would cause "
-                        f"inconsistent holdings: {err_msg}. No transactions were deleted."
-                    )
-                else:
-                    save_tradelog(universe, candidate_tradelog)
+                    # Validate integrity of the resulting tradelog
+                    is_valid, err_msg = pb.validate_transactions(candidate_tradelog)
+                    if not is_valid:
+                        st.error(
+                            f"❌ Deletion rejected — removing these transaction(s) would cause "
+                            f"inconsistent holdings: {err_msg}. No transactions were deleted."
+                        )
+                    else:
+                        save_tradelog(universe, candidate_tradelog)
                     
-                    new_calc = calculate_holdings_and_pnl(candidate_tradelog, latest_prices)
-                    sync_to_positions_ledger(LEDGER_FILE, new_calc["active_holdings"])
+                        new_calc = pb.holdings_and_pnl(
+                            load_position_book(universe, candidate_tradelog), latest_prices)
+                        sync_to_positions_ledger(LEDGER_FILE, new_calc["active_holdings"])
                     
-                    st.success(f"Deleted {len(ids_to_delete)} transaction(s) and synchronized positions ledger!")
-                    st.rerun()
+                        st.success(f"Deleted {len(ids_to_delete)} transaction(s) and synchronized positions ledger!")
+                        st.rerun()
 
 # ── TAB 4: FULL RANKINGS ──────────────────────────────────────────────────────
-with tab_calcs:
-    st.markdown("## 📋 Full Universe Rankings")
-
-    fc1, fc2, fc3 = st.columns(3)
-    with fc1:
-        filter_elig = st.selectbox("Eligibility",
-                                    ["All", "Eligible only", "Disqualified only"])
-    with fc2:
-        top_n_show = st.slider("Show top N", 10, len(result),
-                                min(100, len(result)), 10)
-    with fc3:
-        sort_col = st.selectbox("Sort by",
-                                 ["RANK", "COMPOSITE", "RES_MOM", "PCT_FROM_52H", "REL_52H_DD"])
-
-    display_cols = ["RANK", "SERIES", "COMPOSITE", "SHARPE_3"]
-    for c in ["RES_MOM", "1M%", "3M%", "12M%", "PCT_FROM_52H", "REL_52H_DD", "BETA"]:
-        if c in result.columns: display_cols.append(c)
-
-    calcs_df = result[[c for c in display_cols if c in result.columns]].copy()
-    calcs_df.index.name = "TICKER"
-    calcs_df = calcs_df.reset_index()
-
-    if filter_elig == "Eligible only":
-        calcs_df = calcs_df[calcs_df["PCT_FROM_52H"] >= -25]
-    elif filter_elig == "Disqualified only":
-        calcs_df = calcs_df[calcs_df["PCT_FROM_52H"] < -25]
-
-    calcs_df = calcs_df.sort_values(
-        sort_col, ascending=(sort_col == "RANK"),
-        na_position="last").head(top_n_show)
-
-    fmt = {c: "{:.3f}" for c in calcs_df.columns
-           if c not in ["RANK", "TICKER", "SERIES"]}
-    fmt["PCT_FROM_52H"] = "{:.1f}"
-    fmt["REL_52H_DD"]   = "{:.1f}"
-    for c in ["1M%", "3M%", "12M%"]:
-        if c in fmt: fmt[c] = "{:.1f}"
-    if "BETA" in fmt: fmt["BETA"] = "{:.2f}"
-
-    def style_calcs(row):
-        if pd.notna(row.get("PCT_FROM_52H")) and row["PCT_FROM_52H"] < -25:
-            return ["background-color:#FFF8F8; color:#B0B0B0;"] * len(row)
-        if pd.notna(row.get("REL_52H_DD")) and row["REL_52H_DD"] < rel_dd_breach_threshold:
-            return ["background-color:#FCE8E6;"] * len(row)
-        try:
-            if pd.notna(row.get("RANK")) and int(row["RANK"]) <= dynamic_n:
-                return ["background-color:#E8F5E9;"] * len(row)
-        except (ValueError, TypeError): pass
-        return [""] * len(row)
-
-    st.dataframe(
-        calcs_df.style.apply(style_calcs, axis=1).format(fmt, na_rep="—"),
-        use_container_width=True, hide_index=True, height=600)
-
-    st.caption(
-        f"Universe: {len(stock_tickers)}  |  "
-        f"Eligible: {(result['PCT_FROM_52H'] >= -25).sum()}  |  "
-        f"Disqualified: {(result['PCT_FROM_52H'] < -25).sum()}  |  "
-        f"Rel_52H_DD < {rel_dd_breach_threshold:.0f}%: {(result['REL_52H_DD'] < rel_dd_breach_threshold).sum()}  |  "
-        f"Regime N (green rows): {dynamic_n}")
-
-# ── TAB 5: EARLY MOVERS ──────────────────────────────────────────────────────
-with tab_early:
-    st.markdown("## \U0001f4c8 Early Movers \u2014 Rising Score Candidates")
-    st.caption(
-        f"Tracks composite score across every price-file refresh. "
-        f"Surfaces **unowned** stocks whose score is consistently rising. "
-        f"Runs recorded: **{n_hist_runs}** / {MAX_HISTORY_RUNS}")
-
-    if _score_history_err:
-        st.error(f"⚠️ Score history error: `{_score_history_err}`")
-        st.stop()
-
+if tab_open(tab_calcs):
+    with tab_calcs:
+        st.markdown("## 📋 Full Universe Rankings")
 
-
-    if n_hist_runs < 3:
-        st.info(
-            f"\U0001f4c5 **{n_hist_runs} run(s) recorded so far.** "
-            "Score trend analysis requires at least **3 runs** with refreshed price data. "
-            "Come back after your next price-file refresh(es).")
-        st.markdown(
-            "**How it works:**\n"
-            f"- Every time you refresh `{selected_file}` and open this dashboard, "
-            "the composite score for every stock is saved automatically.\n"
-            "- After 3+ runs, this tab surfaces stocks whose score is rising consistently "
-            "\u2014 before they appear in your Top 25.\n"
-            "- Zones: \U0001f534 Near-Term (rank 26\u201350), "
-            "\U0001f7e1 Building (51\u2013100), "
-            "\u26a1 Fast Mover (top velocity, rank \u2264 200)")
-
-    elif rising_df.empty:
-        st.success("No rising unowned candidates at this time. Check back after the next refresh.")
-
-    else:
-        # ── Section A: Rising Candidates Table ────────────────────────────────
-        st.markdown("### \U0001f50d Rising Candidates")
-
-        # ── Filters ───────────────────────────────────────────────────────────
-        available_zones = sorted(rising_df["Zone"].dropna().unique().tolist())
-        fc1, fc2, fc3, fc4, fc5 = st.columns(5)
+        fc1, fc2, fc3 = st.columns(3)
         with fc1:
-            sel_zones = st.multiselect("Zone", options=available_zones,
-                                       default=[],
-                                       placeholder="All Zones",
-                                       key="early_filter_zone")
+            filter_elig = st.selectbox("Eligibility",
+                                        ["All", "Eligible only", "Disqualified only"])
         with fc2:
-            min_streak = st.number_input("Min Streak ↑", min_value=0, max_value=20,
-                                         value=0, step=1, key="early_filter_streak")
+            top_n_show = st.slider("Show top N", 10, len(result),
+                                    min(100, len(result)), 10)
         with fc3:
-            min_velocity = st.number_input("Min Velocity", min_value=0.0, max_value=1.0,
-                                           value=0.0, step=0.005, format="%.4f",
-                                           key="early_filter_velocity")
-        with fc4:
-            min_z3m_streak = st.number_input("Min Z3M Streak", min_value=0, max_value=20,
-                                             value=0, step=1, key="early_filter_z3m_streak")
-        with fc5:
-            min_z3m_vel = st.number_input("Min Z3M Vel", min_value=0.0, max_value=1.0,
-                                          value=0.0, step=0.005, format="%.4f",
-                                          key="early_filter_z3m_vel")
-
-        # Apply filters on raw numeric data before formatting
-        filtered_df = rising_df.copy()
-        if sel_zones:
-            filtered_df = filtered_df[filtered_df["Zone"].isin(sel_zones)]
-        if min_streak > 0:
-            filtered_df = filtered_df[filtered_df["Streak \u2191"] >= min_streak]
-        if min_velocity > 0:
-            filtered_df = filtered_df[filtered_df["Velocity"] >= min_velocity]
-        if min_z3m_streak > 0:
-            filtered_df = filtered_df[filtered_df["Z3M Streak"].fillna(0) >= min_z3m_streak]
-        if min_z3m_vel > 0:
-            filtered_df = filtered_df[filtered_df["Z3M Vel"].fillna(0) >= min_z3m_vel]
-
-        def _style_early(row):
-            streak = int(row["Streak \u2191"])
-            if streak >= 3: return ["background-color:#E8F5E9;"] * len(row)
-            if streak == 2: return ["background-color:#FFF8E1;"] * len(row)
-            return ["background-color:#FFFFFF;"] * len(row)
-
-        if filtered_df.empty:
-            st.info("No candidates match the current filters. Try relaxing the thresholds.")
-        else:
-            # Pre-format numerics as strings so Glide Data Grid left-aligns them
-            display_rising = filtered_df.copy()
-            display_rising["Rank"]      = display_rising["Rank"].apply(lambda x: str(int(x)) if pd.notna(x) else "\u2014")
-            display_rising["Score Now"] = display_rising["Score Now"].apply(lambda x: f"{x:.3f}" if pd.notna(x) else "\u2014")
-            display_rising["Score -1"]  = display_rising["Score -1"].apply(lambda x: f"{x:.3f}" if pd.notna(x) else "\u2014")
-            display_rising["Score -2"]  = display_rising["Score -2"].apply(lambda x: f"{x:.3f}" if pd.notna(x) else "\u2014")
-            display_rising["Velocity"]  = display_rising["Velocity"].apply(lambda x: f"{x:+.4f}" if pd.notna(x) else "\u2014")
-            display_rising["Streak \u2191"]  = display_rising["Streak \u2191"].apply(lambda x: str(int(x)) if pd.notna(x) else "\u2014")
-            display_rising["Z3M Vel"]   = display_rising["Z3M Vel"].apply(lambda x: f"{x:+.4f}" if pd.notna(x) else "\u2014")
-            display_rising["Z3M Streak"] = display_rising["Z3M Streak"].apply(lambda x: str(int(x)) if pd.notna(x) else "\u2014")
-
-            st.dataframe(
-                display_rising.style.apply(_style_early, axis=1),
-                use_container_width=True, hide_index=True,
-                height=min(800, (len(display_rising) + 2) * 36))
+            sort_col = st.selectbox("Sort by",
+                                     ["RANK", "COMPOSITE", "RES_MOM", "PCT_FROM_52H", "REL_52H_DD"])
+
+        calcs_df, calcs_css = calcs_table(result_key, result, filter_elig, sort_col, top_n_show,
+                                          rel_dd_breach_threshold, dynamic_n)
+
+        fmt = {c: "{:.3f}" for c in calcs_df.columns
+               if c not in ["RANK", "TICKER", "SERIES"]}
+        fmt["PCT_FROM_52H"] = "{:.1f}"
+        fmt["REL_52H_DD"]   = "{:.1f}"
+        for c in ["1M%", "3M%", "12M%"]:
+            if c in fmt: fmt[c] = "{:.1f}"
+        if "BETA" in fmt: fmt["BETA"] = "{:.2f}"
+
+        page_df = paginate(calcs_df, key="calcs_page")
+        page_css = calcs_css[calcs_df.index.get_indexer(page_df.index)]
+        st.dataframe(
+            row_styles(page_df, page_css).format(fmt, na_rep="—"),
+            use_container_width=True, hide_index=True, height=600)
 
+        st.caption(
+            f"Universe: {len(stock_tickers)}  |  "
+            f"Eligible: {(result['PCT_FROM_52H'] >= -25).sum()}  |  "
+            f"Disqualified: {(result['PCT_FROM_52H'] < -25).sum()}  |  "
+            f"Rel_52H_DD < {rel_dd_breach_threshold:.0f}%: {(result['REL_52H_DD'] < rel_dd_breach_threshold).sum()}  |  "
+            f"Regime N (green rows): {dynamic_n}")
 
+# ── TAB 5: EARLY MOVERS ──────────────────────────────────────────────────────
+if tab_open(tab_early):
+    with tab_early:
+        st.markdown("## \U0001f4c8 Early Movers \u2014 Rising Score Candidates")
         st.caption(
-            "\U0001f7e2 Green = 3+ consecutive rising runs  |  "
-            "\U0001f7e1 Yellow = 2 runs  |  "
-            "White = 1 run  |  "
-            "Velocity = composite score slope (last 5 runs)  |  "
-            "Z3M Vel = 3-month Z-score slope (early signal)")
+            f"Tracks composite score across every price-file refresh. "
+            f"Surfaces **unowned** stocks whose score is consistently rising. "
+            f"Runs recorded: **{n_hist_runs}** / {MAX_HISTORY_RUNS}")
 
-        st.divider()
+        rising_df = pd.DataFrame()
+        if not _score_history_err:
+            try:
+                rising_df, _ = cached_rising_candidates(
+                    result_key, _score_runs, sorted(held_tickers_global),
+                    score_history, result, early_signals)
+            except Exception as _eh:
+                _score_history_err = str(_eh)
+
+        if _score_history_err:
+            st.error(f"⚠️ Score history error: `{_score_history_err}`")
+            st.stop()
+
+        if n_hist_runs < 3:
+            st.info(
+                f"\U0001f4c5 **{n_hist_runs} run(s) recorded so far.** "
+                "Score trend analysis requires at least **3 runs** with refreshed price data. "
+                "Come back after your next price-file refresh(es).")
+            st.markdown(
+                "**How it works:**\n"
+                f"- Every time you refresh `{selected_file}` and open this dashboard, "
+                "the composite score for every stock is saved automatically.\n"
+                "- After 3+ runs, this tab surfaces stocks whose score is rising consistently "
+                "\u2014 before they appear in your Top 25.\n"
+                "- Zones: \U0001f534 Near-Term (rank 26\u201350), "
+                "\U0001f7e1 Building (51\u2013100), "
+                "\u26a1 Fast Mover (top velocity, rank \u2264 200)")
+
+        elif rising_df.empty:
+            st.success("No rising unowned candidates at this time. Check back after the next refresh.")
 
-        # ── Section B: Score Trend Chart ──────────────────────────────────────
-        st.markdown("### \U0001f4c9 Score Trend Chart")
-
-        all_tracked = sorted({t for entry in score_history for t in entry["scores"]})
-        sel_ticker  = st.selectbox(
-            "Select a stock to view its score history",
-            options=["-- Select --"] + all_tracked,
-            key="early_mover_ticker_select")
-
-        if sel_ticker and sel_ticker != "-- Select --":
-            trend_rows = [
-                {"Run Date": e["run_date"],
-                 "Score":    e["scores"].get(sel_ticker, np.nan)}
-                for e in score_history]
-            trend_df = pd.DataFrame(trend_rows).set_index("Run Date")
-
-            max_show = len(trend_df)
-            if max_show > 3:
-                n_show = st.slider(
-                    "Runs to display", min_value=3, max_value=max_show,
-                    value=min(20, max_show), step=1,
-                    key="early_mover_history_slider")
+        else:
+            # ── Section A: Rising Candidates Table ────────────────────────────────
+            st.markdown("### \U0001f50d Rising Candidates")
+
+            # ── Filters ───────────────────────────────────────────────────────────
+            available_zones = sorted(rising_df["Zone"].dropna().unique().tolist())
+            fc1, fc2, fc3, fc4, fc5 = st.columns(5)
+            with fc1:
+                sel_zones = st.multiselect("Zone", options=available_zones,
+                                           default=[],
+                                           placeholder="All Zones",
+                                           key="early_filter_zone")
+            with fc2:
+                min_streak = st.number_input("Min Streak ↑", min_value=0, max_value=20,
+                                             value=0, step=1, key="early_filter_streak")
+            with fc3:
+                min_velocity = st.number_input("Min Velocity", min_value=0.0, max_value=1.0,
+                                               value=0.0, step=0.005, format="%.4f",
+                                               key="early_filter_velocity")
+            with fc4:
+                min_z3m_streak = st.number_input("Min Z3M Streak", min_value=0, max_value=20,
+                                                 value=0, step=1, key="early_filter_z3m_streak")
+            with fc5:
+                min_z3m_vel = st.number_input("Min Z3M Vel", min_value=0.0, max_value=1.0,
+                                              value=0.0, step=0.005, format="%.4f",
+                                              key="early_filter_z3m_vel")
+
+            # Apply filters on raw numeric data before formatting
+            filtered_df = rising_df.copy()
+            if sel_zones:
+                filtered_df = filtered_df[filtered_df["Zone"].isin(sel_zones)]
+            if min_streak > 0:
+                filtered_df = filtered_df[filtered_df["Streak \u2191"] >= min_streak]
+            if min_velocity > 0:
+                filtered_df = filtered_df[filtered_df["Velocity"] >= min_velocity]
+            if min_z3m_streak > 0:
+                filtered_df = filtered_df[filtered_df["Z3M Streak"].fillna(0) >= min_z3m_streak]
+            if min_z3m_vel > 0:
+                filtered_df = filtered_df[filtered_df["Z3M Vel"].fillna(0) >= min_z3m_vel]
+
+            if filtered_df.empty:
+                st.info("No candidates match the current filters. Try relaxing the thresholds.")
             else:
-                n_show = max_show
-                st.caption(f"Showing all {max_show} recorded runs. Slider appears once you have more than 3 runs.")
-            trend_df = trend_df.tail(n_show)
+                display_rising = paginate(filtered_df, key="early_page").copy()
+                streak = display_rising["Streak \u2191"].to_numpy(dtype=int)
+                early_css = np.select([streak >= 3, streak == 2],
+                                      ["background-color:#E8F5E9;", "background-color:#FFF8E1;"],
+                                      default="background-color:#FFFFFF;")
+                # Pre-format numerics as strings so Glide Data Grid left-aligns them
+                display_rising["Rank"]      = display_rising["Rank"].apply(lambda x: str(int(x)) if pd.notna(x) else "\u2014")
+                display_rising["Score Now"] = display_rising["Score Now"].apply(lambda x: f"{x:.3f}" if pd.notna(x) else "\u2014")
+                display_rising["Score -1"]  = display_rising["Score -1"].apply(lambda x: f"{x:.3f}" if pd.notna(x) else "\u2014")
+                display_rising["Score -2"]  = display_rising["Score -2"].apply(lambda x: f"{x:.3f}" if pd.notna(x) else "\u2014")
+                display_rising["Velocity"]  = display_rising["Velocity"].apply(lambda x: f"{x:+.4f}" if pd.notna(x) else "\u2014")
+                display_rising["Streak \u2191"]  = display_rising["Streak \u2191"].apply(lambda x: str(int(x)) if pd.notna(x) else "\u2014")
+                display_rising["Z3M Vel"]   = display_rising["Z3M Vel"].apply(lambda x: f"{x:+.4f}" if pd.notna(x) else "\u2014")
+                display_rising["Z3M Streak"] = display_rising["Z3M Streak"].apply(lambda x: str(int(x)) if pd.notna(x) else "\u2014")
+
+                st.dataframe(
+                    row_styles(display_rising, early_css),
+                    use_container_width=True, hide_index=True,
+                    height=min(800, (len(display_rising) + 2) * 36))
+
+
+            st.caption(
+                "\U0001f7e2 Green = 3+ consecutive rising runs  |  "
+                "\U0001f7e1 Yellow = 2 runs  |  "
+                "White = 1 run  |  "
+                "Velocity = composite score slope (last 5 runs)  |  "
+                "Z3M Vel = 3-month Z-score slope (early signal)")
+
+            st.divider()
 
+            # ── Section B: Score Trend Chart ──────────────────────────────────────
+            st.markdown("### \U0001f4c9 Score Trend Chart")
+
+            _tracked    = ~np.isnan(score_history["scores"]).all(axis=0)
+            all_tracked = sorted(t for t, ok in zip(score_history["tickers"], _tracked) if ok)
+            sel_ticker  = st.selectbox(
+                "Select a stock to view its score history",
+                options=["-- Select --"] + all_tracked,
+                key="early_mover_ticker_select")
+
+            if sel_ticker and sel_ticker != "-- Select --":
+                col      = score_history["tickers"].index(sel_ticker)
+                trend_df = pd.DataFrame(
+                    {"Score": score_history["scores"][:, col].astype(float)},
+                    index=pd.Index(score_history["run_dates"], name="Run Date"))
+
+                max_show = len(trend_df)
+                if max_show > 3:
+                    n_show = st.slider(
+                        "Runs to display", min_value=3, max_value=max_show,
+                        value=min(20, max_show), step=1,
+                        key="early_mover_history_slider")
+                else:
+                    n_show = max_show
+                    st.caption(f"Showing all {max_show} recorded runs. Slider appears once you have more than 3 runs.")
+                trend_df = trend_df.tail(n_show)
 
-            # Entry threshold = 25th percentile score of current Top 25
-            top25_scores    = result.head(25)["COMPOSITE"].dropna()
-            entry_threshold = float(top25_scores.quantile(0.25)) if not top25_scores.empty else None
-            if entry_threshold:
-                trend_df["Entry Threshold (Top 25 floor)"] = entry_threshold
 
-            st.line_chart(trend_df, height=320)
+                # Entry threshold = 25th percentile score of current Top 25
+                top25_scores    = result.head(25)["COMPOSITE"].dropna()
+                entry_threshold = float(top25_scores.quantile(0.25)) if not top25_scores.empty else None
+                if entry_threshold:
+                    trend_df["Entry Threshold (Top 25 floor)"] = entry_threshold
 
-            curr_rank  = result.loc[sel_ticker, "RANK"]      if sel_ticker in result.index else None
-            curr_score = result.loc[sel_ticker, "COMPOSITE"] if sel_ticker in result.index else None
+                st.line_chart(trend_df, height=320)
 
-            mc1, mc2, mc3 = st.columns(3)
-            with mc1: st.metric("Current Rank",  f"#{int(curr_rank)}" if curr_rank and pd.notna(curr_rank) else "\u2014")
-            with mc2: st.metric("Current Score", f"{curr_score:.3f}" if curr_score and pd.notna(curr_score) else "\u2014")
-            with mc3: st.metric("Top 25 Floor",  f"{entry_threshold:.3f}" if entry_threshold else "\u2014")
+                curr_rank  = result.loc[sel_ticker, "RANK"]      if sel_ticker in result.index else None
+                curr_score = result.loc[sel_ticker, "COMPOSITE"] if sel_ticker in result.index else None
 
-            if entry_threshold and curr_score and pd.notna(curr_score):
-                gap = entry_threshold - float(curr_score)
-                if gap > 0:
-                    st.caption(f"\U0001f4cf Gap to Top 25 entry floor: **{gap:.3f}** score points")
-                else:
-                    st.success(f"\u2705 **{sel_ticker}** is already above the Top 25 entry floor!")
+                mc1, mc2, mc3 = st.columns(3)
+                with mc1: st.metric("Current Rank",  f"#{int(curr_rank)}" if curr_rank and pd.notna(curr_rank) else "\u2014")
+                with mc2: st.metric("Current Score", f"{curr_score:.3f}" if curr_score and pd.notna(curr_score) else "\u2014")
+                with mc3: st.metric("Top 25 Floor",  f"{entry_threshold:.3f}" if entry_threshold else "\u2014")
+
+                if entry_threshold and curr_score and pd.notna(curr_score):
+                    gap = entry_threshold - float(curr_score)
+                    if gap > 0:
+                        st.caption(f"\U0001f4cf Gap to Top 25 entry floor: **{gap:.3f}** score points")
+                    else:
+                        st.success(f"\u2705 **{sel_ticker}** is already above the Top 25 entry floor!")
 
 # ── TAB 6: CONFIGURATION ─────────────────────────────────────────────────────
-with tab_config:
-    st.markdown("## ⚙️ Configuration")
-
-    st.markdown("#### 📁 Data Source")
-    st.selectbox("Input File", _cfg_files, key="cfg_file")
-
-    st.divider()
-    st.markdown("#### 💰 Capital & Sizing")
-    st.number_input("Portfolio Capital (INR)", min_value=100_000,
-                    step=100_000, format="%d", key="cfg_capital")
-
-    pc1, pc2 = st.columns(2)
-    with pc1:
-        st.number_input("Min Positions", min_value=3, max_value=10,
-                        step=1, format="%d", key="cfg_min_n")
-    with pc2:
-        st.number_input("Max Positions", min_value=15, max_value=30,
-                        step=1, format="%d", key="cfg_max_n")
-
-    st.markdown(f"**Rs {max_position_size_inr:,.0f}**  Max Position Size (INR) "
-                f"*({max_wt_pct:.1f}% of capital)*")
-    st.caption("Auto-computed as Portfolio Capital ÷ Max Positions. This is the hard "
-               "cap on capital allocated to any single position — used by both the "
-               "dashboard's position sizing and Sharpe.py.")
-
-    st.divider()
-    st.markdown("#### 📊 ADTV Liquidity Filter")
-    st.number_input("Min Median Daily Turnover (₹ Cr)",
-                    min_value=0.0, max_value=10.0, step=0.25, format="%.2f",
-                    key="cfg_min_turnover",
-                    help="Stocks must have median daily turnover (price × volume) "
-                         "above this threshold in EITHER the 12M or 6M window to be eligible. "
-                         "Set to 0 to disable.")
-
-    if volume_df is not None:
-        _n_pass_12m = int((result.get("TURNOVER_12M", pd.Series(dtype=float)) >= min_turnover_cr).sum())
-        _n_pass_6m  = int((result.get("TURNOVER_6M",  pd.Series(dtype=float)) >= min_turnover_cr).sum())
-        _n_total    = len(result)
-        st.caption(f"✅ Volume data available | 12M pass: {_n_pass_12m}/{_n_total} | "
-                   f"6M pass: {_n_pass_6m}/{_n_total}")
-    else:
-        st.caption("⚠️ No VOLUME sheet in data file — ADTV filter inactive. "
-                   "Run `update_stock_price.py` with latest version to add volume data.")
+if tab_open(tab_config):
+    with tab_config:
+        st.markdown("## ⚙️ Configuration")
 
-    st.divider()
-    st.markdown("#### 🚦 Universe Eligibility Filters")
+        st.markdown("#### 📁 Data Source")
+        st.selectbox("Input File", _cfg_files, key="cfg_file")
 
-    st.toggle("Restrict to Series EQ only",
-              key="cfg_eq_series_filter",
-              help="When enabled, only stocks in the NSE 'EQ' (rolling settlement) series are "
-                   "included in rankings. Non-EQ series stocks (e.g. BE / Trade-for-Trade) are "
-                   "excluded. Stocks not found in Price_Band_List.csv default to EQ.")
+        st.divider()
+        st.markdown("#### 💰 Capital & Sizing")
+        st.number_input("Portfolio Capital (INR)", min_value=100_000,
+                        step=100_000, format="%d", key="cfg_capital")
+
+        pc1, pc2 = st.columns(2)
+        with pc1:
+            st.number_input("Min Positions", min_value=3, max_value=10,
+                            step=1, format="%d", key="cfg_min_n")
+        with pc2:
+            st.number_input("Max Positions", min_value=15, max_value=30,
+                            step=1, format="%d", key="cfg_max_n")
+
+        st.markdown(f"**Rs {max_position_size_inr:,.0f}**  Max Position Size (INR) "
+                    f"*({max_wt_pct:.1f}% of capital)*")
+        st.caption("Auto-computed as Portfolio Capital ÷ Max Positions. This is the hard "
+                   "cap on capital allocated to any single position — used by both the "
+                   "dashboard's position sizing and Sharpe.py.")
+
+        st.divider()
+        st.markdown("#### 📊 ADTV Liquidity Filter")
+        st.number_input("Min Median Daily Turnover (₹ Cr)",
+                        min_value=0.0, max_value=10.0, step=0.25, format="%.2f",
+                        key="cfg_min_turnover",
+                        help="Stocks must have median daily turnover (price × volume) "
+                             "above this threshold in EITHER the 12M or 6M window to be eligible. "
+                             "Set to 0 to disable.")
+
+        if volume_df is not None:
+            _n_pass_12m = int((result.get("TURNOVER_12M", pd.Series(dtype=float)) >= min_turnover_cr).sum())
+            _n_pass_6m  = int((result.get("TURNOVER_6M",  pd.Series(dtype=float)) >= min_turnover_cr).sum())
+            _n_total    = len(result)
+            st.caption(f"✅ Volume data available | 12M pass: {_n_pass_12m}/{_n_total} | "
+                       f"6M pass: {_n_pass_6m}/{_n_total}")
+        else:
+            st.caption("⚠️ No VOLUME sheet in data file — ADTV filter inactive. "
+                       "Run `update_stock_price.py` with latest version to add volume data.")
 
-    st.toggle("Circuit Hit Frequency Filter",
-              key="cfg_circuit_filter_enabled",
-              help="When enabled, stocks that close at their upper or lower circuit limit too "
-                   "frequently are excluded from rankings. Uses Price_Band_List.csv for band limits.")
+        st.divider()
+        st.markdown("#### 🚦 Universe Eligibility Filters")
+
+        st.toggle("Restrict to Series EQ only",
+                  key="cfg_eq_series_filter",
+                  help="When enabled, only stocks in the NSE 'EQ' (rolling settlement) series are "
+                       "included in rankings. Non-EQ series stocks (e.g. BE / Trade-for-Trade) are "
+                       "excluded. Stocks not found in Price_Band_List.csv default to EQ.")
+
+        st.toggle("Circuit Hit Frequency Filter",
+                  key="cfg_circuit_filter_enabled",
+                  help="When enabled, stocks that close at their upper or lower circuit limit too "
+                       "frequently are excluded from rankings. Uses Price_Band_List.csv for band limits.")
+
+        if st.session_state.cfg_circuit_filter_enabled:
+            st.number_input(
+                "Max Circuit Hit Days (in 252 trading days)",
+                min_value=5, max_value=100, step=5, format="%d",
+                key="cfg_circuit_threshold",
+                help="Stocks that closed at their upper or lower circuit limit on >= this many days "
+                     "in the past 252 trading days will be excluded from rankings. Default: 20.")
+            # Show how many stocks currently exceed the threshold
+            band_csv_path = SCRIPT_DIR / "Price_Band_List.csv"
+            if band_csv_path.exists():
+                try:
+                    _c_df = ml.compute_circuit_hits(
+                        prices_df, stock_tickers, str(band_csv_path), lookback_period=252)
+                    _n_excluded = int((_c_df["TOTAL_CIRCUIT_HITS"] >= circuit_threshold).sum())
+                    st.caption(f"ℹ️ {_n_excluded} stocks currently exceed the {circuit_threshold}-day "
+                               f"threshold and will be excluded from rankings.")
+                except Exception:
+                    pass
 
-    if st.session_state.cfg_circuit_filter_enabled:
+        st.divider()
+        st.markdown("#### 📉 Relative 52H Drawdown Exit")
+        st.caption("Additive Spread Approach: Rel_52H_DD = Stock's % distance from its 52W high "
+                   "minus the benchmark's % distance from its 52W high. A held stock whose "
+                   "Rel_52H_DD falls below the threshold below is flagged REL_DD_BREACH in the "
+                   "Actions Monitor (respects the 28-day hold lock).")
         st.number_input(
-            "Max Circuit Hit Days (in 252 trading days)",
-            min_value=5, max_value=100, step=5, format="%d",
-            key="cfg_circuit_threshold",
-            help="Stocks that closed at their upper or lower circuit limit on >= this many days "
-                 "in the past 252 trading days will be excluded from rankings. Default: 20.")
-        # Show how many stocks currently exceed the threshold
-        band_csv_path = SCRIPT_DIR / "Price_Band_List.csv"
-        if band_csv_path.exists():
-            try:
-                _c_df = ml.compute_circuit_hits(
-                    prices_df, stock_tickers, str(band_csv_path), lookback_period=252)
-                _n_excluded = int((_c_df["TOTAL_CIRCUIT_HITS"] >= circuit_threshold).sum())
-                st.caption(f"ℹ️ {_n_excluded} stocks currently exceed the {circuit_threshold}-day "
-                           f"threshold and will be excluded from rankings.")
-            except Exception:
-                pass
+            "Rel_52H_DD Breach Threshold (%)",
+            min_value=-50, max_value=0, step=1, format="%d",
+            key="cfg_rel_dd_breach_threshold",
+            help="A held stock is flagged REL_DD_BREACH when its Rel_52H_DD (stock's 52H-high "
+                 "distance minus benchmark's) falls below this value. Default: -20.")
 
-    st.divider()
-    st.markdown("#### 📉 Relative 52H Drawdown Exit")
-    st.caption("Additive Spread Approach: Rel_52H_DD = Stock's % distance from its 52W high "
-               "minus the benchmark's % distance from its 52W high. A held stock whose "
-               "Rel_52H_DD falls below the threshold below is flagged REL_DD_BREACH in the "
-               "Actions Monitor (respects the 28-day hold lock).")
-    st.number_input(
-        "Rel_52H_DD Breach Threshold (%)",
-        min_value=-50, max_value=0, step=1, format="%d",
-        key="cfg_rel_dd_breach_threshold",
-        help="A held stock is flagged REL_DD_BREACH when its Rel_52H_DD (stock's 52H-high "
-             "distance minus benchmark's) falls below this value. Default: -20.")
-
-    st.divider()
-    st.markdown("#### 📋 Strategy Parameters (Read-only)")
-
-    for k, v in params.items():
-        st.markdown(f"**{k}:** `{v}`")
-
-    st.divider()
-    st.markdown("#### 💾 Persist Configuration")
-    st.caption("Save current settings to `dashboard_config.json` so they persist across "
-               "browser refreshes and server restarts. Sharpe.py will also use these settings.")
-
-    _save_cols = st.columns([1, 3])
-    with _save_cols[0]:
-        if st.button("💾 Save Configuration", type="primary", use_container_width=True):
-            _current_cfg = {
-                "file":                   st.session_state.cfg_file,
-                "capital":                st.session_state.cfg_capital,
-                "min_n":                  int(st.session_state.cfg_min_n),
-                "max_n":                  int(st.session_state.cfg_max_n),
-                "min_turnover":           float(st.session_state.cfg_min_turnover),
-                "eq_series_filter":       st.session_state.cfg_eq_series_filter,
-                "circuit_filter_enabled": st.session_state.cfg_circuit_filter_enabled,
-                "circuit_threshold":      int(st.session_state.cfg_circuit_threshold),
-                "rel_dd_breach_threshold": int(st.session_state.cfg_rel_dd_breach_threshold),
-            }
-            try:
-                _saved_path = ml.save_config(_current_cfg, str(SCRIPT_DIR))
-                st.success(f"✅ Configuration saved to `{_saved_path.name}`")
-            except Exception as _e:
-                st.error(f"❌ Failed to save: {_e}")
-    with _save_cols[1]:
-        _cfg_path = SCRIPT_DIR / ml.CONFIG_FILENAME
-        if _cfg_path.exists():
-            _mod_time = datetime.datetime.fromtimestamp(_cfg_path.stat().st_mtime)
-            st.caption(f"📄 Last saved: {_mod_time.strftime('%d-%b-%Y %H:%M')}  •  "
-                       f"Path: `{_cfg_path.name}`")
-        else:
-            st.caption("⚠️ No saved config found — using defaults. Click Save to persist.")
+        st.divider()
+        st.markdown("#### 📋 Strategy Parameters (Read-only)")
 
-    st.divider()
-    st.caption("Sharpe Momentum Strategy v3.0 — Dynamic Regime")
-    st.info("Changes to settings take effect immediately on the next rerun. "
-            "Click **Save Configuration** to persist them across sessions and share with Sharpe.py.")
+        for k, v in params.items():
+            st.markdown(f"**{k}:** `{v}`")
 
-# ── TAB 7: PERFORMANCE TRACKER ────────────────────────────────────────────────
-with tab_perf:
-    st.markdown("## 📈 Performance Tracker")
-    _eq_file = SCRIPT_DIR / f"{universe}_equity_history.json"
-    if _eq_file.exists():
-        with open(_eq_file, "r") as _f:
-            _eq_data = json.load(_f)
-    else:
-        _eq_data = []
-
-    if len(_eq_data) >= 2:
-        _eq_df = pd.DataFrame(_eq_data)
-        _eq_df["date"] = pd.to_datetime(_eq_df["date"]).dt.normalize()
-        _eq_df = _eq_df.sort_values("date").reset_index(drop=True)
-
-        # Summary metrics
-        _port_nav = _eq_df["portfolio_nav"].iloc[-1]
-        _bench_nav = _eq_df["benchmark_nav"].iloc[-1]
-        _port_ret_total = (_port_nav / 100.0 - 1.0) * 100
-        _bench_ret_total = (_bench_nav / 100.0 - 1.0) * 100
-        _alpha = _port_ret_total - _bench_ret_total
-        _n_days = len(_eq_df)
-
-        # Max Drawdown
-        _eq_df["port_peak"] = _eq_df["portfolio_nav"].cummax()
-        _eq_df["port_dd"] = (_eq_df["portfolio_nav"] / _eq_df["port_peak"] - 1.0) * 100
-        _max_dd = _eq_df["port_dd"].min()
-
-        _eq_df["bench_peak"] = _eq_df["benchmark_nav"].cummax()
-        _eq_df["bench_dd"] = (_eq_df["benchmark_nav"] / _eq_df["bench_peak"] - 1.0) * 100
-        _bench_max_dd = _eq_df["bench_dd"].min()
-
-        # Tracking days
-        _start_date = _eq_df["date"].iloc[0].strftime("%d-%b-%Y")
-        _end_date = _eq_df["date"].iloc[-1].strftime("%d-%b-%Y")
-
-        # Metric cards
-        pm1, pm2, pm3, pm4 = st.columns(4)
-        with pm1:
-            _port_color = "#2E7D32" if _port_ret_total >= 0 else "#C62828"
-            st.markdown(
-                f"<div style='background-color:#F0F2F6; border-radius:8px; padding:14px 16px;'>"
-                f"<p style='font-size:14px; color:#6B7A8D; margin:0 0 4px 0;'>Portfolio NAV</p>"
-                f"<p style='font-size:24px; font-weight:700; margin:0; color:{_port_color};'>"
-                f"{_port_nav:.2f} <span style='font-size:14px;'>({_port_ret_total:+.2f}%)</span></p>"
-                f"</div>", unsafe_allow_html=True)
-        with pm2:
-            _bench_color = "#2E7D32" if _bench_ret_total >= 0 else "#C62828"
-            st.markdown(
-                f"<div style='background-color:#F0F2F6; border-radius:8px; padding:14px 16px;'>"
-                f"<p style='font-size:14px; color:#6B7A8D; margin:0 0 4px 0;'>Benchmark NAV</p>"
-                f"<p style='font-size:24px; font-weight:700; margin:0; color:{_bench_color};'>"
-                f"{_bench_nav:.2f} <span style='font-size:14px;'>({_bench_ret_total:+.2f}%)</span></p>"
-                f"</div>", unsafe_allow_html=True)
-        with pm3:
-            _alpha_color = "#2E7D32" if _alpha >= 0 else "#C62828"
-            st.markdown(
-                f"<div style='background-color:#F0F2F6; border-radius:8px; padding:14px 16px;'>"
-                f"<p style='font-size:14px; color:#6B7A8D; margin:0 0 4px 0;'>Alpha</p>"
-                f"<p style='font-size:24px; font-weight:700; margin:0; color:{_alpha_color};'>"
-                f"{_alpha:+.2f}%</p>"
-                f"</div>", unsafe_allow_html=True)
-        with pm4:
-            st.markdown(
-                f"<div style='background-color:#F0F2F6; border-radius:8px; padding:14px 16px;'>"
-                f"<p style='font-size:14px; color:#6B7A8D; margin:0 0 4px 0;'>Max Drawdown</p>"
-                f"<p style='font-size:24px; font-weight:700; margin:0; color:#C62828;'>"
-                f"Port: {_max_dd:.2f}% | Bench: {_bench_max_dd:.2f}%</p>"
-                f"</div>", unsafe_allow_html=True)
-
-        st.markdown("")
-
-        # Equity Curve Chart
-        _chart_df = _eq_df[["date", "portfolio_nav", "benchmark_nav"]].copy()
-        _chart_df["date"] = _chart_df["date"].dt.strftime("%d-%b-%Y")
-        _chart_df = _chart_df.rename(columns={
-            "portfolio_nav": "Portfolio",
-            "benchmark_nav": "Benchmark (NIFTY 500)"
-        })
-        _chart_df = _chart_df.set_index("date")
-        st.line_chart(_chart_df, height=400, use_container_width=True)
+        st.divider()
+        st.markdown("#### 💾 Persist Configuration")
+        st.caption("Save current settings to `dashboard_config.json` so they persist across "
+                   "browser refreshes and server restarts. Sharpe.py will also use these settings.")
+
+        _save_cols = st.columns([1, 3])
+        with _save_cols[0]:
+            if st.button("💾 Save Configuration", type="primary", use_container_width=True):
+                _current_cfg = {
+                    "file":                   st.session_state.cfg_file,
+                    "capital":                st.session_state.cfg_capital,
+                    "min_n":                  int(st.session_state.cfg_min_n),
+                    "max_n":                  int(st.session_state.cfg_max_n),
+                    "min_turnover":           float(st.session_state.cfg_min_turnover),
+                    "eq_series_filter":       st.session_state.cfg_eq_series_filter,
+                    "circuit_filter_enabled": st.session_state.cfg_circuit_filter_enabled,
+                    "circuit_threshold":      int(st.session_state.cfg_circuit_threshold),
+                    "rel_dd_breach_threshold": int(st.session_state.cfg_rel_dd_breach_threshold),
+                }
+                try:
+                    _saved_path = ml.save_config(_current_cfg, str(SCRIPT_DIR))
+                    st.success(f"✅ Configuration saved to `{_saved_path.name}`")
+                except Exception as _e:
+                    st.error(f"❌ Failed to save: {_e}")
+        with _save_cols[1]:
+            _cfg_path = SCRIPT_DIR / ml.CONFIG_FILENAME
+            if _cfg_path.exists():
+                _mod_time = datetime.datetime.fromtimestamp(_cfg_path.stat().st_mtime)
+                st.caption(f"📄 Last saved: {_mod_time.strftime('%d-%b-%Y %H:%M')}  •  "
+                           f"Path: `{_cfg_path.name}`")
+            else:
+                st.caption("⚠️ No saved config found — using defaults. Click Save to persist.")
 
-        st.caption(
-            f"📊 Tracking since {_start_date}  |  {_n_days} day(s) recorded  |  "
-            f"Latest: {_end_date}  |  "
-            f"Portfolio includes cash drag (uninvested portion earns 6% p.a.)")
-
-        # Daily Details Table (collapsible)
-        with st.expander("📋 Daily NAV Details", expanded=False):
-            _detail_df = _eq_df[["date", "portfolio_nav", "benchmark_nav",
-                                 "portfolio_ret", "benchmark_ret",
-                                 "n_held", "invested_frac"]].copy()
-            _detail_df["date"] = _detail_df["date"].dt.strftime("%d-%b-%Y")
-            _detail_df["portfolio_ret"] = (_detail_df["portfolio_ret"] * 100).round(3)
-            _detail_df["benchmark_ret"] = (_detail_df["benchmark_ret"] * 100).round(3)
-            _detail_df["invested_frac"] = (_detail_df["invested_frac"] * 100).round(1)
-            _detail_df.columns = ["Date", "Port NAV", "Bench NAV",
-                                  "Port Ret %", "Bench Ret %",
-                                  "# Held", "Invested %"]
-            st.dataframe(_detail_df, use_container_width=True, hide_index=True)
-
-    elif len(_eq_data) == 1:
-        st.info(
-            f"📅 Tracking started on {_eq_data[0]['date']}. "
-            f"The equity curve chart will appear after 2+ days of data. "
-            f"Run `Sharpe.py` again tomorrow!")
-    else:
-        st.warning(
-            "⚠️ No equity history found. Run `Sharpe.py` once to initialise "
-            "the performance tracker. The system will start recording daily NAVs "
-            "from that point forward.")
+        st.divider()
+        st.caption("Sharpe Momentum Strategy v3.0 — Dynamic Regime")
+        st.info("Changes to settings take effect immediately on the next rerun. "
+                "Click **Save Configuration** to persist them across sessions and share with Sharpe.py.")
+
+# ── TAB 7: PERFORMANCE TRACKER ────────────────────────────────────────────────
+if tab_open(tab_perf):
+    with tab_perf:
+        st.markdown("## 📈 Performance Tracker")
+        _eq_data = hj.read_records(hj.ensure_journal(SCRIPT_DIR / f"{universe}_equity_history.json"))
+
+        if len(_eq_data) >= 2:
+            _eq_df = pd.DataFrame(_eq_data)
+            _eq_df["date"] = pd.to_datetime(_eq_df["date"]).dt.normalize()
+            _eq_df = _eq_df.sort_values("date").reset_index(drop=True)
+
+            # Summary metrics
+            _port_nav = _eq_df["portfolio_nav"].iloc[-1]
+            _bench_nav = _eq_df["benchmark_nav"].iloc[-1]
+            _port_ret_total = (_port_nav / 100.0 - 1.0) * 100
+            _bench_ret_total = (_bench_nav / 100.0 - 1.0) * 100
+            _alpha = _port_ret_total - _bench_ret_total
+            _n_days = len(_eq_df)
+
+            # Max Drawdown
+            _eq_df["port_peak"] = _eq_df["portfolio_nav"].cummax()
+            _eq_df["port_dd"] = (_eq_df["portfolio_nav"] / _eq_df["port_peak"] - 1.0) * 100
+            _max_dd = _eq_df["port_dd"].min()
+
+            _eq_df["bench_peak"] = _eq_df["benchmark_nav"].cummax()
+            _eq_df["bench_dd"] = (_eq_df["benchmark_nav"] / _eq_df["bench_peak"] - 1.0) * 100
+            _bench_max_dd = _eq_df["bench_dd"].min()
+
+            # Tracking days
+            _start_date = _eq_df["date"].iloc[0].strftime("%d-%b-%Y")
+            _end_date = _eq_df["date"].iloc[-1].strftime("%d-%b-%Y")
+
+            # Metric cards
+            pm1, pm2, pm3, pm4 = st.columns(4)
+            with pm1:
+                _port_color = "#2E7D32" if _port_ret_total >= 0 else "#C62828"
+                st.markdown(
+                    f"<div style='background-color:#F0F2F6; border-radius:8px; padding:14px 16px;'>"
+                    f"<p style='font-size:14px; color:#6B7A8D; margin:0 0 4px 0;'>Portfolio NAV</p>"
+                    f"<p style='font-size:24px; font-weight:700; margin:0; color:{_port_color};'>"
+                    f"{_port_nav:.2f} <span style='font-size:14px;'>({_port_ret_total:+.2f}%)</span></p>"
+                    f"</div>", unsafe_allow_html=True)
+            with pm2:
+                _bench_color = "#2E7D32" if _bench_ret_total >= 0 else "#C62828"
+                st.markdown(
+                    f"<div style='background-color:#F0F2F6; border-radius:8px; padding:14px 16px;'>"
+                    f"<p style='font-size:14px; color:#6B7A8D; margin:0 0 4px 0;'>Benchmark NAV</p>"
+                    f"<p style='font-size:24px; font-weight:700; margin:0; color:{_bench_color};'>"
+                    f"{_bench_nav:.2f} <span style='font-size:14px;'>({_bench_ret_total:+.2f}%)</span></p>"
+                    f"</div>", unsafe_allow_html=True)
+            with pm3:
+                _alpha_color = "#2E7D32" if _alpha >= 0 else "#C62828"
+                st.markdown(
+                    f"<div style='background-color:#F0F2F6; border-radius:8px; padding:14px 16px;'>"
+                    f"<p style='font-size:14px; color:#6B7A8D; margin:0 0 4px 0;'>Alpha</p>"
+                    f"<p style='font-size:24px; font-weight:700; margin:0; color:{_alpha_color};'>"
+                    f"{_alpha:+.2f}%</p>"
+                    f"</div>", unsafe_allow_html=True)
+            with pm4:
+                st.markdown(
+                    f"<div style='background-color:#F0F2F6; border-radius:8px; padding:14px 16px;'>"
+                    f"<p style='font-size:14px; color:#6B7A8D; margin:0 0 4px 0;'>Max Drawdown</p>"
+                    f"<p style='font-size:24px; font-weight:700; margin:0; color:#C62828;'>"
+                    f"Port: {_max_dd:.2f}% | Bench: {_bench_max_dd:.2f}%</p>"
+                    f"</div>", unsafe_allow_html=True)
+
+            st.markdown("")
+
+            # Equity Curve Chart
+            _chart_df = _eq_df[["date", "portfolio_nav", "benchmark_nav"]].copy()
+            _chart_df["date"] = _chart_df["date"].dt.strftime("%d-%b-%Y")
+            _chart_df = _chart_df.rename(columns={
+                "portfolio_nav": "Portfolio",
+                "benchmark_nav": "Benchmark (NIFTY 500)"
+            })
+            _chart_df = _chart_df.set_index("date")
+            st.line_chart(_chart_df, height=400, use_container_width=True)
+
+            st.caption(
+                f"📊 Tracking since {_start_date}  |  {_n_days} day(s) recorded  |  "
+                f"Latest: {_end_date}  |  "
+                f"Portfolio includes cash drag (uninvested portion earns 6% p.a.)")
+
+            # Daily Details Table (collapsible)
+            with st.expander("📋 Daily NAV Details", expanded=False):
+                _detail_df = _eq_df[["date", "portfolio_nav", "benchmark_nav",
+                                     "portfolio_ret", "benchmark_ret",
+                                     "n_held", "invested_frac"]].copy()
+                _detail_df["date"] = _detail_df["date"].dt.strftime("%d-%b-%Y")
+                _detail_df["portfolio_ret"] = (_detail_df["portfolio_ret"] * 100).round(3)
+                _detail_df["benchmark_ret"] = (_detail_df["benchmark_ret"] * 100).round(3)
+                _detail_df["invested_frac"] = (_detail_df["invested_frac"] * 100).round(1)
+                _detail_df.columns = ["Date", "Port NAV", "Bench NAV",
+                                      "Port Ret %", "Bench Ret %",
+                                      "# Held", "Invested %"]
+                st.dataframe(_detail_df, use_container_width=True, hide_index=True)
+
+        elif len(_eq_data) == 1:
+            st.info(
+                f"📅 Tracking started on {_eq_data[0]['date']}. "
+                f"The equity curve chart will appear after 2+ days of data. "
+                f"Run `Sharpe.py` again tomorrow!")
+        else:
+            st.warning(
+                "⚠️ No equity history found. Run `Sharpe.py` once to initialise "
+                "the performance tracker. The system will start recording daily NAVs "
+                "from that point forward.")
 
 # ── ACTIONS ───────────────────────────────────────────────────────────────────
 st.divider()
@@ -0,0 +1,344 @@
+"""
+sweep.py
+========
+Parallel parameter sweep over the walk-forward Sharpe backtest.
+
+Instead of copying backtest.py into another sandbox_*.py for every strategy
+question, describe the variants as a grid and run them all in one go:
+
+    python sweep.py N750 --grid grid.json --workers 8
+
+The rolling-statistics panel (walkforward.build_walk_forward_panel) is
+built once in the parent and its arrays are placed in shared memory; each
+worker process attaches to the same buffers instead of receiving a pickled
+copy, so a 100-config sweep costs one panel build plus 100 O(weeks ×
+tickers) simulations.
+
+Grid file (JSON) — every key maps to a list of values; the sweep runs the
+cartesian product. Keys not given keep their DEFAULT_CONFIG value:
+
+    {
+      "windows":   [{"12M": 252, "9M": 189, "6M": 126, "3M": 63},
+                    {"12M": 252, "6M": 126, "3M": 63}],
+      "hold_rank": [30, 40, 50],
+      "rel_dd_breach_threshold": [null, -20]
+    }
+
+The two regimes weight different signals (nifty_ema: ema50 / ema_trend /
+breadth / momentum; universe_breadth: ema50_breadth / ema_trend_breadth /
+breadth / momentum). A grid that sweeps both regimes gives each its own
+weights by keying a signal_weights value on the regime name:
+
+    "regime":         ["nifty_ema", "universe_breadth"],
+    "signal_weights": [{"nifty_ema":        {"ema50": 0.4, ...},
+                        "universe_breadth": {"ema50_breadth": 0.4, ...}}]
+
+A regime missing from such a value keeps its defaults. expand_grid()
+rejects weights whose keys do not match the config's regime.
+
+Output: one CSV under "backtest results/" with a row per config — the
+config values, CAGR, MDD, average turnover, final equity and runtime.
+
+Functions
+---------
+expand_grid(grid, base)             — list of config dicts (cartesian product)
+regime_weights(config)              — signal_weights for the config's regime (None = defaults)
+run_config(panel, config, rebalance_idx) — one backtest → metrics dict
+run_sweep(panel, configs, workers)  — all configs, in a process pool
+"""
+
+import argparse
+import datetime
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import momentum_lib as ml
+import walkforward as wf
+
+
+# ── CONFIG ────────────────────────────────────────────────────────────────────
+RFR_ANNUAL   = 0.07
+TRADING_DAYS = 252
+
+DEFAULT_CONFIG = {
+    "windows":                 {"12M": 252, "9M": 189, "6M": 126, "3M": 63},
+    "min_pct_from_52h":        -25.0,
+    "rel_dd_breach_threshold": None,       # None = no REL_52H_DD exit
+    "hold_rank":               40,
+    "min_hold_days":           28,
+    "regime":                  "nifty_ema",  # or "universe_breadth"
+    "signal_weights":          None,       # None = the regime's own defaults
+    "min_n":                   ml.DEFAULT_MIN_N,
+    "max_n":                   ml.DEFAULT_MAX_N,
+    "new_entry_threshold":     ml.DEFAULT_NEW_ENTRY_THRESHOLD,
+    "max_weight":              0.05,
+    "friction":                0.002,
+}
+
+# Signal names each regime's signal_weights must cover
+REGIME_SIGNAL_KEYS = {
+    "nifty_ema":        {"ema50", "ema_trend", "breadth", "momentum"},
+    "universe_breadth": set(ml.DEFAULT_SIGNAL_WEIGHTS),
+}
+
+# Sample grid used when no --grid file is given
+DEFAULT_GRID = {
+    "hold_rank":     [30, 40, 50],
+    "min_hold_days": [14, 28],
+}
+
+
+def expand_grid(grid: dict, base: dict = None) -> list:
+    """Cartesian product of `grid` (key → list of values) over `base`."""
+    base = dict(DEFAULT_CONFIG if base is None else base)
+    unknown = set(grid) - set(base)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameter(s): {', '.join(sorted(unknown))}")
+    keys    = list(grid)
+    configs = [{**base, **dict(zip(keys, values))}
+               for values in itertools.product(*(grid[k] for k in keys))]
+    for config in configs:
+        regime_weights(config)
+    return configs
+
+
+def regime_weights(config: dict):
+    """
+    signal_weights for config["regime"]: the value itself, or its entry for
+    the regime when keyed on regime names (None = the regime's defaults).
+    Raises ValueError for an unknown regime or weights with other keys.
+    """
+    regime = config["regime"]
+    if regime not in REGIME_SIGNAL_KEYS:
+        raise ValueError(f"Unknown regime: {regime!r}")
+    weights = config["signal_weights"]
+    if weights is not None and set(weights) <= set(REGIME_SIGNAL_KEYS):
+        weights = weights.get(regime)
+    if weights is not None and set(weights) != REGIME_SIGNAL_KEYS[regime]:
+        raise ValueError(f"signal_weights for regime {regime!r} must have keys "
+                         f"{sorted(REGIME_SIGNAL_KEYS[regime])}, got {sorted(weights)}")
+    return weights
+
+
+# ── SINGLE RUN ────────────────────────────────────────────────────────────────
+
+def _max_drawdown(equity: pd.Series) -> float:
+    return float((equity / equity.cummax() - 1.0).min())
+
+
+def run_config(panel: dict, config: dict, rebalance_idx: list) -> dict:
+    """
+    One walk-forward backtest for `config`.
+
+    Returns dict: CAGR_Pct, MDD_Pct, Avg_Turnover_Pct, Final_Equity,
+    Nifty_CAGR_Pct, Rebalances, Runtime_S.
+    """
+    t0      = time.perf_counter()
+    weights = regime_weights(config)
+    if config["regime"] == "universe_breadth":
+        regime_fn = wf.universe_breadth_regime(
+            config["min_n"], config["max_n"], config["new_entry_threshold"], weights)
+    else:
+        regime_fn = wf.nifty_ema_regime(
+            config["min_n"], config["max_n"], config["new_entry_threshold"], weights)
+
+    res = wf.run_walk_forward(
+        panel, rebalance_idx, config["windows"],
+        regime_fn=regime_fn,
+        select_fn=wf.hold_buffer_selector(config["hold_rank"], config["min_hold_days"],
+                                          config["rel_dd_breach_threshold"]),
+        weight_fn=wf.composite_inv_vol_weights(config["max_weight"]),
+        min_pct_from_52h=config["min_pct_from_52h"],
+        friction=config["friction"],
+        verbose=False,
+    )
+
+    dates = panel["dates"]
+    years = (dates[rebalance_idx[-1]] - dates[rebalance_idx[0]]).days / 365.25
+    years = years if years > 0 else 1.0
+    start = 2_000_000.0
+    return {
+        "CAGR_Pct":         ((res["Equity"].iloc[-1] / start) ** (1 / years) - 1.0) * 100,
+        "MDD_Pct":          _max_drawdown(res["Equity"]) * 100,
+        "Avg_Turnover_Pct": res["Turnover_Pct"].mean(),
+        "Final_Equity":     res["Equity"].iloc[-1],
+        "Nifty_CAGR_Pct":   ((res["Nifty_Equity"].iloc[-1] / start) ** (1 / years) - 1.0) * 100,
+        "Rebalances":       len(res),
+        "Runtime_S":        time.perf_counter() - t0,
+    }
+
+
+# ── SHARED-MEMORY PANEL ───────────────────────────────────────────────────────
+# Worker processes see the panel's ndarrays through named shared-memory
+# blocks; only the small metadata (tickers, dates, scalars) is pickled.
+
+_WORKER_PANEL = None
+_WORKER_SHM   = []
+
+
+def _flatten_arrays(panel: dict) -> dict:
+    """{(key,) or (key, sub): ndarray} for every array in the panel."""
+    arrays = {}
+    for key, val in panel.items():
+        if isinstance(val, np.ndarray):
+            arrays[(key,)] = val
+        elif isinstance(val, dict):
+            for sub, arr in val.items():
+                arrays[(key, sub)] = arr
+    return arrays
+
+
+def _share_panel(panel: dict):
+    """Copy the panel's arrays into shared memory. Returns (blocks, spec)."""
+    blocks, layout = [], []
+    for path, arr in _flatten_arrays(panel).items():
+        shm = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+        np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)[...] = arr
+        blocks.append(shm)
+        layout.append((path, shm.name, arr.shape, arr.dtype.str))
+    meta = {k: v for k, v in panel.items()
+            if not isinstance(v, (np.ndarray, dict))}
+    return blocks, {"meta": meta, "layout": layout}
+
+
+def _attach_panel(spec: dict):
+    """Pool initializer: rebuild the panel dict as views on shared memory."""
+    global _WORKER_PANEL
+    panel = dict(spec["meta"])
+    for path, name, shape, dtype in spec["layout"]:
+        shm = shared_memory.SharedMemory(name=name)
+        _WORKER_SHM.append(shm)          # keep the mapping alive
+        arr = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        if len(path) == 1:
+            panel[path[0]] = arr
+        else:
+            panel.setdefault(path[0], {})[path[1]] = arr
+    _WORKER_PANEL = panel
+
+
+def _worker_run(args):
+    config, rebalance_idx = args
+    return run_config(_WORKER_PANEL, config, rebalance_idx)
+
+
+# ── SWEEP ─────────────────────────────────────────────────────────────────────
+
+def _config_columns(config: dict) -> dict:
+    """Flatten a config into printable table columns."""
+    row = {}
+    for key, val in config.items():
+        if key == "windows":
+            row[key] = "/".join(val)
+        elif isinstance(val, dict):
+            row[key] = json.dumps(val, sort_keys=True)
+        else:
+            row[key] = val
+    return row
+
+
+def run_sweep(panel: dict, configs: list, rebalance_idx: list = None,
+              workers: int = None) -> pd.DataFrame:
+    """
+    Run every config against the same panel.
+
+    workers : process count (default os.cpu_count()); 1 runs in-process.
+
+    Returns DataFrame — one row per config (config columns + metrics).
+    """
+    if rebalance_idx is None:
+        rebalance_idx = wf.week_end_indices(panel["dates"])
+    workers = workers or os.cpu_count() or 1
+    jobs    = [(c, rebalance_idx) for c in configs]
+
+    print(f"Running {len(configs)} config(s) on {min(workers, len(configs))} worker(s) ...")
+    if workers == 1 or len(configs) == 1:
+        metrics = []
+        for i, (config, idx_list) in enumerate(jobs, start=1):
+            metrics.append(run_config(panel, config, idx_list))
+            sys.stdout.write(f"\r  [{i}/{len(jobs)}]")
+            sys.stdout.flush()
+    else:
+        blocks, spec = _share_panel(panel)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach_panel,
+                                     initargs=(spec,)) as pool:
+                metrics = []
+                for i, m in enumerate(pool.map(_worker_run, jobs), start=1):
+                    metrics.append(m)
+                    sys.stdout.write(f"\r  [{i}/{len(jobs)}]")
+                    sys.stdout.flush()
+        finally:
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+    print()
+
+    return pd.DataFrame([{**_config_columns(c), **m} for c, m in zip(configs, metrics)])
+
+
+# ── CLI ───────────────────────────────────────────────────────────────────────
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parallel Sharpe strategy parameter sweep")
+    parser.add_argument("universe", nargs="?", default="N750",
+                        help="Universe name (reads <universe>_updated.xlsx)")
+    parser.add_argument("--file", default=None,
+                        help="Price workbook (overrides the universe default)")
+    parser.add_argument("--grid", default=None,
+                        help="JSON file mapping parameter → list of values")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: all cores)")
+    parser.add_argument("--warmup", type=int, default=252,
+                        help="Trading days before the first rebalance (default: 252)")
+    parser.add_argument("--out", default=None,
+                        help="Results CSV (default: backtest results/sweep_<timestamp>.csv)")
+    args = parser.parse_args(argv)
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid, "r") as f:
+            grid = json.load(f)
+    configs = expand_grid(grid)
+
+    file = args.file or f"{args.universe}_updated.xlsx"
+    print(f"Loading {file} ...")
+    prices_df, nifty_series, stock_tickers, dates = ml.load_prices(file)
+
+    t0 = time.perf_counter()
+    panel = wf.build_walk_forward_panel(prices_df, nifty_series, stock_tickers,
+                                        RFR_ANNUAL / TRADING_DAYS, TRADING_DAYS)
+    rebalance_idx = wf.week_end_indices(dates, warmup=args.warmup)
+    print(f"Panel: {len(stock_tickers)} tickers × {len(dates)} days, "
+          f"{len(rebalance_idx)} rebalances ({time.perf_counter() - t0:.1f}s)")
+    if len(rebalance_idx) < 2:
+        print("[!] ERROR: Not enough history after the warm-up for a backtest.")
+        return 1
+
+    t0 = time.perf_counter()
+    results = run_sweep(panel, configs, rebalance_idx, workers=args.workers)
+    print(f"Sweep complete in {time.perf_counter() - t0:.1f}s")
+
+    out = args.out
+    if out is None:
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        os.makedirs("backtest results", exist_ok=True)
+        out = os.path.join("backtest results", f"sweep_{timestamp}.csv")
+    results.sort_values("CAGR_Pct", ascending=False).to_csv(out, index=False)
+
+    cols = [c for c in grid] + ["CAGR_Pct", "MDD_Pct", "Avg_Turnover_Pct", "Runtime_S"]
+    with pd.option_context("display.width", 160, "display.float_format", "{:,.2f}".format):
+        print(results.sort_values("CAGR_Pct", ascending=False)[cols].head(20).to_string(index=False))
+    print(f"\nResults saved to {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""
+Unit tests for allocator.py — vectorized weights must match the per-ticker
+loop Sharpe.py / the backtests used, and capped redistribution must respect
+the cap while conserving weight.
+
+Run:  python test_allocator.py
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import allocator as al
+
+
+def legacy_weights(tickers, prices_df, composite, max_weight):
+    """The loop Sharpe.py ran before allocator.py."""
+    raw = {}
+    for t in tickers:
+        px = prices_df.loc[t].dropna()
+        if len(px) > 10:
+            vols = []
+            for w in [252, 189, 126, 63]:
+                px_w  = px.iloc[-w:] if len(px) >= w else px
+                log_r = np.diff(np.log(px_w.values))
+                if len(log_r) > 5:
+                    vols.append(np.std(log_r, ddof=1) * np.sqrt(252))
+            raw[t] = composite[t] / np.mean(vols) if vols and np.mean(vols) > 0 else composite[t]
+        else:
+            raw[t] = composite[t]
+    total = sum(raw.values())
+    return {t: min(raw[t] / total if total > 0 else 1.0 / len(tickers), max_weight)
+            for t in tickers}
+
+
+class TestAllocator(unittest.TestCase):
+
+    def setUp(self):
+        rng    = np.random.default_rng(11)
+        n, T   = 30, 300
+        px     = 100 * np.cumprod(1 + rng.normal(0, rng.uniform(0.005, 0.04, (n, 1)), (n, T)), axis=1)
+        px[rng.random((n, T)) < 0.05] = np.nan        # scattered missing days
+        px[0, :-8]   = np.nan                         # too short for vol weighting
+        px[1, :-40]  = np.nan                         # only the short windows apply
+        px[2, :-100] = np.nan
+        self.tickers   = [f"T{i:02d}" for i in range(n)]
+        self.prices    = pd.DataFrame(px, index=self.tickers)
+        self.composite = pd.Series(rng.uniform(0.1, 1.0, n), index=self.tickers)
+
+    def test_matches_legacy_loop(self):
+        for cap in (0.05, 1.0):
+            got = al.target_weights(self.composite, self.prices, cap)
+            exp = legacy_weights(self.tickers, self.prices, self.composite, cap)
+            for t in self.tickers:
+                self.assertAlmostEqual(got[t], exp[t], places=12)
+
+    def test_cap_redistribution(self):
+        w = np.array([0.40, 0.25, 0.15, 0.10, 0.06, 0.04])
+        np.testing.assert_allclose(al.cap_weights(w, 0.2), [0.2, 0.2, 0.15, 0.10, 0.06, 0.04])
+
+        capped = al.cap_weights(w, 0.2, redistribute=True)
+        self.assertAlmostEqual(capped.sum(), 1.0, places=12)
+        self.assertLessEqual(capped.max(), 0.2 + 1e-12)
+        self.assertTrue(np.all(np.diff(capped) <= 1e-12))          # order preserved
+
+        few = al.cap_weights(np.array([0.5, 0.3, 0.2]), 0.25, redistribute=True)
+        np.testing.assert_allclose(few, [0.25, 0.25, 0.25])         # 25% left in cash
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
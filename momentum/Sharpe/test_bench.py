@@ -0,0 +1,36 @@
+"""
+Unit tests for bench.py — every stage runs offline on a tiny synthetic
+universe and the baseline comparison flags only real slowdowns.
+
+Run:  python test_bench.py
+"""
+
+import unittest
+
+import bench
+
+
+class TestBench(unittest.TestCase):
+
+    def test_tiny_universe_times_every_stage(self):
+        results = bench.run_benchmarks({"TINY": 30}, n_days=270, repeat=1)
+        stages  = results["universes"]["TINY"]["stages"]
+        self.assertEqual(list(stages), bench.STAGES)
+        self.assertTrue(all(s > 0 for s in stages.values()))
+
+    def test_compare_to_baseline(self):
+        base = {"universes": {"N750": {"stages": {"sharpe": 0.10, "beta": 0.001,
+                                                  "turnover": 0.20}}}}
+        cur  = {"universes": {"N750": {"stages": {"sharpe": 0.20, "beta": 0.003,
+                                                  "turnover": 0.21}},
+                              "N500": {"stages": {"sharpe": 0.05}}}}
+        table = bench.compare_to_baseline(cur, base, threshold=1.25).set_index("stage")
+        self.assertEqual(len(table), 3)                  # N500 has no baseline
+        self.assertTrue(table.loc["sharpe", "regression"])
+        self.assertFalse(table.loc["beta", "regression"])      # below MIN_SECONDS
+        self.assertFalse(table.loc["turnover", "regression"])
+        self.assertAlmostEqual(table.loc["sharpe", "ratio"], 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
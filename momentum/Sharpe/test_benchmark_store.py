@@ -0,0 +1,114 @@
+"""
+Unit tests for benchmark_store.py — incremental fetches keyed on the last
+stored date, re-reads of a provisional intraday bar, head backfill, and the
+precomputed EMA / regime inputs.
+
+Run:  python test_benchmark_store.py
+"""
+
+import datetime
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import benchmark_store as bs
+
+
+def make_index(n_days: int = 900, seed: int = 4) -> pd.Series:
+    rng   = np.random.default_rng(seed)
+    dates = pd.bdate_range("2023-01-02", periods=n_days)
+    return pd.Series(20000 * np.cumprod(1 + rng.normal(0.0004, 0.01, n_days)), index=dates)
+
+
+class TestBenchmarkStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp   = tempfile.TemporaryDirectory()
+        self.dir   = Path(self.tmp.name)
+        self.full  = make_index()
+        self.start = self.full.index[300].date()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def at(self, i: int, hour: int = 18) -> datetime.datetime:
+        return datetime.datetime.combine(self.full.index[i].date(), datetime.time(hour))
+
+    def test_incremental_updates(self):
+        provider = bs.series_provider(self.full)
+        frame = bs.update(bs.NIFTY500, self.start, provider, self.dir, now=self.at(600))
+        self.assertEqual(frame.index[-1], self.full.index[600])
+        self.assertEqual(bs.last_date(bs.NIFTY500, self.dir), self.full.index[600].date())
+
+        bs.update(bs.NIFTY500, self.start, provider, self.dir, now=self.at(600, 19))
+        self.assertEqual(len(provider.calls), 1)                    # data already runs to today
+
+        provider.calls.clear()
+        frame = bs.update(bs.NIFTY500, self.start, provider, self.dir, now=self.at(605))
+        self.assertEqual(len(provider.calls), 1)
+        _, lo, _ = provider.calls[0]
+        self.assertEqual(lo, self.full.index[600].date() - datetime.timedelta(days=bs.OVERLAP_DAYS))
+
+        exp = self.full.iloc[300:606]
+        pd.testing.assert_series_equal(frame["Close"], exp, check_names=False, check_freq=False)
+        np.testing.assert_allclose(frame["EMA_200"], exp.ewm(span=200, adjust=False).mean(),
+                                   rtol=1e-12)
+
+    def test_intraday_bar_is_rechecked(self):
+        provider = bs.series_provider(self.full * 0.99)          # 11:00 print, not the close
+        bs.update(bs.NIFTY500, self.start, provider, self.dir, now=self.at(600, 11))
+        self.assertTrue(bs._read_index(self.dir)[bs.NIFTY500]["provisional"])
+
+        final = bs.series_provider(self.full)
+        bs.update(bs.NIFTY500, self.start, final, self.dir, now=self.at(600, 11) +
+                  datetime.timedelta(minutes=bs.RECHECK_MINUTES - 1))
+        self.assertEqual(final.calls, [])                         # within RECHECK_MINUTES
+        frame = bs.update(bs.NIFTY500, self.start, final, self.dir, now=self.at(600, 17))
+        self.assertEqual(len(final.calls), 1)
+        self.assertEqual(frame["Close"].iloc[-1], self.full.iloc[600])
+        self.assertFalse(bs._read_index(self.dir)[bs.NIFTY500]["provisional"])
+        bs.update(bs.NIFTY500, self.start, final, self.dir, now=self.at(600, 19))
+        self.assertEqual(len(final.calls), 1)                     # final close: no refetch
+
+    def test_head_backfill_and_regime_inputs(self):
+        provider = bs.series_provider(self.full)
+        bs.update(bs.NIFTY500, self.start, provider, self.dir, now=self.at(600))
+        frame = bs.get_frame(bs.NIFTY500, self.full.index[100].date(), provider, self.dir)
+        self.assertEqual(frame.index[0], self.full.index[100])
+        self.assertEqual(bs.load(bs.NIFTY500, self.dir).index[0], self.full.index[100])
+
+        inputs = bs.regime_inputs(bs.load(bs.NIFTY500, self.dir), fast=50, slow=100)
+        close  = self.full.iloc[100:]      # the tail was fetched up to today as well
+        self.assertAlmostEqual(inputs["price"], close.iloc[-1])
+        self.assertAlmostEqual(inputs["ema_slow"],
+                               close.ewm(span=100, adjust=False).mean().iloc[-1], places=6)
+
+        short = bs.regime_inputs(close.iloc[:60].rename("Close").to_frame(), 50, 100)
+        self.assertTrue(np.isnan(short["ema_slow"]))
+
+    def test_failed_head_fetch_is_retried(self):
+        provider = bs.series_provider(self.full)
+        bs.update(bs.NIFTY500, self.start, provider, self.dir, now=self.at(600))
+        early = self.full.index[100].date()
+
+        def flaky(symbol, lo, hi):
+            if lo < self.start:
+                raise ConnectionError("timeout")
+            return provider(symbol, lo, hi)
+
+        frame = bs.update(bs.NIFTY500, early, flaky, self.dir, now=self.at(605))
+        self.assertEqual(frame.index[-1], self.full.index[605])     # the tail still landed
+        self.assertEqual(bs._read_index(self.dir)[bs.NIFTY500]["requested_from"],
+                         str(self.start))
+
+        provider.calls.clear()
+        frame = bs.update(bs.NIFTY500, early, provider, self.dir, now=self.at(605, 19))
+        self.assertEqual([c[1] for c in provider.calls], [early])
+        self.assertEqual(frame.index[0], self.full.index[100])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,123 @@
+"""
+Unit tests for equity_curve.py — single-step parity with the per-run loop
+Sharpe.py used to run, exact day-by-day backfill across holidays,
+tradelog positions, and merging a rebuilt curve into older journal history.
+
+Run:  python test_equity_curve.py
+"""
+
+import datetime
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import equity_curve as eqc
+
+
+def make_panel(n_days: int = 12, seed: int = 3):
+    """Price panel with a holiday column and a few missing / zero prices."""
+    rng   = np.random.default_rng(seed)
+    dates = [datetime.date(2026, 3, 2) + datetime.timedelta(days=i) for i in range(n_days)]
+    px    = 100 * np.cumprod(1 + rng.normal(0, 0.02, (5, n_days)), axis=1)
+    px[:, 4] = np.nan                                 # holiday
+    px[1, -1] = np.nan                                # no print on the last day
+    px[2, 7]  = 0.0
+    prices = pd.DataFrame(px, index=["A", "B", "C", "D", "E"], columns=dates)
+    nifty  = pd.Series(1000 * np.cumprod(1 + rng.normal(0, 0.01, n_days)), index=dates)
+    nifty.iloc[4] = np.nan
+    return prices, nifty
+
+
+def legacy_step(prices, nifty, held, ref_idx, max_n, yield_pa):
+    """One multi-day step exactly as Sharpe.py computed it before."""
+    rets = []
+    for t in (t for t in held if t in prices.index):
+        now, ref = prices.loc[t].iloc[-1], prices.loc[t].iloc[ref_idx]
+        if pd.notna(now) and pd.notna(ref) and ref > 0:
+            rets.append(now / ref - 1.0)
+    inv = min(len(held) / max_n, 1.0)
+    gap = max((prices.columns[-1] - prices.columns[ref_idx]).days, 1)
+    n   = nifty.dropna()
+    return (inv * (np.mean(rets) if rets else 0.0) + (1 - inv) * yield_pa / 365 * gap,
+            n.iloc[-1] / n.loc[:prices.columns[ref_idx]].iloc[-1] - 1.0)
+
+
+class TestEquityCurve(unittest.TestCase):
+
+    def setUp(self):
+        self.prices, self.nifty = make_panel()
+        self.dates = eqc.column_dates(self.prices.columns)
+        self.held  = ["A", "B", "C", "ZZZ"]           # ZZZ: not in the panel
+
+    def test_single_step_matches_legacy(self):
+        frame = eqc.nav_frame(self.prices, self.nifty,
+                              eqc.holdings_from_ledger(self.held, self.dates),
+                              max_n=5, liquid_yield_pa=0.06, start=-2, start_nav=(110.0, 105.0))
+        port, bench = legacy_step(self.prices, self.nifty, self.held, -2, 5, 0.06)
+        self.assertEqual(len(frame), 1)
+        self.assertAlmostEqual(frame["portfolio_ret"].iloc[0], port, places=12)
+        self.assertAlmostEqual(frame["benchmark_ret"].iloc[0], bench, places=12)
+        self.assertAlmostEqual(frame["portfolio_nav"].iloc[0], 110.0 * (1 + port), places=9)
+        self.assertEqual(frame["n_held"].iloc[0], 4)
+
+    def test_backfill_is_daily_and_telescopes(self):
+        day   = datetime.date(2026, 3, 4)             # last recorded equity date
+        start = eqc.column_index(self.dates, day)
+        self.assertEqual(start, 2)
+        self.assertEqual(eqc.column_index(self.dates, datetime.date(2026, 3, 1)), -1)
+
+        frame = eqc.nav_frame(self.prices, self.nifty,
+                              eqc.holdings_from_ledger(["D"], self.dates),
+                              max_n=1, liquid_yield_pa=0.0, start=start)
+        self.assertEqual(len(frame), len(self.dates) - start - 1)
+        d = self.prices.loc["D"]
+        self.assertAlmostEqual(frame["portfolio_nav"].iloc[-1] / 100.0,
+                               d.iloc[-1] / d.iloc[start], places=10)
+        recs = eqc.to_records(frame, last_date="2026-03-14")
+        self.assertEqual([r["date"] for r in recs[:2]], ["2026-03-05", "2026-03-06"])
+        self.assertEqual(recs[-1]["date"], "2026-03-14")
+
+    def test_zero_and_missing_prices(self):
+        # C prints 0 in column 7: a -100% day as before, then no reference for column 8
+        frame = eqc.nav_frame(self.prices, self.nifty, eqc.holdings_from_ledger(["C"], self.dates),
+                              max_n=1, liquid_yield_pa=0.0)
+        self.assertEqual(frame["portfolio_ret"].tolist()[6:8], [-1.0, 0.0])
+        # holiday column 4 earns nothing; column 5 is measured from column 3's close
+        c = self.prices.loc["C"]
+        self.assertEqual(frame["portfolio_ret"].iloc[3], 0.0)
+        self.assertAlmostEqual(frame["portfolio_ret"].iloc[4], c.iloc[5] / c.iloc[3] - 1.0, places=12)
+
+    def test_tradelog_positions(self):
+        txs = [
+            {"date": "2026-03-01", "ticker": "A", "action": "BUY",  "quantity": 10},
+            {"date": "2026-03-06", "ticker": "B", "action": "BUY",  "quantity": 5},   # holiday column
+            {"date": "2026-03-09", "ticker": "A", "action": "SELL", "quantity": 10},
+        ]
+        held = eqc.holdings_from_tradelog(txs, self.dates)
+        self.assertEqual(held["A"].tolist(), [10.0] * 7 + [0.0] * 5)
+        self.assertEqual(held["B"].tolist(), [0.0] * 4 + [5.0] * 8)
+        frame = eqc.nav_frame(self.prices, self.nifty, held, max_n=2)
+        self.assertEqual(frame["n_held"].tolist(), [1, 1, 1, 1, 2, 2, 2, 1, 1, 1, 1])
+
+    def test_rebuild_keeps_older_history(self):
+        # the journal predates the panel; its last record before column 3 anchors the rebuild
+        existing = [{"date": "2026-02-20", "portfolio_nav": 104.0, "benchmark_nav": 101.0},
+                    {"date": "2026-03-03", "portfolio_nav": 108.0, "benchmark_nav": 103.0},
+                    {"date": "2026-03-09", "portfolio_nav": 1.0,   "benchmark_nav": 1.0}]
+        start = 3
+        nav   = eqc.anchor_nav(existing, self.dates[start])
+        self.assertEqual(nav, (108.0, 103.0))
+        self.assertEqual(eqc.anchor_nav(existing, "2026-02-19"), (eqc.START_NAV, eqc.START_NAV))
+        frame = eqc.nav_frame(self.prices, self.nifty, eqc.holdings_from_ledger(["D"], self.dates),
+                              max_n=1, liquid_yield_pa=0.0, start=start, start_nav=nav)
+        merged = eqc.merge_records(existing, eqc.to_records(frame))
+        self.assertEqual([r["date"] for r in merged[:3]], ["2026-02-20", "2026-03-03", "2026-03-06"])
+        self.assertEqual(len(merged), 2 + len(frame))
+        d = self.prices.loc["D"]
+        self.assertAlmostEqual(merged[-1]["portfolio_nav"], 108.0 * d.iloc[-1] / d.iloc[start], places=3)
+        self.assertEqual(eqc.merge_records(existing, []), existing)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
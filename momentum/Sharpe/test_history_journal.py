@@ -0,0 +1,84 @@
+"""
+Unit tests for history_journal.py — one-time JSON import, same-date upserts,
+range reads, compaction, and the writers' lock.
+
+Run:  python test_history_journal.py
+"""
+
+import json
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import history_journal as hj
+
+
+def rec(day: int, nav: float) -> dict:
+    return {"date": f"2026-06-{day:02d}", "portfolio_nav": nav, "n_held": day % 7}
+
+
+class TestHistoryJournal(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp   = tempfile.TemporaryDirectory()
+        self.legacy = Path(self._tmp.name) / "U_equity_history.json"
+        # Legacy arrays may be out of order and repeat a date (last one wins)
+        self.legacy.write_text(json.dumps([rec(2, 100.5), rec(1, 100.0), rec(2, 101.0)]))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_migrate_append_upsert(self):
+        path = hj.ensure_journal(self.legacy)
+        self.assertEqual(path.name, "U_equity_history.jsonl")
+        self.assertEqual(hj.read_records(path), [rec(1, 100.0), rec(2, 101.0)])
+
+        self.assertTrue(hj.append_record(path, rec(3, 102.0)))
+        self.assertFalse(hj.append_record(path, rec(3, 102.0)))     # idempotent rerun
+        self.assertTrue(hj.append_record(path, rec(3, 102.5)))      # same-day upsert
+        self.assertEqual(len(path.read_text().splitlines()), 4)
+        self.assertEqual(hj.read_records(path), [rec(1, 100.0), rec(2, 101.0), rec(3, 102.5)])
+        self.assertEqual(hj.last_record(path), rec(3, 102.5))
+
+        # A second open never re-imports; the legacy file is left untouched
+        self.legacy.write_text("[]")
+        self.assertEqual(hj.ensure_journal(self.legacy), path)
+        self.assertEqual(len(hj.read_records(path)), 3)
+
+    def test_range_reads_and_compaction(self):
+        path = hj.ensure_journal(self.legacy)
+        for day in range(3, 29):
+            hj.append_record(path, rec(day, 100.0 + day))
+        got = hj.read_records(path, start="2026-06-10", end="2026-06-12")
+        self.assertEqual([r["date"] for r in got], ["2026-06-10", "2026-06-11", "2026-06-12"])
+
+        for i in range(hj.COMPACT_MIN + 5):                         # many same-day upserts
+            hj.append_record(path, rec(28, 200.0 + i))
+        live = hj.read_records(path)                                # triggers compact()
+        self.assertEqual(len(path.read_text().splitlines()), 28)
+        self.assertEqual(hj.read_records(path), live)
+        self.assertEqual(live[-1], rec(28, 200.0 + hj.COMPACT_MIN + 4))
+
+
+    def test_writers_wait_for_the_lock(self):
+        path = hj.ensure_journal(self.legacy)
+        for day in range(3, 6):
+            hj.append_record(path, rec(day, 100.0))
+        with hj._journal_lock(path):                                # e.g. another process compacting
+            writers = [threading.Thread(target=hj.append_record, args=(path, rec(6, 106.0))),
+                       threading.Thread(target=hj.compact, args=(path,))]
+            for t in writers:
+                t.start()
+            time.sleep(0.2)
+            self.assertTrue(all(t.is_alive() for t in writers))
+            self.assertEqual(len(path.read_text().splitlines()), 5)
+        for t in writers:
+            t.join(5)
+        self.assertEqual(hj.last_record(path), rec(6, 106.0))
+        self.assertEqual(len(hj.read_records(path)), 6)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
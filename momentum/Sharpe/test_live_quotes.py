@@ -0,0 +1,85 @@
+"""
+Unit tests for live_quotes.py — one batched provider call per refresh,
+TTL hits served from the shared cache, and concurrent callers coalesced.
+
+Run:  python test_live_quotes.py
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import live_quotes as lq
+
+
+class TestLiveQuotes(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp  = tempfile.TemporaryDirectory()
+        self.cache = Path(self._tmp.name) / "quotes.json"
+        self.calls = []
+        self.stub  = lq.stub_provider({"AAA": 10.0, "BBB": 20.0, "CCC": 30.0})
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def provider(self, tickers, exchanges):
+        self.calls.append(sorted(tickers))
+        time.sleep(0.05)
+        return self.stub(tickers)
+
+    def test_batched_and_ttl_cached(self):
+        got = lq.get_quotes(["AAA", "BBB", "ZZZ"], provider=self.provider, cache_path=self.cache)
+        self.assertEqual(got, {"AAA": 10.0, "BBB": 20.0})
+        self.assertEqual(self.calls, [["AAA", "BBB", "ZZZ"]])
+
+        # Within the TTL only the unresolved / new tickers are fetched
+        got = lq.get_quotes(["AAA", "CCC", "ZZZ"], provider=self.provider, cache_path=self.cache)
+        self.assertEqual(got, {"AAA": 10.0, "CCC": 30.0})
+        self.assertEqual(self.calls[1], ["CCC", "ZZZ"])
+        self.assertEqual(set(json.loads(self.cache.read_text())),
+                         {"AAA.NS|BO", "BBB.NS|BO", "CCC.NS|BO"})
+
+        # ttl=0 forces a refetch
+        lq.get_quotes(["AAA"], ttl=0, provider=self.provider, cache_path=self.cache)
+        self.assertEqual(self.calls[2], ["AAA"])
+
+    def test_cache_is_per_exchange_chain(self):
+        # a BSE fallback price cached for an NS|BO caller is not an NSE quote
+        bse = lambda tickers, exchanges: {t: 99.0 for t in tickers if "BO" in exchanges}
+        self.assertEqual(lq.get_quotes(["AAA"], provider=bse, cache_path=self.cache),
+                         {"AAA": 99.0})
+        got = lq.get_quotes(["AAA"], exchanges=("NS",), provider=self.provider,
+                            cache_path=self.cache)
+        self.assertEqual(got, {"AAA": 10.0})
+        self.assertEqual(self.calls, [["AAA"]])
+
+    def test_concurrent_requests_coalesce(self):
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+                       lq.get_quotes(["AAA", "BBB"], provider=self.provider,
+                                     cache_path=self.cache)))
+                   for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(results, [{"AAA": 10.0, "BBB": 20.0}] * 6)
+
+    def test_stub_file_from_environment(self):
+        stub = Path(self._tmp.name) / "stub.json"
+        stub.write_text(json.dumps({"AAA": 1.5}))
+        os.environ[lq.STUB_ENV] = str(stub)
+        try:
+            self.assertEqual(lq.get_quotes(["AAA", "BBB"], cache_path=self.cache), {"AAA": 1.5})
+        finally:
+            del os.environ[lq.STUB_ENV]
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,77 @@
+"""
+Unit tests for market_caps.py — batched refresh with per-ticker staleness
+and the once-a-day limit, and the vectorized tier table.
+
+Run:  python test_market_caps.py
+"""
+
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import market_caps as mc
+from test_momentum_lib import make_panel
+
+
+class TestMarketCaps(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp   = tempfile.TemporaryDirectory()
+        self.store  = Path(self._tmp.name) / mc.STORE_FILENAME
+        self.prices = make_panel(n_tickers=40, n_days=120)
+        self.tickers = list(self.prices.index)
+        rng = np.random.default_rng(3)
+        self.caps = dict(zip(self.tickers, rng.lognormal(20, 2, len(self.tickers))))
+        self.calls = []
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def fetcher(self, ticker):
+        self.calls.append(ticker)
+        if ticker == "T007":                      # delisted — every exchange fails
+            return None, None
+        return self.caps[ticker], "NS"
+
+    def test_refresh_is_daily_and_only_fetches_stale(self):
+        n = mc.refresh_market_caps(self.store, self.tickers, fetcher=self.fetcher,
+                                   batch_size=16, max_workers=4)
+        self.assertEqual((n, len(self.calls)), (39, 40))
+        self.assertEqual(mc.refresh_market_caps(self.store, self.tickers,
+                                                fetcher=self.fetcher), 0)
+
+        # Age two tickers past MAX_AGE_HOURS: a forced refresh refetches
+        # only those plus the one that has never succeeded
+        caps = mc.load_market_caps(self.store)
+        caps.loc[["T001", "T002"], "FETCHED_AT"] = time.time() - 2 * mc.MAX_AGE_HOURS * 3600
+        mc.save_market_caps(self.store, caps)
+        self.calls.clear()
+        mc.refresh_market_caps(self.store, self.tickers, force=True, fetcher=self.fetcher)
+        self.assertEqual(sorted(self.calls), ["T001", "T002", "T007"])
+        self.assertEqual(len(mc.load_market_caps(self.store)), 39)
+
+    def test_tiers_match_per_ticker_ranking(self):
+        mc.refresh_market_caps(self.store, self.tickers, fetcher=self.fetcher)
+        caps    = mc.load_market_caps(self.store)
+        bounds  = mc.TIER_BOUNDS
+        summary = mc.cap_tier_momentum(self.prices, self.tickers, caps)
+
+        ranked = caps["MCAP"].sort_values(ascending=False)
+        tiers  = {}
+        for rank, t in enumerate(ranked.index, start=1):
+            label = next(lbl for b, lbl in bounds if b is None or rank <= b)
+            px    = self.prices.loc[t].dropna()
+            pos   = len(px) >= 63 and px.iloc[-1] / px.iloc[-63] - 1.0 > 0
+            total, n_pos = tiers.get(label, (0, 0))
+            tiers[label] = (total + 1, n_pos + int(pos))
+        expected = pd.DataFrame(tiers, index=["Total Stocks", "Positive Mom Stocks"]).T
+        pd.testing.assert_frame_equal(summary[["Total Stocks", "Positive Mom Stocks"]],
+                                      expected, check_dtype=False, check_names=False)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
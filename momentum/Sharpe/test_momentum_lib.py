@@ -0,0 +1,330 @@
+"""
+Unit tests for the vectorised momentum_lib engines — each is checked for
+parity against the original per-ticker implementation it replaces.
+
+Run:  python test_momentum_lib.py
+"""
+
+import contextlib
+import datetime
+import io
+import tempfile
+import unittest
+from pathlib import Path
+
+import openpyxl
+
+import numpy as np
+import pandas as pd
+
+import momentum_lib as ml
+import ranking_state as rs
+
+
+WINDOWS   = {"12M": 252, "9M": 189, "6M": 126, "3M": 63}
+RFR_DAILY = 0.07 / 252
+
+
+def make_panel(n_tickers: int = 40, n_days: int = 300, seed: int = 7) -> pd.DataFrame:
+    """Synthetic (ticker × date) price panel with listing gaps and holes."""
+    rng   = np.random.default_rng(seed)
+    dates = pd.bdate_range("2025-01-01", periods=n_days).date
+    rets  = rng.normal(0.0005, 0.02, size=(n_tickers, n_days))
+    px    = 100 * np.exp(np.cumsum(rets, axis=1))
+
+    px[1, :180]   = np.nan                      # recent listing — fails 12M/9M
+    px[2, :40]    = np.nan                      # just inside 12M coverage
+    px[3, ::7]    = np.nan                      # scattered missing days
+    px[4, -30:]   = np.nan                      # stale / suspended
+    px[5, :]      = np.nan                      # no data at all
+    px[6, :-1]    = np.nan                      # single observation
+    px[7, :]      = 50.0                        # flat line — zero vol
+    px[8, 100:110] = np.nan                     # mid-history hole
+
+    tickers = [f"T{i:03d}" for i in range(n_tickers)]
+    return pd.DataFrame(px, index=tickers, columns=dates)
+
+
+class TestSharpeMatrixParity(unittest.TestCase):
+
+    def setUp(self):
+        self.prices  = make_panel()
+        self.tickers = list(self.prices.index)
+
+    def assertFramesMatch(self, a: pd.DataFrame, b: pd.DataFrame):
+        pd.testing.assert_frame_equal(a, b, check_exact=False, rtol=1e-9, atol=1e-12)
+
+    def test_raw_sharpe_matches_per_ticker_path(self):
+        loop_s, loop_z = ml.compute_sharpe(
+            self.prices, self.tickers, WINDOWS, RFR_DAILY, engine="loop")
+        mat_s, mat_z = ml.compute_sharpe(
+            self.prices, self.tickers, WINDOWS, RFR_DAILY)
+        self.assertFramesMatch(loop_s, mat_s)
+        self.assertFramesMatch(loop_z, mat_z)
+
+    def test_adjusted_sharpe_matches_per_ticker_path(self):
+        loop_s, loop_z = ml.compute_adjusted_sharpe(
+            self.prices, self.tickers, WINDOWS, RFR_DAILY, engine="loop")
+        mat_s, mat_z = ml.compute_adjusted_sharpe(
+            self.prices, self.tickers, WINDOWS, RFR_DAILY)
+        self.assertFramesMatch(loop_s, mat_s)
+        self.assertFramesMatch(loop_z, mat_z)
+
+    def test_nan_semantics(self):
+        s = ml.compute_sharpe_matrix(self.prices, self.tickers, WINDOWS, RFR_DAILY)
+        self.assertTrue(s.loc["T001", ["12M", "9M"]].isna().all())
+        self.assertTrue(s.loc["T001", ["6M", "3M"]].notna().all())
+        self.assertTrue(s.loc[["T005", "T006", "T007"]].isna().all().all())
+
+    def test_ticker_subset_and_order(self):
+        subset = ["T010", "T003", "T000"]
+        s = ml.compute_sharpe_matrix(self.prices, subset, WINDOWS, RFR_DAILY)
+        self.assertEqual(list(s.index), subset)
+        self.assertAlmostEqual(
+            s.loc["T003", "6M"],
+            ml._sharpe_ratio(self.prices.loc["T003"], 126, RFR_DAILY, 252))
+
+
+class TestRegressionMatrixParity(unittest.TestCase):
+
+    def setUp(self):
+        panel        = make_panel(n_tickers=41)
+        self.nifty   = panel.iloc[0].copy()
+        self.nifty.iloc[[20, 150, 151, 260]] = np.nan     # market holidays / gaps
+        self.prices  = panel.iloc[1:]
+        self.tickers = list(self.prices.index)
+
+    def test_residual_momentum_matches_per_ticker_path(self):
+        loop_r, loop_z = ml.compute_residual_momentum(
+            self.prices, self.tickers, self.nifty, WINDOWS, 252, RFR_DAILY, engine="loop")
+        mat_r, mat_z = ml.compute_residual_momentum(
+            self.prices, self.tickers, self.nifty, WINDOWS, 252, RFR_DAILY)
+        pd.testing.assert_frame_equal(loop_r, mat_r, rtol=1e-9, atol=1e-12)
+        pd.testing.assert_frame_equal(loop_z, mat_z, rtol=1e-9, atol=1e-12)
+
+    def test_beta_matches_per_ticker_path(self):
+        for window in (252, 63):
+            loop_b = ml.compute_beta(self.prices, self.tickers, self.nifty,
+                                     window=window, engine="loop")
+            mat_b  = ml.compute_beta(self.prices, self.tickers, self.nifty, window=window)
+            pd.testing.assert_series_equal(loop_b, mat_b, rtol=1e-9, atol=1e-12)
+        self.assertTrue(np.isnan(mat_b["T005"]) and np.isnan(mat_b["T006"]))
+
+
+def write_workbook(path: Path, prices: pd.DataFrame, nifty: pd.Series):
+    """Write a DATA + VOLUME workbook in the update_stock_price.py layout."""
+    wb = openpyxl.Workbook()
+    wb.remove(wb.active)
+    for sheet in ("DATA", "VOLUME"):
+        ws = wb.create_sheet(sheet)
+        ws.cell(row=1, column=1, value="TICKER")
+        for c, d in enumerate(prices.columns, start=2):
+            ws.cell(row=1, column=c, value=d)
+        rows = [("NIFTY 500", nifty)] + list(prices.iterrows())
+        for r, (ticker, series) in enumerate(rows, start=2):
+            ws.cell(row=r, column=1, value=ticker)
+            for c, v in enumerate(series.values, start=2):
+                if pd.notna(v):
+                    ws.cell(row=r, column=c, value=float(round(v, 2)))
+    wb.save(path)
+
+
+class TestPriceStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp   = tempfile.TemporaryDirectory()
+        self.xlsx  = Path(self.tmp.name) / "U_updated.xlsx"
+        panel      = make_panel(n_tickers=10, n_days=30)
+        self.nifty = panel.iloc[0]
+        write_workbook(self.xlsx, panel.iloc[1:], self.nifty)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_store_round_trip_matches_xlsx(self):
+        from_xlsx = ml.load_prices(str(self.xlsx), use_store=False)
+        written   = ml.write_price_store(str(self.xlsx))
+        self.assertEqual({p.name for p in written},
+                         {"U_updated.DATA.npz", "U_updated.VOLUME.npz"})
+        from_store = ml.read_price_store(str(self.xlsx), "DATA")
+        self.assertIsNotNone(from_store)
+
+        loaded = ml.load_prices(str(self.xlsx))
+        pd.testing.assert_frame_equal(from_xlsx[0], loaded[0])
+        pd.testing.assert_series_equal(from_xlsx[1], loaded[1])
+        self.assertEqual(from_xlsx[2], loaded[2])
+        self.assertEqual(from_xlsx[3], loaded[3])
+        self.assertIsInstance(loaded[3][0], datetime.date)
+        pd.testing.assert_frame_equal(ml.load_volume(str(self.xlsx), use_store=False),
+                                      ml.load_volume(str(self.xlsx)))
+
+    def test_stale_store_is_ignored_and_rebuilt(self):
+        ml.write_price_store(str(self.xlsx))
+        panel = make_panel(n_tickers=10, n_days=30, seed=99)
+        write_workbook(self.xlsx, panel.iloc[1:], panel.iloc[0])
+        self.assertIsNone(ml.read_price_store(str(self.xlsx), "DATA"))
+
+        prices_df, _, _, _ = ml.load_prices(str(self.xlsx))
+        self.assertAlmostEqual(prices_df.loc["T009"].iloc[0], round(panel.loc["T009"].iloc[0], 2))
+        self.assertIsNotNone(ml.read_price_store(str(self.xlsx), "DATA"))
+
+
+class TestCircuitHits(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.csv = Path(self.tmp.name) / "bands.csv"
+        self.csv.write_text("Symbol,Series,Security Name,Band,Remarks\n"
+                            "AAA,EQ,A,20,-\n"
+                            "BBB,BE,B,No Band,-\n"
+                            "CCC,EQ,C,2,-\n"
+                            "CCC,W1,C,2,-\n")
+        dates = pd.bdate_range("2025-01-01", periods=8).date
+        self.prices = pd.DataFrame(
+            [[100, 120, 144, 115.2, 115.2, np.nan, 138.24, 138.24],  # 20% band
+             [100, 105, 99.75, 94.8, np.nan, 94.8, 99.54, 99.54],    # default 5%
+             [100, 102, 102, 99.96, 99.96, 99.96, 101.96, 100]],     # 2% band
+            index=["AAA", "BBB", "CCC"], columns=dates)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_band_list_parsed_once(self):
+        bands = ml.load_price_bands(self.csv)
+        self.assertEqual(list(bands.index), ["AAA", "BBB", "CCC"])
+        self.assertEqual(bands.loc["CCC", "SERIES"], "W1")
+        self.assertTrue(np.isnan(bands.loc["BBB", "BAND"]))
+        self.assertTrue(ml.load_price_bands(Path(self.tmp.name) / "missing.csv").empty)
+
+    def test_counts_across_gaps_and_lookbacks(self):
+        tickers = ["AAA", "BBB", "CCC", "ZZZ"]
+        full = ml.compute_circuit_hits(self.prices, tickers, str(self.csv))
+        self.assertEqual(full.loc["AAA"].tolist(), [3, 1, 4])   # gap-spanning UC counts
+        self.assertEqual(full.loc["BBB"].tolist(), [2, 2, 4])
+        self.assertEqual(full.loc["CCC"].tolist(), [2, 2, 4])
+        self.assertEqual(full.loc["ZZZ"].tolist(), [0, 0, 0])
+        short = ml.compute_circuit_hits(self.prices, tickers, str(self.csv), lookback_period=2)
+        self.assertEqual(short.loc["AAA"].tolist(), [1, 0, 1])
+
+    def test_history_matches_sliced_counts(self):
+        tickers = list(self.prices.index)
+        uc, lc = ml.circuit_hit_history(self.prices, tickers, str(self.csv), lookback_period=3)
+        for idx in range(len(self.prices.columns)):
+            sliced = ml.compute_circuit_hits(self.prices.iloc[:, :idx + 1], tickers,
+                                             str(self.csv), lookback_period=3)
+            self.assertEqual(uc.iloc[:, idx].tolist(), sliced["UC_COUNT"].tolist())
+            self.assertEqual(lc.iloc[:, idx].tolist(), sliced["LC_COUNT"].tolist())
+
+
+class TestEarlyMoverSignals(unittest.TestCase):
+
+    @staticmethod
+    def loop_slope_streak(series):
+        """Per-ticker reference: the dashboard's original polyfit / while-loop."""
+        clean  = series[~np.isnan(series)]
+        window = clean[-5:]
+        slope  = float(np.polyfit(np.arange(len(window)), window, 1)[0]) if len(window) >= 2 else 0.0
+        streak = 0
+        for i in range(len(clean) - 1, 0, -1):
+            if clean[i] > clean[i - 1]:
+                streak += 1
+            else:
+                break
+        return slope, streak
+
+    def test_matches_per_ticker_loop(self):
+        rng = np.random.default_rng(3)
+        mat = np.round(np.cumsum(rng.normal(0, 0.1, (30, 40)), axis=0), 4)
+        mat[rng.random(mat.shape) < 0.2] = np.nan
+        mat[:, 0]  = np.nan                 # never scored
+        mat[:, 1]  = np.nan
+        mat[-1, 1] = 1.5                    # single point
+        mat[:, 2]  = np.arange(30)          # rising every run
+        scores = pd.DataFrame(mat, columns=[f"T{j:02d}" for j in range(40)])
+        z3m    = scores.iloc[:, ::-1] * 0.5 # reversed column order on purpose
+
+        sig = ml.early_mover_signals(scores, z3m)
+        for j, ticker in enumerate(scores.columns):
+            exp_slope, exp_streak = self.loop_slope_streak(mat[:, j])
+            self.assertAlmostEqual(sig.loc[ticker, "VELOCITY"], exp_slope, places=10)
+            self.assertEqual(sig.loc[ticker, "STREAK"], exp_streak)
+            if sig.loc[ticker, "N_RUNS"] >= 2:
+                self.assertAlmostEqual(sig.loc[ticker, "Z3M_VELOCITY"], exp_slope * 0.5, places=10)
+                self.assertEqual(sig.loc[ticker, "Z3M_STREAK"], exp_streak)
+        self.assertEqual(sig.loc["T02", "STREAK"], 29)
+        self.assertEqual(sig.loc["T01", "N_RUNS"], 1)
+        self.assertTrue(np.isnan(sig.loc["T01", "Z3M_STREAK"]))
+        self.assertEqual(sig.loc["T02", "SCORE_2"], 27)
+
+
+class TestRankingsCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp     = tempfile.TemporaryDirectory()
+        panel        = make_panel(n_tickers=31)
+        self.nifty   = panel.iloc[0]
+        self.prices  = panel.iloc[1:]
+        self.tickers = list(self.prices.index)
+        self.params  = dict(band_csv_path=None, circuit_filter_enabled=False,
+                            eq_series_filter=False, windows=WINDOWS)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def rank(self, **overrides):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            res = ml.cached_universe_rankings(
+                self.prices, self.nifty, self.tickers, cache_dir=self.tmp.name,
+                **{**self.params, **overrides})
+        return res, "cache hit" in out.getvalue()
+
+    def test_hit_returns_identical_output(self):
+        (r1, s1, d1), hit1 = self.rank()
+        (r2, s2, d2), hit2 = self.rank()
+        self.assertFalse(hit1)
+        self.assertTrue(hit2)
+        pd.testing.assert_frame_equal(r1, r2)
+        self.assertEqual((s1, d1), (s2, d2))
+
+    def test_param_or_data_change_misses(self):
+        self.rank()
+        self.assertFalse(self.rank(min_n=3)[1])
+        self.prices = self.prices * 1.01
+        self.assertFalse(self.rank()[1])
+
+    def test_precomputed_table_is_keyed(self):
+        frame = rs.ranking_state_frame(
+            rs.build_ranking_state(self.prices, self.tickers, WINDOWS), RFR_DAILY)
+        self.rank()
+        self.assertFalse(self.rank(precomputed=frame)[1])     # state path ≠ full recompute
+        self.assertTrue(self.rank(precomputed=frame)[1])
+        self.assertFalse(self.rank(precomputed=frame * 1.0001)[1])
+
+    def test_series_column_keeps_list_dtype(self):
+        csv = Path(self.tmp.name) / "bands.csv"
+        csv.write_text("Symbol,Series,Security Name,Band,Remarks\nT01,BE,B,5,-\n")
+        (first, _, _), _  = self.rank(band_csv_path=str(csv))
+        (cached, _, _), hit = self.rank(band_csv_path=str(csv))
+        ref = pd.DataFrame(index=first.index)
+        ref["SERIES"] = ["BE" if t == "T01" else "EQ" for t in first.index]   # the old list build
+        self.assertTrue(hit)
+        for res in (first, cached):
+            pd.testing.assert_series_equal(res["SERIES"], ref["SERIES"])
+
+    def test_lru_eviction_by_size(self):
+        self.rank(min_n=3)
+        self.rank(min_n=4, max_cache_mb=1e-6)
+        self.assertEqual(len(list(Path(self.tmp.name).glob("*.npz"))), 0)
+        self.rank(min_n=5)
+        self.rank(min_n=6)
+        self.rank(min_n=5)                       # touch → most recent
+        entries = sorted(Path(self.tmp.name).glob("*.npz"))
+        size    = max(p.stat().st_size for p in entries)
+        self.rank(min_n=7, max_cache_mb=2.5 * size / (1024 * 1024))
+        self.assertTrue(self.rank(min_n=5)[1])
+        self.assertFalse(self.rank(min_n=6, max_cache_mb=1e6)[1])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
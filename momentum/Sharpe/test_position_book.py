@@ -0,0 +1,189 @@
+"""
+Unit tests for position_book.py — incremental appends must match a full
+replay, edits / deletes / back-dated entries must trigger one, and both
+must reproduce the dashboards' former calculate_holdings_and_pnl /
+validate_tradelog_integrity (kept below as legacy_* reference copies).
+
+Run:  python test_position_book.py
+"""
+
+import datetime
+import json
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+import position_book as pb
+
+
+def make_tradelog(n: int = 120, seed: int = 5) -> list:
+    """Random but valid BUY / SELL sequence across a handful of tickers."""
+    rng, held, txs = random.Random(seed), {}, []
+    for i in range(n):
+        ticker = rng.choice(["AAA", "BBB", "CCC", "DDD"])
+        if held.get(ticker, 0) > 0 and rng.random() < 0.4:
+            action, qty = "SELL", rng.randint(1, held[ticker])
+            held[ticker] -= qty
+        else:
+            action, qty = "BUY", rng.randint(1, 50)
+            held[ticker] = held.get(ticker, 0) + qty
+        txs.append({"id": f"tx{i}", "date": f"2026-{1 + i // 28:02d}-{1 + i % 28:02d}",
+                    "timestamp": f"T{i:04d}", "ticker": ticker, "action": action,
+                    "quantity": qty, "price": round(rng.uniform(50, 150), 2)})
+    return txs
+
+
+def legacy_validate(transactions):
+    """validate_tradelog_integrity() as it was in sharpe_dashboard.py."""
+    try:
+        sorted_txs = sorted(transactions, key=lambda x: (x.get("date", ""), x.get("timestamp", "")))
+    except Exception:
+        sorted_txs = transactions
+    holdings = {}
+    for tx in sorted_txs:
+        ticker = tx["ticker"]
+        action = tx["action"].upper()
+        qty = float(tx["quantity"])
+        current = holdings.get(ticker, 0.0)
+        if action == "BUY":
+            holdings[ticker] = current + qty
+        elif action == "SELL":
+            if qty > current + 1e-9:
+                return False, (f"{ticker}: SELL of {qty:.0f} shares exceeds "
+                               f"holding of {current:.0f} shares on {tx.get('date', '?')}")
+            holdings[ticker] = current - qty
+    return True, ""
+
+
+def legacy_holdings_and_pnl(transactions, latest_prices=None):
+    """calculate_holdings_and_pnl() as it was in sharpe_dashboard.py."""
+    try:
+        sorted_txs = sorted(transactions, key=lambda x: (x.get("date", ""), x.get("timestamp", "")))
+    except Exception:
+        sorted_txs = transactions
+
+    holdings = {}
+    realized_pnl = 0.0
+    realized_pnl_by_ticker = {}
+    for tx in sorted_txs:
+        ticker = tx["ticker"]
+        action = tx["action"].upper()
+        qty = float(tx["quantity"])
+        price = float(tx["price"])
+        tx_date = tx.get("date", "")
+        if isinstance(tx_date, str):
+            try:
+                tx_date = datetime.date.fromisoformat(tx_date)
+            except Exception:
+                tx_date = datetime.date.today()
+        if ticker not in holdings:
+            holdings[ticker] = {"qty": 0.0, "avg_price": 0.0, "first_buy_date": None,
+                                "total_cost": 0.0}
+        h = holdings[ticker]
+        t_pnl = realized_pnl_by_ticker.get(ticker, 0.0)
+        if action == "BUY":
+            if h["qty"] == 0:
+                h["first_buy_date"] = tx_date
+            h["total_cost"] += qty * price
+            h["qty"] += qty
+            h["avg_price"] = h["total_cost"] / h["qty"]
+        elif action == "SELL":
+            if h["qty"] > 0:
+                sell_qty = min(qty, h["qty"])
+                pnl = sell_qty * (price - h["avg_price"])
+                realized_pnl += pnl
+                t_pnl += pnl
+                h["qty"] -= sell_qty
+                h["total_cost"] = h["qty"] * h["avg_price"]
+                if h["qty"] == 0:
+                    h["avg_price"] = 0.0
+                    h["first_buy_date"] = None
+        realized_pnl_by_ticker[ticker] = t_pnl
+
+    active_holdings = {ticker: h for ticker, h in holdings.items() if h["qty"] > 0}
+    unrealized_pnl = 0.0
+    holdings_metrics = []
+    for ticker, h in active_holdings.items():
+        curr_price = h["avg_price"]
+        if latest_prices is not None and ticker in latest_prices:
+            curr_price = latest_prices[ticker]
+        market_val = h["qty"] * curr_price
+        u_pnl = market_val - h["total_cost"]
+        unrealized_pnl += u_pnl
+        u_pnl_pct = (u_pnl / h["total_cost"] * 100) if h["total_cost"] > 0 else 0.0
+        holdings_metrics.append({
+            "Ticker": ticker, "Qty": h["qty"], "Avg Price": h["avg_price"],
+            "Current Price": curr_price, "Cost Value": h["total_cost"],
+            "Market Value": market_val, "Unrealized PnL": u_pnl,
+            "Unrealized PnL %": u_pnl_pct, "First Buy Date": h["first_buy_date"],
+        })
+    return {"active_holdings": active_holdings, "holdings_metrics": holdings_metrics,
+            "realized_pnl": realized_pnl, "realized_pnl_by_ticker": realized_pnl_by_ticker,
+            "unrealized_pnl": unrealized_pnl}
+
+
+class TestPositionBook(unittest.TestCase):
+
+    def setUp(self):
+        self.txs = make_tradelog()
+
+    def assert_same(self, book, transactions):
+        prices = {"AAA": 100.0, "CCC": 90.0}
+        self.assertEqual(pb.holdings_and_pnl(book, prices),
+                         legacy_holdings_and_pnl(transactions, prices))
+        self.assertEqual(pb.calculate_holdings_and_pnl(transactions, prices),
+                         legacy_holdings_and_pnl(transactions, prices))
+
+    def test_appends_are_incremental(self):
+        book = json.loads(json.dumps(pb.replay(self.txs[:80])))   # as persisted
+        for tx in self.txs[80:100]:
+            ok, err = pb.validate_append(book, self.txs[:book["checkpoint"]["count"]], tx)
+            self.assertTrue(ok, err)
+            pb.apply_transaction(book, tx)
+        book, replayed = pb.sync_book(book, self.txs)
+        self.assertFalse(replayed)
+        self.assert_same(book, self.txs)
+
+    def test_edit_delete_and_backdated_replay(self):
+        book = pb.replay(self.txs)
+        edited = [dict(tx) for tx in self.txs]
+        edited[10]["price"] += 1.0
+        backdated = self.txs + [dict(self.txs[0], id="late", timestamp="T0000a")]
+        for candidate in (edited, self.txs[:50] + self.txs[51:], backdated):
+            synced, replayed = pb.sync_book(json.loads(json.dumps(book)), candidate)
+            self.assertTrue(replayed)
+            self.assert_same(synced, candidate)
+
+    def test_validation_and_open_book(self):
+        book = pb.replay(self.txs)
+        held = book["positions"]["AAA"]["qty"]
+        oversell = {"id": "x", "date": "2027-01-01", "timestamp": "", "ticker": "AAA",
+                    "action": "SELL", "quantity": held + 1, "price": 1.0}
+        self.assertFalse(pb.validate_append(book, self.txs, oversell)[0])
+        self.assertEqual(pb.validate_append(book, self.txs, oversell),
+                         legacy_validate(self.txs + [oversell]))
+        self.assertEqual(pb.validate_transactions(self.txs), legacy_validate(self.txs))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "U_tradelog.json"
+            path.write_text(json.dumps(self.txs))
+            first = pb.open_book(path, self.txs)
+            self.assertTrue(pb.book_path(path).exists())
+            self.assertEqual(pb.open_book(path, self.txs), first)
+            self.assert_same(first, self.txs)
+
+    def test_book_not_saved_when_tradelog_write_failed(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "U_tradelog.json"
+            path.write_text(json.dumps(self.txs[:80]))
+            pb.open_book(path, self.txs[:80])
+            saved = pb.load_book(pb.book_path(path))
+            # the dashboard's save_tradelog() failed: the file still holds 80 transactions
+            self.assert_same(pb.open_book(path, self.txs[:100]), self.txs[:100])
+            self.assertEqual(pb.load_book(pb.book_path(path)), saved)
+            self.assert_same(pb.open_book(path, self.txs[:80]), self.txs[:80])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,81 @@
+"""
+Unit tests for precompute.py — snapshot round trip, staleness checks and
+the vectorized STOCKDB cap-tier table.
+
+Run:  python test_precompute.py
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import pandas as pd
+
+import momentum_lib as ml
+import precompute as pc
+from test_momentum_lib import make_panel, write_workbook
+
+
+class TestSnapshot(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp    = tempfile.TemporaryDirectory()
+        cls.base   = Path(cls.tmp.name)
+        cls.xlsx   = cls.base / "U_updated.xlsx"
+        cls._cache = ml.RANKINGS_CACHE_DIR
+        ml.RANKINGS_CACHE_DIR = cls.base / "rankings_cache"
+        cls.prices = make_panel(n_tickers=30, n_days=300)
+        write_workbook(cls.xlsx, cls.prices, cls.prices.iloc[0].rename("NIFTY 500"))
+        tiers = ["LARGECAP", "MIDCAP", "SMALLCAP", "MICROCAP"]
+        pd.DataFrame({"SYMBOL":    cls.prices.index[:24],
+                      "MARKETCAP": [tiers[i % 4] for i in range(24)]}
+                     ).to_csv(cls.base / pc.STOCKDB_CSV, index=False)
+        ml.save_config({"min_turnover": 0, "eq_series_filter": False,
+                        "circuit_filter_enabled": False, "circuit_threshold": 3}, cls.base)
+        cls.params = pc.snapshot_params(0, False, False, 3)
+        cls.built  = pc.refresh_snapshots(cls.base)
+
+    @classmethod
+    def tearDownClass(cls):
+        ml.RANKINGS_CACHE_DIR = cls._cache
+        cls.tmp.cleanup()
+
+    def test_round_trip_matches_build(self):
+        self.assertEqual(self.built, [self.xlsx])
+        snap = pc.load_snapshot(self.xlsx, self.params)
+        self.assertIsNotNone(snap)
+        fresh = pc.build_snapshot(self.xlsx, self.params, record_scores=False)
+        for name in pc.SNAPSHOT_FRAMES:
+            pd.testing.assert_frame_equal(snap[name], fresh[name])
+        self.assertAlmostEqual(snap["regime_score"], fresh["regime_score"], places=12)
+        self.assertEqual(snap["score_runs"][0], 1)          # run recorded by the service
+        self.assertEqual(pc.refresh_snapshots(self.base), [])
+
+    def test_stale_on_params_or_input_change(self):
+        self.assertIsNone(pc.load_snapshot(self.xlsx, pc.snapshot_params(5, False, False, 3)))
+        stockdb = self.base / pc.STOCKDB_CSV
+        original = stockdb.read_bytes()
+        try:
+            stockdb.write_bytes(original + b"EXTRA,LARGECAP\n")
+            self.assertIsNone(pc.load_snapshot(self.xlsx, self.params))
+        finally:
+            stockdb.write_bytes(original)
+        self.assertIsNotNone(pc.load_snapshot(self.xlsx, self.params))
+
+    def test_cap_tier_dual_matches_per_ticker_loop(self):
+        snap    = pc.load_snapshot(self.xlsx, self.params)
+        stockdb = pc.load_stockdb(self.base / pc.STOCKDB_CSV)
+        result  = snap["result"]
+        for tier, label in pc.CAP_LABELS.items():
+            names  = [t for t in self.prices.index if stockdb.get(t) == tier]
+            ret_63 = [self.prices.loc[t].dropna() for t in names]
+            ret_63 = sum(1 for px in ret_63 if len(px) >= 63 and px.iloc[-1] / px.iloc[-63] > 1)
+            s3m    = int((result.loc[names, "S_3M"] > 0).sum())
+            row    = snap["cap_tiers"].set_index("Cap Tier").loc[label]
+            self.assertEqual((row["Total"], row["63D Ret +ve"], row["3M Sharpe +ve"]),
+                             (len(names), ret_63, s3m))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,94 @@
+"""
+Unit tests for ranking_state.py — an incrementally advanced state must give
+the same Sharpe / 52W-high / EMA values as a full recompute on the panel,
+for growing panels and for a fixed-width rolling window.
+
+Run:  python test_ranking_state.py
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import momentum_lib as ml
+import ranking_state as rs
+from test_momentum_lib import RFR_DAILY, WINDOWS, make_panel
+
+
+class TestRankingState(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.prices  = make_panel(n_tickers=30, n_days=420)
+        cls.tickers = list(cls.prices.index)
+
+    def assert_matches_full(self, frame, prices, tickers):
+        sharpe = ml.compute_sharpe_matrix(prices, tickers, WINDOWS, RFR_DAILY)
+        pd.testing.assert_frame_equal(frame[list(WINDOWS)], sharpe,
+                                      rtol=1e-8, atol=1e-10)
+        pct = ml.compute_pct_from_52h(prices, tickers)
+        pd.testing.assert_series_equal(frame["PCT_FROM_52H"], pct,
+                                       check_names=False, rtol=1e-12)
+        for span in rs.DEFAULT_EMA_SPANS:
+            ema = prices.loc[tickers].T.ewm(span=span, adjust=False).mean().iloc[-1]
+            pd.testing.assert_series_equal(frame[f"EMA{span}"], ema,
+                                           check_names=False, rtol=1e-10)
+        pd.testing.assert_series_equal(frame["LAST_PX"], prices.loc[tickers].iloc[:, -1],
+                                       check_names=False)
+
+    def test_advance_matches_full_recompute(self):
+        state = rs.build_ranking_state(self.prices.iloc[:, :300], self.tickers, WINDOWS)
+        state, info = rs.advance_ranking_state(state, self.prices, self.tickers)
+        self.assertEqual(info, {"advanced": 120, "rebuilt": 0, "full_rebuild": False})
+        self.assert_matches_full(rs.ranking_state_frame(state, RFR_DAILY),
+                                 self.prices, self.tickers)
+
+    def test_rolling_window_matches_full_recompute(self):
+        # fixed 261-column window, as in the N750 workbooks
+        width = 261
+        state = rs.build_ranking_state(self.prices.iloc[:, :width], self.tickers, WINDOWS)
+        for end in list(range(width + 1, width + 6)) + [width + 30, len(self.prices.columns)]:
+            panel = self.prices.iloc[:, end - width:end]
+            state, info = rs.advance_ranking_state(state, panel, self.tickers)
+            self.assertFalse(info["full_rebuild"])
+            self.assert_matches_full(rs.ranking_state_frame(state, RFR_DAILY),
+                                     panel, self.tickers)
+
+    def test_corporate_action_and_new_ticker_rebuild(self):
+        state = rs.build_ranking_state(self.prices.iloc[:, :400], self.tickers[:-1], WINDOWS)
+
+        # 1:2 split on day 405 back-adjusts T010's whole history
+        adjusted = self.prices.copy()
+        adjusted.iloc[10, :405] = adjusted.iloc[10, :405] / 2.0
+        state, info = rs.advance_ranking_state(state, adjusted, self.tickers)
+        # T010 (restated) + T029 (new) + T004 (suspended, cannot be verified)
+        self.assertEqual(info["rebuilt"], 3)
+        self.assert_matches_full(rs.ranking_state_frame(state, RFR_DAILY),
+                                 adjusted, self.tickers)
+
+    def test_update_round_trip_and_rankings(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            xlsx = str(Path(tmp) / "N750_updated.xlsx")
+            rs.update_ranking_state(xlsx, self.prices.iloc[:, :410], self.tickers, WINDOWS)
+            state = rs.update_ranking_state(xlsx, self.prices, self.tickers, WINDOWS)
+            self.assertTrue(rs.ranking_state_path(xlsx).exists())
+        frame = rs.ranking_state_frame(state, RFR_DAILY)
+        self.assert_matches_full(frame, self.prices, self.tickers)
+
+        nifty = self.prices.iloc[0].rename("NIFTY500")
+        args  = dict(band_csv_path=None, circuit_filter_enabled=False,
+                     rfr_annual=RFR_DAILY * 252)
+        full, full_score, _ = ml.compute_universe_rankings(
+            self.prices, nifty, self.tickers, **args)
+        incr, incr_score, _ = ml.compute_universe_rankings(
+            self.prices, nifty, self.tickers, precomputed=frame, **args)
+        self.assertAlmostEqual(incr_score, full_score, places=12)
+        pd.testing.assert_series_equal(incr["COMPOSITE"], full["COMPOSITE"], rtol=1e-8)
+        pd.testing.assert_series_equal(incr["RANK"], full["RANK"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,102 @@
+"""
+Unit tests for score_history.py — append / supersede / compaction round
+trips.
+
+Run:  python test_score_history.py
+"""
+
+import json
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import score_history as sh
+
+
+class TestScoreStore(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp  = tempfile.TemporaryDirectory()
+        self.store = Path(self._tmp.name) / "N750_score_history"
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_append_supersede_and_new_tickers(self):
+        sh.append_score_run(self.store, "2026-01-05", "m1",
+                            pd.Series({"AAA": 1.0, "BBB": 2.0}), pd.Series({"AAA": 0.5}))
+        sh.append_score_run(self.store, "2026-01-06", "m2",
+                            pd.Series({"AAA": 1.1, "BBB": 2.1}))
+        sh.append_score_run(self.store, "2026-01-06", "m3",      # same day → replaces
+                            pd.Series({"AAA": 1.2, "CCC": 3.0}))
+        out = sh.load_score_store(self.store)
+        self.assertEqual(out["run_dates"], ["2026-01-05", "2026-01-06"])
+        self.assertEqual(out["file_mtimes"], ["m1", "m3"])
+        self.assertEqual(out["tickers"], ["AAA", "BBB", "CCC"])
+        np.testing.assert_array_equal(
+            out["scores"], np.array([[1.0, 2.0, np.nan], [1.2, np.nan, 3.0]], dtype=np.float32))
+        self.assertEqual(out["z3m"][0, 0], np.float32(0.5))
+
+    def test_compaction_keeps_last_runs(self):
+        for day in range(1, 10):
+            sh.append_score_run(self.store, f"2026-02-{day:02d}", str(day),
+                                pd.Series({"AAA": float(day)}), max_runs=3)
+        out = sh.load_score_store(self.store, max_runs=3)
+        self.assertEqual(out["run_dates"], ["2026-02-07", "2026-02-08", "2026-02-09"])
+        np.testing.assert_array_equal(out["scores"][:, 0], [7.0, 8.0, 9.0])
+        self.assertLessEqual(len((self.store / sh.INDEX_FILE).read_text().splitlines()), 6)
+        self.assertEqual(len(list(self.store.glob("values.*.f32"))), 1)
+
+    def test_concurrent_writers_keep_tickers_unique(self):
+        # dashboard and precompute thread both adding the same new tickers
+        def write(day):
+            sh.append_score_run(self.store, f"2026-03-{day:02d}", str(day),
+                                pd.Series({f"T{k}": float(day) for k in range(40)}))
+        threads = [threading.Thread(target=write, args=(d,)) for d in range(1, 9)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        raw = (self.store / sh.TICKERS_FILE).read_text().split()
+        self.assertEqual(len(raw), 40)
+        out = sh.load_score_store(self.store)
+        self.assertEqual(len(out["run_dates"]), 8)
+        for i, day in enumerate(out["run_dates"]):
+            np.testing.assert_array_equal(out["scores"][i], float(day[-2:]))
+
+    def test_duplicate_tickers_are_dropped_on_load(self):
+        # a store written by unlocked writers: BBB listed twice
+        sh.append_score_run(self.store, "2026-04-01", "m1", pd.Series({"AAA": 1.0, "BBB": 2.0}))
+        with open(self.store / sh.TICKERS_FILE, "a") as f:
+            f.write("BBB\n")
+        sh.append_score_run(self.store, "2026-04-02", "m2",
+                            pd.Series({"AAA": 1.5, "BBB": 2.5, "CCC": 3.5}))
+        out = sh.load_score_store(self.store)
+        self.assertEqual(out["tickers"], ["AAA", "BBB", "CCC"])
+        np.testing.assert_array_equal(
+            out["scores"], np.array([[1.0, 2.0, np.nan], [1.5, 2.5, 3.5]], dtype=np.float32))
+
+    def test_json_import_runs_once_with_one_fsync(self):
+        legacy = Path(self._tmp.name) / "N750_score_history.json"
+        legacy.write_text(json.dumps([
+            {"run_date": f"2026-05-{d:02d}", "file_mtime": str(d),
+             "scores": {"AAA": float(d), "BBB": -float(d)}, "z3m_scores": {"AAA": 0.1 * d}}
+            for d in range(1, 6)]))
+        with mock.patch("score_history.os.fsync") as fsync:
+            store_dir = sh.ensure_score_store(self._tmp.name, "N750")
+            sh.ensure_score_store(self._tmp.name, "N750")          # already imported
+        self.assertEqual(store_dir, self.store)
+        self.assertEqual(fsync.call_count, 1)
+        out = sh.load_score_store(self.store)
+        self.assertEqual(len(out["run_dates"]), 5)
+        np.testing.assert_array_equal(out["scores"][:, 1], [-1.0, -2.0, -3.0, -4.0, -5.0])
+        self.assertEqual(sh.empty_score_store()["scores"].shape, (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
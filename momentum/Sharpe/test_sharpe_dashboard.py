@@ -0,0 +1,95 @@
+"""
+AppTest checks for sharpe_dashboard.py — the lazily rendered tabs, the
+memoized Top 25 / Full Rankings frames and the paged Full Rankings table.
+The dashboard runs on a copy of N500_updated.xlsx in a temporary folder,
+so its tradelog / ledger / history writes never touch the real files.
+Skipped when streamlit / yfinance / openpyxl are not installed.
+
+Run:  python test_sharpe_dashboard.py
+"""
+
+import importlib.util
+import json
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+HAVE_DEPS = all(importlib.util.find_spec(m) for m in ("streamlit", "yfinance", "openpyxl"))
+if HAVE_DEPS:
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    import momentum_lib as ml
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+DATA_FILES = ["N500_updated.xlsx", "Price_Band_List.csv", "Sector Metadata.csv", "STOCKDB.csv"]
+TOP_25     = "📊 Top 25 Rankings"
+FULL       = "📋 Full Rankings"
+
+
+@unittest.skipUnless(HAVE_DEPS, "streamlit / yfinance / openpyxl not installed")
+class TestSharpeDashboard(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls._tmp = tempfile.TemporaryDirectory()
+        tmp      = Path(cls._tmp.name)
+        shutil.copy(SCRIPT_DIR / "sharpe_dashboard.py", tmp)
+        for name in DATA_FILES:
+            shutil.copy(SCRIPT_DIR / name, tmp)
+        with open(tmp / ml.CONFIG_FILENAME, "w") as f:
+            json.dump({"file": "N500_updated.xlsx"}, f)
+        cls.app_path  = str(tmp / "sharpe_dashboard.py")
+        cls._cache    = ml.RANKINGS_CACHE_DIR
+        cls._argv     = list(sys.argv)
+        ml.RANKINGS_CACHE_DIR = tmp / "rankings_cache"
+        sys.argv.append("--no-precompute")
+
+    @classmethod
+    def tearDownClass(cls):
+        ml.RANKINGS_CACHE_DIR = cls._cache
+        sys.argv[:] = cls._argv
+        st.cache_data.clear()
+        cls._tmp.cleanup()
+
+    def run_tab(self, at, tab):
+        """Rerun with `tab` open (AppTest does not keep the tab selection)."""
+        at.session_state["active_tab"] = tab
+        at.run()
+        self.assertFalse(at.exception, [e.value for e in at.exception])
+        return at
+
+    def frames(self):
+        """Top 25 and the first two Full Rankings pages (top 300, eligible, by composite)."""
+        at  = self.run_tab(AppTest.from_file(self.app_path, default_timeout=300), TOP_25)
+        top = at.dataframe[0].value
+        self.run_tab(at, FULL)
+        at.slider[0].set_value(300)
+        at.selectbox[0].set_value("Eligible only")
+        at.selectbox[1].set_value("COMPOSITE")
+        page1 = self.run_tab(at, FULL).dataframe[0].value
+        at.number_input(key="calcs_page").set_value(2)
+        page2 = self.run_tab(at, FULL).dataframe[0].value
+        return top, page1, page2
+
+    def test_tables_render_and_page(self):
+        top, page1, page2 = self.frames()
+        self.assertEqual(top["Rank"].tolist(), list(range(1, 26)))
+        self.assertEqual((len(page1), len(page2)), (100, 100))
+        composite = page1["COMPOSITE"].tolist() + page2["COMPOSITE"].tolist()
+        self.assertEqual(composite, sorted(composite, reverse=True))
+        self.assertTrue((page1["PCT_FROM_52H"] >= -25).all())
+        self.assertFalse(set(page1["TICKER"]) & set(page2["TICKER"]))
+
+    def test_memoized_tables_match_fresh_render(self):
+        cached = self.frames()
+        self.assertEqual([len(f) for f in self.frames()], [len(f) for f in cached])
+        st.cache_data.clear()
+        for fresh, memo in zip(self.frames(), cached):
+            self.assertTrue(fresh.equals(memo))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
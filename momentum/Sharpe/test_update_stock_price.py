@@ -0,0 +1,108 @@
+"""
+Unit tests for update_stock_price.py --incremental — the overlap check and
+fetch_incremental()'s split between tail appends and full refetches
+(appended day, re-adjusted history, new ticker), and the NIFTY500 row read
+from the shared benchmark store. Skipped when yfinance / openpyxl (the
+script's own imports) are not installed.
+
+Run:  python test_update_stock_price.py
+"""
+
+import datetime
+import importlib.util
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import pandas as pd
+
+HAVE_DEPS = all(importlib.util.find_spec(m) for m in ("yfinance", "openpyxl"))
+if HAVE_DEPS:
+    import update_stock_price as usp
+
+
+def days(n: int, first: datetime.date = datetime.date(2026, 3, 2)) -> list:
+    return [first + datetime.timedelta(days=k) for k in range(n)]
+
+
+@unittest.skipUnless(HAVE_DEPS, "yfinance / openpyxl not installed")
+class TestIncrementalFetch(unittest.TestCase):
+
+    def setUp(self):
+        self.dates = days(12)
+        self.full  = {"AAA":      {d: 100.0 + k for k, d in enumerate(self.dates)},
+                      "BBB":      {d: 50.0 + k for k, d in enumerate(self.dates)},
+                      "NIFTY500": {d: 20000.0 + k for k, d in enumerate(self.dates)}}
+        # stored history (rounded to 2 dp like the workbook) stops two days short
+        self.prev  = {t: {d: round(v, 2) for d, v in m.items() if d <= self.dates[-3]}
+                      for t, m in self.full.items()}
+        self.calls = []
+        self._orig = usp.fetch_history
+        usp.fetch_history = self.fetch
+
+    def tearDown(self):
+        usp.fetch_history = self._orig
+
+    def fetch(self, tickers, start=None, batch_size=None):
+        """fetch_history() over self.full; `start` limits it to the tail."""
+        self.calls.append((sorted(tickers), start))
+        close = {t: {d: v for d, v in self.full.get(t, {}).items() if start is None or d >= start}
+                 for t in tickers}
+        return close, {t: {d: 1000.0 for d in m} for t, m in close.items()}
+
+    def test_appended_days_extend_stored_history(self):
+        self.full["AAA"] = {d: v + 1e-4 for d, v in self.full["AAA"].items()}   # float noise
+        close, volume = usp.fetch_incremental(["AAA", "NIFTY500"], self.prev, {})
+        self.assertEqual(close["AAA"][self.dates[-1]], self.full["AAA"][self.dates[-1]])
+        self.assertEqual(close["AAA"][self.dates[0]], self.prev["AAA"][self.dates[0]])
+        self.assertEqual(len(volume["AAA"]), 1 + usp.OVERLAP_DAYS + 2)
+        start = self.dates[-3] - datetime.timedelta(days=usp.OVERLAP_DAYS)
+        self.assertEqual(self.calls, [(["AAA"], start), (["NIFTY500"], None)])   # index: always full
+
+    def test_dividend_readjustment_refetches_in_full(self):
+        # a 0.3% dividend rescales every earlier close by 0.997
+        self.full["AAA"] = {d: v * (0.997 if d < self.dates[-2] else 1.0)
+                            for d, v in self.full["AAA"].items()}
+        close, _ = usp.fetch_incremental(["AAA", "BBB"], self.prev, {})
+        self.assertEqual(close["AAA"], self.full["AAA"])
+        self.assertEqual(self.calls[-1], (["AAA"], None))
+        self.assertEqual(close["BBB"][self.dates[0]], self.prev["BBB"][self.dates[0]])
+
+    def test_new_ticker_refetches_in_full(self):
+        self.full["CCC"] = {d: 10.0 for d in self.dates}
+        close, _ = usp.fetch_incremental(["AAA", "CCC"], self.prev, {})
+        self.assertEqual(close["CCC"], self.full["CCC"])
+        self.assertEqual(self.calls[-1], (["CCC"], None))
+
+    def test_consistency_tolerance(self):
+        stored = {self.dates[0]: 1234.57, self.dates[1]: 7.35}
+        self.assertTrue(usp.history_is_consistent(stored, {self.dates[0]: 1234.5649,
+                                                           self.dates[1]: 7.3549}))
+        self.assertFalse(usp.history_is_consistent(stored, {self.dates[0]: 1234.57 * 0.999}))
+        self.assertFalse(usp.history_is_consistent(stored, {self.dates[2]: 1.0}))   # no overlap
+
+
+@unittest.skipUnless(HAVE_DEPS, "yfinance / openpyxl not installed")
+class TestBenchmarkRow(unittest.TestCase):
+
+    def test_nifty500_comes_from_benchmark_store(self):
+        dates = pd.bdate_range(end=datetime.date.today(), periods=400)
+        close = pd.Series(20000.0 + pd.RangeIndex(400), index=dates)
+        provider = usp.bs.series_provider(close)
+        with tempfile.TemporaryDirectory() as tmp, \
+             mock.patch.object(usp.bs, "STORE_DIR", Path(tmp)), \
+             mock.patch.object(usp.bs, "yahoo_provider", provider), \
+             mock.patch.object(usp, "batch_download", side_effect=AssertionError):
+            full, volume = usp.fetch_history(["NIFTY500"])         # PERIOD window
+            first = datetime.date.today() - datetime.timedelta(days=usp.PERIOD_DAYS)
+            self.assertEqual(min(full["NIFTY500"]), min(d for d in dates.date if d >= first))
+            self.assertEqual(full["NIFTY500"][dates[-1].date()], close.iloc[-1])
+            self.assertEqual(volume["NIFTY500"], {})
+            tail, _ = usp.fetch_history(["NIFTY500"], start=dates[-10].date())
+            self.assertEqual(list(tail["NIFTY500"]), list(dates[-10:].date))
+            self.assertEqual(len(provider.calls), 1)               # served from the store
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
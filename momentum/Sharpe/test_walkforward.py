@@ -0,0 +1,137 @@
+"""
+Unit tests for walkforward.py — the precomputed cross-section must match a
+point-in-time recomputation on prices_df.iloc[:, :idx+1].
+
+Run:  python test_walkforward.py
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import momentum_lib as ml
+import sweep
+import walkforward as wf
+from test_momentum_lib import RFR_DAILY, WINDOWS, make_panel
+
+
+def slice_vol(px: pd.Series, windows=wf.DEFAULT_VOL_WINDOWS) -> float:
+    """Mean inverse-vol denominator exactly as backtest.py computes it."""
+    px = px.dropna()
+    if len(px) <= 10:
+        return np.nan
+    vols = []
+    for w in windows:
+        px_w  = px.iloc[-w:] if len(px) >= w else px
+        log_r = np.diff(np.log(px_w.values))
+        if len(log_r) > 5:
+            vols.append(np.std(log_r, ddof=1) * np.sqrt(252))
+    return np.mean(vols)
+
+
+class TestWalkForwardParity(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.prices  = make_panel(n_tickers=30, n_days=420)
+        cls.nifty   = cls.prices.iloc[0].rename("NIFTY500")
+        cls.tickers = list(cls.prices.index[1:])
+        cls.panel   = wf.build_walk_forward_panel(
+            cls.prices, cls.nifty, cls.tickers, RFR_DAILY)
+
+    def test_cross_section_matches_sliced_recompute(self):
+        for idx in (60, 130, 251, 300, 419):
+            sliced = self.prices.iloc[:, :idx + 1]
+            sharpe_df, z_df = ml.compute_sharpe(sliced, self.tickers, WINDOWS,
+                                                RFR_DAILY, engine="loop")
+            pct = ml.compute_pct_from_52h(sliced, self.tickers)
+            xs  = wf.walk_forward_cross_section(self.panel, idx, WINDOWS)
+
+            pd.testing.assert_frame_equal(xs[list(WINDOWS)], sharpe_df,
+                                          rtol=1e-9, atol=1e-9)
+            for col in ["Z_12M", "Z_3M", "SHARPE_3"]:
+                pd.testing.assert_series_equal(xs[col], z_df[col], rtol=1e-9,
+                                               atol=1e-9)
+            pd.testing.assert_series_equal(
+                xs["COMPOSITE"], z_df["COMPOSITE"].map(ml.normalise_composite),
+                rtol=1e-9, atol=1e-9)
+            pd.testing.assert_series_equal(xs["PCT_FROM_52H"], pct, check_names=False,
+                                           rtol=1e-12)
+            rel_dd = ml.compute_relative_52h_dd(pct, self.nifty.iloc[:idx + 1])
+            pd.testing.assert_series_equal(xs["REL_52H_DD"], rel_dd, check_names=False,
+                                           rtol=1e-12)
+
+            expected_vol = pd.Series({t: slice_vol(sliced.loc[t]) for t in self.tickers})
+            got_vol      = xs[[f"VOL_{w}" for w in wf.DEFAULT_VOL_WINDOWS]].mean(axis=1)
+            pd.testing.assert_series_equal(got_vol, expected_vol, check_names=False,
+                                           rtol=1e-9, atol=1e-12)
+
+    def test_universe_regime_matches_compute_regime_score(self):
+        regime = wf.universe_breadth_regime()
+        for idx in (150, 260, 419):
+            sliced = self.prices.iloc[:, :idx + 1]
+            xs     = wf.walk_forward_cross_section(self.panel, idx, WINDOWS)
+            mask   = xs["PCT_FROM_52H"] >= -25
+            expected, detail = ml.compute_regime_score(
+                self.nifty.iloc[:idx + 1], mask, xs["COMPOSITE"],
+                prices_df=sliced.loc[self.tickers])
+            got, got_detail = regime(self.panel, idx, xs, mask)
+            self.assertAlmostEqual(got, expected, places=12)
+            self.assertEqual(got_detail["dynamic_n"], detail["dynamic_n"])
+
+    def test_week_ends_and_run(self):
+        rebal = wf.week_end_indices(self.panel["dates"], warmup=252)
+        self.assertEqual(rebal[-1], len(self.panel["dates"]) - 1)
+        self.assertTrue(all(i >= 252 for i in rebal))
+
+        res = wf.run_walk_forward(
+            self.panel, rebal, WINDOWS,
+            regime_fn=wf.nifty_ema_regime(new_entry_threshold=0.0),
+            select_fn=wf.hold_buffer_selector(),
+            weight_fn=wf.composite_inv_vol_weights(),
+            verbose=False)
+        self.assertEqual(len(res), len(rebal) - 1)
+        held = res["Top20_Tickers"].iloc[0].split(", ")
+        self.assertLessEqual(len(held), ml.DEFAULT_MAX_N)
+        self.assertTrue(np.isfinite(res["Equity"]).all())
+        self.assertAlmostEqual(res["Nifty_Equity"].iloc[-1] / 2_000_000.0,
+                               self.nifty.iloc[rebal[-1]] / self.nifty.iloc[rebal[0]])
+
+
+class TestSweep(unittest.TestCase):
+
+    def test_expand_grid(self):
+        configs = sweep.expand_grid({"hold_rank": [30, 40], "min_n": [3, 5, 8]})
+        self.assertEqual(len(configs), 6)
+        self.assertEqual(configs[0]["min_hold_days"], sweep.DEFAULT_CONFIG["min_hold_days"])
+        with self.assertRaises(ValueError):
+            sweep.expand_grid({"hold_rnak": [30]})
+
+    def test_signal_weights_follow_the_regime(self):
+        ema     = {"ema50": 0.4, "ema_trend": 0.2, "breadth": 0.2, "momentum": 0.2}
+        breadth = dict(ml.DEFAULT_SIGNAL_WEIGHTS, momentum=0.3, breadth=0.1)
+        configs = sweep.expand_grid({"regime": ["nifty_ema", "universe_breadth"],
+                                     "signal_weights": [None, {"nifty_ema": ema,
+                                                               "universe_breadth": breadth}]})
+        self.assertEqual([sweep.regime_weights(c) for c in configs],
+                         [None, ema, None, breadth])
+        with self.assertRaises(ValueError):     # nifty_ema keys under universe_breadth
+            sweep.expand_grid({"regime": ["nifty_ema", "universe_breadth"],
+                               "signal_weights": [ema]})
+
+    def test_shared_memory_pool_matches_in_process(self):
+        prices = make_panel(n_tickers=25, n_days=340, seed=11)
+        panel  = wf.build_walk_forward_panel(prices, prices.iloc[0], list(prices.index[1:]),
+                                             RFR_DAILY)
+        configs = sweep.expand_grid({"hold_rank": [10, 40],
+                                     "rel_dd_breach_threshold": [None, -5]})
+        serial   = sweep.run_sweep(panel, configs, workers=1)
+        parallel = sweep.run_sweep(panel, configs, workers=2)
+        metrics  = ["CAGR_Pct", "MDD_Pct", "Avg_Turnover_Pct", "Final_Equity"]
+        pd.testing.assert_frame_equal(serial[metrics], parallel[metrics])
+        self.assertEqual(list(serial["windows"]), ["12M/9M/6M/3M"] * 4)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -4,7 +4,7 @@ date columns in the template.
 
 Usage:
     pip install yfinance openpyxl pandas
-    python update_stock_price.py {NSEAll|N750|N500} [--output-dir PATH]
+    python update_stock_price.py {NSEAll|N750|N500} [--output-dir PATH] [--incremental]
 
 Input/Output:  <universe>.xlsx -> <universe>_updated.xlsx
                Also copies to --output-dir if specified.
@@ -13,7 +13,19 @@ The template must contain two sheets:
   DATA   — tickers in col A, date headers in row 1, price cells empty
   VOLUME — same layout, volume cells empty
 
-Both sheets are populated from a single yf.download() call.
+Both sheets are populated from a single yf.download() call. The NIFTY500
+row (^CRSLDX) comes from the shared benchmark store (Sharpe/benchmark_store.py),
+which fetches only the days it does not hold yet; its VOLUME row stays empty.
+
+--incremental reads the previous <universe>_updated.xlsx, fetches only the
+days since each ticker's last stored close, and re-fetches the full year
+only for tickers that are new or whose overlapping closes no longer match
+(split / bonus / dividend re-adjustment). Columns still follow the
+template's rolling date header, so the oldest day rolls off automatically.
+
+After saving, a columnar price store (<output>.DATA.npz / .VOLUME.npz) is
+written next to the workbook so momentum_lib.load_prices / load_volume can
+skip openpyxl parsing. The store is copied to --output-dir alongside the xlsx.
 """
 
 import argparse
@@ -27,11 +39,23 @@ import pandas as pd
 import yfinance as yf
 import openpyxl
 
+import benchmark_store as bs
+import momentum_lib as ml
+
 
 # ── Config ────────────────────────────────────────────────────────────────────
 BATCH_SIZE  = 50          # tickers per yfinance batch download
 SLEEP_SEC   = 2           # pause between batches (avoid rate-limiting)
 PERIOD      = "1y"        # history period for date columns
+PERIOD_DAYS = 366         # the same window as a start date (benchmark store)
+
+# Incremental mode (--incremental): re-fetch only the tail since the last
+# stored close, starting OVERLAP_DAYS earlier so re-adjusted history can be
+# detected on the overlap and refetched in full for just those tickers.
+OVERLAP_DAYS           = 7       # calendar days of overlap with stored history
+CONSISTENCY_TOL        = 0.0005  # relative close mismatch that flags a re-adjustment
+CONSISTENCY_ABS        = 0.006   # absolute slack: stored closes are rounded to 2 dp
+INCREMENTAL_BATCH_SIZE = 250     # tail requests are tiny — fewer, larger batches
 
 # Tickers whose Yahoo Finance symbol differs from the value stored in the sheet.
 # Key = value as it appears in column A  →  Value = correct Yahoo Finance symbol.
@@ -109,17 +133,21 @@ def ns(ticker: str) -> str:
     if not t.endswith(".NS") and not t.endswith(".BO") and not t.startswith("^"):
         return t + ".NS"
     return t
-def batch_download(tickers_ns: list[str]):
-    """Download 1-year daily Close AND Volume for a batch.
+def batch_download(tickers_ns: list[str], start: datetime.date = None):
+    """Download daily Close AND Volume for a batch.
+
+    Fetches the full PERIOD history by default, or only bars on/after
+    `start` (incremental tail).
 
     Returns (close_df, volume_df) — both indexed by date.
     """
+    window = {"start": start.isoformat()} if start is not None else {"period": PERIOD}
     raw = yf.download(
         tickers_ns,
-        period=PERIOD,
         auto_adjust=True,
         progress=False,
         threads=True,
+        **window,
     )
     if raw.empty:
         return pd.DataFrame(), pd.DataFrame()
@@ -137,23 +165,18 @@ def batch_download(tickers_ns: list[str]):
         volume.index = volume.index.date
     return close, volume
 
-def main(input_file: str, output_file: str, extra_copy_dir: str = None):
-    print(f"Loading template: {input_file}")
-    (wb, ws_data, ws_vol,
-     tickers, ticker_rows, date_cols,
-     vol_ticker_rows, vol_date_cols) = load_template(input_file)
 
-    total = len(tickers)
-    print(f"  {total} tickers | {len(date_cols)} date columns "
-          f"({min(date_cols)} → {max(date_cols)})")
-    if ws_vol is not None:
-        print(f"  VOLUME sheet: {len(vol_ticker_rows)} tickers | "
-              f"{len(vol_date_cols)} date columns")
-    else:
-        print("  ⚠  No VOLUME sheet in template — volume data will not be written.")
-    print()
+def fetch_history(tickers: list[str], start: datetime.date = None,
+                  batch_size: int = BATCH_SIZE):
+    """Download Close + Volume for `tickers` (sheet names, not Yahoo symbols).
+
+    Index / override tickers are fetched one at a time (the Nifty 500 from the
+    shared benchmark store, Close only); equities in batches of `batch_size`. `start` limits the request to the tail on/after that
+    date (None = full PERIOD).
 
-    # ── Batch-download historical close prices AND volume ─────────────────────
+    Returns (all_close, all_volume): ticker → {date: value}. Tickers that
+    returned nothing map to an empty dict.
+    """
     all_close:  dict[str, dict] = {t: {} for t in tickers}  # ticker → {date: price}
     all_volume: dict[str, dict] = {t: {} for t in tickers}  # ticker → {date: volume}
 
@@ -171,9 +194,14 @@ def main(input_file: str, output_file: str, extra_copy_dir: str = None):
             orig = ns_to_original[sym]
             print(f"  {sym} ({orig})", end="", flush=True)
             try:
-                close_df, vol_df = batch_download([sym])
+                if sym == bs.NIFTY500:
+                    first  = start or datetime.date.today() - datetime.timedelta(days=PERIOD_DAYS)
+                    series = bs.get_frame(bs.NIFTY500, start=first)["Close"].dropna()
+                    all_close[orig] = dict(zip(series.index.date, series.to_numpy()))
+                    print(f"  ✓ ({len(series)} rows, benchmark store)")
+                    continue
+                close_df, vol_df = batch_download([sym], start)
                 if not close_df.empty:
-                    col_name = close_df.columns[0] if isinstance(close_df.columns[0], str) else sym
                     series = close_df.iloc[:, 0].dropna()
                     all_close[orig] = series.to_dict()
                     if not vol_df.empty:
@@ -187,13 +215,14 @@ def main(input_file: str, output_file: str, extra_copy_dir: str = None):
             time.sleep(1)
 
     # ── Download equity tickers in batches ────────────────────────────────────
-    batches = [equity_tickers[i:i + BATCH_SIZE] for i in range(0, len(equity_tickers), BATCH_SIZE)]
-    print(f"\nDownloading equity prices + volume in {len(batches)} batches of ≤{BATCH_SIZE}…")
+    batches = [equity_tickers[i:i + batch_size] for i in range(0, len(equity_tickers), batch_size)]
+    if batches:
+        print(f"\nDownloading equity prices + volume in {len(batches)} batches of ≤{batch_size}…")
 
     for idx, batch in enumerate(batches, 1):
         print(f"  Batch {idx}/{len(batches)}: {batch[0]} … {batch[-1]}", end="", flush=True)
         try:
-            close_df, vol_df = batch_download(batch)
+            close_df, vol_df = batch_download(batch, start)
             if not close_df.empty:
                 for col in close_df.columns:
                     orig = ns_to_original.get(col, col.replace(".NS", ""))
@@ -210,6 +239,132 @@ def main(input_file: str, output_file: str, extra_copy_dir: str = None):
         if idx < len(batches):
             time.sleep(SLEEP_SEC)
 
+    return all_close, all_volume
+
+
+# ── Incremental mode ──────────────────────────────────────────────────────────
+def load_previous_history(output_file: str):
+    """Read the last <universe>_updated.xlsx (store-first via momentum_lib).
+
+    Returns (prev_close, prev_volume) as ticker → {date: value} dicts
+    (NIFTY500 included), or (None, None) if there is no previous output.
+    """
+    if not Path(output_file).exists():
+        return None, None
+    try:
+        prices_df, nifty_series, _, _ = ml.load_prices(output_file)
+    except Exception as e:
+        print(f"  ⚠  Could not read previous output ({e}) — falling back to full fetch.")
+        return None, None
+    volume_df = ml.load_volume(output_file)
+
+    def to_maps(df):
+        return {t: row.dropna().to_dict() for t, row in df.iterrows()}
+
+    prev_close = to_maps(prices_df)
+    prev_close["NIFTY500"] = nifty_series.dropna().to_dict()
+    prev_volume = to_maps(volume_df) if volume_df is not None else {}
+    return prev_close, prev_volume
+
+
+def history_is_consistent(stored: dict, fetched: dict) -> bool:
+    """True if freshly fetched closes agree with stored ones on overlap dates.
+
+    A split / bonus / dividend re-adjustment (auto_adjust=True) rescales the
+    whole history, which shows up as a mismatch on the overlap window. A
+    dividend D on a close P scales earlier closes by (1 - D/P), so the
+    relative tolerance (0.05%) catches any dividend yield above 0.05%.
+    The stored values are rounded to 2 dp, so a close moves by up to 0.005
+    on a re-read; CONSISTENCY_ABS covers that, which on closes below ~Rs 12
+    is the wider of the two bounds.
+    """
+    overlap = [d for d in fetched if d in stored]
+    if not overlap:
+        return False
+    for d in overlap:
+        old, new = stored[d], float(fetched[d])
+        if abs(new - old) > max(CONSISTENCY_ABS, CONSISTENCY_TOL * abs(old)):
+            return False
+    return True
+
+
+def fetch_incremental(tickers: list[str], prev_close: dict, prev_volume: dict):
+    """Fetch only the missing tail per ticker and append it to stored history.
+
+    Tickers are grouped by their last stored date; each group is downloaded
+    from OVERLAP_DAYS before that date so the overlap can be checked with
+    history_is_consistent(). Tickers with no stored history, or whose
+    overlap disagrees, get a full PERIOD refetch.
+
+    Returns (all_close, all_volume) in the same shape as fetch_history().
+    """
+    all_close  = {t: dict(prev_close.get(t, {}))  for t in tickers}
+    all_volume = {t: dict(prev_volume.get(t, {})) for t in tickers}
+
+    # Index tickers (NIFTY500) are a single request (the benchmark store only
+    # asks Yahoo for the days it lacks) and their VOLUME row is not kept by
+    # load_volume — always refetch them in full.
+    by_start: dict[datetime.date, list[str]] = {}
+    refetch = [t for t in tickers if not all_close[t] or ns(t).startswith("^")]
+    for t in tickers:
+        if t not in refetch:
+            start = max(all_close[t]) - datetime.timedelta(days=OVERLAP_DAYS)
+            by_start.setdefault(start, []).append(t)
+
+    for start, group in sorted(by_start.items()):
+        print(f"\nIncremental: {len(group)} ticker(s) from {start} …")
+        tail_close, tail_volume = fetch_history(group, start=start,
+                                                batch_size=INCREMENTAL_BATCH_SIZE)
+        for t in group:
+            if not tail_close[t]:
+                continue  # nothing new (holiday / suspended) — keep stored history
+            if not history_is_consistent(all_close[t], tail_close[t]):
+                refetch.append(t)
+                continue
+            all_close[t].update(tail_close[t])
+            all_volume[t].update(tail_volume[t])
+
+    if refetch:
+        print(f"\nFull {PERIOD} refetch for {len(refetch)} ticker(s) "
+              f"(new or re-adjusted history): {', '.join(refetch[:20])}"
+              f"{' …' if len(refetch) > 20 else ''}")
+        full_close, full_volume = fetch_history(refetch)
+        for t in refetch:
+            all_close[t]  = full_close[t]
+            all_volume[t] = full_volume[t]
+
+    return all_close, all_volume
+
+
+def main(input_file: str, output_file: str, extra_copy_dir: str = None,
+         incremental: bool = False):
+    print(f"Loading template: {input_file}")
+    (wb, ws_data, ws_vol,
+     tickers, ticker_rows, date_cols,
+     vol_ticker_rows, vol_date_cols) = load_template(input_file)
+
+    total = len(tickers)
+    print(f"  {total} tickers | {len(date_cols)} date columns "
+          f"({min(date_cols)} → {max(date_cols)})")
+    if ws_vol is not None:
+        print(f"  VOLUME sheet: {len(vol_ticker_rows)} tickers | "
+              f"{len(vol_date_cols)} date columns")
+    else:
+        print("  ⚠  No VOLUME sheet in template — volume data will not be written.")
+    print()
+
+    # ── Download close prices AND volume (full history or missing tail) ───────
+    prev_close, prev_volume = (load_previous_history(output_file)
+                               if incremental else (None, None))
+    if prev_close:
+        print(f"Incremental mode: extending {output_file} "
+              f"(last stored close {max(max(m) for m in prev_close.values() if m)})")
+        all_close, all_volume = fetch_incremental(tickers, prev_close, prev_volume)
+    else:
+        if incremental:
+            print("Incremental mode: no previous output found — running a full fetch.")
+        all_close, all_volume = fetch_history(tickers)
+
     # ── Write historical prices into DATA sheet ───────────────────────────────
     print("\nWriting historical prices to DATA sheet…")
     for ticker, price_map in all_close.items():
@@ -266,14 +421,21 @@ def main(input_file: str, output_file: str, extra_copy_dir: str = None):
     wb.save(output_file)
     print("Done ✓")
 
+    # ── Columnar price store (fast path for load_prices / load_volume) ────────
+    print("Writing columnar price store…")
+    store_files = ml.write_price_store(output_file)
+    for p in store_files:
+        print(f"  → {p.name}")
+
     # ── Copy to extra directory if specified ──────────────────────────────────
     if extra_copy_dir:
-        dest = Path(extra_copy_dir) / Path(output_file).name
-        try:
-            shutil.copy2(output_file, dest)
-            print(f"Copied → {dest}")
-        except Exception as e:
-            print(f"⚠  Could not copy to {dest}: {e}")
+        for src in [Path(output_file), *store_files]:
+            dest = Path(extra_copy_dir) / src.name
+            try:
+                shutil.copy2(src, dest)
+                print(f"Copied → {dest}")
+            except Exception as e:
+                print(f"⚠  Could not copy to {dest}: {e}")
 
     if errors:
         print(f"\n⚠  {len(errors)} tickers had missing data:")
@@ -289,6 +451,9 @@ if __name__ == "__main__":
     parser.add_argument("universe", choices=["NSEAll", "N750", "N500"], help="Universe name (e.g., N750)")
     parser.add_argument("--output-dir", type=str, default=None,
                         help="Additional directory to copy the output file to (e.g., Sharpe Score folder)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Fetch only days missing from the existing <universe>_updated.xlsx "
+                             "(full refetch only for new or re-adjusted tickers)")
     args = parser.parse_args()
 
     input_file = f"{args.universe}.xlsx"
@@ -298,4 +463,5 @@ if __name__ == "__main__":
         print(f"ERROR: {input_file} not found. Place it in the same folder as this script.")
         sys.exit(1)
         
-    main(input_file, output_file, extra_copy_dir=args.output_dir)
\ No newline at end of file
+    main(input_file, output_file, extra_copy_dir=args.output_dir,
+         incremental=args.incremental)
\ No newline at end of file
@@ -0,0 +1,562 @@
+"""
+walkforward.py
+==============
+Walk-forward backtest engine for the Sharpe momentum strategy.
+
+The backtest scripts used to slice prices_df.iloc[:, :idx+1] at every
+week-end and re-run compute_sharpe / compute_pct_from_52h from scratch —
+O(weeks × tickers × window). This module does the expensive work once:
+
+  * every ticker's valid prices are packed to the left of a matrix, so
+    "the last N valid prices as of date idx" is a fixed column range;
+  * cumulative sums of log returns and squared log returns turn any
+    window's mean / std into two subtractions;
+  * rolling 52-week highs and per-ticker EMAs are computed once over the
+    whole history (both are causal, so the value at idx equals what a
+    sliced recomputation would give).
+
+A rebalance date's cross-section is then an O(tickers) gather. The numbers
+match the per-slice path (_sharpe_ratio, _pct_from_52h, the inverse-vol
+weights in backtest.py) — missing days, listing gaps and coverage rules
+are handled identically.
+
+Functions
+---------
+build_walk_forward_panel(prices_df, nifty_series, stock_tickers, rfr_daily, trading_days, ...)
+    Precompute rolling statistics for every ticker and date.
+    Returns panel: dict.
+
+week_end_indices(dates, warmup)
+    Column indices of the last trading day of each ISO week (+ final day).
+
+walk_forward_cross_section(panel, idx, windows)
+    Sharpe per window, Z-scores, COMPOSITE (normalised), SHARPE_3,
+    PCT_FROM_52H, VOL_<w>, EMA<span> and LAST_PX as of column idx.
+
+rank_cross_section(xs, min_pct_from_52h)
+    Eligible (PCT_FROM_52H >= threshold) rows ranked by COMPOSITE.
+
+run_walk_forward(panel, rebalance_idx, windows, regime_fn, select_fn, weight_fn, ...)
+    Simulate the weekly rebalance loop with pluggable strategy rules.
+    Returns results DataFrame (one row per rebalance).
+
+Strategy callbacks
+------------------
+nifty_ema_regime(...)         — backtest.py regime (NIFTY EMA bands + vol brake)
+universe_breadth_regime(...)  — live regime, same as ml.compute_regime_score
+hold_buffer_selector(...)     — rank ≤ 40 hold buffer, 28-day lock, dynamic N
+composite_inv_vol_weights(...) — COMPOSITE / mean vol, per-stock 5% cap
+"""
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+import allocator as al
+import momentum_lib as ml
+
+
+# ── DEFAULTS ──────────────────────────────────────────────────────────────────
+DEFAULT_HIGH_WINDOW  = 252
+DEFAULT_VOL_WINDOWS  = al.DEFAULT_VOL_WINDOWS
+DEFAULT_EMA_SPANS    = (50, 200)
+NIFTY_VOL_WINDOW     = 20
+
+
+# ── PANEL PRECOMPUTATION ──────────────────────────────────────────────────────
+
+def _left_pack_valid(values: np.ndarray) -> np.ndarray:
+    """
+    Move each row's non-NaN entries to the left, preserving order.
+    Column k of row i is then the (k+1)-th valid observation of ticker i.
+    """
+    order = np.argsort(np.isnan(values), axis=1, kind="stable")
+    return np.take_along_axis(values, order, axis=1)
+
+
+def _window_sums(cum: np.ndarray, end: np.ndarray, length: np.ndarray) -> np.ndarray:
+    """Row-wise cum[end] - cum[end - length] (indices clipped to the matrix)."""
+    rows = np.arange(cum.shape[0])
+    hi   = np.clip(end, 0, cum.shape[1] - 1)
+    lo   = np.clip(end - length, 0, cum.shape[1] - 1)
+    return cum[rows, hi] - cum[rows, lo]
+
+
+def build_walk_forward_panel(prices_df: pd.DataFrame,
+                             nifty_series: pd.Series,
+                             stock_tickers: list,
+                             rfr_daily: float,
+                             trading_days: int = 252,
+                             high_window: int = DEFAULT_HIGH_WINDOW,
+                             ema_spans: tuple = DEFAULT_EMA_SPANS) -> dict:
+    """
+    One pass over the full price history; everything a rebalance needs is
+    then an index lookup.
+
+    Layout (n = tickers, T = dates):
+      packed   : n × T  valid prices packed left (NaN padded)
+      count    : n × T  number of valid prices at or before each date
+      cum_r    : n × T  cum_r[:, k] = sum of the first k packed log returns
+      cum_r2   : n × T  same for squared log returns
+      high     : n × T  rolling `high_window` max over packed prices
+      ema      : {span: n × T}  per-ticker EMA on the raw (gappy) panel,
+                 identical to prices_df.T.ewm(span, adjust=False) on a slice
+      px_ffill : n × T  forward-filled prices for period returns
+      nifty_*  : forward-filled NIFTY500, its EMAs, 20-day realised vol and
+                 % from its own 52W high (for REL_52H_DD)
+
+    Returns panel: dict.
+    """
+    frame  = prices_df.reindex(stock_tickers)
+    values = frame.to_numpy(dtype=float)
+    n, T   = values.shape
+
+    packed = _left_pack_valid(values)
+    count  = np.cumsum(~np.isnan(values), axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_r = np.log(packed[:, 1:] / packed[:, :-1])
+    log_r  = np.nan_to_num(log_r, nan=0.0)
+    zeros  = np.zeros((n, 1))
+    cum_r  = np.hstack([zeros, np.cumsum(log_r, axis=1)])
+    cum_r2 = np.hstack([zeros, np.cumsum(log_r * log_r, axis=1)])
+
+    high = (pd.DataFrame(packed.T)
+              .rolling(high_window, min_periods=1).max()
+              .to_numpy().T)
+
+    ema = {span: frame.T.ewm(span=span, adjust=False).mean().to_numpy().T
+           for span in ema_spans}
+
+    px_ffill = frame.ffill(axis=1).to_numpy(dtype=float)
+
+    nifty_ffill = nifty_series.reindex(prices_df.columns).ffill()
+    nifty_valid = nifty_ffill.dropna()
+    nifty_ema   = {span: nifty_valid.ewm(span=span, adjust=False).mean()
+                              .reindex(nifty_ffill.index).to_numpy()
+                   for span in ema_spans}
+    nifty_vol   = (np.log(nifty_valid).diff()
+                     .rolling(NIFTY_VOL_WINDOW).std(ddof=1) * np.sqrt(trading_days))
+
+    # Benchmark % from its own 52W high (_pct_from_52h on the raw series)
+    nifty_raw   = nifty_series.dropna()
+    nifty_high  = nifty_raw.rolling(high_window, min_periods=1).max()
+    nifty_pct   = ((nifty_raw / nifty_high - 1) * 100).where(nifty_high > 0)
+    nifty_pct.iloc[:1] = np.nan
+    nifty_pct   = nifty_pct.reindex(prices_df.columns).ffill()
+
+    return {
+        "tickers":      list(stock_tickers),
+        "dates":        list(prices_df.columns),
+        "rfr_daily":    rfr_daily,
+        "trading_days": trading_days,
+        "high_window":  high_window,
+        "packed":       packed,
+        "count":        count,
+        "cum_r":        cum_r,
+        "cum_r2":       cum_r2,
+        "high":         high,
+        "ema":          ema,
+        "px_ffill":     px_ffill,
+        "nifty_ffill":  nifty_ffill.to_numpy(dtype=float),
+        "nifty_count":  np.cumsum(nifty_ffill.notna().to_numpy()),
+        "nifty_ema":    nifty_ema,
+        "nifty_vol":    nifty_vol.reindex(nifty_ffill.index).to_numpy(),
+        "nifty_pct_52h": nifty_pct.to_numpy(dtype=float),
+    }
+
+
+def week_end_indices(dates: list, warmup: int = 252) -> list:
+    """
+    Column indices of the last trading day of each ISO week, plus the final
+    day in the data, skipping anything before `warmup` (12M Sharpe buffer).
+    """
+    weeks = pd.DatetimeIndex(dates).isocalendar().week.to_numpy()
+    ends  = list(np.flatnonzero(weeks[:-1] != weeks[1:]))
+    ends.append(len(dates) - 1)
+    return [int(i) for i in ends if i >= warmup]
+
+
+# ── CROSS-SECTION ─────────────────────────────────────────────────────────────
+
+def _window_moments(panel: dict, c: np.ndarray, n_ret: np.ndarray):
+    """Mean and sample std (ddof=1) of the last `n_ret` log returns per row."""
+    end = c - 1
+    s1  = _window_sums(panel["cum_r"],  end, n_ret)
+    s2  = _window_sums(panel["cum_r2"], end, n_ret)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = s1 / n_ret
+        var  = (s2 - s1 * s1 / n_ret) / (n_ret - 1)
+    sd = np.sqrt(np.clip(var, 0.0, None))
+    return mean, sd
+
+
+def _sharpe_columns(panel: dict, c: np.ndarray, windows: dict) -> dict:
+    """{label: raw Sharpe array} — same rules as _sharpe_ratio()."""
+    out = {}
+    for label, window in windows.items():
+        n_ret    = np.minimum(window, c - 1)
+        mean, sd = _window_moments(panel, c, n_ret)
+        ok       = (c >= window * 0.90) & (n_ret >= 2) & (sd >= 1e-12)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = (mean - panel["rfr_daily"]) / sd * np.sqrt(panel["trading_days"])
+        out[label] = np.where(ok, sharpe, np.nan)
+    return out
+
+
+def _z_filled(values: np.ndarray) -> np.ndarray:
+    """ml._cross_section_z followed by fillna(0), on a plain array."""
+    valid = ~np.isnan(values)
+    z     = np.zeros_like(values)
+    if valid.sum() >= 2:
+        sd = values[valid].std(ddof=1)
+        if sd > 0:
+            z[valid] = (values[valid] - values[valid].mean()) / sd
+    return z
+
+
+def _normalise(values: np.ndarray) -> np.ndarray:
+    """Vectorised ml.normalise_composite."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(values > 1, values + 1.0,
+                        np.where(values < 0, 1.0 / (1.0 - values), values))
+
+
+def walk_forward_sharpe(panel: dict, idx: int, windows: dict) -> pd.DataFrame:
+    """
+    Raw Sharpe per window as of column idx — same rules as _sharpe_ratio():
+    NaN below 90% coverage or for (near-)zero volatility.
+    """
+    return pd.DataFrame(_sharpe_columns(panel, panel["count"][:, idx], windows),
+                        index=panel["tickers"])
+
+
+def walk_forward_cross_section(panel: dict, idx: int, windows: dict,
+                               vol_windows: tuple = DEFAULT_VOL_WINDOWS) -> pd.DataFrame:
+    """
+    Everything the strategy rules look at on rebalance date `idx`.
+
+    Columns: <window labels> (raw Sharpe), Z_<label>, COMPOSITE (normalised),
+    SHARPE_3 (when 12M/6M/3M present), PCT_FROM_52H, REL_52H_DD (vs the
+    benchmark, see ml.compute_relative_52h_dd), VOL_<w> (annualised
+    std of raw log returns over the last w prices, NaN with <= 10 prices),
+    EMA<span>, LAST_PX, VALID_OBS.
+
+    Z-scores and COMPOSITE follow ml.sharpe_z_scores / normalise_composite;
+    the frame is assembled once from arrays since this runs every rebalance.
+
+    Returns xs: DataFrame indexed by ticker (panel order).
+    """
+    c    = panel["count"][:, idx]
+    rows = np.arange(len(c))
+    last = np.clip(c - 1, 0, None)
+
+    cols = _sharpe_columns(panel, c, windows)
+    for label in windows:
+        cols[f"Z_{label}"] = _z_filled(cols[label])
+    core = [f"Z_{l}" for l in windows if l != "1M"]
+    cols["COMPOSITE"] = _normalise(np.mean([cols[z] for z in core], axis=0))
+    if all(k in windows for k in ["12M", "6M", "3M"]):
+        cols["SHARPE_3"] = np.mean([cols["Z_12M"], cols["Z_6M"], cols["Z_3M"]], axis=0)
+
+    last_px = np.where(c >= 1, panel["packed"][rows, last], np.nan)
+    high    = panel["high"][rows, last]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = (last_px / high - 1) * 100
+    cols["PCT_FROM_52H"] = np.where((c >= 2) & (high > 0), pct, np.nan)
+    cols["REL_52H_DD"]   = cols["PCT_FROM_52H"] - panel["nifty_pct_52h"][idx]
+
+    for window in vol_windows:
+        n_ret    = np.minimum(window, c) - 1
+        _, sd    = _window_moments(panel, c, n_ret)
+        cols[f"VOL_{window}"] = np.where((c > 10) & (n_ret > 5),
+                                         sd * np.sqrt(panel["trading_days"]), np.nan)
+
+    for span, ema in panel["ema"].items():
+        cols[f"EMA{span}"] = ema[:, idx]
+    cols["LAST_PX"]   = last_px
+    cols["VALID_OBS"] = c
+    return pd.DataFrame(cols, index=panel["tickers"])
+
+
+def rank_cross_section(xs: pd.DataFrame, min_pct_from_52h: float = -25.0) -> pd.DataFrame:
+    """Eligible rows (PCT_FROM_52H >= threshold) with RANK by COMPOSITE, sorted."""
+    ranked = xs[xs["PCT_FROM_52H"] >= min_pct_from_52h].copy()
+    ranked["RANK"] = ranked["COMPOSITE"].rank(ascending=False, method="first",
+                                              na_option="bottom")
+    return ranked.sort_values("RANK", ascending=True)
+
+
+# ── STRATEGY CALLBACKS ────────────────────────────────────────────────────────
+# regime_fn(panel, idx, xs, eligible_mask) -> (score, detail)
+#     detail must carry "dynamic_n" and "allow_new".
+# select_fn(book, ranked, detail, date) -> list of tickers to hold
+#     book = {ticker: {"entry_date": date, "weight": w}} from last rebalance.
+# weight_fn(xs, tickers) -> {ticker: weight}
+
+def _dynamic_n(score: float, min_n: int, max_n: int) -> int:
+    return int(min_n + min(score / 0.75, 1.0) * (max_n - min_n))
+
+
+def nifty_ema_regime(min_n: int = ml.DEFAULT_MIN_N,
+                     max_n: int = ml.DEFAULT_MAX_N,
+                     new_entry_threshold: float = ml.DEFAULT_NEW_ENTRY_THRESHOLD,
+                     signal_weights: dict = None,
+                     ema50_band: float = 0.10,
+                     ema_trend_band: float = 0.05,
+                     vol_brake: bool = True):
+    """
+    Regime used by backtest.py: NIFTY500 distance from EMA50 and EMA50/EMA200
+    spread as banded scores, 52H breadth, momentum breadth, minus a
+    volatility panic brake (0 at 15% 20-day vol, up to 0.50 at 25%).
+    """
+    if signal_weights is None:
+        signal_weights = {"ema50": 0.35, "ema_trend": 0.25,
+                          "breadth": 0.25, "momentum": 0.15}
+
+    def regime(panel, idx, xs, eligible_mask):
+        if panel["nifty_count"][idx] < 200:
+            return 0.5, {"dynamic_n": 15, "allow_new": True}
+        price  = panel["nifty_ffill"][idx]
+        ema50  = panel["nifty_ema"][50][idx]
+        ema200 = panel["nifty_ema"][200][idx]
+        ema50_score     = float(np.clip((price / ema50  - 1.0) / ema50_band     + 0.5, 0.0, 1.0))
+        ema_trend_score = float(np.clip((ema50  / ema200 - 1.0) / ema_trend_band + 0.5, 0.0, 1.0))
+        total  = len(eligible_mask)
+        elig   = int(eligible_mask.sum())
+        breadth_score  = elig / total if total > 0 else 0.5
+        pos_mom        = int((xs["COMPOSITE"][eligible_mask] > 1.5).sum())
+        momentum_score = pos_mom / max(1, elig)
+
+        raw_score = (
+            ema50_score     * signal_weights["ema50"]     +
+            ema_trend_score * signal_weights["ema_trend"] +
+            breadth_score   * signal_weights["breadth"]   +
+            momentum_score  * signal_weights["momentum"]
+        )
+
+        vol_penalty = 0.0
+        ann_vol     = panel["nifty_vol"][idx]
+        if vol_brake and not np.isnan(ann_vol) and ann_vol > 0.15:
+            vol_penalty = min(0.50, (ann_vol - 0.15) * (0.50 / 0.10))
+
+        score = max(0.0, raw_score - vol_penalty)
+        return score, {"dynamic_n": _dynamic_n(score, min_n, max_n),
+                       "allow_new": score >= new_entry_threshold}
+
+    return regime
+
+
+def universe_breadth_regime(min_n: int = ml.DEFAULT_MIN_N,
+                            max_n: int = ml.DEFAULT_MAX_N,
+                            new_entry_threshold: float = ml.DEFAULT_NEW_ENTRY_THRESHOLD,
+                            signal_weights: dict = None):
+    """
+    Live regime (ml.compute_regime_score with prices_df): whole-universe
+    EMA50 / EMA50>EMA200 breadth from the precomputed per-ticker EMAs.
+    """
+    if signal_weights is None:
+        signal_weights = ml.DEFAULT_SIGNAL_WEIGHTS
+
+    def regime(panel, idx, xs, eligible_mask):
+        if panel["nifty_count"][idx] < 200:
+            return 0.5, {"dynamic_n": int((min_n + max_n) / 2), "allow_new": True}
+        if idx + 1 >= 200:
+            c       = panel["count"][:, idx]
+            prev    = panel["count"][:, idx - 1]
+            raw_px  = xs["LAST_PX"].where(c > prev)      # NaN if no print today
+            valid   = raw_px.notna() & xs["EMA200"].notna()
+            n_valid = int(valid.sum())
+            if n_valid > 0:
+                ema50_score     = float((raw_px[valid] > xs["EMA50"][valid]).sum()) / n_valid
+                ema_trend_score = float((xs["EMA50"][valid] > xs["EMA200"][valid]).sum()) / n_valid
+            else:
+                ema50_score = ema_trend_score = 0.5
+        else:
+            price  = panel["nifty_ffill"][idx]
+            ema50  = panel["nifty_ema"][50][idx]
+            ema200 = panel["nifty_ema"][200][idx]
+            ema50_score     = 1.0 if price > ema50 else 0.0
+            ema_trend_score = 1.0 if ema50 > ema200 else 0.0
+
+        total          = len(eligible_mask)
+        elig           = int(eligible_mask.sum())
+        breadth_score  = elig / total if total > 0 else 0.5
+        pos_mom        = int((xs["COMPOSITE"][eligible_mask] > 1.5).sum())
+        momentum_score = pos_mom / max(1, elig)
+
+        score = (
+            ema50_score     * signal_weights["ema50_breadth"]     +
+            ema_trend_score * signal_weights["ema_trend_breadth"] +
+            breadth_score   * signal_weights["breadth"]           +
+            momentum_score  * signal_weights["momentum"]
+        )
+        return score, {"dynamic_n": _dynamic_n(score, min_n, max_n),
+                       "allow_new": score >= new_entry_threshold}
+
+    return regime
+
+
+def hold_buffer_selector(hold_rank: int = 40, min_hold_days: int = 28,
+                         rel_dd_breach_threshold: float = None):
+    """
+    Pass 1: keep a held stock while it is still eligible and either ranks
+    within `hold_rank` or has been held fewer than `min_hold_days` days.
+    With `rel_dd_breach_threshold` set, a stock whose REL_52H_DD is below it
+    also exits once the hold lock has expired (Sharpe.py EXIT_REL_DD).
+    Pass 2: if the regime allows new entries, fill up to dynamic_n from the
+    top of the ranking.
+    """
+    def select(book, ranked, detail, date):
+        keep = []
+        for ticker, state in book.items():
+            if ticker not in ranked.index:
+                continue
+            days_held = (date - state["entry_date"]).days
+            locked    = days_held < min_hold_days
+            if (rel_dd_breach_threshold is not None and not locked
+                    and ranked.at[ticker, "REL_52H_DD"] < rel_dd_breach_threshold):
+                continue
+            if ranked.at[ticker, "RANK"] <= hold_rank or locked:
+                keep.append(ticker)
+
+        if detail["allow_new"]:
+            slots = detail["dynamic_n"] - len(keep)
+            for ticker in ranked.index:
+                if slots <= 0:
+                    break
+                if ticker not in keep:
+                    keep.append(ticker)
+                    slots -= 1
+        return keep
+
+    return select
+
+
+def composite_inv_vol_weights(max_weight: float = 0.05,
+                              vol_windows: tuple = DEFAULT_VOL_WINDOWS,
+                              redistribute: bool = False):
+    """
+    COMPOSITE / mean(VOL_<w>) normalised to 1, then each name capped at
+    `max_weight` (the excess stays in cash, as in live Sharpe.py, unless
+    `redistribute`). Falls back to raw COMPOSITE when volatility is
+    unavailable. Same steps as allocator.target_weights().
+    """
+    vol_cols = [f"VOL_{w}" for w in vol_windows]
+
+    def weights(xs, tickers):
+        if not tickers:
+            return {}
+        sub = xs.loc[tickers]
+        raw = al.raw_weights(sub["COMPOSITE"].to_numpy(), sub[vol_cols].to_numpy())
+        return dict(zip(tickers, al.cap_weights(al.normalise(raw), max_weight, redistribute)))
+
+    return weights
+
+
+# ── SIMULATION ────────────────────────────────────────────────────────────────
+
+def run_walk_forward(panel: dict,
+                     rebalance_idx: list,
+                     windows: dict,
+                     regime_fn,
+                     select_fn,
+                     weight_fn,
+                     min_pct_from_52h: float = -25.0,
+                     friction: float = 0.002,
+                     cash_yield_pa: float = 0.06,
+                     start_equity: float = 2_000_000.0,
+                     cash_when_blocked: bool = True,
+                     verbose: bool = True) -> pd.DataFrame:
+    """
+    Weekly walk-forward loop. At each rebalance index the cross-section is
+    looked up, ranked, passed through the callbacks, and the resulting
+    book earns its forward-filled price return to the next rebalance.
+
+    cash_when_blocked : when the regime blocks new entries, the whole period
+                        earns the cash yield (backtest.py behaviour).
+    Friction is charged on the sum of absolute weight changes.
+
+    Returns DataFrame with backtest.py's columns (Rebalance_Date, Regime,
+    Eligible_Count, Turnover_Pct, Gross_Return, Net_Return, Nifty_Return,
+    Equity, Nifty_Equity, Top20_Tickers) plus Regime_Score and Dynamic_N.
+    """
+    dates      = panel["dates"]
+    tickers    = panel["tickers"]
+    pos        = {t: i for i, t in enumerate(tickers)}
+    px_ffill   = panel["px_ffill"]
+    nifty      = panel["nifty_ffill"]
+    period_ret = (1.0 + cash_yield_pa) ** (1 / 52) - 1.0
+
+    equity       = start_equity
+    nifty_equity = start_equity
+    book         = {}
+    log          = []
+
+    for i in range(len(rebalance_idx) - 1):
+        idx, next_idx = rebalance_idx[i], rebalance_idx[i + 1]
+        t_date        = dates[idx]
+
+        xs            = walk_forward_cross_section(panel, idx, windows)
+        eligible_mask = xs["PCT_FROM_52H"] >= min_pct_from_52h
+        ranked        = rank_cross_section(xs, min_pct_from_52h)
+
+        score, detail = regime_fn(panel, idx, xs, eligible_mask)
+        allow_new     = detail["allow_new"]
+        dynamic_n     = detail["dynamic_n"]
+        regime        = f"BUY ({score:.2f})" if allow_new else f"CASH ({score:.2f})"
+
+        held    = select_fn(book, ranked, detail, t_date)
+        weights = weight_fn(xs, held)
+        new_book = {t: {"entry_date": book[t]["entry_date"] if t in book else t_date,
+                        "weight":     weights[t]}
+                    for t in held}
+
+        if cash_when_blocked and not allow_new:
+            gross_ret = period_ret
+        elif new_book:
+            rows      = [pos[t] for t in new_book]
+            w         = np.array([s["weight"] for s in new_book.values()])
+            stock_ret = px_ffill[rows, next_idx] / px_ffill[rows, idx] - 1.0
+            cash_w    = max(0.0, 1.0 - w.sum())
+            gross_ret = np.nansum(stock_ret * w) + cash_w * period_ret
+            if pd.isna(gross_ret):
+                gross_ret = 0.0
+        else:
+            gross_ret = period_ret
+
+        abs_change = sum(abs(new_book.get(t, {"weight": 0.0})["weight"] -
+                             book.get(t, {"weight": 0.0})["weight"])
+                         for t in set(book) | set(new_book))
+        net_ret    = gross_ret - abs_change * friction
+        nifty_ret  = nifty[next_idx] / nifty[idx] - 1.0
+
+        equity       *= (1 + net_ret)
+        nifty_equity *= (1 + nifty_ret)
+
+        if verbose:
+            sys.stdout.write(f"\r  [{i+1}/{len(rebalance_idx)-1}] {t_date.strftime('%b %Y')} | "
+                             f"Eq: {equity:12,.0f} | RS: {score:.2f} | N={dynamic_n:2d} | "
+                             f"Held: {len(new_book):2d}")
+            sys.stdout.flush()
+
+        log.append({
+            "Rebalance_Date": t_date.strftime("%Y-%m-%d"),
+            "Regime":         regime,
+            "Regime_Score":   score,
+            "Dynamic_N":      dynamic_n,
+            "Eligible_Count": len(ranked),
+            "Turnover_Pct":   abs_change / 2.0 * 100,
+            "Gross_Return":   gross_ret,
+            "Net_Return":     net_ret,
+            "Nifty_Return":   nifty_ret,
+            "Equity":         equity,
+            "Nifty_Equity":   nifty_equity,
+            "Top20_Tickers":  ", ".join(new_book) if new_book else "CASH",
+        })
+        book = new_book
+
+    if verbose and log:
+        print()
+    return pd.DataFrame(log)
@@ -66,7 +66,6 @@ DEFAULT_BOT         = 0.20      # short bottom 20%
 DEFAULT_MIN_OBS     = 24        # minimum non-NaN obs to run regression
 DEFAULT_LIQUIDITY   = 1.0       # crore INR average monthly traded value
 NSE500_API_URL      = "https://www.niftyindices.com/IndexConstituents/ind_nifty500list.csv"
-NIFTY500_TICKER     = "^CRSLDX"   # Nifty 500 TR index on Yahoo Finance
 RF_TICKER           = "INDA.NS"   # fallback; we use RBI 91-day T-bill proxy (4% ann default)
 RF_ANNUAL_DEFAULT   = 0.065       # 6.5% annualised RBI repo rate proxy
 SLEEP_BETWEEN_DL    = 0.05       # seconds between yfinance calls